@@ -7,6 +7,10 @@ from langgraph.graph import StateGraph, END
 from agents.query_agent import query_agent
 from agents.visualization_agent import visualization_agent
 from utils.mongo_connector import mongo_connector
+from utils.result_cache import query_result_cache
+from collection_names import FIELD_STATS_COLLECTION
+from data_ingestion.field_stats import FieldStatsStore
+from data_ingestion.summaries import SummaryStore
 
 
 class AgentState(TypedDict):
@@ -20,12 +24,14 @@ class AgentState(TypedDict):
     plotly_figure: Dict[str, Any]
     error: str
     step: str
+    summary: Optional[str]
 
 
 class OrchestrationAgent:
     """
     Orchestrates the entire BI pipeline using LangGraph
     Workflow: Query → Parse → Execute → Visualize
+    (questions a dashboard summary answers skip schema and LLM: Route → Execute → Visualize)
     """
     
     def __init__(self):
@@ -37,13 +43,19 @@ class OrchestrationAgent:
         workflow = StateGraph(AgentState)
         
         # Define nodes
+        workflow.add_node("route_summary", self.route_summary_node)
         workflow.add_node("fetch_schema", self.fetch_schema_node)
         workflow.add_node("generate_query", self.generate_query_node)
         workflow.add_node("execute_query", self.execute_query_node)
         workflow.add_node("create_visualization", self.create_visualization_node)
         
         # Define edges (workflow)
-        workflow.set_entry_point("fetch_schema")
+        workflow.set_entry_point("route_summary")
+        workflow.add_conditional_edges(
+            "route_summary",
+            lambda state: "execute_query" if state.get('summary') else "fetch_schema",
+            {"execute_query": "execute_query", "fetch_schema": "fetch_schema"}
+        )
         workflow.add_edge("fetch_schema", "generate_query")
         workflow.add_edge("generate_query", "execute_query")
         workflow.add_edge("execute_query", "create_visualization")
@@ -51,6 +63,25 @@ class OrchestrationAgent:
         
         return workflow.compile()
     
+    def route_summary_node(self, state: AgentState) -> AgentState:
+        """Node 0: Answer from a precomputed dashboard summary when one covers the question"""
+        try:
+            # Unscoped questions run against the default collection, so only route when that is summarized
+            collection = state.get('collection') or os.getenv('MONGODB_COLLECTION', 'reconciliation_records')
+            route = SummaryStore(mongo_connector.get_database()).route(state['query'], collection)
+        except Exception as e:
+            print(f"⚠️  Summary routing skipped: {e}")
+            route = None
+        
+        if route:
+            state['summary'] = route['summary']
+            state['collection'] = route['collection']
+            state['pipeline'] = route['pipeline']
+            state['step'] = 'summary_routed'
+            print(f"\n🧩 Answering from summary {route['summary']}")
+        
+        return state
+    
     def fetch_schema_node(self, state: AgentState) -> AgentState:
         """Node 1: Fetch collection schema"""
         print("\n📋 Step 1: Fetching collection schema...")
@@ -58,6 +89,7 @@ class OrchestrationAgent:
         try:
             collection = state.get('collection') or os.getenv('MONGODB_COLLECTION', 'reconciliation_records')
             schema = mongo_connector.get_collection_schema(collection)
+            FieldStatsStore(mongo_connector.get_collection(FIELD_STATS_COLLECTION)).annotate_schema(schema, collection)
             state['schema'] = schema
             state['step'] = 'schema_fetched'
             print(f"✅ Schema fetched: {len(schema.get('fields', []))} fields from {collection}")
@@ -172,7 +204,8 @@ class OrchestrationAgent:
             'chart_config': {},
             'plotly_figure': {},
             'error': '',
-            'step': 'initialized'
+            'step': 'initialized',
+            'summary': None
         }
         
         # Execute workflow
@@ -189,18 +222,74 @@ class OrchestrationAgent:
             'metadata': {
                 'step': final_state.get('step'),
                 'record_count': len(final_state.get('data', [])),
-                'chart_type': final_state.get('chart_config', {}).get('chart_type')
+                'chart_type': final_state.get('chart_config', {}).get('chart_type'),
+                'summary': final_state.get('summary')
             }
         }
         
         if final_state.get('error'):
             response['error'] = final_state['error']
+        else:
+            # Cache the result so /rechart can re-render it without LLM or MongoDB
+            response['metadata']['result_id'] = query_result_cache.put({
+                'query': query,
+                'collection': collection,
+                'pipeline': response['pipeline'],
+                'data': response['data'],
+                'chart_config': response['chart_config']
+            })
         
         print(f"\n{'='*60}")
         print(f"✅ Pipeline Complete: {response['success']}")
         print(f"{'='*60}\n")
         
         return response
+    
+    def rechart(self, result_id: str, chart_spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Re-render a cached query result with a different chart specification
+        
+        Args:
+            result_id: ID from the metadata of a previous process_query response
+            chart_spec: Overrides for chart_type, x_axis, y_axis, labels, values, title
+            
+        Returns:
+            Response in the same format as process_query, or None if the
+            result is unknown or has expired
+        """
+        cached = query_result_cache.get(result_id)
+        if cached is None:
+            return None
+        
+        chart_config = dict(cached['chart_config'])
+        chart_config.update({k: v for k, v in chart_spec.items() if v is not None})
+        
+        chart_type = chart_config.get('chart_type')
+        if chart_type not in visualization_agent.CHART_TYPES:
+            raise ValueError(f"Unsupported chart type: {chart_type}")
+        
+        columns = chart_config.get('columns') or []
+        for key in ('x_axis', 'y_axis', 'labels', 'values'):
+            column = chart_spec.get(key)
+            if column is not None and column not in columns:
+                raise ValueError(f"Unknown column for {key}: {column}")
+        
+        plotly_figure = visualization_agent.create_plotly_figure(chart_config)
+        
+        return {
+            'success': True,
+            'query': cached['query'],
+            'pipeline': cached['pipeline'],
+            'data': cached['data'],
+            'chart_config': chart_config,
+            'plotly_figure': plotly_figure,
+            'metadata': {
+                'step': 'visualization_created',
+                'record_count': len(cached['data']),
+                'chart_type': chart_type,
+                'result_id': result_id
+            }
+        }
 
 
 # Create singleton instance
@@ -71,6 +71,11 @@ class QueryAgent:
         5. discrepancies - Identified mismatches with severity levels (high, medium, low)
         6. discrepancyResolution - Resolution records with status (Approved, Rejected, Pending)
         7. ticket - Issue tracking with risk levels (High, Medium, Low) and status (Progress, Resolved, Closed)
+        8. matchingResultCells - matchingResult flattened to one indexed document per cell source:
+           matchingResultId, matchingMethodId, rule (matching rule name), rowIndex, colIndex, column,
+           value (cell value), matchType (exact, aggregated, computed, none), reconciled (row status),
+           severity, discrepancyType, sourceIndex, tableId, documentId (source name), sourceAmount,
+           vendorType, sourceDate. Indexed on matchingMethodId+rule, tableId, vendorType, sourceDate, reconciled.
 
         CRITICAL FIELD PATTERNS:
         - IDs: Use ObjectId references (_id, profileId, matchingMethodId, workspaceId, organizationId)
@@ -78,7 +83,10 @@ class QueryAgent:
         - Dates: ISO date format in createdAt, updatedAt, resolvedAt, expiresAt
         - Status: String enums (Completed, Settled, Approved, Progress, etc.)
         - Vendor Types: "American Express", "Mastercard", "AMERICAN EXPRESS" (case-insensitive)
-        - Nested Data: matchingResult contains deeply nested "cells" and "sources" arrays
+        - Nested Data: matchingResult contains deeply nested "cells" and "sources" arrays;
+          prefer matchingResultCells, which needs no $unwind
+        - Cell facts: a cell's value repeats on each of its sources, so sum "value" over
+          {{"sourceIndex": 0}} to count each cell once; sum "sourceAmount" to total source records
 
         INSTRUCTIONS:
         1. Analyze the question and identify which collections are needed
@@ -89,8 +97,12 @@ class QueryAgent:
         6. Ensure field names match the schema exactly (case-sensitive)
         7. For aggregations, use operators: $sum, $avg, $max, $min, $count
         8. For date operations, use $dateToString, $dateFromString, or date operators
-        9. For array operations in matchingResult, use $unwind and $arrayElemAt
+        9. For questions about reconciled amounts, rules, cells or source records, query
+           matchingResultCells with $match/$group instead of unwinding matchingResult
         10. For discrepancy analysis, filter by severity or type fields
+        11. Use the field statistics in the schema: filter with values that appear in top values
+            and within min..max, group on fields with few distinct values, and add $limit when
+            grouping on a field with many distinct values
 
         RECONCILIATION-SPECIFIC EXAMPLES:
 
@@ -125,19 +137,21 @@ class QueryAgent:
             {{"$sort": {{"count": -1}}}}
         ]
 
-        - "Total amount reconciled per vendor type" → [
-            {{"$lookup": {{
-            "from": "matchingResult",
-            "localField": "_id",
-            "foreignField": "matchingMethodId",
-            "as": "results"
+        - "Total amount reconciled per matching rule" (matchingResultCells) → [
+            {{"$match": {{"matchType": {{"$in": ["exact", "aggregated"]}}, "sourceIndex": 0}}}},
+            {{"$group": {{
+            "_id": "$rule",
+            "totalAmount": {{"$sum": "$value"}}
             }}}},
-            {{"$unwind": "$results"}},
-            {{"$unwind": "$results.rows"}},
-            {{"$unwind": "$results.rows.cells"}},
+            {{"$sort": {{"totalAmount": -1}}}}
+        ]
+
+        - "Total source amount per vendor type for unreconciled rows" (matchingResultCells) → [
+            {{"$match": {{"reconciled": false, "tableId": {{"$exists": true}}}}}},
             {{"$group": {{
-            "_id": "$ruleName",
-            "totalAmount": {{"$sum": "$results.rows.cells.value"}}
+            "_id": "$vendorType",
+            "totalAmount": {{"$sum": "$sourceAmount"}},
+            "records": {{"$sum": 1}}
             }}}},
             {{"$sort": {{"totalAmount": -1}}}}
         ]
@@ -208,17 +222,36 @@ class QueryAgent:
             }
     
     def _format_schema(self, schema: Dict[str, Any]) -> str:
-        """Format schema information for prompt"""
+        """Format schema information (with ingestion field statistics, if any) for prompt"""
         if not schema.get('fields'):
             return "No schema information available"
         
         field_list = []
+        if schema.get('document_count'):
+            field_list.append(f"  ({schema['document_count']} documents)")
         for field in schema['fields']:
             types = ', '.join(field['types'])
-            field_list.append(f"  - {field['name']}: {types}")
+            line = f"  - {field['name']}: {types}"
+            stats = field.get('stats')
+            if stats:
+                line += self._format_field_stats(stats)
+            field_list.append(line)
         
         return "\n".join(field_list)
     
+    @staticmethod
+    def _format_field_stats(stats: Dict[str, Any]) -> str:
+        """Compact one-line summary of a field's statistics"""
+        parts = [f"~{stats['distinct_estimate']} distinct"]
+        if stats.get('null_rate'):
+            parts.append(f"{stats['null_rate']:.0%} null/missing")
+        if 'min' in stats:
+            parts.append(f"range {stats['min']} .. {stats['max']}")
+        top = stats.get('top_values') or []
+        if top:
+            parts.append('top: ' + ', '.join(json.dumps(item['value'], default=str) for item in top[:5]))
+        return f" ({'; '.join(parts)})"
+    
     def _extract_pipeline(self, text: str) -> List[Dict[str, Any]]:
         """
         Extract and parse MongoDB pipeline from LLM response
@@ -3,19 +3,38 @@ FastAPI Backend Application
 Reconciliation DataFlow Dashboard Agent (Updated for Multi-Collection Support)
 AI-driven dashboard for reconciliation data analysis
 """
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
 import os
 import json
+import shutil
+import tempfile
 from dotenv import load_dotenv
 
 from agents.orchestration_agent import orchestration_agent
 from utils.mongo_connector import mongo_connector
-from data_ingestion.json_ingester import ingest_reconciliation_data
-from data_ingestion.reconciliation_flow_ingester import ingest_reconciliation_flow
+from utils.json_response import FastJSONResponse
+from utils.compression import CompressionMiddleware
+from data_ingestion.json_ingester import ingest_reconciliation_data, ingest_reconciliation_data_stream
+from data_ingestion.reconciliation_flow_ingester import (
+    ingest_reconciliation_flow,
+    ingest_reconciliation_flow_stream
+)
+from data_ingestion.jobs import ingestion_jobs
+from data_ingestion.format_readers import detect_format
+from data_ingestion.field_stats import FIELD_STATS_COLLECTION, FieldStatsStore
+from data_ingestion.summaries import SummaryStore
+from data_ingestion.chunked_upload import (
+    chunked_uploads, UploadError, UploadNotFoundError, UploadConflictError
+)
+from reconciliation import MatchSpec, run_reconciliation, detect_discrepancies
+from reconciliation.engine import WATERMARK_FIELD
+from reconciliation.coordinator import sharded_runs
+from reconciliation.rules import RuleExecutor
 
 # Load environment variables
 load_dotenv()
@@ -51,6 +70,8 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("\n🛑 Shutting down API...")
+    ingestion_jobs.shutdown()
+    sharded_runs.shutdown()
     mongo_connector.close()
     print("✅ Cleanup complete\n")
 
@@ -60,7 +81,8 @@ app = FastAPI(
     title="Reconciliation DataFlow Dashboard Agent",
     description="AI-powered reconciliation data analysis with multi-collection support",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -72,6 +94,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large payloads (brotli when available, otherwise gzip)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv('COMPRESSION_MIN_SIZE', 1024)),
+    gzip_level=int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+    brotli_quality=int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+)
+
 
 # ==================== Request/Response Models ====================
 
@@ -93,11 +123,25 @@ class QueryResponse(BaseModel):
     error: Optional[str] = None
 
 
+class RechartRequest(BaseModel):
+    """Request model for re-rendering a cached query result"""
+    result_id: str
+    chart_type: Optional[str] = None
+    x_axis: Optional[str] = None
+    y_axis: Optional[str] = None
+    labels: Optional[str] = None
+    values: Optional[str] = None
+    title: Optional[str] = None
+
+
 class FlowIngestionResponse(BaseModel):
     """Response model for reconciliation flow ingestion"""
     success: bool
     collections_processed: Dict[str, int]
     data_tables_created: Dict[str, int]
+    upsert_summary: Optional[Dict[str, Dict[str, int]]] = None
+    collection_timings: Optional[Dict[str, float]] = None  # Seconds spent writing each collection
+    collection_errors: Optional[Dict[str, str]] = None
     error: Optional[str] = None
 
 
@@ -105,11 +149,80 @@ class IngestionResponse(BaseModel):
     """Response model for simple data ingestion"""
     success: bool
     records_inserted: int
+    records_updated: Optional[int] = None
+    records_unchanged: Optional[int] = None
     indexes_created: List[str]
     statistics: dict
     error: Optional[str] = None
 
 
+class JobSubmissionResponse(BaseModel):
+    """Response model for a queued background ingestion job"""
+    job_id: str
+    status: str
+    status_url: str
+
+
+class ChunkedUploadInit(BaseModel):
+    """Request model for starting a resumable chunked upload"""
+    filename: str
+    total_size: int
+    kind: str = "json"  # 'json' or 'reconciliation_flow'
+    collection_name: str = "reconciliation_records"
+    drop_existing: bool = False
+    incremental: bool = False
+    sha256: Optional[str] = None  # Whole file; ingestion then waits for verification
+
+
+class ChunkedUploadComplete(BaseModel):
+    """Request model for finishing a chunked upload"""
+    sha256: Optional[str] = None
+
+
+class ReconcileRequest(BaseModel):
+    """Request model for running the reconciliation engine on two sources"""
+    matching_method_id: Optional[str] = None
+    left_collection: Optional[str] = None
+    right_collection: Optional[str] = None
+    left_filter: Optional[Dict] = None
+    right_filter: Optional[Dict] = None
+    amount_field: str = "amount"
+    date_field: Optional[str] = "date"
+    key_fields: List[str] = []
+    amount_tolerance: float = 0.0
+    amount_tolerance_pct: float = 0.0
+    date_window_days: int = 0
+    name_field: Optional[str] = None
+    name_similarity: Optional[float] = None
+    rule_name: str = "Transaction match"
+    replace_existing: bool = True
+    incremental: bool = False
+    watermark_field: Optional[str] = None
+
+
+class ShardedReconcileRequest(ReconcileRequest):
+    """Request model for a reconciliation partitioned over worker processes"""
+    partition_by: str = "workspaceId"  # 'workspaceId', 'organizationId' or 'date'
+    partitions: Optional[int] = None
+    workers: Optional[int] = None
+    method_filter: Optional[Dict] = None
+
+
+class DiscrepancyDetectionRequest(BaseModel):
+    """Request model for detecting discrepancies in stored matching results"""
+    match_id: Optional[str] = None
+    matching_method_id: Optional[str] = None
+    rules: Optional[Dict[str, Dict[str, Any]]] = None
+    create_tickets: bool = True
+    replace_existing: bool = True
+
+class RuleExecutionRequest(BaseModel):
+    """Request model for executing the matching rules of a method or profile"""
+    matching_method_id: Optional[str] = None
+    profile_id: Optional[str] = None
+    explain: bool = False
+
+
 class DataSourceInfo(BaseModel):
     """Information about current data source"""
     has_data: bool
@@ -153,7 +266,8 @@ async def health_check():
         "collections_count": len(collections),
         "collections": collections[:10],  # First 10 collections
         "llm_provider": os.getenv('LLM_PROVIDER', 'not_configured'),
-        "database": os.getenv('MONGODB_DATABASE', 'reconciliation_system')
+        "database": os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+        "connection_pool": mongo_connector.pool_stats()
     }
 
 
@@ -186,10 +300,36 @@ async def get_data_source_info():
 
 # ==================== Data Ingestion Endpoints ====================
 
+def field_stats_store() -> FieldStatsStore:
+    """Store of the per-collection field statistics written during ingestion"""
+    return FieldStatsStore(mongo_connector.get_collection(FIELD_STATS_COLLECTION))
+
+
+def summary_store() -> SummaryStore:
+    """Store of the precomputed dashboard summaries"""
+    return SummaryStore(mongo_connector.get_database())
+
+
+def ingestion_error_status(result: dict) -> int:
+    """Map a failed ingestion result to an HTTP status code"""
+    if (result.get('error') or '').startswith('Invalid '):
+        return 400
+    return 500
+
+
+def upload_format(filename: str) -> str:
+    """Record format of a simple-data upload (json, ndjson, csv, parquet), or 400"""
+    try:
+        return detect_format(filename or '')
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/upload-reconciliation-flow", response_model=FlowIngestionResponse)
 async def upload_reconciliation_flow(
     file: UploadFile = File(...),
-    drop_existing: bool = Form(default=False)
+    drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False)
 ):
     """
     Upload and ingest complete reconciliation flow JSON
@@ -197,6 +337,7 @@ async def upload_reconciliation_flow(
     Args:
         file: JSON file with complete flow structure
         drop_existing: Whether to drop existing collections
+        incremental: Upsert by document identity, skipping unchanged documents
         
     Returns:
         Ingestion result with statistics
@@ -208,26 +349,18 @@ async def upload_reconciliation_flow(
                 detail="Only JSON files are supported"
             )
         
-        content = await file.read()
-        json_data = content.decode('utf-8')
-        
-        try:
-            json.loads(json_data)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid JSON format: {str(e)}"
-            )
-        
-        result = ingest_reconciliation_flow(
-            json_data=json_data,
+        # Parse the upload incrementally straight from the spooled file
+        result = ingest_reconciliation_flow_stream(
+            stream=file.file,
             mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
             db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
-            drop_existing=drop_existing
+            client=mongo_connector.get_client(),
+            drop_existing=drop_existing,
+            incremental=incremental
         )
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
         
         return FlowIngestionResponse(**result)
     
@@ -243,7 +376,8 @@ async def upload_reconciliation_flow(
 @app.post("/ingest-reconciliation-flow", response_model=FlowIngestionResponse)
 async def ingest_flow_from_text(
     json_data: str = Form(...),
-    drop_existing: bool = Form(default=False)
+    drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False)
 ):
     """
     Ingest reconciliation flow from JSON text
@@ -251,6 +385,7 @@ async def ingest_flow_from_text(
     Args:
         json_data: JSON string with complete flow structure
         drop_existing: Whether to drop existing collections
+        incremental: Upsert by document identity, skipping unchanged documents
         
     Returns:
         Ingestion result
@@ -268,11 +403,13 @@ async def ingest_flow_from_text(
             json_data=json_data,
             mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
             db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
-            drop_existing=drop_existing
+            client=mongo_connector.get_client(),
+            drop_existing=drop_existing,
+            incremental=incremental
         )
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
         
         return FlowIngestionResponse(**result)
     
@@ -289,47 +426,38 @@ async def ingest_flow_from_text(
 async def upload_json_file(
     file: UploadFile = File(...),
     drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False),
     collection_name: str = Form(default="reconciliation_records")
 ):
     """
-    Upload and ingest simple JSON file (legacy support)
+    Upload and ingest a simple record file (JSON, NDJSON, CSV or Parquet)
     
     Args:
-        file: JSON file upload
+        file: .json, .ndjson/.jsonl, .csv or .parquet upload
         drop_existing: Whether to drop existing data
+        incremental: Upsert by document identity, skipping unchanged documents
         collection_name: Target collection name
         
     Returns:
         Ingestion result with statistics
     """
     try:
-        if not file.filename.endswith('.json'):
-            raise HTTPException(
-                status_code=400,
-                detail="Only JSON files are supported"
-            )
+        file_format = upload_format(file.filename)
         
-        content = await file.read()
-        json_data = content.decode('utf-8')
-        
-        try:
-            json.loads(json_data)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid JSON format: {str(e)}"
-            )
-        
-        result = ingest_reconciliation_data(
-            json_data=json_data,
+        # Parse the upload incrementally straight from the spooled file
+        result = ingest_reconciliation_data_stream(
+            stream=file.file,
             mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
             db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+            client=mongo_connector.get_client(),
             collection_name=collection_name,
-            drop_existing=drop_existing
+            drop_existing=drop_existing,
+            incremental=incremental,
+            file_format=file_format
         )
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
         
         return IngestionResponse(**result)
     
@@ -346,6 +474,7 @@ async def upload_json_file(
 async def ingest_json_text(
     json_data: str = Form(...),
     drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False),
     collection_name: str = Form(default="reconciliation_records")
 ):
     """
@@ -354,6 +483,7 @@ async def ingest_json_text(
     Args:
         json_data: JSON string
         drop_existing: Whether to drop existing data
+        incremental: Upsert by document identity, skipping unchanged documents
         collection_name: Target collection name
         
     Returns:
@@ -372,12 +502,14 @@ async def ingest_json_text(
             json_data=json_data,
             mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
             db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+            client=mongo_connector.get_client(),
             collection_name=collection_name,
-            drop_existing=drop_existing
+            drop_existing=drop_existing,
+            incremental=incremental
         )
         
         if not result['success']:
-            raise HTTPException(status_code=500, detail=result['error'])
+            raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
         
         return IngestionResponse(**result)
     
@@ -392,34 +524,337 @@ async def ingest_json_text(
 
 @app.delete("/clear-data")
 async def clear_data(collection_name: Optional[str] = None):
-    """Clear data from specified collection or all collections"""
+    """
+    Clear data from specified collection or all collections
+    
+    Collections are truncated in parallel by drop-and-recreate, keeping
+    their indexes and validators, which is much faster than deleting
+    documents one by one.
+    """
     try:
+        names = [collection_name] if collection_name else None
+        summary = await run_in_threadpool(mongo_connector.truncate_collections, names)
         if collection_name:
-            collection = mongo_connector.get_collection(collection_name)
-            result = collection.delete_many({})
-            return {
-                "success": True,
-                "deleted_count": result.deleted_count,
-                "collection": collection_name,
-                "message": f"Deleted {result.deleted_count} records from {collection_name}"
-            }
-        else:
-            # Clear all collections
-            collections = mongo_connector.list_collections()
-            total_deleted = 0
-            for coll_name in collections:
-                coll = mongo_connector.get_collection(coll_name)
-                result = coll.delete_many({})
-                total_deleted += result.deleted_count
-            
-            return {
-                "success": True,
-                "deleted_count": total_deleted,
-                "collections_cleared": len(collections),
-                "message": f"Cleared {len(collections)} collections, deleted {total_deleted} records"
-            }
+            field_stats_store().reset(collection_name)
+        await run_in_threadpool(summary_store().refresh_sources, names)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if summary['failed']:
+        errors = '; '.join(f"{r['collection']}: {r['error']}" for r in summary['collections'] if 'error' in r)
+        raise HTTPException(status_code=500, detail=f"Failed to clear {len(summary['failed'])} collection(s): {errors}")
+    
+    response = {
+        "success": True,
+        "deleted_count": summary['deleted_count'],
+        "elapsed_seconds": summary['elapsed_seconds'],
+        "collections": summary['collections']
+    }
+    if collection_name:
+        response["collection"] = collection_name
+        response["message"] = f"Deleted {summary['deleted_count']} records from {collection_name}"
+    else:
+        response["collections_cleared"] = summary['collections_cleared']
+        response["message"] = (f"Cleared {summary['collections_cleared']} collections, deleted "
+                               f"{summary['deleted_count']} records in {summary['elapsed_seconds']}s")
+    return FastJSONResponse(response)
+
+
+# ==================== Background Ingestion Job Endpoints ====================
+
+async def spool_upload(file: UploadFile) -> str:
+    """
+    Copy an upload to a local temp file that outlives the request
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        Path of the copy (owned by the job manager once submitted)
+    """
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(file.filename or '')[1], prefix='ingest-',
+                                dir=os.getenv('INGEST_JOB_DIR') or None)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            await run_in_threadpool(shutil.copyfileobj, file.file, out, 1024 * 1024)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+@app.post("/jobs/upload-json", response_model=JobSubmissionResponse, status_code=202)
+async def submit_json_upload_job(
+    file: UploadFile = File(...),
+    drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False),
+    collection_name: str = Form(default="reconciliation_records")
+):
+    """
+    Queue a simple record file (JSON, NDJSON, CSV or Parquet) for background ingestion
+    
+    Returns immediately; poll /jobs/{job_id} for progress and the result.
+    
+    Args:
+        file: .json, .ndjson/.jsonl, .csv or .parquet upload
+        drop_existing: Whether to drop existing data
+        incremental: Upsert by document identity, skipping unchanged documents
+        collection_name: Target collection name
+        
+    Returns:
+        Job ID and status URL
+    """
+    file_format = upload_format(file.filename)
+    
+    try:
+        job = ingestion_jobs.submit(
+            kind='json',
+            filename=file.filename,
+            path=await spool_upload(file),
+            ingest=ingest_reconciliation_data_stream,
+            mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+            db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+            client=mongo_connector.get_client(),
+            collection_name=collection_name,
+            drop_existing=drop_existing,
+            incremental=incremental,
+            file_format=file_format
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    return JobSubmissionResponse(job_id=job.job_id, status=job.status,
+                                 status_url=f"/jobs/{job.job_id}")
+
+
+@app.post("/jobs/upload-reconciliation-flow", response_model=JobSubmissionResponse, status_code=202)
+async def submit_flow_upload_job(
+    file: UploadFile = File(...),
+    drop_existing: bool = Form(default=False),
+    incremental: bool = Form(default=False)
+):
+    """
+    Queue a reconciliation flow upload for background ingestion
+    
+    Returns immediately; poll /jobs/{job_id} for progress and the result.
+    
+    Args:
+        file: JSON file with complete flow structure
+        drop_existing: Whether to drop existing collections
+        incremental: Upsert by document identity, skipping unchanged documents
+        
+    Returns:
+        Job ID and status URL
+    """
+    if not file.filename.endswith('.json'):
+        raise HTTPException(status_code=400, detail="Only JSON files are supported")
+    
+    try:
+        job = ingestion_jobs.submit(
+            kind='reconciliation_flow',
+            filename=file.filename,
+            path=await spool_upload(file),
+            ingest=ingest_reconciliation_flow_stream,
+            mongo_uri=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+            db_name=os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+            client=mongo_connector.get_client(),
+            drop_existing=drop_existing,
+            incremental=incremental
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+    
+    return JobSubmissionResponse(job_id=job.job_id, status=job.status,
+                                 status_url=f"/jobs/{job.job_id}")
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Get progress of a background ingestion job
+    
+    Args:
+        job_id: ID returned when the job was submitted
+        
+    Returns:
+        Status, records processed, throughput, ETA, errors and (when
+        finished) the ingestion result
+    """
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return FastJSONResponse(job)
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """List recent background ingestion jobs, newest first"""
+    return FastJSONResponse({"jobs": ingestion_jobs.list_jobs()})
+
+
+# ==================== Chunked Upload Endpoints ====================
+
+def start_upload_ingestion(upload, request: ChunkedUploadInit) -> str:
+    """Queue the ingestion job of a chunked upload; returns its job ID"""
+    params = {
+        'mongo_uri': os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+        'db_name': os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+        'client': mongo_connector.get_client(),
+        'drop_existing': request.drop_existing,
+        'incremental': request.incremental
+    }
+    if request.kind == 'json':
+        ingest = ingest_reconciliation_data_stream
+        params['collection_name'] = request.collection_name
+        params['file_format'] = upload_format(request.filename)
+    else:
+        ingest = ingest_reconciliation_flow_stream
+    
+    upload_id = upload.upload_id
+    job = ingestion_jobs.submit_stream(
+        kind=request.kind,
+        filename=request.filename,
+        total_bytes=request.total_size,
+        open_stream=lambda: chunked_uploads.open_reader(upload_id),
+        ingest=ingest,
+        cleanup=lambda: chunked_uploads.job_finished(upload_id),
+        **params
+    )
+    upload.job_id = job.job_id
+    return job.job_id
+
+
+@app.post("/uploads", status_code=201)
+async def init_chunked_upload(request: ChunkedUploadInit):
+    """
+    Start a resumable chunked upload
+    
+    An ingestion job is queued straight away and parses the file as its
+    contiguous prefix arrives, so ingestion overlaps the upload. If a
+    whole-file sha256 is given, the job is only queued once complete()
+    has verified it, so a corrupted upload never writes any rows.
+    
+    Args:
+        request: File name, total size, optional sha256, ingestion kind and options
+        
+    Returns:
+        upload_id, job_id (None until completion for checksummed uploads)
+        and the maximum part size
+    """
+    if request.kind not in ('json', 'reconciliation_flow'):
+        raise HTTPException(status_code=400, detail="kind must be 'json' or 'reconciliation_flow'")
+    file_format = upload_format(request.filename)
+    if request.kind == 'reconciliation_flow' and file_format != 'json':
+        raise HTTPException(status_code=400, detail="Reconciliation flows must be JSON files")
+    
+    try:
+        upload = chunked_uploads.init(request.filename, request.total_size, request.sha256)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    upload.options = request
+    job_id = None if request.sha256 else start_upload_ingestion(upload, request)
+    
+    return {
+        "upload_id": upload.upload_id,
+        "job_id": job_id,
+        "max_part_size": chunked_uploads.max_part_size,
+        "status_url": f"/uploads/{upload.upload_id}",
+        "job_status_url": f"/jobs/{job_id}" if job_id else None
+    }
+
+
+@app.put("/uploads/{upload_id}/parts")
+async def upload_part(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    x_content_sha256: Optional[str] = Header(default=None)
+):
+    """
+    Upload one part of a chunked upload
+    
+    The request body is the raw part. Parts may arrive in any order and
+    retries of an already received part are accepted.
+    
+    Args:
+        upload_id: ID returned by POST /uploads
+        offset: Byte offset of the part within the file
+        x_content_sha256: Hex SHA-256 of the part (X-Content-SHA256 header)
+        
+    Returns:
+        Upload status
+    """
+    data = await request.body()
+    try:
+        written = await run_in_threadpool(
+            chunked_uploads.write_part, upload_id, offset, data, x_content_sha256
+        )
+        status = chunked_uploads.get(upload_id).status()
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    status.update(written)
+    return FastJSONResponse(status)
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload_status(upload_id: str):
+    """
+    Get received byte ranges of a chunked upload, to resume after an interruption
+    
+    Args:
+        upload_id: ID returned by POST /uploads
+        
+    Returns:
+        State, bytes received, contiguous prefix, missing ranges and job ID
+    """
+    try:
+        return FastJSONResponse(chunked_uploads.get(upload_id).status())
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/uploads/{upload_id}/complete")
+async def complete_chunked_upload(upload_id: str, request: ChunkedUploadComplete):
+    """
+    Finish a chunked upload once every byte has been received
+    
+    The ingestion job only sees the end of the file after this call. A
+    whole-file sha256 declared in POST /uploads is verified here; on a
+    mismatch the upload is aborted and no job is started.
+    
+    Args:
+        upload_id: ID returned by POST /uploads
+        request: Optional SHA-256 of the whole file (must match the declared one)
+        
+    Returns:
+        Upload status with the ingestion job ID
+    """
+    try:
+        upload = await run_in_threadpool(chunked_uploads.complete, upload_id, request.sha256)
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if upload.job_id is None:
+        # Checksummed upload: verified, so ingestion can start now
+        start_upload_ingestion(upload, upload.options)
+    return FastJSONResponse(upload.status())
+
+
+@app.delete("/uploads/{upload_id}")
+async def abort_chunked_upload(upload_id: str):
+    """Abort a chunked upload; its ingestion job fails and the staged file is removed"""
+    try:
+        chunked_uploads.abort(upload_id)
+    except UploadNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"upload_id": upload_id, "state": "aborted"}
 
 
 # ==================== Reconciliation Flow Endpoints ====================
@@ -437,10 +872,10 @@ async def get_reconciliation_flow(profile_id: Optional[str] = None):
     """
     try:
         flow = mongo_connector.get_reconciliation_flow(profile_id)
-        return {
+        return FastJSONResponse({
             "success": True,
             "flow": flow
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -455,11 +890,11 @@ async def get_matching_rules(vendor_type: Optional[str] = None):
             rules = list(mongo_connector.get_collection('matchingrules').find({}))
             rules = [mongo_connector.serialize_document(r) for r in rules]
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "rules": rules,
             "count": len(rules)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -474,13 +909,204 @@ async def get_discrepancies(severity: Optional[str] = None):
             discrepancies = list(mongo_connector.get_collection('discrepancies').find({}))
             discrepancies = [mongo_connector.serialize_document(d) for d in discrepancies]
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "discrepancies": discrepancies,
             "count": len(discrepancies)
-        }
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/kpis")
+async def get_kpis(profile_id: Optional[str] = None):
+    """
+    Reconciliation overview metrics in one small response
+    
+    Discrepancies by severity/type, unresolved discrepancies, open tickets
+    by risk, resolution statuses and matched/unmatched row counts and
+    amounts. Each collection is summarized by one $facet aggregation, and
+    the collections are aggregated concurrently.
+    
+    Args:
+        profile_id: Only data of this profile
+    """
+    try:
+        result = await run_in_threadpool(mongo_connector.get_kpis, profile_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not result['success']:
+        raise HTTPException(status_code=500, detail=result['error'])
+    return FastJSONResponse(result)
+
+
+# ==================== Reconciliation Engine Endpoints ====================
+
+def match_spec_from_request(request: ReconcileRequest) -> MatchSpec:
+    """Match specification from the fields of a reconcile request"""
+    return MatchSpec(
+        name=request.rule_name,
+        amount_field=request.amount_field,
+        date_field=request.date_field,
+        key_fields=request.key_fields,
+        amount_tolerance=request.amount_tolerance,
+        amount_tolerance_pct=request.amount_tolerance_pct,
+        date_window_days=request.date_window_days,
+        name_field=request.name_field,
+        **({'name_similarity': request.name_similarity} if request.name_similarity is not None else {})
+    )
+
+
+@app.post("/reconcile")
+async def reconcile(request: ReconcileRequest):
+    """
+    Match the records of two source collections (e.g. POS vs bank)
+    
+    Records are paired one-to-one on equal key fields and amount/date,
+    first exactly, then within the amount and date tolerances. Pairs and
+    unmatched records are written as matchingResult documents, unmatched
+    records also as discrepancies. With incremental, only rows that
+    arrived since the last run are matched (against the still-open rows)
+    and the earlier results are updated in place.
+    
+    Returns:
+        Match summary, documents written and stage timings
+    """
+    spec = match_spec_from_request(request)
+    result = await run_in_threadpool(
+        run_reconciliation,
+        os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+        os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+        spec,
+        client=mongo_connector.get_client(),
+        matching_method_id=request.matching_method_id,
+        left_collection=request.left_collection,
+        right_collection=request.right_collection,
+        left_filter=request.left_filter,
+        right_filter=request.right_filter,
+        replace_existing=request.replace_existing,
+        incremental=request.incremental,
+        watermark_field=request.watermark_field or WATERMARK_FIELD
+    )
+    if not result['success']:
+        raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
+    return FastJSONResponse(result)
+
+
+@app.post("/reconcile/sharded", response_model=JobSubmissionResponse, status_code=202)
+async def reconcile_sharded(request: ShardedReconcileRequest):
+    """
+    Queue a reconciliation partitioned over worker processes
+    
+    partition_by 'workspaceId' or 'organizationId' reconciles every
+    matching method (optionally selected by method_filter), one partition
+    per tenant. partition_by 'date' splits one pair of sources into date
+    ranges and merges them into a single result.
+    
+    Returns immediately; poll /reconcile/runs/{run_id} for per-partition
+    progress, timings and the result.
+    """
+    run = sharded_runs.submit(
+        os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+        os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+        match_spec_from_request(request),
+        workers=request.workers,
+        client=mongo_connector.get_client(),
+        partition_by=request.partition_by,
+        partitions=request.partitions,
+        matching_method_id=request.matching_method_id,
+        method_filter=request.method_filter,
+        left_collection=request.left_collection,
+        right_collection=request.right_collection,
+        left_filter=request.left_filter,
+        right_filter=request.right_filter,
+        replace_existing=request.replace_existing,
+        incremental=request.incremental,
+        watermark_field=request.watermark_field or WATERMARK_FIELD
+    )
+    return JobSubmissionResponse(job_id=run.run_id, status=run.status,
+                                 status_url=f"/reconcile/runs/{run.run_id}")
+
+
+@app.get("/reconcile/runs/{run_id}")
+async def get_sharded_run(run_id: str):
+    """
+    Get progress of a sharded reconciliation
+    
+    Args:
+        run_id: ID returned when the run was queued
+    
+    Returns:
+        Status, stage, per-partition status/rows/timings and the result once finished
+    """
+    run = sharded_runs.get(run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return FastJSONResponse(run)
+
+
+@app.get("/reconcile/runs")
+async def list_sharded_runs():
+    """List recent sharded reconciliations, newest first"""
+    return FastJSONResponse({"runs": sharded_runs.list_runs()})
+
+
+@app.post("/discrepancies/detect")
+async def detect_result_discrepancies(request: DiscrepancyDetectionRequest):
+    """
+    Detect discrepancies in the matchingResult rows of a run or matching method
+    
+    Amount differences, missing counterparts and rows marked not reconciled
+    are classified by type and severity with per-rule thresholds (rules maps
+    a rule name, or 'default', to tolerance/medium/high/medium_pct/high_pct/
+    ticket_severity). Discrepancies, and tickets for those at or above the
+    ticket severity, are bulk inserted. Rows that already have a
+    discrepancy from the engine or an ingested flow are skipped.
+    
+    Returns:
+        Counts by type and severity, documents written and timings
+    """
+    result = await run_in_threadpool(
+        detect_discrepancies,
+        os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+        os.getenv('MONGODB_DATABASE', 'reconciliation_system'),
+        client=mongo_connector.get_client(),
+        rules=request.rules,
+        create_tickets=request.create_tickets,
+        match_id=request.match_id,
+        matching_method_id=request.matching_method_id,
+        replace_existing=request.replace_existing
+    )
+    if not result['success']:
+        raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
+    return FastJSONResponse(result)
+
+
+@app.post("/matching-rules/execute")
+async def execute_matching_rules(request: RuleExecutionRequest):
+    """
+    Execute the matching rules of a matching method or a whole profile
+    
+    Rules are compiled into a dependency DAG: aggregate steps over the same
+    source collection run as one $facet pipeline, and shared or cascading
+    outputs are computed once.
+    
+    Returns:
+        Outputs and display values per rule, plan statistics and timings
+    """
+    try:
+        executor = RuleExecutor(mongo_connector.get_database())
+        result = await run_in_threadpool(
+            executor.execute,
+            request.matching_method_id,
+            request.profile_id,
+            explain=request.explain
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not result['success']:
+        raise HTTPException(status_code=ingestion_error_status(result), detail=result['error'])
+    return FastJSONResponse(result)
 
 
 # ==================== Query & Visualization Endpoints ====================
@@ -490,6 +1116,7 @@ async def get_schema(collection: str):
     """Get collection schema"""
     try:
         schema = mongo_connector.get_collection_schema(collection)
+        field_stats_store().annotate_schema(schema, collection)
         return {
             "success": True,
             "collection": collection,
@@ -499,6 +1126,76 @@ async def get_schema(collection: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/stats")
+async def list_field_stats():
+    """List collections with field statistics collected during ingestion"""
+    try:
+        profiles = await run_in_threadpool(field_stats_store().list_profiles)
+        profiles = [mongo_connector.serialize_document(profile) for profile in profiles]
+        return FastJSONResponse({
+            "success": True,
+            "collections": profiles,
+            "total": len(profiles)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/stats/{collection_name}")
+async def get_field_stats(collection_name: str):
+    """
+    Per-field statistics of a collection, maintained during ingestion
+    
+    Returns count, null rate, distinct estimate, top values and, for numeric
+    and date fields, min/max and an equi-depth histogram, without scanning
+    the collection.
+    """
+    try:
+        stats = await run_in_threadpool(field_stats_store().get, collection_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"No field statistics for collection '{collection_name}'")
+    return FastJSONResponse({"success": True, **mongo_connector.serialize_document(stats)})
+
+
+@app.get("/summaries")
+async def list_summaries():
+    """
+    List the precomputed dashboard summaries
+    
+    Each summary is a named aggregation (e.g. discrepancies by severity and
+    type) kept in its own collection with $merge and refreshed after every
+    ingestion run. /generate_chart answers matching questions from them.
+    """
+    try:
+        summaries = await run_in_threadpool(summary_store().list_summaries)
+        summaries = [mongo_connector.serialize_document(summary) for summary in summaries]
+        return FastJSONResponse({"success": True, "summaries": summaries})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/summaries/refresh")
+async def refresh_summaries(source: Optional[str] = None):
+    """
+    Re-aggregate the dashboard summaries in full
+    
+    Needed only after data changed outside ingestion and reconciliation
+    (e.g. direct database edits).
+    
+    Args:
+        source: Only summaries of this source collection
+    """
+    try:
+        refreshed = await run_in_threadpool(summary_store().refresh_sources, [source] if source else None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if 'error' in refreshed:
+        raise HTTPException(status_code=500, detail=f"Summary refresh failed: {refreshed['error']}")
+    return FastJSONResponse({"success": True, "summaries": refreshed})
+
+
 @app.post("/generate_chart", response_model=QueryResponse)
 async def generate_chart(request: QueryRequest):
     """
@@ -534,8 +1231,8 @@ async def generate_chart(request: QueryRequest):
             collection=request.collection
         )
         
-        
-        return QueryResponse(**result)
+        # Validate against the response model, then encode with orjson directly
+        return FastJSONResponse(QueryResponse(**result).dict())
     
     except HTTPException:
         raise
@@ -548,6 +1245,40 @@ async def generate_chart(request: QueryRequest):
         )
 
 
+@app.post("/rechart", response_model=QueryResponse)
+async def rechart(request: RechartRequest):
+    """
+    Re-render a previous /generate_chart result with a new chart specification
+    
+    Only the Plotly figure is rebuilt; the LLM and MongoDB are not called.
+    
+    Args:
+        request: RechartRequest with the result_id from the original
+                 response metadata and the chart fields to change
+        
+    Returns:
+        Response in the same format as /generate_chart
+    """
+    try:
+        chart_spec = request.dict(exclude={'result_id'})
+        result = orchestration_agent.rechart(request.result_id, chart_spec)
+        
+        if result is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Result not found or expired. Please run the query again."
+            )
+        
+        return FastJSONResponse(QueryResponse(**result).dict())
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rechart failed: {str(e)}")
+
+
 @app.post("/execute_pipeline")
 async def execute_pipeline(pipeline: list, collection: str):
     """
@@ -562,12 +1293,12 @@ async def execute_pipeline(pipeline: list, collection: str):
     """
     try:
         data = mongo_connector.execute_aggregation(pipeline, collection)
-        return {
+        return FastJSONResponse({
             "success": True,
             "data": data,
             "count": len(data),
             "collection": collection
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -604,12 +1335,12 @@ async def get_sample_data(collection: str, limit: int = 5):
         sample = list(coll.find({}).limit(limit))
         sample = [mongo_connector.serialize_document(doc) for doc in sample]
         
-        return {
+        return FastJSONResponse({
             "success": True,
             "collection": collection,
             "sample": sample,
             "count": len(sample)
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
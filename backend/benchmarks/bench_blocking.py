@@ -0,0 +1,178 @@
+"""
+Blocking Index Benchmark
+Builds synthetic POS and bank tables whose merchant names differ by
+abbreviations, typos and card-processor suffixes, then reports for the
+blocking index used by fuzzy reconciliation:
+- candidate pairs against all pairs (reduction ratio)
+- pair completeness: qualifying pairs (within the amount/date tolerances
+  and the name threshold) found by blocking, against an exhaustive scan
+- recall and precision of the final one-to-one matching against the
+  generated true pairs, with and without the name field
+
+Usage (from backend/):
+    python -m benchmarks.bench_blocking --records 20000 --tolerance 1 --window 3 --similarity 0.3
+"""
+import argparse
+import random
+import time
+from typing import List, Set, Tuple
+
+import numpy as np
+
+from reconciliation.blocking import BlockingIndex
+from reconciliation.columnar import SourceTable, normalize_keys, normalize_names
+from reconciliation.matcher import MatchSpec, block_codes, match_tables
+
+MERCHANTS = [
+    'Starbucks Coffee', 'Amazon Marketplace', 'Shell Oil', 'Walmart Supercenter', 'Uber Trip',
+    'Costco Wholesale', 'Home Depot', 'Target Store', 'Delta Air Lines', 'Marriott Hotels',
+    'Whole Foods Market', 'Best Buy', 'Chipotle Mexican Grill', 'Apple Online Store', 'Netflix',
+    'Walgreens', 'CVS Pharmacy', 'Exxon Mobil', 'Lyft Ride', 'Hilton Garden Inn'
+]
+PROCESSOR_SUFFIXES = ['', ' POS PURCHASE', ' CARD 4421', ' ONLINE', ' SQ *']
+
+
+def typo(name: str, rng: random.Random) -> str:
+    """Drop, swap or double one character"""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 2)
+    kind = rng.random()
+    if kind < 0.4:
+        return name[:i] + name[i + 1:]
+    if kind < 0.7:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i] + name[i:]
+
+
+def bank_name(name: str, rng: random.Random) -> str:
+    """How a bank statement might print a merchant name"""
+    words = name.upper().split()
+    if rng.random() < 0.3:
+        words = [word[:5] for word in words]
+    printed = ' '.join(words)
+    if rng.random() < 0.3:
+        printed = typo(printed, rng)
+    return printed + rng.choice(PROCESSOR_SUFFIXES)
+
+
+def build_tables(count: int, tolerance: float, window: int, noise: float,
+                 seed: int = 42) -> Tuple[SourceTable, SourceTable, Set[Tuple[int, int]]]:
+    """POS and bank tables with count true pairs plus 10% unmatched records on each side"""
+    rng = random.Random(seed)
+    pos, bank, truth = [], [], set()
+    for i in range(count):
+        merchant = f"{rng.choice(MERCHANTS)} #{rng.randrange(100, 999)}"
+        vendor = rng.choice(['AMEX', 'MASTERCARD', 'VISA'])
+        cents = rng.randrange(100, 50000)
+        day = rng.randrange(365)
+        pos.append((merchant, vendor, cents, day))
+        if rng.random() < noise:
+            cents += rng.randint(-int(tolerance * 100), int(tolerance * 100))
+            day += rng.randint(-window, window)
+        truth.add((i, len(bank)))
+        bank.append((bank_name(merchant, rng), vendor, cents, day))
+    for _ in range(count // 10):
+        pos.append((f"{rng.choice(MERCHANTS)} #{rng.randrange(100, 999)}", rng.choice(['AMEX', 'VISA']),
+                    rng.randrange(100, 50000), rng.randrange(365)))
+        bank.append((bank_name(rng.choice(MERCHANTS), rng), rng.choice(['AMEX', 'VISA']),
+                     rng.randrange(100, 50000), rng.randrange(365)))
+
+    def table(rows, table_id):
+        names, vendors, cents, days = zip(*rows)
+        return SourceTable(table_id, table_id, np.arange(len(rows)).astype(object),
+                           np.array(cents, dtype=np.float64), np.array(days, dtype=np.float64),
+                           {'vendor': normalize_keys(vendors)}, 'amount', 'date',
+                           names=normalize_names(names), name_field='merchant')
+
+    # Shuffle the bank side so the true pairs are not aligned by position
+    order = list(range(len(bank)))
+    rng.shuffle(order)
+    position = {old: new for new, old in enumerate(order)}
+    truth = {(left, position[right]) for left, right in truth}
+    return table(pos, 'pos'), table([bank[i] for i in order], 'bank'), truth
+
+
+def exhaustive_pairs(index: BlockingIndex, left: SourceTable, right: SourceTable,
+                     left_block: np.ndarray, right_block: np.ndarray,
+                     chunk: int = 256) -> Set[Tuple[int, int]]:
+    """Every qualifying pair, by checking all pairs chunk by chunk"""
+    found = set()
+    right_rows = np.arange(len(right))
+    for start in range(0, len(left), chunk):
+        rows = np.arange(start, min(start + chunk, len(left)))
+        pairs_left = np.repeat(rows, len(right))
+        pairs_right = np.tile(right_rows, len(rows))
+        same = left_block[pairs_left] == right_block[pairs_right]
+        pairs_left, pairs_right = pairs_left[same], pairs_right[same]
+        valid, _ = index.verify(left, right, pairs_left, pairs_right)
+        found.update(zip(pairs_left[valid].tolist(), pairs_right[valid].tolist()))
+    return found
+
+
+def accuracy(outcome, truth: Set[Tuple[int, int]]) -> Tuple[float, float]:
+    matched = set(zip(outcome.left_index.tolist(), outcome.right_index.tolist()))
+    correct = len(matched & truth)
+    return correct / len(truth), (correct / len(matched) if matched else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=20000, help='true pairs in the synthetic tables')
+    parser.add_argument('--tolerance', type=float, default=1.0, help='absolute amount tolerance')
+    parser.add_argument('--window', type=int, default=3, help='date window in days')
+    parser.add_argument('--similarity', type=float, default=0.3, help='minimum name similarity')
+    parser.add_argument('--noise', type=float, default=0.3, help='share of pairs with amount/date drift')
+    parser.add_argument('--exhaustive-limit', type=int, default=30000,
+                        help='skip the exhaustive scan above this many left records')
+    args = parser.parse_args()
+
+    left, right, truth = build_tables(args.records, args.tolerance, args.window, args.noise)
+    left_block, right_block = block_codes(left, right, [('vendor', 'vendor')])
+    index = BlockingIndex(args.tolerance, 0.0, args.window, args.similarity)
+
+    start = time.perf_counter()
+    candidates_left, candidates_right = index.candidate_pairs(
+        left, right, np.arange(len(left)), np.arange(len(right)), left_block, right_block)
+    valid, _ = index.verify(left, right, candidates_left, candidates_right)
+    blocking_s = time.perf_counter() - start
+    blocked = set(zip(candidates_left[valid].tolist(), candidates_right[valid].tolist()))
+    true_candidates = len(truth & set(zip(candidates_left.tolist(), candidates_right.tolist())))
+
+    print(f"\n🧱 Blocking {len(left):,} x {len(right):,} records "
+          f"(±{args.tolerance} amount, ±{args.window} days, similarity ≥ {args.similarity})")
+    print('='*60)
+    print(f"{'all pairs':<28} {len(left) * len(right):>14,}")
+    print(f"{'candidate pairs':<28} {len(candidates_left):>14,}   ({blocking_s:.2f} s)")
+    print(f"{'reduction ratio':<28} {index.stats['reduction_ratio']:>14.6f}")
+    print(f"{'true pairs among candidates':<28} {true_candidates / len(truth):>14.2%}")
+
+    if len(left) <= args.exhaustive_limit:
+        start = time.perf_counter()
+        exhaustive = exhaustive_pairs(index, left, right, left_block, right_block)
+        exhaustive_s = time.perf_counter() - start
+        completeness = len(blocked & exhaustive) / len(exhaustive) if exhaustive else 1.0
+        print(f"{'exhaustive qualifying pairs':<28} {len(exhaustive):>14,}   ({exhaustive_s:.2f} s)")
+        print(f"{'pair completeness':<28} {completeness:>14.2%}   "
+              f"{'✅' if completeness == 1.0 else '❌'}")
+    else:
+        print(f"⚠️ Exhaustive scan skipped (more than {args.exhaustive_limit:,} left records)")
+
+    print(f"\n{'matching':<28} {'seconds':>8} {'recall':>9} {'precision':>10}")
+    specs: List[Tuple[str, MatchSpec]] = [
+        ('amount/date windows', MatchSpec(key_fields=['vendor'], amount_tolerance=args.tolerance,
+                                          date_window_days=args.window)),
+        ('blocked fuzzy names', MatchSpec(key_fields=['vendor'], amount_tolerance=args.tolerance,
+                                          date_window_days=args.window, name_field='merchant',
+                                          name_similarity=args.similarity)),
+    ]
+    for label, spec in specs:
+        start = time.perf_counter()
+        outcome = match_tables(left, right, spec)
+        seconds = time.perf_counter() - start
+        recall, precision = accuracy(outcome, truth)
+        print(f"{label:<28} {seconds:8.2f} {recall:>9.2%} {precision:>10.2%}")
+
+
+if __name__ == "__main__":
+    main()
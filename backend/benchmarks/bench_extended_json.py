@@ -0,0 +1,131 @@
+"""
+Extended JSON Decoding Benchmark
+Compares the previous two-pass approach (json.loads followed by a recursive
+convert_oid_strings copy) with parse-time decoding through an object_hook,
+both for in-memory strings and for the streaming upload path.
+
+Usage (from backend/):
+    python -m benchmarks.bench_extended_json --cells 100000
+"""
+import argparse
+import io
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+
+from data_ingestion import extended_json
+from data_ingestion.stream_reader import iter_top_level_items
+
+
+LEGACY_OID_KEYS = ['_id', 'profileId', 'matchingMethodId', 'extractionMethodId',
+                   'workspaceId', 'organizationId', 'matchResultsId', 'discrepancyId',
+                   'ticketId', 'resolvedBy']
+
+
+def legacy_convert_oid_strings(data: Any) -> Any:
+    """The recursive post-parse conversion previously used by ReconciliationFlowIngester"""
+    if isinstance(data, dict):
+        converted = {}
+        for key, value in data.items():
+            if key in LEGACY_OID_KEYS and isinstance(value, dict) and '$oid' in value:
+                converted[key] = ObjectId(value['$oid'])
+            elif key == 'datasourceIds' and isinstance(value, list):
+                converted[key] = [
+                    ObjectId(item['$oid']) if isinstance(item, dict) and '$oid' in item else item
+                    for item in value
+                ]
+            elif isinstance(value, dict) and '$date' in value:
+                try:
+                    converted[key] = datetime.fromisoformat(value['$date'].replace('Z', '+00:00'))
+                except Exception:
+                    converted[key] = value
+            elif isinstance(value, (dict, list)):
+                converted[key] = legacy_convert_oid_strings(value)
+            else:
+                converted[key] = value
+        return converted
+    elif isinstance(data, list):
+        return [legacy_convert_oid_strings(item) for item in data]
+    return data
+
+
+def build_flow(cells: int, cells_per_row: int = 4) -> Dict[str, Any]:
+    """Build a flow whose matchingResult holds `cells` cells, each with one source row"""
+    rows = []
+    for row_index in range(cells // cells_per_row):
+        row_cells = []
+        for col in range(cells_per_row):
+            n = row_index * cells_per_row + col
+            row_cells.append({
+                "value": round(n * 1.25, 2),
+                "matchType": "exact",
+                "sources": [{
+                    "tableId": f"table-{col % 2}",
+                    "rowIndex": row_index,
+                    "colIndex": col,
+                    "originalValue": str(round(n * 1.25, 2)),
+                    "documentId": "Pos Vendor Data",
+                    "fullRow": {
+                        "_id": {"$oid": f"{n:024x}"},
+                        "date": "2024-12-29",
+                        "vendortype": "American Express",
+                        "amount": round(n * 1.25, 2),
+                        "createdAt": {"$date": "2025-10-03T09:40:33.797Z"}
+                    }
+                }]
+            })
+        rows.append({"cells": row_cells})
+
+    return {
+        "matchmethod": {
+            "_id": {"$oid": "68df99f783106149bead8289"},
+            "datasourceIds": [{"$oid": "68d27dee054c4d4029b800b7"}],
+            "createdAt": {"$date": "2025-10-03T09:40:07.241Z"}
+        },
+        "matchingResult": {
+            "_id": {"$oid": "68df9a1183106149bead82ca"},
+            "matchingMethodId": {"$oid": "68df99f783106149bead8289"},
+            "rows": rows,
+            "createdAt": {"$date": "2025-10-03T09:40:33.797Z"}
+        }
+    }
+
+
+def timed(label: str, func, repeat: int):
+    """Run func `repeat` times and print the best wall-clock time"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<44} {best * 1000:10.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cells', type=int, default=100000, help='total matchingResult cells')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    raw = json.dumps(build_flow(args.cells)).encode('utf-8')
+    print(f"\n📦 Synthetic flow: {args.cells:,} cells, {len(raw) / 1e6:.1f} MB")
+    print('='*60)
+
+    timed("json.loads + convert_oid_strings (before)",
+          lambda: {k: legacy_convert_oid_strings(v) for k, v in json.loads(raw).items()},
+          args.repeat)
+    timed("extended_json.loads (object_hook)",
+          lambda: extended_json.loads(raw), args.repeat)
+    timed("streaming kvitems + convert_oid_strings",
+          lambda: [legacy_convert_oid_strings(v) for _, v in iter_top_level_items(io.BytesIO(raw))],
+          args.repeat)
+    timed("streaming with object_hook (upload path)",
+          lambda: list(iter_top_level_items(io.BytesIO(raw), extended_json.object_hook)),
+          args.repeat)
+
+
+if __name__ == "__main__":
+    main()
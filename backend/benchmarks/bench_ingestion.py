@@ -0,0 +1,238 @@
+"""
+Ingestion Throughput Benchmark
+Runs both ingesters against a local mongod on synthetic flows from
+benchmarks.flow_generator at several scales, and reports documents/sec,
+peak RSS and per-stage time.
+
+- flow: ReconciliationFlowIngester.ingest_stream on the whole flow.
+  Stages: parse (streaming Extended JSON decode), extract (data table
+  row deduplication), ingest (end to end) and the slowest collection write.
+- json: ReconciliationDataIngester.ingest_stream on the flow's distinct
+  data table records as a JSON array. Stages: parse, enrich
+  (BatchEnricher) and ingest; insert is ingest minus parse and enrich.
+
+Each case runs in a fresh process so its peak RSS is its own. The
+benchmark database is dropped before every case and at the end.
+
+Usage (from backend/):
+    python -m benchmarks.bench_ingestion --scales 1000,10000,50000 --sources 8
+    MONGODB_URI=mongodb://localhost:27017/ python -m benchmarks.bench_ingestion --ingesters flow
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pymongo import MongoClient
+
+from benchmarks.flow_generator import generate_flow, table_records
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_flow_case(path: str, mongo_uri: str, db_name: str) -> Dict[str, Any]:
+    """Ingest a flow file, then time the parse and extract stages on their own"""
+    from data_ingestion import extended_json
+    from data_ingestion.reconciliation_flow_ingester import ReconciliationFlowIngester
+    from data_ingestion.stream_reader import iter_top_level_items
+
+    baseline = peak_rss_mb()
+    ingester = ReconciliationFlowIngester(mongo_uri, db_name)
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        result = ingester.ingest_stream(f)
+    ingest_s = time.perf_counter() - start
+    peak = peak_rss_mb()
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        sections = dict(iter_top_level_items(f, extended_json.object_hook))
+    parse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ingester.collect_data_tables(sections)
+    extract_s = time.perf_counter() - start
+    ingester.close()
+
+    timings = result.get('collection_timings') or {}
+    slowest = max(timings, key=timings.get) if timings else None
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'documents': sum(result['collections_processed'].values()) + sum(result['data_tables_created'].values()),
+        'ingest_s': ingest_s,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak,
+        'stages': {
+            'parse': parse_s,
+            'extract': extract_s,
+            'ingest': ingest_s,
+            f'slowest write ({slowest})' if slowest else 'slowest write': timings.get(slowest, 0.0)
+        }
+    }
+
+
+def run_json_case(path: str, mongo_uri: str, db_name: str) -> Dict[str, Any]:
+    """Ingest a JSON record array, then time the parse and enrich stages on their own"""
+    from data_ingestion.bulk_writer import DEFAULT_BATCH_SIZE
+    from data_ingestion.enrichment import BatchEnricher
+    from data_ingestion.json_ingester import ReconciliationDataIngester
+    from data_ingestion.stream_reader import iter_json_records
+
+    baseline = peak_rss_mb()
+    ingester = ReconciliationDataIngester(mongo_uri, db_name, 'bench_records')
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        result = ingester.ingest_stream(f)
+    ingest_s = time.perf_counter() - start
+    peak = peak_rss_mb()
+    ingester.close()
+
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        records = list(iter_json_records(f))
+    parse_s = time.perf_counter() - start
+
+    enricher = BatchEnricher()
+    start = time.perf_counter()
+    for offset in range(0, len(records), DEFAULT_BATCH_SIZE):
+        enricher.enrich(records[offset:offset + DEFAULT_BATCH_SIZE], offset)
+    enrich_s = time.perf_counter() - start
+
+    return {
+        'success': result['success'],
+        'error': result.get('error'),
+        'documents': result.get('records_inserted', 0),
+        'ingest_s': ingest_s,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak,
+        'stages': {
+            'parse': parse_s,
+            'enrich': enrich_s,
+            'ingest': ingest_s,
+            'insert (derived)': max(ingest_s - parse_s - enrich_s, 0.0)
+        }
+    }
+
+
+CASES = {
+    'flow': run_flow_case,
+    'json': run_json_case
+}
+
+
+def run_case(ingester: str, path: str, mongo_uri: str, db_name: str) -> Dict[str, Any]:
+    """Drop the benchmark database and run one case (called in a fresh process)"""
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    client.drop_database(db_name)
+    client.close()
+    return CASES[ingester](path, mongo_uri, db_name)
+
+
+def write_inputs(rows: int, sources: int, discrepancy_rate: float,
+                 seed: int, directory: str) -> Dict[str, Any]:
+    """Generate one scale's flow and record files"""
+    start = time.perf_counter()
+    flow = generate_flow(rows=rows, sources=sources, discrepancy_rate=discrepancy_rate, seed=seed)
+    records = table_records(flow)
+    generate_s = time.perf_counter() - start
+
+    paths = {}
+    for name, payload in (('flow', flow), ('json', records)):
+        path = os.path.join(directory, f'{name}-{rows}.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, separators=(',', ':'))
+        paths[name] = path
+    return {'paths': paths, 'generate_s': generate_s, 'records': len(records)}
+
+
+def print_result(ingester: str, rows: int, size_mb: float, result: Dict[str, Any]):
+    """Print one benchmark row followed by its stage times"""
+    if not result['success']:
+        print(f"{ingester:<6} {rows:>9,}  ❌ {result['error']}")
+        return
+    rate = result['documents'] / result['ingest_s'] if result['ingest_s'] else 0.0
+    peak = result['peak_rss_mb']
+    growth = peak - result['baseline_rss_mb'] if peak is not None else None
+    print(f"{ingester:<6} {rows:>9,} {result['documents']:>10,} {size_mb:>8.1f} "
+          f"{result['ingest_s']:>9.2f} {rate:>12,.0f} "
+          f"{(f'{peak:,.0f}' if peak is not None else 'n/a'):>10} "
+          f"{(f'+{growth:,.0f}' if growth is not None else ''):>8}")
+    stages = '  '.join(f"{name} {seconds:.2f}s" for name, seconds in result['stages'].items())
+    print(f"{'':<17}↳ {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'),
+                        help='MongoDB URI (default: $MONGODB_URI or localhost)')
+    parser.add_argument('--db', default='bench_ingestion', help='scratch database (dropped per case)')
+    parser.add_argument('--scales', default='1000,10000,50000', help='comma-separated matchingResult row counts')
+    parser.add_argument('--sources', type=int, default=8, help='source records per source cell')
+    parser.add_argument('--discrepancy-rate', type=float, default=0.2, help='fraction of rows not reconciled')
+    parser.add_argument('--ingesters', default='flow,json', help='comma-separated: flow, json')
+    parser.add_argument('--seed', type=int, default=42, help='generator seed')
+    parser.add_argument('--output', default=None, help='optional JSON file for the raw results')
+    args = parser.parse_args()
+
+    ingesters = [name.strip() for name in args.ingesters.split(',') if name.strip()]
+    unknown = [name for name in ingesters if name not in CASES]
+    if unknown:
+        parser.error(f"unknown ingester(s): {', '.join(unknown)}")
+    scales = [int(value) for value in args.scales.split(',') if value.strip()]
+
+    try:
+        MongoClient(args.uri, serverSelectionTimeoutMS=3000).server_info()
+    except Exception as e:
+        print(f"❌ Cannot reach MongoDB at {args.uri}: {e}")
+        sys.exit(1)
+
+    print(f"\n📦 Ingestion benchmark against {args.uri} (database {args.db})")
+    print('='*80)
+    print(f"{'kind':<6} {'rows':>9} {'documents':>10} {'MB':>8} {'seconds':>9} {'docs/sec':>12} "
+          f"{'peak RSS':>10} {'growth':>8}")
+
+    results: List[Dict[str, Any]] = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='bench-ingestion-') as directory:
+        for rows in scales:
+            inputs = write_inputs(rows, args.sources, args.discrepancy_rate, args.seed, directory)
+            for ingester in ingesters:
+                path = inputs['paths'][ingester]
+                size_mb = os.path.getsize(path) / 1e6
+                # One process per case, so ru_maxrss is the peak of this case alone
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(run_case, ingester, path, args.uri, args.db).result()
+                result['stages'] = {'generate': inputs['generate_s'], **result['stages']}
+                print_result(ingester, rows, size_mb, result)
+                results.append({'ingester': ingester, 'rows': rows, 'size_mb': size_mb, **result})
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+    client.drop_database(args.db)
+    client.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
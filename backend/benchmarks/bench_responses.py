@@ -0,0 +1,132 @@
+"""
+Response Encoding Benchmark
+Compares encode time and bytes on the wire for the /reconciliation-flow and
+/generate_chart payloads: stdlib JSON (FastAPI default) vs orjson, each with
+identity, gzip and brotli encodings.
+
+Usage (from backend/):
+    python -m benchmarks.bench_responses --rows 2000 --chart-rows 5000
+"""
+import argparse
+import copy
+import gzip
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from utils.json_response import FastJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+SAMPLE_FLOW = Path(__file__).resolve().parent.parent / 'utils' / 'Reconciliation Data Flow.json'
+
+
+def build_flow_payload(rows: int) -> Dict[str, Any]:
+    """Scale the sample reconciliation flow up to the requested number of result rows"""
+    with open(SAMPLE_FLOW, 'r', encoding='utf-8') as f:
+        flow = json.load(f)
+
+    template_rows = flow['matchingResult']['rows']
+    flow['matchingResult']['rows'] = [
+        copy.deepcopy(template_rows[i % len(template_rows)]) for i in range(rows)
+    ]
+    return {"success": True, "flow": flow}
+
+
+def build_chart_payload(rows: int) -> Dict[str, Any]:
+    """Build a /generate_chart response with a bar figure over `rows` categories"""
+    data = [
+        {"category": f"Vendor {i}", "totalAmount": round(i * 13.37, 2), "count": i % 50}
+        for i in range(rows)
+    ]
+    return {
+        "success": True,
+        "query": "Total amount by vendor",
+        "pipeline": [{"$group": {"_id": "$vendor", "totalAmount": {"$sum": "$amount"}}}],
+        "data": data,
+        "chart_config": {
+            "success": True,
+            "chart_type": "bar",
+            "x_axis": "category",
+            "y_axis": "totalAmount",
+            "title": "Total amount by vendor",
+            "data": data,
+            "columns": ["category", "totalAmount", "count"]
+        },
+        "plotly_figure": {
+            "data": [{
+                "type": "bar",
+                "x": [row["category"] for row in data],
+                "y": [row["totalAmount"] for row in data],
+                "marker": {"color": "#636efa"}
+            }],
+            "layout": {"title": {"text": "Total amount by vendor"}}
+        },
+        "metadata": {"step": "visualization_created", "record_count": rows, "chart_type": "bar"},
+        "error": None
+    }
+
+
+def encode_default(payload: Dict[str, Any]) -> bytes:
+    """FastAPI default path: jsonable_encoder followed by stdlib json"""
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def encode_orjson(payload: Dict[str, Any]) -> bytes:
+    """New path: FastJSONResponse returned directly from the endpoint"""
+    return FastJSONResponse(payload).body
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> float:
+    """Best wall-clock time in milliseconds over `repeat` runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_benchmark(name: str, payload: Dict[str, Any], repeat: int):
+    """Print encode times and encoded sizes for one payload"""
+    print(f"\n{'='*70}")
+    print(f"📦 {name}")
+    print('='*70)
+
+    for label, encoder in [('stdlib json', encode_default), ('orjson', encode_orjson)]:
+        body = encoder(payload)
+        encode_ms = best_time(lambda: encoder(payload), repeat)
+        print(f"{label:<12} encode: {encode_ms:9.2f} ms   identity: {len(body):>12,} bytes")
+
+    body = encode_orjson(payload)
+    gzip_ms = best_time(lambda: gzip.compress(body, compresslevel=6), repeat)
+    print(f"{'gzip-6':<12} encode: {gzip_ms:9.2f} ms   wire:     {len(gzip.compress(body, 6)):>12,} bytes")
+
+    if brotli is not None:
+        br_ms = best_time(lambda: brotli.compress(body, quality=4), repeat)
+        print(f"{'brotli-4':<12} encode: {br_ms:9.2f} ms   wire:     {len(brotli.compress(body, quality=4)):>12,} bytes")
+    else:
+        print("brotli       not installed, skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000, help='matchingResult rows in the flow payload')
+    parser.add_argument('--chart-rows', type=int, default=5000, help='records in the chart payload')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    run_benchmark(f"/reconciliation-flow ({args.rows} rows)", build_flow_payload(args.rows), args.repeat)
+    run_benchmark(f"/generate_chart ({args.chart_rows} records)", build_chart_payload(args.chart_rows), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""
+Synthetic Reconciliation Flow Generator
+Builds deterministic flows in the Extended JSON shape the upload endpoints
+and ReconciliationFlowIngester accept: matchmethod, matchingrules,
+datasources, a matchingResult whose rows/cells/sources carry fullRow data
+table records, plus discrepancies, resolutions and tickets for the rows
+that did not reconcile.
+
+Usage (from backend/):
+    python -m benchmarks.flow_generator --rows 10000 --sources 8 --out flow.json
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+VENDORS = ['American Express', 'Mastercard', 'Visa', 'Discover', 'RuPay']
+SEVERITIES = ['high', 'medium', 'low']
+DISCREPANCY_TYPES = ['data_mismatch', 'missing_record', 'amount_difference']
+RESOLUTION_STATUSES = ['Approved', 'Rejected', 'Pending']
+TICKET_STATUSES = ['Open', 'Progress', 'Closed']
+
+
+class FlowGenerator:
+    """
+    Deterministic generator for reconciliation flows
+
+    Every source cell aggregates `sources` records drawn from one data
+    table, tables alternating across the cells of a row. Records are drawn
+    from a fixed pool per table, so the same record is referenced by
+    several cells, exercising the ingester's row deduplication.
+    """
+
+    def __init__(self, rows: int = 1000, cells: int = 4, sources: int = 4,
+                 tables: int = 2, table_rows: Optional[int] = None,
+                 discrepancy_rate: float = 0.2, resolution_rate: float = 0.5,
+                 seed: int = 42):
+        """
+        Initialize the generator
+
+        Args:
+            rows: matchingResult rows (one per reconciled group)
+            cells: Cells per row; the last two are the computed difference
+                   and the reconciliation status, the rest are source cells
+            sources: Source records per source cell
+            tables: Data tables (datasources) the records come from
+            table_rows: Records per data table (default: half of all
+                        references per table, so about half are duplicates)
+            discrepancy_rate: Fraction of rows that do not reconcile and
+                              get a discrepancy document
+            resolution_rate: Fraction of discrepancies with a resolution
+                             and a ticket
+            seed: Random seed; the same arguments always give the same flow
+        """
+        self.rows = rows
+        self.cells = max(cells, 3)
+        self.sources = max(sources, 1)
+        self.tables = max(tables, 1)
+        self.source_cells = self.cells - 2
+        references = rows * self.source_cells * self.sources
+        self.table_rows = table_rows or max(references // (2 * self.tables), self.sources)
+        self.discrepancy_rate = discrepancy_rate
+        self.resolution_rate = resolution_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._oid_counter = 0
+        self._base_time = datetime(2025, 10, 3, 9, 40, 0)
+
+    def _oid(self) -> Dict[str, str]:
+        """Next ObjectId, as Extended JSON"""
+        self._oid_counter += 1
+        return {"$oid": f"{self.seed & 0xffffffff:08x}{self._oid_counter:016x}"}
+
+    def _date(self, seconds: float = 0) -> Dict[str, str]:
+        """Timestamp `seconds` after the flow's base time, as Extended JSON"""
+        value = self._base_time + timedelta(seconds=seconds)
+        return {"$date": value.strftime('%Y-%m-%dT%H:%M:%S.') + f"{value.microsecond // 1000:03d}Z"}
+
+    def _table_id(self) -> str:
+        """Random data table ID in the '<uuid><epoch ms>' shape used by datasources"""
+        return str(uuid.UUID(int=self._rng.getrandbits(128), version=4)) + str(
+            1758625269533 + self._rng.randrange(10 ** 9))
+
+    def _table_records(self, table_index: int, table_id: str) -> List[Dict[str, Any]]:
+        """
+        Build the record pool of one data table
+
+        Even tables use ISO dates, numeric amounts and 'vendortype';
+        odd tables use M/D/YYYY dates, string amounts and 'vendorType',
+        mirroring the POS and credit card tables of the sample flow.
+        """
+        rng = self._rng
+        source_id = f"{rng.getrandbits(256):064x}"
+        pos_style = table_index % 2 == 0
+        records = []
+        for _ in range(self.table_rows):
+            day = datetime(2024, 1, 1) + timedelta(days=rng.randrange(366))
+            amount = round(rng.uniform(5, 5000), 2)
+            vendor = rng.choice(VENDORS)
+            if pos_style:
+                record = {"_id": self._oid(), "date": day.strftime('%Y-%m-%d'),
+                          "vendortype": vendor, "amount": amount}
+            else:
+                record = {"_id": self._oid(), "date": f"{day.month}/{day.day}/{day.year}",
+                          "vendorType": vendor.upper(), "amount": f"{amount:.2f}"}
+            record.update({"sourceType": "document", "sourceId": source_id})
+            records.append(record)
+        return records
+
+    def generate(self) -> Dict[str, Any]:
+        """
+        Build the flow
+
+        Returns:
+            Flow dictionary in Extended JSON form ({"$oid"}/{"$date"} values),
+            ready for json.dumps or extended_json.object_hook decoding
+        """
+        rng = self._rng
+        profile_id = self._oid()
+        workspace_id = self._oid()
+        organization_id = self._oid()
+        method_id = self._oid()
+
+        table_ids = [self._table_id() for _ in range(self.tables)]
+        table_names = [f"Data Source {i + 1}" for i in range(self.tables)]
+        pools = [self._table_records(i, table_id) for i, table_id in enumerate(table_ids)]
+
+        datasources = [{
+            "_id": self._oid(),
+            "name": table_names[i],
+            "description": f"Synthetic records for {table_names[i]}",
+            "source": {"sourceType": "File", "subType": "Unstructured"},
+            "extractionMethodId": self._oid(),
+            "workspaceId": workspace_id,
+            "extractionStatus": "Success",
+            "organizationId": organization_id,
+            "createdAt": self._date(-86400),
+            "updatedAt": self._date(-86000),
+            "__v": 0,
+            "collectionId": table_id
+        } for i, table_id in enumerate(table_ids)]
+
+        matchmethod = {
+            "_id": method_id,
+            "profileId": profile_id,
+            "datasourceIds": [source["_id"] for source in datasources],
+            "displayFields": [],
+            "createdAt": self._date(),
+            "updatedAt": self._date(),
+            "__v": 0
+        }
+
+        column_names = [f"amount_{i + 1}" for i in range(self.source_cells)]
+        rule_names = [f"{vendor} rule" for vendor in VENDORS[:self.tables]]
+        matchingrules = [{
+            "_id": self._oid(),
+            "matchingMethodId": method_id,
+            "ruleName": name,
+            "descp": f"Reconcile the summed amounts for {name.replace(' rule', '')}",
+            "rules": [[
+                {
+                    "type": "aggregate",
+                    "dataSourceIds": [table_ids[col % self.tables]],
+                    "fieldId": "amount",
+                    "operation": "$sum",
+                    "output": {"name": f"sum_{col + 1}", "datatype": "numeric"}
+                } for col in range(self.source_cells)
+            ] + [{
+                "type": "arithmetic",
+                "dataSourceIds": ["outputs"],
+                "operation": "$subtract",
+                "output": {"name": "difference", "datatype": "numeric"},
+                "leftField": {"type": "ref", "value": "outputs.sum_1"},
+                "rightField": {"type": "ref", "value": f"outputs.sum_{self.source_cells}"}
+            }]],
+            "active": True,
+            "status": "pass",
+            "datasourceIds": matchmethod["datasourceIds"],
+            "order": order,
+            "outputs": {"fields": []},
+            "profileId": profile_id,
+            "createdAt": self._date(1),
+            "updatedAt": self._date(600),
+            "__v": 0
+        } for order, name in enumerate(rule_names)]
+
+        result_id = self._oid()
+        rows, discrepancy_rows = [], []
+        for row_index in range(self.rows):
+            reconciled = rng.random() >= self.discrepancy_rate
+            cells, source_rows, totals = [], [], []
+            for col in range(self.source_cells):
+                table = col % self.tables
+                picks = rng.sample(range(self.table_rows), min(self.sources, self.table_rows))
+                sources = []
+                for pick in picks:
+                    record = pools[table][pick]
+                    sources.append({
+                        "tableId": table_ids[table],
+                        "rowIndex": pick,
+                        "colIndex": 3,
+                        "originalValue": record["amount"],
+                        "documentId": table_names[table],
+                        "fullRow": record
+                    })
+                    source_rows.append({"tableId": table_ids[table], "rowIndex": pick})
+                total = round(sum(float(s["originalValue"]) for s in sources), 2)
+                totals.append(total)
+                cells.append({"value": total,
+                              "matchType": "aggregated" if len(sources) > 1 else "exact",
+                              "sources": sources})
+
+            difference = 0 if reconciled else round(totals[0] - totals[-1], 2) or 0.01
+            cells.append({"value": difference, "matchType": "computed"})
+            status_cell = {"value": "Reconciled" if reconciled else "Not Reconciled",
+                           "matchType": "none"}
+            if not reconciled:
+                status_cell["metaData"] = {
+                    "severity": rng.choice(SEVERITIES),
+                    "details": "Data not reconciled due to data mismatch",
+                    "type": rng.choice(DISCREPANCY_TYPES)
+                }
+                discrepancy_rows.append((row_index, cells, status_cell["metaData"]))
+            cells.append(status_cell)
+
+            rows.append({"cells": cells, "sourceRows": source_rows,
+                         "matchingRules": [rule_names[row_index % len(rule_names)]]})
+
+        matching_result = {
+            "_id": result_id,
+            "matchId": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "matchingMethodId": method_id,
+            "profileId": profile_id["$oid"],
+            "columns": [{"name": name, "type": "number", "sourceFields": []} for name in column_names]
+                       + [{"name": "result", "type": "number", "sourceFields": []},
+                          {"name": "reconciliation_status", "type": "boolean", "sourceFields": []}],
+            "rows": rows,
+            "sources": table_ids,
+            "metadata": {
+                "matchSummary": {
+                    "totalMatches": self.rows - len(discrepancy_rows),
+                    "totalDiscrepancies": len(discrepancy_rows),
+                    "aggregationApplied": self.sources > 1
+                },
+                "documentIds": table_names,
+                "fieldsUsed": [f"{table_id}.amount" for table_id in table_ids]
+            },
+            "createdAt": self._date(26),
+            "updatedAt": self._date(652),
+            "__v": 0
+        }
+
+        discrepancies, resolutions, tickets = [], [], []
+        for offset, (row_index, cells, meta) in enumerate(discrepancy_rows):
+            discrepancy_id = self._oid()
+            discrepancies.append({
+                "_id": discrepancy_id,
+                "type": meta["type"],
+                "details": meta["details"],
+                "severity": meta["severity"],
+                "suggestedResolution": {
+                    "aiSummary": f"Row {row_index} differs by {cells[-1]['value']} between sources.",
+                    "smartFacts": ["Unmatched Bank Transaction"],
+                    "_id": self._oid()
+                },
+                "collection": json.dumps(cells[:-1], separators=(',', ':'))[:2000],
+                "matchedRowIndex": row_index,
+                "matchResultsId": result_id,
+                "profileId": profile_id,
+                "workspaceId": workspace_id,
+                "organizationId": organization_id,
+                "createdAt": self._date(40 + offset),
+                "updatedAt": self._date(700 + offset),
+                "__v": 0
+            })
+            if rng.random() >= self.resolution_rate:
+                continue
+
+            ticket_id = self._oid()
+            tickets.append({
+                "_id": ticket_id,
+                "name": f"Discrepancy in row {row_index}",
+                "instruction": "Review the source records and resolve the difference",
+                "status": rng.choice(TICKET_STATUSES),
+                "risk": meta["severity"].capitalize(),
+                "discrepancyId": discrepancy_id,
+                "profileId": profile_id,
+                "workspaceId": workspace_id,
+                "organizationId": organization_id,
+                "expiresAt": self._date(7 * 86400),
+                "createdAt": self._date(60 + offset),
+                "updatedAt": self._date(3600 + offset),
+                "__v": 0
+            })
+            resolutions.append({
+                "_id": self._oid(),
+                "discrepancyId": discrepancy_id,
+                "ticketId": ticket_id,
+                "resolvedBy": self._oid(),
+                "resolvedAt": self._date(1800 + offset),
+                "status": rng.choice(RESOLUTION_STATUSES),
+                "resolvedCollection": discrepancies[-1]["collection"],
+                "comment": "Resolved after reviewing the source statements",
+                "organizationId": organization_id,
+                "createdAt": self._date(1800 + offset),
+                "updatedAt": self._date(1900 + offset),
+                "__v": 0
+            })
+
+        return {
+            "matchmethod": matchmethod,
+            "matchingrules": matchingrules,
+            "datasources": datasources,
+            "matchingResult": matching_result,
+            "discrepancies": discrepancies,
+            "discrepancyResolution": resolutions,
+            "ticket": tickets
+        }
+
+
+def generate_flow(**kwargs) -> Dict[str, Any]:
+    """
+    Helper function to build a synthetic flow
+
+    Args:
+        **kwargs: FlowGenerator arguments (rows, cells, sources, tables,
+                  table_rows, discrepancy_rate, resolution_rate, seed)
+
+    Returns:
+        Flow dictionary in Extended JSON form
+    """
+    return FlowGenerator(**kwargs).generate()
+
+
+def generate_flow_bytes(**kwargs) -> bytes:
+    """Synthetic flow serialized as UTF-8 JSON, as an upload would send it"""
+    return json.dumps(generate_flow(**kwargs), separators=(',', ':')).encode('utf-8')
+
+
+def table_records(flow: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Distinct data table records of a flow, flattened for the simple-data ingester
+
+    Args:
+        flow: Flow from generate_flow
+
+    Returns:
+        Records without their Extended JSON _id, tagged with their table
+    """
+    records, seen = [], set()
+    for row in flow["matchingResult"]["rows"]:
+        for cell in row["cells"]:
+            for source in cell.get("sources", []):
+                full_row = source["fullRow"]
+                key = full_row["_id"]["$oid"]
+                if key in seen:
+                    continue
+                seen.add(key)
+                record = {k: v for k, v in full_row.items() if k != "_id"}
+                record["table_id"] = source["tableId"]
+                records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000, help='matchingResult rows')
+    parser.add_argument('--cells', type=int, default=4, help='cells per row (min 3)')
+    parser.add_argument('--sources', type=int, default=4, help='source records per source cell')
+    parser.add_argument('--tables', type=int, default=2, help='data tables')
+    parser.add_argument('--table-rows', type=int, default=None, help='records per data table')
+    parser.add_argument('--discrepancy-rate', type=float, default=0.2, help='fraction of rows not reconciled')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--out', default='synthetic_flow.json', help='output file')
+    args = parser.parse_args()
+
+    raw = generate_flow_bytes(rows=args.rows, cells=args.cells, sources=args.sources,
+                              tables=args.tables, table_rows=args.table_rows,
+                              discrepancy_rate=args.discrepancy_rate, seed=args.seed)
+    with open(args.out, 'wb') as f:
+        f.write(raw)
+    print(f"✅ Wrote {args.out} ({len(raw) / 1e6:.1f} MB, {args.rows:,} rows)")
+
+
+if __name__ == "__main__":
+    main()
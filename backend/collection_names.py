@@ -0,0 +1,22 @@
+"""
+Collection Names
+Collections written by the ingesters, the reconciliation engine and the
+dashboard summaries, in a dependency-free module so that utils,
+data_ingestion and reconciliation can share them without importing one
+another
+"""
+
+# Flattened matchingResult cells, one document per cell source
+CELL_FACTS_COLLECTION = 'matchingResultCells'
+
+# Per-collection field statistics profiles maintained during ingestion
+FIELD_STATS_COLLECTION = 'fieldStats'
+
+# Last refresh of each dashboard summary
+SUMMARY_STATE_COLLECTION = 'summaryState'
+
+# Leases serializing changes to each dashboard summary across processes
+SUMMARY_LEASE_COLLECTION = 'summaryLeases'
+
+# Per-source high-water marks of incremental reconciliation runs
+RECONCILIATION_STATE_COLLECTION = 'reconciliationState'
@@ -1,6 +1,14 @@
 """
 Data Ingestion Module for Reconciliation Dashboard
 """
-from .json_ingester import ReconciliationDataIngester, ingest_reconciliation_data
+from .json_ingester import (
+    ReconciliationDataIngester,
+    ingest_reconciliation_data,
+    ingest_reconciliation_data_stream
+)
 
-__all__ = ['ReconciliationDataIngester', 'ingest_reconciliation_data']
+__all__ = [
+    'ReconciliationDataIngester',
+    'ingest_reconciliation_data',
+    'ingest_reconciliation_data_stream'
+]
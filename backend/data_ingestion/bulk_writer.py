@@ -0,0 +1,358 @@
+"""
+Bulk Write Pipeline
+Writes documents to MongoDB in unordered batches from a small pool of
+concurrent writers, with per-batch error accounting
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+
+DEFAULT_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+DEFAULT_WRITERS = int(os.getenv('INGEST_WRITERS', 4))
+
+# Only the first few failing batches are kept in the report
+MAX_REPORTED_BATCH_ERRORS = 20
+
+# Field holding the content hash written by BulkUpsertPipeline
+CONTENT_HASH_FIELD = '_content_hash'
+
+# Fields that change on every upload and are left out of the content hash
+VOLATILE_FIELDS = ('_ingested_at', CONTENT_HASH_FIELD)
+
+
+def content_hash(document: Dict[str, Any], ignore: Sequence[str] = VOLATILE_FIELDS) -> str:
+    """
+    Stable hash of a document's content, ignoring VOLATILE_FIELDS
+    
+    Args:
+        document: Document to hash
+        ignore: Fields left out of the hash
+        
+    Returns:
+        Hex SHA-1 of the canonical JSON encoding
+    """
+    content = {k: v for k, v in document.items() if k not in ignore}
+    canonical = json.dumps(content, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def write_errors(e: Exception) -> List[Dict[str, Any]]:
+    """Normalize a bulk write exception into a short list of error entries"""
+    if isinstance(e, BulkWriteError):
+        errors = [
+            {'index': err.get('index'), 'code': err.get('code'),
+             'message': str(err.get('errmsg', ''))[:200]}
+            for err in e.details.get('writeErrors', [])
+        ]
+        if errors:
+            return errors
+    return [{'index': None, 'code': None, 'message': str(e)[:200]}]
+
+
+def written_documents(documents: List[Dict[str, Any]], e: Exception = None) -> List[Dict[str, Any]]:
+    """
+    Documents of an unordered bulk write that were stored
+
+    Args:
+        documents: Documents in the order they were sent
+        e: Exception raised by the write, if any
+
+    Returns:
+        All documents after a clean write, all but the failed indexes after a
+        BulkWriteError, none after any other error
+    """
+    if e is None:
+        return documents
+    if not isinstance(e, BulkWriteError):
+        return []
+    failed = {err.get('index') for err in e.details.get('writeErrors', [])}
+    return [document for index, document in enumerate(documents) if index not in failed]
+
+
+class BulkInsertPipeline:
+    """
+    Concurrent, unordered insert_many pipeline
+
+    Documents are buffered into batches; each full batch is handed to a
+    writer thread. The number of batches in flight is bounded, so memory
+    stays proportional to batch_size * max_pending regardless of input size.
+    With ordered=False a bad document only fails itself, not the rest of its batch.
+    An optional field statistics profile is updated on the writer thread
+    with the documents of each batch that were actually stored.
+    """
+
+    def __init__(self, collection, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_workers: int = DEFAULT_WRITERS, max_pending: int = None,
+                 profile=None, track_ids: bool = False):
+        """
+        Initialize the pipeline
+
+        Args:
+            collection: Target pymongo collection
+            batch_size: Documents per insert_many call
+            max_workers: Concurrent writer threads
+            max_pending: Maximum batches queued or in flight (default 2 * max_workers)
+            profile: Optional FieldStatsProfile fed the stored documents
+            track_ids: Collect the _id of every stored document in inserted_ids
+        """
+        self.collection = collection
+        self.profile = profile
+        self.inserted_ids: Optional[List[Any]] = [] if track_ids else None
+        self.batch_size = batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='bulk-insert')
+        self._slots = threading.BoundedSemaphore(max_pending or max_workers * 2)
+        self._lock = threading.Lock()
+        self._buffer: List[Dict[str, Any]] = []
+        self._batch_number = 0
+        self._started_at = time.perf_counter()
+        self._closed = False
+        self._summary = None
+        self.inserted = 0
+        self.failed = 0
+        self.failed_batches = 0
+        self.batch_errors: List[Dict[str, Any]] = []
+
+    def add(self, document: Dict[str, Any]):
+        """Queue a single document"""
+        self._buffer.append(document)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, documents: Iterable[Dict[str, Any]]):
+        """Queue several documents"""
+        for document in documents:
+            self.add(document)
+
+    def flush(self):
+        """Submit the buffered documents as a batch"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        self._batch_number += 1
+        # Blocks the producer while too many batches are in flight
+        self._slots.acquire()
+        future = self._executor.submit(self._write_batch, self._batch_number, batch)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def _write_batch(self, batch_number: int, batch: List[Dict[str, Any]]):
+        """Insert one batch and record its outcome"""
+        size = len(batch)
+        try:
+            result = self.collection.insert_many(batch, ordered=False)
+            inserted, errors = len(result.inserted_ids), []
+            self._profile_batch(batch)
+        except BulkWriteError as e:
+            inserted = e.details.get('nInserted', 0)
+            errors = write_errors(e)
+            batch = written_documents(batch, e)
+            self._profile_batch(batch)
+        except Exception as e:
+            inserted = 0
+            errors = write_errors(e)
+            batch = []
+
+        if self.inserted_ids is not None and batch:
+            with self._lock:
+                self.inserted_ids.extend(document['_id'] for document in batch)
+        self._record(batch_number, size, inserted, errors)
+
+    def _profile_batch(self, batch: List[Dict[str, Any]]):
+        """Add a batch to the statistics profile (never fails the write)"""
+        if self.profile is None or not batch:
+            return
+        try:
+            self.profile.update(batch)
+        except Exception as e:
+            print(f"⚠️  Field statistics update failed: {e}")
+
+    def _record(self, batch_number: int, size: int, inserted: int,
+                errors: List[Dict[str, Any]], written: int = None):
+        """
+        Add a batch outcome to the totals
+
+        Args:
+            batch_number: Sequence number of the batch
+            size: Documents in the batch
+            inserted: Documents newly inserted
+            errors: Write errors
+            written: Documents handled successfully (defaults to inserted)
+        """
+        failed = size - (inserted if written is None else written)
+        with self._lock:
+            self.inserted += inserted
+            self.failed += failed
+            if failed:
+                self.failed_batches += 1
+                if len(self.batch_errors) < MAX_REPORTED_BATCH_ERRORS:
+                    self.batch_errors.append({
+                        'batch': batch_number,
+                        'size': size,
+                        'inserted': inserted,
+                        'failed': failed,
+                        'errors': errors[:5]
+                    })
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Flush remaining documents and wait for all writers
+
+        Returns:
+            Summary with counts, per-batch errors and throughput
+        """
+        if self._closed:
+            return self._summary
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self._closed = True
+
+        elapsed = time.perf_counter() - self._started_at
+        self._summary = {
+            'batches': self._batch_number,
+            'batch_size': self.batch_size,
+            'inserted': self.inserted,
+            'failed': self.failed,
+            'failed_batches': self.failed_batches,
+            'batch_errors': self.batch_errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'docs_per_sec': round(self.inserted / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        return self._summary
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BulkUpsertPipeline(BulkInsertPipeline):
+    """
+    Concurrent incremental loader using unordered ReplaceOne upserts
+
+    Each document is keyed on the first of key_fields it contains (or on
+    its content hash if it has none) and stored with a _content_hash.
+    Fields generated per upload (e.g. positional tracking IDs) can be left
+    out of the hash, so re-uploading the same keyless record matches it.
+    Before writing a batch the stored hashes for its keys are fetched in
+    one query, and documents whose content is unchanged are skipped, so
+    re-uploading the same delta performs no writes. Only changed documents
+    are added to the statistics profile; a changed document counts again,
+    so profile counts of updated data are approximate.
+    """
+
+    def __init__(self, collection, key_fields: Sequence[str] = ('_id',),
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_workers: int = DEFAULT_WRITERS,
+                 max_pending: int = None, profile=None, volatile_fields: Sequence[str] = ()):
+        """
+        Initialize the pipeline
+
+        Args:
+            collection: Target pymongo collection
+            key_fields: Candidate identity fields, in priority order
+            batch_size: Documents per bulk_write call
+            max_workers: Concurrent writer threads
+            max_pending: Maximum batches queued or in flight (default 2 * max_workers)
+            profile: Optional FieldStatsProfile fed the changed documents that were stored
+            volatile_fields: Fields left out of the content hash besides VOLATILE_FIELDS
+        """
+        super().__init__(collection, batch_size, max_workers, max_pending, profile)
+        self.key_fields = tuple(key_fields)
+        self.hash_ignore = VOLATILE_FIELDS + tuple(volatile_fields)
+        self.updated = 0
+        self.unchanged = 0
+
+        # The per-batch hash lookup needs the key fields indexed
+        for field in self.key_fields + (CONTENT_HASH_FIELD,):
+            if field != '_id':
+                try:
+                    collection.create_index(field)
+                except Exception as e:
+                    print(f"⚠️  Could not create index on {field}: {e}")
+
+    def document_key(self, document: Dict[str, Any]) -> Tuple[str, Any]:
+        """Identity of a document as (field, value)"""
+        for field in self.key_fields:
+            if document.get(field) is not None:
+                return field, document[field]
+        return CONTENT_HASH_FIELD, document[CONTENT_HASH_FIELD]
+
+    def _stored_hashes(self, keys: List[Tuple[str, Any]]) -> Dict[Tuple[str, Any], str]:
+        """Fetch the stored content hash for each key that already exists"""
+        by_field: Dict[str, List[Any]] = {}
+        for field, value in keys:
+            by_field.setdefault(field, []).append(value)
+
+        stored = {}
+        for field, values in by_field.items():
+            cursor = self.collection.find({field: {'$in': values}},
+                                          {field: 1, CONTENT_HASH_FIELD: 1})
+            for doc in cursor:
+                stored[(field, doc.get(field))] = doc.get(CONTENT_HASH_FIELD)
+        return stored
+
+    def _write_batch(self, batch_number: int, batch: List[Dict[str, Any]]):
+        """Upsert the changed documents of one batch and record its outcome"""
+        inserted = updated = unchanged = 0
+        errors = []
+        try:
+            keyed = []
+            for document in batch:
+                # Annotate a copy: the caller's documents may be shared with other writers
+                document = {**document, CONTENT_HASH_FIELD: content_hash(document, self.hash_ignore)}
+                keyed.append((self.document_key(document), document))
+
+            stored = self._stored_hashes([key for key, _ in keyed])
+
+            requests, changed = [], []
+            for key, document in keyed:
+                if stored.get(key) == document[CONTENT_HASH_FIELD]:
+                    unchanged += 1
+                    continue
+                field, value = key
+                requests.append(ReplaceOne({field: value}, document, upsert=True))
+                changed.append(document)
+
+            if requests:
+                try:
+                    result = self.collection.bulk_write(requests, ordered=False)
+                    inserted, updated = result.upserted_count, result.matched_count
+                    self._profile_batch(changed)
+                except BulkWriteError as e:
+                    inserted = e.details.get('nUpserted', 0)
+                    updated = e.details.get('nMatched', 0)
+                    errors = write_errors(e)
+                    self._profile_batch(written_documents(changed, e))
+        except Exception as e:
+            errors = write_errors(e)
+
+        with self._lock:
+            self.updated += updated
+            self.unchanged += unchanged
+        self._record(batch_number, len(batch), inserted, errors,
+                     written=inserted + updated + unchanged)
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Flush remaining documents and wait for all writers
+
+        Returns:
+            Summary as for BulkInsertPipeline plus updated and unchanged counts
+        """
+        if self._closed:
+            return self._summary
+        summary = super().close()
+        summary['updated'] = self.updated
+        summary['unchanged'] = self.unchanged
+        written = self.inserted + self.updated + self.unchanged
+        if summary['elapsed_seconds'] > 0:
+            summary['docs_per_sec'] = round(written / summary['elapsed_seconds'], 1)
+        return summary
@@ -0,0 +1,155 @@
+"""
+Matching Result Cell Facts
+Flattens matchingResult rows/cells/sources into one indexed document per
+cell source, so analytical queries can $match/$group directly instead of
+unwinding the nested result documents
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from collection_names import CELL_FACTS_COLLECTION
+from .enrichment import coerce_numeric_value, parse_date_value
+
+
+# Indexes for the common filters and group keys
+CELL_FACT_INDEXES = [
+    [('matchingMethodId', 1), ('rule', 1)],
+    [('matchingResultId', 1), ('rowIndex', 1)],
+    [('tableId', 1)],
+    [('vendorType', 1)],
+    [('sourceDate', 1)],
+    [('reconciled', 1)]
+]
+
+# Source row fields holding the vendor, in either casing used by the data tables
+VENDOR_FIELDS = ('vendorType', 'vendortype')
+
+
+def ensure_cell_fact_indexes(collection) -> List[str]:
+    """
+    Create the cell fact indexes
+
+    Args:
+        collection: pymongo collection
+
+    Returns:
+        Names of the indexes
+    """
+    return [collection.create_index(keys) for keys in CELL_FACT_INDEXES]
+
+
+def _source_date(value: Any) -> Optional[datetime]:
+    """Parse a source row date (ISO, YYYY-MM-DD or M/D/YYYY); None if it is not a date"""
+    if isinstance(value, datetime):
+        return value
+    if not isinstance(value, str):
+        return None
+    parsed = parse_date_value(value)
+    if isinstance(parsed, datetime):
+        return parsed
+    try:
+        return datetime.strptime(value, '%m/%d/%Y')
+    except ValueError:
+        return None
+
+
+def _row_status(cells: List[Dict], columns: List[Dict]) -> Dict[str, Any]:
+    """
+    Row-level reconciliation status from the row's boolean column
+
+    Returns:
+        Dictionary with 'reconciled' and, for unreconciled rows, the
+        discrepancy 'severity' and 'discrepancyType' when the cell carries them
+    """
+    for col_index, cell in enumerate(cells):
+        column = columns[col_index] if col_index < len(columns) else {}
+        if column.get('type') != 'boolean':
+            continue
+        value = cell.get('value')
+        if isinstance(value, bool):
+            status = {'reconciled': value}
+        elif isinstance(value, str):
+            status = {'reconciled': value.strip().lower() == 'reconciled'}
+        else:
+            continue
+        meta = cell.get('metaData') or {}
+        if meta.get('severity'):
+            status['severity'] = meta['severity']
+        if meta.get('type'):
+            status['discrepancyType'] = meta['type']
+        return status
+    return {}
+
+
+def iter_cell_facts(matching_result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one fact document per cell source of a matchingResult
+
+    Cells without sources (computed differences, status cells) yield a
+    single document without the source fields. The cell value is repeated
+    on every source of the cell, so sum `value` over sourceIndex 0 to
+    count each cell once; sum `sourceAmount` to total the source records.
+    The _id is derived from the result, row, cell and source positions,
+    so re-ingesting the same result upserts the same documents.
+
+    Args:
+        matching_result: Decoded matchingResult document
+
+    Yields:
+        Fact documents (fields with no value are omitted)
+    """
+    result_id = matching_result.get('_id')
+    columns = matching_result.get('columns') or []
+    result_fields = {
+        'matchingResultId': result_id,
+        'matchId': matching_result.get('matchId'),
+        'matchingMethodId': matching_result.get('matchingMethodId'),
+        'profileId': matching_result.get('profileId'),
+        'resultCreatedAt': matching_result.get('createdAt')
+    }
+
+    for row_index, row in enumerate(matching_result.get('rows') or []):
+        cells = row.get('cells') or []
+        rules = row.get('matchingRules') or []
+        row_fields = {
+            'rowIndex': row_index,
+            'rule': rules[0] if rules else None,
+            **_row_status(cells, columns)
+        }
+
+        for col_index, cell in enumerate(cells):
+            column = columns[col_index] if col_index < len(columns) else {}
+            cell_fields = {
+                'colIndex': col_index,
+                'column': column.get('name'),
+                'columnType': column.get('type'),
+                'value': cell.get('value'),
+                'matchType': cell.get('matchType')
+            }
+            sources = cell.get('sources') or [None]
+
+            for source_index, source in enumerate(sources):
+                fact = {
+                    '_id': f'{result_id}:{row_index}:{col_index}:{source_index}',
+                    **result_fields,
+                    **row_fields,
+                    **cell_fields,
+                    'sourceIndex': source_index
+                }
+                if source is not None:
+                    full_row = source.get('fullRow') or {}
+                    vendor = next((full_row[f] for f in VENDOR_FIELDS if full_row.get(f)), None)
+                    original = source.get('originalValue')
+                    amount = coerce_numeric_value(original if original is not None else full_row.get('amount'))
+                    fact.update({
+                        'sourceCount': len(sources),
+                        'tableId': source.get('tableId'),
+                        'documentId': source.get('documentId'),
+                        'sourceRowIndex': source.get('rowIndex'),
+                        'sourceRowId': full_row.get('_id'),
+                        'originalValue': original,
+                        'sourceAmount': amount if isinstance(amount, float) else None,
+                        'vendorType': vendor,
+                        'sourceDate': _source_date(full_row.get('date'))
+                    })
+                yield {key: value for key, value in fact.items() if value is not None}
@@ -0,0 +1,446 @@
+"""
+Resumable Chunked Uploads
+Stages upload parts at their offsets in a local file and exposes a reader
+that follows the contiguous received prefix, so ingestion can run while
+the rest of the file is still arriving. The reader only reports end of
+file once the upload is completed, and an upload that declares a whole-file
+checksum is only handed to ingestion after the checksum was verified.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Upload states
+RECEIVING = 'receiving'
+COMPLETE = 'complete'
+ABORTED = 'aborted'
+
+
+class UploadError(Exception):
+    """Invalid upload request (bad offset, checksum mismatch, unknown upload, ...)"""
+
+
+class UploadNotFoundError(UploadError):
+    """Unknown upload ID (never created, expired or already finished)"""
+
+
+class UploadConflictError(UploadError):
+    """Part overlaps bytes already received with different boundaries"""
+
+
+class UploadAbortedError(IOError):
+    """Raised by UploadReader when the upload is aborted or stalls"""
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkedUpload:
+    """
+    One upload being assembled from parts
+    """
+
+    def __init__(self, filename: str, total_size: int, path: str, sha256: Optional[str] = None):
+        """
+        Initialize the upload
+
+        Args:
+            filename: Original file name
+            total_size: Final size in bytes
+            path: Staging file (pre-sized to total_size)
+            sha256: Declared hex SHA-256 of the whole file; ingestion of a
+                    checksummed upload waits until it has been verified
+        """
+        self.upload_id = uuid.uuid4().hex
+        self.filename = filename
+        self.total_size = total_size
+        self.path = path
+        self.sha256 = sha256.lower() if sha256 else None
+        self.state = RECEIVING
+        self.error: Optional[str] = None
+        self.ranges: List[List[int]] = []
+        self.in_flight: List[Tuple[int, int]] = []
+        self.parts_received = 0
+        self.created_at = datetime.utcnow()
+        self.last_activity = time.monotonic()
+        self.job_id: Optional[str] = None
+        self.job_finished = False
+        # Caller data, e.g. the ingestion options of a job started on completion
+        self.options: Optional[Any] = None
+        self.condition = threading.Condition()
+
+    @property
+    def watermark(self) -> int:
+        """End of the contiguous prefix received so far"""
+        if self.ranges and self.ranges[0][0] == 0:
+            return self.ranges[0][1]
+        return 0
+
+    @property
+    def bytes_received(self) -> int:
+        return sum(end - start for start, end in self.ranges)
+
+    def covers(self, start: int, end: int) -> bool:
+        """Whether [start, end) was already received"""
+        return any(s <= start and end <= e for s, e in self.ranges)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """Whether [start, end) intersects a received range or a part being written"""
+        return any(start < e and s < end for s, e in self.ranges + self.in_flight)
+
+    def add_range(self, start: int, end: int):
+        """Merge [start, end) into the sorted list of received ranges"""
+        merged = []
+        for s, e in sorted(self.ranges + [[start, end]]):
+            if merged and s <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], e)
+            else:
+                merged.append([s, e])
+        self.ranges = merged
+
+    def missing_ranges(self) -> List[Tuple[int, int]]:
+        """Byte ranges still to be uploaded"""
+        missing, position = [], 0
+        for start, end in self.ranges:
+            if start > position:
+                missing.append((position, start))
+            position = end
+        if position < self.total_size:
+            missing.append((position, self.total_size))
+        return missing
+
+    def status(self) -> Dict[str, Any]:
+        """Upload progress for the status endpoint"""
+        with self.condition:
+            return {
+                'upload_id': self.upload_id,
+                'filename': self.filename,
+                'state': self.state,
+                'total_size': self.total_size,
+                'bytes_received': self.bytes_received,
+                'contiguous_bytes': self.watermark,
+                'parts_received': self.parts_received,
+                'missing_ranges': self.missing_ranges()[:100],
+                'checksum_declared': self.sha256 is not None,
+                'created_at': self.created_at,
+                'job_id': self.job_id,
+                'error': self.error
+            }
+
+
+class UploadReader:
+    """
+    Binary reader over a staging file that only returns received bytes
+
+    Reads block until the contiguous prefix covers the requested position,
+    so a parser can consume the upload while parts are still arriving. End
+    of file is only returned once the upload has been completed; a reader
+    that waits longer than stall_timeout aborts the upload.
+    """
+
+    def __init__(self, upload: ChunkedUpload, stall_timeout: float):
+        """
+        Initialize the reader
+
+        Args:
+            upload: Upload to follow
+            stall_timeout: Seconds to wait for the next contiguous bytes
+        """
+        self.upload = upload
+        self.stall_timeout = stall_timeout
+        self.position = 0
+        # Unbuffered: read-ahead would cache bytes past the watermark that are not written yet
+        self._file = open(upload.path, 'rb', buffering=0)
+
+    def _ready(self) -> bool:
+        """Whether a read can return: new bytes, end of a completed upload, or abort"""
+        upload = self.upload
+        if upload.state != RECEIVING:
+            return True
+        return self.position < upload.total_size and upload.watermark > self.position
+
+    def read(self, size: int = -1) -> bytes:
+        upload = self.upload
+        with upload.condition:
+            deadline = time.monotonic() + self.stall_timeout
+            while not self._ready():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    waiting = ('completion' if self.position >= upload.total_size
+                               else f'data past byte {self.position}')
+                    upload.state = ABORTED
+                    upload.error = f'Upload stalled: no {waiting} for {self.stall_timeout:.0f}s'
+                    upload.condition.notify_all()
+                    raise UploadAbortedError(upload.error)
+                upload.condition.wait(remaining)
+            if upload.state == ABORTED:
+                raise UploadAbortedError(upload.error or 'Upload was aborted')
+            if self.position >= upload.total_size:
+                return b''
+            available = upload.watermark - self.position
+
+        if size is None or size < 0 or size > available:
+            size = available
+        self._file.seek(self.position)
+        data = self._file.read(size)
+        self.position += len(data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ChunkedUploadManager:
+    """
+    Registry of in-progress chunked uploads staged on local disk
+
+    Uploads stay registered until they are completed or aborted and their
+    ingestion job (if one was started) has finished.
+    """
+
+    def __init__(self, staging_dir: str, max_part_size: int = 64 * 1024 * 1024,
+                 idle_timeout: int = 3600, stall_timeout: int = 300):
+        """
+        Initialize the manager
+
+        Args:
+            staging_dir: Directory for staging files
+            max_part_size: Largest accepted part in bytes
+            idle_timeout: Seconds without a new part before an incomplete
+                          upload is aborted
+            stall_timeout: Seconds an ingestion job waits for the next
+                           contiguous bytes (or for completion) before it
+                           aborts the upload and frees its worker
+        """
+        self.staging_dir = staging_dir
+        self.max_part_size = max_part_size
+        self.idle_timeout = idle_timeout
+        self.stall_timeout = stall_timeout
+        self._uploads: Dict[str, ChunkedUpload] = {}
+        self._lock = threading.Lock()
+
+    def init(self, filename: str, total_size: int, sha256: Optional[str] = None) -> ChunkedUpload:
+        """
+        Start a new upload
+
+        Args:
+            filename: Original file name
+            total_size: Final size in bytes
+            sha256: Optional hex SHA-256 of the whole file, verified by complete()
+
+        Returns:
+            The new upload
+        """
+        if total_size <= 0:
+            raise UploadError('total_size must be positive')
+        if sha256 and not re.fullmatch(r'[0-9a-fA-F]{64}', sha256):
+            raise UploadError('sha256 must be 64 hex characters')
+        free = shutil.disk_usage(self.staging_dir).free
+        if total_size > free:
+            raise UploadError(f'Not enough staging space: {total_size:,} bytes needed, {free:,} free')
+
+        self.expire_idle()
+        fd, path = tempfile.mkstemp(prefix='upload-', suffix='.part', dir=self.staging_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.truncate(total_size)
+
+        upload = ChunkedUpload(filename, total_size, path, sha256)
+        with self._lock:
+            self._uploads[upload.upload_id] = upload
+        print(f"📥 Started chunked upload {upload.upload_id} ({filename}, {total_size:,} bytes)")
+        return upload
+
+    def get(self, upload_id: str) -> ChunkedUpload:
+        """Look up an upload, raising UploadError if it is unknown"""
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+        if upload is None:
+            raise UploadNotFoundError(f'Upload not found: {upload_id}')
+        return upload
+
+    def write_part(self, upload_id: str, offset: int, data: bytes,
+                   sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Stage one part at its offset
+
+        Re-sending a part that was already received is accepted as a no-op,
+        so clients can retry blindly after a network error.
+
+        Args:
+            upload_id: Upload ID from init
+            offset: Byte offset of the part in the file
+            data: Part contents
+            sha256: Expected hex SHA-256 of the part
+
+        Returns:
+            Upload status after the part was written
+        """
+        upload = self.get(upload_id)
+        end = offset + len(data)
+        if upload.state != RECEIVING:
+            raise UploadError(f'Upload is {upload.state}')
+        if not data:
+            raise UploadError('Empty part')
+        if len(data) > self.max_part_size:
+            raise UploadError(f'Part exceeds {self.max_part_size:,} bytes')
+        if offset < 0 or end > upload.total_size:
+            raise UploadError(f'Part [{offset}, {end}) is outside the file (size {upload.total_size})')
+        if sha256 and hashlib.sha256(data).hexdigest() != sha256.lower():
+            raise UploadError('Checksum mismatch')
+
+        with upload.condition:
+            if upload.covers(offset, end):
+                upload.last_activity = time.monotonic()
+                return {'duplicate': True}
+            if upload.overlaps(offset, end):
+                raise UploadConflictError(f'Part [{offset}, {end}) overlaps data already received')
+            upload.in_flight.append((offset, end))
+
+        try:
+            with open(upload.path, 'r+b') as f:
+                f.seek(offset)
+                f.write(data)
+        finally:
+            with upload.condition:
+                upload.in_flight.remove((offset, end))
+
+        with upload.condition:
+            upload.add_range(offset, end)
+            upload.parts_received += 1
+            upload.last_activity = time.monotonic()
+            upload.condition.notify_all()
+        return {'duplicate': False}
+
+    def complete(self, upload_id: str, sha256: Optional[str] = None) -> ChunkedUpload:
+        """
+        Mark an upload as fully received
+
+        A whole-file checksum must be declared when the upload is started:
+        ingestion of an undeclared upload is already under way and could
+        not be stopped by a mismatch any more. A mismatch aborts the upload.
+
+        Args:
+            upload_id: Upload ID from init
+            sha256: Optional hex SHA-256 of the whole file (must equal the declared one)
+
+        Returns:
+            The completed upload
+        """
+        upload = self.get(upload_id)
+        with upload.condition:
+            if upload.state != RECEIVING:
+                raise UploadError(upload.error or f'Upload is {upload.state}')
+            missing = upload.missing_ranges()
+        if missing:
+            raise UploadError(f'Upload is incomplete: {len(missing)} missing ranges, first {missing[0]}')
+
+        if sha256 and upload.sha256 is None:
+            raise UploadError('A whole-file sha256 must be declared when the upload is started '
+                              '(POST /uploads); ingestion of this upload is already in progress')
+        if sha256 and sha256.lower() != upload.sha256:
+            raise UploadError('sha256 differs from the one declared when the upload was started')
+
+        if upload.sha256 and file_sha256(upload.path) != upload.sha256:
+            self.abort(upload_id, 'File checksum mismatch')
+            raise UploadError('File checksum mismatch; the upload was aborted')
+
+        with upload.condition:
+            upload.state = COMPLETE
+            upload.condition.notify_all()
+            finished = upload.job_finished
+        if finished:
+            self.discard(upload_id)
+        return upload
+
+    def abort(self, upload_id: str, reason: str = 'Upload was aborted'):
+        """Abort an upload; a reader waiting on it raises UploadAbortedError"""
+        upload = self.get(upload_id)
+        with upload.condition:
+            if upload.state != ABORTED:
+                upload.state = ABORTED
+                upload.error = reason
+            upload.condition.notify_all()
+            idle = upload.job_id is None or upload.job_finished
+        if idle:
+            self.discard(upload_id)
+
+    def job_finished(self, upload_id: str):
+        """
+        Record that the upload's ingestion job has ended
+
+        The upload is forgotten once it is also completed or aborted;
+        until then it stays available to complete() and abort().
+        """
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+        if upload is None:
+            return
+        with upload.condition:
+            upload.job_finished = True
+            done = upload.state != RECEIVING
+        if done:
+            self.discard(upload_id)
+
+    def discard(self, upload_id: str):
+        """Forget an upload and delete its staging file"""
+        with self._lock:
+            upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            return
+        try:
+            os.remove(upload.path)
+        except OSError:
+            pass
+
+    def open_reader(self, upload_id: str) -> UploadReader:
+        """Reader that streams the upload as its contiguous prefix grows"""
+        return UploadReader(self.get(upload_id), self.stall_timeout)
+
+    def expire_idle(self):
+        """Abort incomplete uploads that have received nothing for idle_timeout"""
+        now = time.monotonic()
+        with self._lock:
+            uploads = list(self._uploads.values())
+        for upload in uploads:
+            if upload.state == RECEIVING and now - upload.last_activity > self.idle_timeout:
+                print(f"⚠️  Aborting idle upload {upload.upload_id}")
+                self.abort(upload.upload_id, 'Upload expired: no parts received')
+
+
+def _staging_dir() -> str:
+    """Staging directory from UPLOAD_STAGING_DIR, created if missing"""
+    path = os.getenv('UPLOAD_STAGING_DIR') or os.path.join(tempfile.gettempdir(), 'ingest-uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+# Singleton instance
+chunked_uploads = ChunkedUploadManager(
+    staging_dir=_staging_dir(),
+    max_part_size=int(os.getenv('UPLOAD_MAX_PART_MB', 64)) * 1024 * 1024,
+    idle_timeout=int(os.getenv('UPLOAD_IDLE_TIMEOUT_SECONDS', 3600)),
+    stall_timeout=int(os.getenv('UPLOAD_STALL_TIMEOUT_SECONDS', 300))
+)
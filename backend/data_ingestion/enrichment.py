@@ -0,0 +1,296 @@
+"""
+Record Enrichment
+Shared field rules plus a columnar batch enricher that parses dates,
+derives temporal features and coerces numerics with pandas/NumPy
+"""
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Fields parsed as dates, in priority order for temporal features
+DATE_FIELDS = [
+    'date', 'transaction_date', 'reconciliation_date',
+    'created_at', 'updated_at', 'timestamp'
+]
+
+# Fields coerced to float
+NUMERIC_FIELDS = [
+    'amount', 'value', 'total', 'balance', 'difference',
+    'debit', 'credit', 'net_amount', 'quantity', 'price'
+]
+
+# English names, matching strftime('%A') / strftime('%B') in the C locale
+DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                      'Friday', 'Saturday', 'Sunday'], dtype=object)
+MONTH_NAMES = np.array(['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                        'August', 'September', 'October', 'November', 'December'], dtype=object)
+
+# Character codes used by the vectorized date-shape classifier
+_DIGIT_0, _DIGIT_9 = ord('0'), ord('9')
+_DASH, _COLON, _DOT, _T, _SPACE, _Z = (ord(c) for c in '-:.T Z')
+
+
+def parse_date_value(value: str) -> Any:
+    """
+    Parse a date string the way the per-record enrichment always has
+
+    Tries ISO format (with 'Z' as UTC) first, then '%Y-%m-%d'.
+
+    Args:
+        value: Raw string
+
+    Returns:
+        datetime on success, otherwise the original string
+    """
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            return datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return value
+
+
+def coerce_numeric_value(value: Any) -> Any:
+    """Convert a value to float, leaving it unchanged if that is not possible"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _wall_time(value: datetime) -> np.datetime64:
+    """Wall-clock time of a datetime as datetime64 (timezone dropped, not converted)"""
+    return np.datetime64(value.replace(tzinfo=None), 'us')
+
+
+class BatchEnricher:
+    """
+    Columnar enrichment of record batches
+
+    Produces the same documents as ReconciliationDataIngester.enrich_record
+    (except for a shared _ingested_at per batch), but parses dates, derives
+    _year/_month/_quarter/_day_of_week/_month_name and coerces numerics one
+    column at a time with pandas/NumPy. Values the vectorized parsers cannot
+    handle fall back to the scalar rules above.
+    """
+
+    def __init__(self, source: str = 'json_upload'):
+        """
+        Initialize the enricher
+
+        Args:
+            source: Value written to _ingestion_source
+        """
+        self.source = source
+
+    @staticmethod
+    def _column(records: List[Dict], field: str) -> Tuple[np.ndarray, List[Any]]:
+        """Row positions and values of a field, for the records that have it"""
+        try:
+            # Common case: every record has the field
+            return np.arange(len(records)), list(map(itemgetter(field), records))
+        except KeyError:
+            pairs = [(i, record[field]) for i, record in enumerate(records) if field in record]
+            positions = np.fromiter((i for i, _ in pairs), dtype=np.int64, count=len(pairs))
+            return positions, [value for _, value in pairs]
+
+    @staticmethod
+    def _string_mask(values: List[Any]) -> np.ndarray:
+        """Boolean mask of the values that are str"""
+        if pd.api.types.infer_dtype(values, skipna=False) == 'string':
+            return np.ones(len(values), dtype=bool)
+        return np.fromiter((type(v) is str for v in values), dtype=bool, count=len(values))
+
+    @staticmethod
+    def _classify_date_strings(strings: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Classify strings by shape using a character-code matrix
+
+        Returns:
+            Masks for 'YYYY-MM-DD', naive 'YYYY-MM-DD[T ]HH:MM:SS[.fff|.ffffff]'
+            and the same with a trailing 'Z'
+        """
+        count = len(strings)
+        width = max(strings.dtype.itemsize // 4, 1)
+        chars = np.zeros((count, max(width, 28)), dtype=np.uint32)
+        chars[:, :width] = strings.view(np.uint32).reshape(count, width)
+        lengths = np.char.str_len(strings)
+        digit = (chars >= _DIGIT_0) & (chars <= _DIGIT_9)
+
+        def digits(*positions):
+            return digit[:, list(positions)].all(axis=1)
+
+        date_part = digits(0, 1, 2, 3, 5, 6, 8, 9) & (chars[:, 4] == _DASH) & (chars[:, 7] == _DASH)
+        time_part = (
+            date_part
+            & ((chars[:, 10] == _T) | (chars[:, 10] == _SPACE))
+            & digits(11, 12, 14, 15, 17, 18)
+            & (chars[:, 13] == _COLON) & (chars[:, 16] == _COLON)
+        )
+        frac3 = time_part & (chars[:, 19] == _DOT) & digits(20, 21, 22)
+        frac6 = frac3 & digits(23, 24, 25)
+
+        date_only = date_part & (lengths == 10)
+        naive = time_part & ((lengths == 19) | (frac3 & (lengths == 23)) | (frac6 & (lengths == 26)))
+        last = chars[np.arange(count), np.clip(lengths - 1, 0, None)]
+        utc = time_part & (last == _Z) & (
+            (lengths == 20) | (frac3 & (lengths == 24)) | (frac6 & (lengths == 27))
+        )
+        return date_only, naive, utc
+
+    def _parse_dates(self, values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Parse a column of date values
+
+        Returns:
+            Tuple of (output values as object array, wall-clock datetime64
+            array with NaT where the value is not a datetime)
+        """
+        output = np.empty(len(values), dtype=object)
+        output[:] = values
+        wall = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[us]')
+
+        is_str = self._string_mask(values)
+        pending = is_str.copy()
+        str_positions = np.flatnonzero(is_str)
+
+        if len(str_positions):
+            strings = np.array([values[i] for i in str_positions] if not is_str.all() else values,
+                               dtype=str)
+            for mask, options in zip(
+                self._classify_date_strings(strings),
+                ({'format': '%Y-%m-%d'}, {'format': 'ISO8601'}, {'format': 'ISO8601', 'utc': True})
+            ):
+                if not mask.any():
+                    continue
+                parsed = pd.DatetimeIndex(pd.to_datetime(strings[mask], errors='coerce', **options))
+                ok = ~parsed.isna()
+                positions = str_positions[mask][ok]
+                parsed = parsed[ok]
+                output[positions] = parsed.to_pydatetime()
+                wall[positions] = (parsed.tz_localize(None) if parsed.tz is not None else parsed).to_numpy()
+                pending[positions] = False
+
+        # Scalar fallback for unusual formats and values the vectorized parse rejected
+        for i in np.flatnonzero(pending):
+            parsed_value = parse_date_value(values[i])
+            output[i] = parsed_value
+            if isinstance(parsed_value, datetime):
+                wall[i] = _wall_time(parsed_value)
+
+        # Values that were already datetimes still drive temporal features
+        for i in np.flatnonzero(~is_str):
+            if isinstance(values[i], datetime):
+                wall[i] = _wall_time(values[i])
+
+        return output, wall
+
+    @staticmethod
+    def _coerce_numeric(values: List[Any]) -> np.ndarray:
+        """Coerce a column to float; unconvertible values are left unchanged"""
+        if pd.api.types.infer_dtype(values, skipna=False) in ('floating', 'integer', 'mixed-integer-float'):
+            return np.asarray(values, dtype=float).astype(object)
+
+        output = np.empty(len(values), dtype=object)
+        output[:] = values
+
+        converted = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+        ok = converted.notna().to_numpy()
+        output[ok] = converted.to_numpy(dtype=float)[ok].tolist()
+
+        # NaN covers both failures and genuine NaN/'nan'/'1_000' inputs: defer to float()
+        for i in np.flatnonzero(~ok):
+            output[i] = coerce_numeric_value(values[i])
+        return output
+
+    def enrich(self, records: List[Dict], start_index: int = 0,
+               ingested_at: Optional[datetime] = None) -> List[Dict]:
+        """
+        Enrich a batch of records
+
+        Args:
+            records: Raw records
+            start_index: Index of the first record in the whole upload (for record_id)
+            ingested_at: Ingestion timestamp (defaults to now, UTC)
+
+        Returns:
+            New list of enriched record dictionaries
+        """
+        enriched = [record.copy() for record in records]
+        count = len(enriched)
+        if count == 0:
+            return enriched
+
+        for offset, record in enumerate(enriched):
+            if 'id' not in record and '_id' not in record:
+                record['record_id'] = f'REC-{start_index + offset + 1:06d}'
+
+        # Only fields that occur in this batch need a column pass
+        present = set().union(*enriched)
+
+        # Dates: the first field holding a datetime drives temporal features
+        temporal = np.full(count, np.datetime64('NaT'), dtype='datetime64[us]')
+        for field in DATE_FIELDS:
+            if field not in present:
+                continue
+            positions, values = self._column(enriched, field)
+            if not len(positions):
+                continue
+            output, wall = self._parse_dates(values)
+            for position, value in zip(positions.tolist(), output.tolist()):
+                enriched[position][field] = value
+            unset = np.isnat(temporal[positions]) & ~np.isnat(wall)
+            temporal[positions[unset]] = wall[unset]
+
+        ingested_at = ingested_at or datetime.utcnow()
+        for record in enriched:
+            record['_ingested_at'] = ingested_at
+            record['_ingestion_source'] = self.source
+
+        has_date = np.flatnonzero(~np.isnat(temporal))
+        if len(has_date):
+            index = pd.DatetimeIndex(temporal[has_date])
+            years = index.year.to_numpy()
+            months = index.month.to_numpy()
+            quarters = (
+                'Q' + ((months - 1) // 3 + 1).astype(str).astype(object)
+                + ' ' + years.astype(str).astype(object)
+            )
+            day_names = DAY_NAMES[index.dayofweek.to_numpy()]
+            month_names = MONTH_NAMES[months - 1]
+            for position, year, month, quarter, day_name, month_name in zip(
+                has_date.tolist(), years.tolist(), months.tolist(),
+                quarters.tolist(), day_names.tolist(), month_names.tolist()
+            ):
+                record = enriched[position]
+                record['_year'] = year
+                record['_month'] = month
+                record['_quarter'] = quarter
+                record['_day_of_week'] = day_name
+                record['_month_name'] = month_name
+
+        for field in NUMERIC_FIELDS:
+            if field not in present:
+                continue
+            positions, values = self._column(enriched, field)
+            if not len(positions):
+                continue
+            output = self._coerce_numeric(values)
+            for position, value in zip(positions.tolist(), output.tolist()):
+                enriched[position][field] = value
+
+        if 'status' in present:
+            positions, values = self._column(enriched, 'status')
+            is_str = self._string_mask(values)
+            if is_str.any():
+                statuses = np.array([v for v, s in zip(values, is_str) if s], dtype=str)
+                normalized = np.char.strip(np.char.lower(statuses))
+                for position, value in zip(positions[is_str].tolist(), normalized.tolist()):
+                    enriched[position]['status'] = value
+
+        return enriched
@@ -0,0 +1,67 @@
+"""
+MongoDB Extended JSON Decoding
+Builds ObjectId and datetime values while JSON is being parsed, so
+documents never need a second conversion pass
+"""
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def _decode_date(value: Any) -> Any:
+    """Decode the payload of a {"$date": ...} wrapper"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if isinstance(value, dict) and '$numberLong' in value:
+        value = int(value['$numberLong'])
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    raise ValueError(f"Unsupported $date value: {value!r}")
+
+
+def object_hook(obj: Dict[str, Any]) -> Any:
+    """
+    json/ijson object hook decoding Extended JSON wrappers
+
+    Converts {"$oid": "..."} to ObjectId and {"$date": ...} to datetime
+    (ISO strings and epoch milliseconds). Anything that does not decode
+    cleanly is returned unchanged.
+
+    Args:
+        obj: Freshly parsed JSON object
+
+    Returns:
+        Decoded value or the original dict
+    """
+    if len(obj) != 1:
+        return obj
+    if '$oid' in obj:
+        try:
+            return ObjectId(obj['$oid'])
+        except (InvalidId, TypeError):
+            return obj
+    if '$date' in obj:
+        try:
+            return _decode_date(obj['$date'])
+        except (ValueError, TypeError):
+            return obj
+    return obj
+
+
+def loads(json_data: Union[str, bytes]) -> Any:
+    """
+    Parse a JSON document, decoding Extended JSON values in the same pass
+
+    Args:
+        json_data: JSON text
+
+    Returns:
+        Parsed document with ObjectId and datetime values
+
+    Raises:
+        json.JSONDecodeError: If the document is malformed
+    """
+    return json.loads(json_data, object_hook=object_hook)
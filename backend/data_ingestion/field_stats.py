@@ -0,0 +1,525 @@
+"""
+Field Statistics Profiles
+Streaming per-field statistics (count, null rate, min/max, HyperLogLog
+distinct count, top-k values, equi-depth histogram) updated batch by batch
+during ingestion and stored per collection, so the agents and the /stats
+endpoint can read them without scanning the data
+"""
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from bson import Binary
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from collection_names import FIELD_STATS_COLLECTION
+from .bulk_writer import CONTENT_HASH_FIELD
+
+
+FIELD_STATS_ENABLED = os.getenv('INGEST_FIELD_STATS', 'true').lower() not in ('0', 'false', 'no')
+
+HLL_PRECISION = 12          # 4096 registers, ~1.6% standard error
+TOP_K = 10                  # Values reported per field
+TOP_K_CAPACITY = 200        # Candidate values kept per field between batches
+RESERVOIR_SIZE = 1024       # Sampled values behind each histogram
+HISTOGRAM_BUCKETS = 10
+MAX_PROFILED_FIELDS = 200   # Guards against documents with unbounded key sets
+MERGE_ATTEMPTS = 20         # Compare-and-swap retries when concurrent runs merge into one profile
+
+# Internal fields that say nothing about the data
+SKIPPED_FIELDS = ('_id', CONTENT_HASH_FIELD)
+
+_NUMERIC_TYPES = (int, float)
+
+
+def _from_epoch_ns(value: float) -> datetime:
+    """Naive UTC datetime from nanoseconds since the epoch"""
+    return datetime.fromtimestamp(value / 1e9, tz=timezone.utc).replace(tzinfo=None)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit value hashes
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION, registers: Optional[np.ndarray] = None):
+        """
+        Initialize the counter
+
+        Args:
+            precision: log2 of the register count
+            registers: Existing registers to continue from
+        """
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = registers if registers is not None else np.zeros(self.size, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Add a batch of uint64 hashes"""
+        if not len(hashes):
+            return
+        hashes = hashes.astype(np.uint64, copy=False)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining bits (exact in float64 for bits <= 53)
+        with np.errstate(divide='ignore'):
+            top_bit = np.floor(np.log2(rest.astype(np.float64)))
+        rank = np.where(rest == 0, bits + 1, bits - top_bit).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> int:
+        """Estimated number of distinct values"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+
+class OrderedSketch:
+    """
+    Min/max plus a uniform reservoir sample of an ordered value stream
+
+    Datetimes are fed as nanoseconds since the epoch.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE, seen: int = 0,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 sample: Optional[np.ndarray] = None):
+        self.size = size
+        self.seen = seen
+        self.min = minimum
+        self.max = maximum
+        self.sample = sample if sample is not None else np.empty(0, dtype=np.float64)
+
+    def update(self, values: np.ndarray, rng: np.random.Generator):
+        """Add a batch of values (reservoir sampling, vectorized per batch)"""
+        if not len(values):
+            return
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+        free = self.size - len(self.sample)
+        if free > 0:
+            self.sample = np.concatenate([self.sample, values[:free]])
+            self.seen += min(free, len(values))
+            values = values[free:]
+        if len(values):
+            # Value i of the batch replaces a random slot with probability size / (seen + i + 1)
+            positions = self.seen + np.arange(1, len(values) + 1)
+            slots = (rng.random(len(values)) * positions).astype(np.int64)
+            keep = slots < self.size
+            self.sample[slots[keep]] = values[keep]
+            self.seen += len(values)
+
+    def merge(self, other: 'OrderedSketch', rng: np.random.Generator):
+        """Add another sketch; each reservoir contributes in proportion to the values it has seen"""
+        if not other.seen:
+            return
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+        seen = self.seen + other.seen
+        if len(self.sample) + len(other.sample) <= self.size:
+            self.sample = np.concatenate([self.sample, other.sample])
+        else:
+            take = min(int(round(self.size * self.seen / seen)), len(self.sample))
+            rest = min(self.size - take, len(other.sample))
+            self.sample = np.concatenate([rng.choice(self.sample, take, replace=False),
+                                          rng.choice(other.sample, rest, replace=False)])
+        self.seen = seen
+
+    def histogram(self, buckets: int = HISTOGRAM_BUCKETS) -> List[Tuple[float, float, int]]:
+        """
+        Equi-depth histogram estimated from the reservoir
+
+        Returns:
+            List of (lower, upper, estimated count) with roughly equal counts
+        """
+        if not len(self.sample):
+            return []
+        edges = np.unique(np.quantile(self.sample, np.linspace(0, 1, buckets + 1)))
+        if len(edges) == 1:
+            return [(self.min, self.max, self.seen)]
+        edges[0], edges[-1] = self.min, self.max
+        counts, _ = np.histogram(self.sample, bins=edges)
+        scale = self.seen / len(self.sample)
+        return [(float(edges[i]), float(edges[i + 1]), int(round(counts[i] * scale)))
+                for i in range(len(counts))]
+
+    def to_document(self) -> Dict[str, Any]:
+        return {'seen': self.seen, 'min': self.min, 'max': self.max,
+                'sample': Binary(self.sample.astype(np.float64).tobytes())}
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> 'OrderedSketch':
+        return cls(seen=doc['seen'], minimum=doc['min'], maximum=doc['max'],
+                   sample=np.frombuffer(doc['sample'], dtype=np.float64).copy())
+
+
+class FieldStats:
+    """
+    Streaming statistics of one field
+    """
+
+    def __init__(self, name: str):
+        """
+        Initialize the statistics
+
+        Args:
+            name: Field name
+        """
+        self.name = name
+        self.present = 0
+        self.nulls = 0
+        self.types = Counter()
+        self.hll = HyperLogLog()
+        self.top: Dict[Tuple[str, Any], int] = {}
+        self.numeric = OrderedSketch()
+        self.dates = OrderedSketch()
+
+    def _merge_top(self, tag: str, counts: pd.Series):
+        """Add a batch's value counts to the top-k candidates"""
+        for value, count in counts.head(TOP_K_CAPACITY).items():
+            key = (tag, value)
+            self.top[key] = self.top.get(key, 0) + int(count)
+        if len(self.top) > 2 * TOP_K_CAPACITY:
+            self.top = dict(Counter(self.top).most_common(TOP_K_CAPACITY))
+
+    def update(self, values: List[Any], rng: np.random.Generator):
+        """
+        Add one batch of values of this field
+
+        Args:
+            values: Values of the documents in the batch that have the field
+            rng: Random generator for reservoir sampling
+        """
+        self.present += len(values)
+        kinds = Counter(map(type, values))
+        for kind, count in kinds.items():
+            self.types[kind.__name__] += count
+        self.nulls += kinds.get(type(None), 0)
+
+        hashes = []
+        if kinds.get(int) or kinds.get(float):
+            numbers = np.fromiter((v for v in values if type(v) in _NUMERIC_TYPES),
+                                  dtype=np.float64)
+            numbers = numbers[np.isfinite(numbers)]
+            self.numeric.update(numbers, rng)
+            hashes.append(pd.util.hash_array(numbers))
+            counts = pd.Series(numbers).value_counts()
+            if not kinds.get(float):
+                counts.index = counts.index.astype(np.int64)
+            self._merge_top('n', counts)
+
+        if kinds.get(datetime):
+            stamps = pd.to_datetime([v for v in values if type(v) is datetime], utc=True).asi8
+            self.dates.update(stamps.astype(np.float64), rng)
+            hashes.append(pd.util.hash_array(stamps))
+
+        if kinds.get(str):
+            strings = np.array([v for v in values if type(v) is str], dtype=object)
+            hashes.append(pd.util.hash_array(strings))
+            self._merge_top('s', pd.Series(strings).value_counts())
+
+        if kinds.get(bool):
+            flags = np.fromiter((v for v in values if type(v) is bool), dtype=bool)
+            hashes.append(pd.util.hash_array(flags))
+            self._merge_top('b', pd.Series(flags).value_counts())
+
+        if hashes:
+            self.hll.add_hashes(np.concatenate(hashes))
+
+    def merge(self, other: 'FieldStats', rng: np.random.Generator):
+        """Add the statistics of the same field gathered elsewhere (e.g. by another ingestion run)"""
+        self.present += other.present
+        self.nulls += other.nulls
+        self.types.update(other.types)
+        np.maximum(self.hll.registers, other.hll.registers, out=self.hll.registers)
+        for key, count in other.top.items():
+            self.top[key] = self.top.get(key, 0) + count
+        if len(self.top) > 2 * TOP_K_CAPACITY:
+            self.top = dict(Counter(self.top).most_common(TOP_K_CAPACITY))
+        self.numeric.merge(other.numeric, rng)
+        self.dates.merge(other.dates, rng)
+
+    def summary(self, documents: int) -> Dict[str, Any]:
+        """
+        Public statistics of the field
+
+        Args:
+            documents: Documents profiled in the collection
+
+        Returns:
+            Dictionary with counts, null rate, types, distinct estimate,
+            top values and (for numeric or date fields) min, max and histogram
+        """
+        values = self.present - self.nulls
+        missing = max(documents - self.present, 0)
+        summary = {
+            'field': self.name,
+            'count': values,
+            'nulls': self.nulls,
+            'missing': missing,
+            'null_rate': round((self.nulls + missing) / documents, 4) if documents else 0.0,
+            'types': dict(self.types),
+            'distinct_estimate': min(self.hll.estimate(), values),
+            'top_values': [
+                {'value': bool(value) if tag == 'b' else value, 'count': count}
+                for (tag, value), count in Counter(self.top).most_common(TOP_K) if count > 1
+            ]
+        }
+
+        if self.numeric.seen and self.numeric.seen >= self.dates.seen:
+            summary['min'], summary['max'] = self.numeric.min, self.numeric.max
+            if 'float' not in self.types:
+                summary['min'], summary['max'] = int(self.numeric.min), int(self.numeric.max)
+            summary['histogram'] = [{'lower': low, 'upper': high, 'count': count}
+                                    for low, high, count in self.numeric.histogram()]
+        elif self.dates.seen:
+            summary['min'] = _from_epoch_ns(self.dates.min)
+            summary['max'] = _from_epoch_ns(self.dates.max)
+            summary['histogram'] = [
+                {'lower': _from_epoch_ns(low), 'upper': _from_epoch_ns(high), 'count': count}
+                for low, high, count in self.dates.histogram()
+            ]
+        return summary
+
+    def to_document(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'present': self.present,
+            'nulls': self.nulls,
+            'types': dict(self.types),
+            'hll': Binary(self.hll.registers.tobytes()),
+            'top': [[tag, value, count] for (tag, value), count in self.top.items()],
+            'numeric': self.numeric.to_document(),
+            'dates': self.dates.to_document()
+        }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> 'FieldStats':
+        stats = cls(doc['name'])
+        stats.present = doc['present']
+        stats.nulls = doc['nulls']
+        stats.types = Counter(doc['types'])
+        stats.hll = HyperLogLog(registers=np.frombuffer(doc['hll'], dtype=np.uint8).copy())
+        stats.top = {(tag, value): count for tag, value, count in doc['top']}
+        stats.numeric = OrderedSketch.from_document(doc['numeric'])
+        stats.dates = OrderedSketch.from_document(doc['dates'])
+        return stats
+
+
+class FieldStatsProfile:
+    """
+    Statistics of every top-level field of one collection
+
+    update() is thread-safe, so bulk writer threads can feed it batches
+    directly. Nested documents and arrays are counted by type only.
+    """
+
+    def __init__(self, collection_name: str, documents: int = 0,
+                 fields: Optional[Dict[str, FieldStats]] = None):
+        """
+        Initialize the profile
+
+        Args:
+            collection_name: Profiled collection
+            documents: Documents already profiled
+            fields: Existing field statistics
+        """
+        self.collection_name = collection_name
+        self.documents = documents
+        self.fields: Dict[str, FieldStats] = fields or {}
+        self._rng = np.random.default_rng(documents)
+        self._lock = threading.Lock()
+
+    def update(self, documents: Iterable[Dict[str, Any]]):
+        """Add a batch of documents"""
+        columns: Dict[str, List[Any]] = {}
+        count = 0
+        for document in documents:
+            count += 1
+            for key, value in document.items():
+                column = columns.get(key)
+                if column is None:
+                    columns[key] = column = []
+                column.append(value)
+
+        with self._lock:
+            self.documents += count
+            for name, values in columns.items():
+                if name in SKIPPED_FIELDS:
+                    continue
+                stats = self.fields.get(name)
+                if stats is None:
+                    if len(self.fields) >= MAX_PROFILED_FIELDS:
+                        continue
+                    stats = self.fields[name] = FieldStats(name)
+                stats.update(values, self._rng)
+
+    def merge(self, other: 'FieldStatsProfile'):
+        """Add another profile of the same collection (e.g. one run's delta)"""
+        with self._lock:
+            self.documents += other.documents
+            for name, stats in other.fields.items():
+                mine = self.fields.get(name)
+                if mine is not None:
+                    mine.merge(stats, self._rng)
+                elif len(self.fields) < MAX_PROFILED_FIELDS:
+                    self.fields[name] = stats
+
+    def summary(self, include_fields: bool = True) -> Dict[str, Any]:
+        """Public statistics of the collection and (optionally) each field"""
+        with self._lock:
+            summary = {
+                'collection': self.collection_name,
+                'documents': self.documents,
+                'field_count': len(self.fields)
+            }
+            if include_fields:
+                summary['fields'] = [stats.summary(self.documents) for stats in self.fields.values()]
+        return summary
+
+    def to_document(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                '_id': self.collection_name,
+                'collection': self.collection_name,
+                'documents': self.documents,
+                'field_count': len(self.fields),
+                'updated_at': datetime.utcnow(),
+                'fields': [stats.to_document() for stats in self.fields.values()]
+            }
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> 'FieldStatsProfile':
+        fields = {field['name']: FieldStats.from_document(field) for field in doc.get('fields', [])}
+        return cls(doc['collection'], doc.get('documents', 0), fields)
+
+
+class FieldStatsStore:
+    """
+    Persists one statistics profile per collection in FIELD_STATS_COLLECTION
+
+    Ingestion runs profile only what they wrote, starting from an empty
+    profile, and merge it into the stored one with a versioned
+    compare-and-swap, so concurrent runs into the same collection (in this
+    or other processes) do not overwrite each other's counts.
+    """
+
+    def __init__(self, collection):
+        """
+        Initialize the store
+
+        Args:
+            collection: pymongo collection holding the profiles
+        """
+        self.collection = collection
+
+    def merge(self, delta: FieldStatsProfile) -> bool:
+        """
+        Add a run's profile to the stored one
+
+        The stored document carries a version; the merged profile only
+        replaces the version it was computed from, and the merge is retried
+        when another run got there first.
+
+        Args:
+            delta: Profile of the documents written by one run
+
+        Returns:
+            Whether the profile was stored
+        """
+        if not delta.documents:
+            return True
+        name = delta.collection_name
+        try:
+            for attempt in range(MERGE_ATTEMPTS):
+                doc = self.collection.find_one({'_id': name})
+                profile = FieldStatsProfile.from_document(doc) if doc else FieldStatsProfile(name)
+                profile.merge(delta)
+                merged = profile.to_document()
+                merged['version'] = (doc.get('version') or 0) + 1 if doc else 1
+                try:
+                    if doc is None:
+                        self.collection.insert_one(merged)
+                        return True
+                    if self.collection.replace_one({'_id': name, 'version': doc.get('version')},
+                                                   merged).matched_count:
+                        return True
+                except DuplicateKeyError:
+                    pass
+                time.sleep(0.01 * (attempt + 1))
+            print(f"⚠️  Could not save field statistics for {name}: too many concurrent updates")
+        except Exception as e:
+            print(f"⚠️  Could not save field statistics for {name}: {e}")
+        return False
+
+    def reset(self, *collection_names: str):
+        """Forget the profiles of collections whose data was dropped"""
+        self.collection.delete_many({'_id': {'$in': list(collection_names)}})
+
+    def get(self, collection_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Statistics of a collection
+
+        Args:
+            collection_name: Profiled collection
+
+        Returns:
+            Profile summary with per-field statistics, or None if the
+            collection has not been profiled
+        """
+        doc = self.collection.find_one({'_id': collection_name})
+        if not doc:
+            return None
+        summary = FieldStatsProfile.from_document(doc).summary()
+        summary['updated_at'] = doc.get('updated_at')
+        return summary
+
+    def annotate_schema(self, schema: Dict[str, Any], collection_name: str) -> Dict[str, Any]:
+        """
+        Attach a collection's statistics to the fields of its sampled schema
+
+        Profiled fields gain a stats entry (null rate, distinct estimate,
+        top values, min/max) and the schema the profiled document count,
+        so the agents get them without an extra scan.
+
+        Args:
+            schema: Schema from MongoDBConnector.get_collection_schema (updated in place)
+            collection_name: Collection the schema was sampled from
+
+        Returns:
+            The schema
+        """
+        try:
+            profile = self.get(collection_name)
+        except PyMongoError as e:
+            print(f"⚠️  Field statistics unavailable for {collection_name}: {e}")
+            return schema
+        if profile:
+            stats = {field['field']: field for field in profile['fields']}
+            schema['document_count'] = profile['documents']
+            for field in schema.get('fields', []):
+                if field['name'] in stats:
+                    field['stats'] = {key: value for key, value in stats[field['name']].items()
+                                      if key not in ('field', 'histogram')}
+        return schema
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Collections with a profile, without per-field statistics"""
+        return [
+            {key: doc.get(key) for key in ('collection', 'documents', 'field_count', 'updated_at')}
+            for doc in self.collection.find({}, {'fields': 0}).sort('_id', 1)
+        ]
@@ -0,0 +1,228 @@
+"""
+Record Format Readers
+Streaming readers for NDJSON, CSV and Parquet uploads that yield plain
+record dictionaries for the same batched enrichment and insert pipeline
+as JSON
+"""
+import math
+import os
+import shutil
+import tempfile
+from typing import Any, BinaryIO, Dict, Iterator
+
+import orjson
+import pandas as pd
+
+from .stream_reader import iter_json_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet support is optional
+    pa = None
+    pq = None
+
+
+# File extension -> format name
+FORMAT_EXTENSIONS = {
+    '.json': 'json',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet'
+}
+
+# Rows per pandas CSV chunk / Arrow record batch
+READER_CHUNK_ROWS = int(os.getenv('INGEST_READER_CHUNK_ROWS', 50000))
+
+
+def detect_format(filename: str) -> str:
+    """
+    Record format of an upload from its file name
+
+    Args:
+        filename: Uploaded file name
+
+    Returns:
+        One of 'json', 'ndjson', 'csv', 'parquet'
+
+    Raises:
+        ValueError: If the extension is not supported
+    """
+    extension = os.path.splitext(filename.lower())[1]
+    if extension not in FORMAT_EXTENSIONS:
+        supported = ', '.join(sorted(FORMAT_EXTENSIONS))
+        raise ValueError(f"Unsupported file type '{extension or filename}'. Supported: {supported}")
+    return FORMAT_EXTENSIONS[extension]
+
+
+def iter_ndjson_records(stream: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one record per line of newline-delimited JSON
+
+    Args:
+        stream: Binary file-like object
+
+    Yields:
+        Record dictionaries (blank lines are skipped)
+
+    Raises:
+        ValueError: On a malformed line or a line that is not an object
+    """
+    buffer = b''
+    line_number = 0
+    while True:
+        block = stream.read(1024 * 1024)
+        lines = (buffer + block).split(b'\n')
+        # Keep the trailing partial line until the next block (or EOF)
+        buffer = lines.pop() if block else b''
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise ValueError(f'line {line_number}: {e}') from None
+            if not isinstance(record, dict):
+                raise ValueError(f'line {line_number}: expected a JSON object')
+            yield record
+        if not block:
+            return
+
+
+def _infer_csv_column(values: pd.Series) -> pd.Series:
+    """
+    Convert a column of CSV strings to bool, int or float when every value fits
+
+    Columns with leading-zero numbers (account numbers, zip codes) or
+    integers too large for int64 stay strings.
+
+    Args:
+        values: Column read with dtype=str (NaN for empty cells)
+
+    Returns:
+        Object column of Python values
+    """
+    present = values.dropna()
+    if present.empty:
+        return values
+
+    lowered = present.str.lower()
+    if lowered.isin(('true', 'false')).all():
+        converted = lowered.eq('true')
+    else:
+        numbers = pd.to_numeric(present, errors='coerce')
+        if numbers.isna().any() or present.str.match(r'[+-]?0\d').any():
+            return values
+        if numbers.dtype.kind in 'iu':
+            converted = numbers
+        elif present.str.fullmatch(r'[+-]?\d+').all():
+            return values
+        else:
+            converted = numbers.astype(float)
+
+    result = values.astype(object)
+    result[converted.index] = converted.astype(object)
+    return result
+
+
+def iter_csv_records(stream: BinaryIO, chunk_rows: int = READER_CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from a CSV file, parsed in chunks with pandas
+
+    Each column of a chunk is converted to bool, int or float when all of
+    its values parse; empty cells are omitted from the record. Dates stay
+    strings and are parsed by enrichment.
+
+    Args:
+        stream: Binary file-like object
+        chunk_rows: Rows parsed per pandas chunk
+
+    Yields:
+        Record dictionaries
+    """
+    for frame in pd.read_csv(stream, chunksize=chunk_rows, dtype=str, skipinitialspace=True):
+        columns = list(frame.columns)
+        frame = pd.DataFrame({column: _infer_csv_column(frame[column]) for column in columns})
+        for row in frame.itertuples(index=False, name=None):
+            yield {
+                column: value for column, value in zip(columns, row)
+                if not (value is None or (isinstance(value, float) and math.isnan(value)))
+            }
+
+
+def _bson_safe_batch(batch):
+    """Cast Arrow columns MongoDB cannot store as-is (decimal, date, time)"""
+    arrays, fields = [], []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_decimal(field.type):
+            column = column.cast(pa.float64())
+        elif pa.types.is_date(field.type):
+            column = column.cast(pa.timestamp('ms'))
+        elif pa.types.is_time(field.type):
+            column = column.cast(pa.string())
+        arrays.append(column)
+        fields.append(pa.field(field.name, column.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def iter_parquet_records(stream: BinaryIO, chunk_rows: int = READER_CHUNK_ROWS) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from a Parquet file, row group by row group via Arrow
+
+    Parquet keeps its metadata at the end of the file, so a non-seekable
+    stream is first copied to a temporary file.
+
+    Args:
+        stream: Binary file-like object
+        chunk_rows: Maximum rows per Arrow record batch
+
+    Yields:
+        Record dictionaries (nulls omitted)
+    """
+    if pq is None:
+        raise ValueError('Parquet support requires pyarrow (pip install pyarrow)')
+
+    seekable = getattr(stream, 'seekable', None)
+    if seekable is not None and seekable():
+        yield from _iter_parquet_file(stream, chunk_rows)
+        return
+
+    with tempfile.TemporaryFile(prefix='ingest-', suffix='.parquet') as spool:
+        shutil.copyfileobj(stream, spool, 1024 * 1024)
+        spool.seek(0)
+        yield from _iter_parquet_file(spool, chunk_rows)
+
+
+def _iter_parquet_file(source: BinaryIO, chunk_rows: int) -> Iterator[Dict[str, Any]]:
+    """Iterate a seekable Parquet file one record batch at a time"""
+    parquet_file = pq.ParquetFile(source)
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows):
+        for row in _bson_safe_batch(batch).to_pylist():
+            yield {key: value for key, value in row.items() if value is not None}
+
+
+def iter_records(stream: BinaryIO, file_format: str = 'json',
+                 object_hook=None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield records from a stream in any supported format
+
+    Args:
+        stream: Binary file-like object
+        file_format: 'json', 'ndjson', 'csv' or 'parquet'
+        object_hook: Optional hook for JSON objects (JSON format only)
+
+    Returns:
+        Iterator of record dictionaries
+    """
+    if file_format == 'json':
+        return iter_json_records(stream, object_hook)
+    if file_format == 'ndjson':
+        return iter_ndjson_records(stream)
+    if file_format == 'csv':
+        return iter_csv_records(stream)
+    if file_format == 'parquet':
+        return iter_parquet_records(stream)
+    raise ValueError(f'Unsupported format: {file_format}')
@@ -0,0 +1,293 @@
+"""
+Background Ingestion Jobs
+Runs uploaded files through the stream ingesters on a bounded worker pool
+and tracks per-job progress, throughput and ETA
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class ProgressReader:
+    """
+    Binary file wrapper that counts the bytes handed to the parser
+    """
+
+    def __init__(self, raw: BinaryIO):
+        """
+        Initialize the reader
+
+        Args:
+            raw: Underlying binary file object
+        """
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    # Seek support lets Parquet read the footer in place instead of spooling a copy
+    def seekable(self) -> bool:
+        seekable = getattr(self.raw, 'seekable', None)
+        return bool(seekable and seekable())
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.raw.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.raw.tell()
+
+    @property
+    def closed(self) -> bool:
+        return self.raw.closed
+
+
+class IngestionJob:
+    """
+    State of one background ingestion
+    """
+
+    def __init__(self, kind: str, filename: str, total_bytes: int, params: Dict[str, Any]):
+        """
+        Initialize the job
+
+        Args:
+            kind: 'json' or 'reconciliation_flow'
+            filename: Name of the uploaded file
+            total_bytes: Size of the upload
+            params: Keyword arguments for the ingest function
+        """
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.params = params
+        self.status = QUEUED
+        self.total_bytes = total_bytes
+        self.reader: Optional[ProgressReader] = None
+        self.records_processed = 0
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started = None
+        self._elapsed = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def mark_running(self):
+        """Record the start of processing"""
+        self.status = RUNNING
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+
+    def mark_finished(self, status: str, error: Optional[str] = None):
+        """Record the end of processing"""
+        self._elapsed = time.perf_counter() - self._started
+        self.finished_at = datetime.utcnow()
+        self.error = error
+        self.status = status
+
+    def add_records(self, count: int):
+        """Progress callback handed to the ingesters"""
+        self.records_processed += count
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the job state
+
+        Returns:
+            Dictionary with status, counts, throughput, ETA and result
+        """
+        bytes_read = self.reader.bytes_read if self.reader else 0
+        if self._elapsed is not None:
+            elapsed = self._elapsed
+        elif self._started is not None:
+            elapsed = time.perf_counter() - self._started
+        else:
+            elapsed = 0.0
+
+        fraction = min(bytes_read / self.total_bytes, 1.0) if self.total_bytes else 0.0
+        if self.status == COMPLETED:
+            fraction = 1.0
+
+        eta = None
+        if self.status == RUNNING and 0 < fraction < 1:
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'filename': self.filename,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'bytes_total': self.total_bytes,
+            'bytes_read': bytes_read,
+            'progress': round(fraction, 4),
+            'records_processed': self.records_processed,
+            'elapsed_seconds': round(elapsed, 3),
+            'records_per_sec': round(self.records_processed / elapsed, 1) if elapsed > 0 else 0.0,
+            'eta_seconds': eta,
+            'error': self.error,
+            'result': self.result
+        }
+
+
+class IngestionJobManager:
+    """
+    Bounded worker pool for background ingestion jobs
+
+    Only max_workers jobs run at a time and they run outside the request
+    thread pool, so large uploads cannot starve interactive queries.
+    Finished jobs are kept in memory up to max_retained_jobs.
+    """
+
+    def __init__(self, max_workers: int = 2, max_retained_jobs: int = 200):
+        """
+        Initialize the manager
+
+        Args:
+            max_workers: Jobs allowed to run concurrently
+            max_retained_jobs: Finished jobs kept for status queries
+        """
+        self.max_workers = max_workers
+        self.max_retained_jobs = max_retained_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='ingest-job')
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, filename: str, path: str,
+               ingest: Callable[..., Dict[str, Any]], **params) -> IngestionJob:
+        """
+        Queue an uploaded file for ingestion
+
+        The manager owns the file at `path` and deletes it when the job ends.
+
+        Args:
+            kind: Job type label
+            filename: Name of the uploaded file
+            path: Local copy of the upload
+            ingest: Stream helper called as ingest(stream=..., progress=..., **params)
+            **params: Extra arguments for ingest
+
+        Returns:
+            The queued job
+        """
+        def remove_file():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        return self.submit_stream(kind, filename, os.path.getsize(path),
+                                  lambda: open(path, 'rb'), ingest,
+                                  cleanup=remove_file, **params)
+
+    def submit_stream(self, kind: str, filename: str, total_bytes: int,
+                      open_stream: Callable[[], BinaryIO],
+                      ingest: Callable[..., Dict[str, Any]],
+                      cleanup: Optional[Callable[[], None]] = None, **params) -> IngestionJob:
+        """
+        Queue ingestion from an arbitrary binary stream
+
+        Args:
+            kind: Job type label
+            filename: Name of the uploaded file
+            total_bytes: Expected stream length (for progress and ETA)
+            open_stream: Opens the stream on the worker thread; the stream is closed afterwards
+            ingest: Stream helper called as ingest(stream=..., progress=..., **params)
+            cleanup: Called once the job has finished, successfully or not
+            **params: Extra arguments for ingest
+
+        Returns:
+            The queued job
+        """
+        job = IngestionJob(kind, filename, total_bytes, params)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job, open_stream, ingest, cleanup)
+        print(f"📥 Queued ingestion job {job.job_id} ({kind}, {filename}, {job.total_bytes:,} bytes)")
+        return job
+
+    def _run(self, job: IngestionJob, open_stream: Callable[[], BinaryIO],
+             ingest: Callable[..., Dict[str, Any]], cleanup: Optional[Callable[[], None]]):
+        """Execute a job on a worker thread"""
+        job.mark_running()
+        try:
+            with open_stream() as f:
+                job.reader = ProgressReader(f)
+                job.result = ingest(stream=job.reader, progress=job.add_records, **job.params)
+            if job.result.get('success'):
+                job.mark_finished(COMPLETED)
+            else:
+                job.mark_finished(FAILED, job.result.get('error') or 'Ingestion failed')
+        except Exception as e:
+            job.mark_finished(FAILED, f'Ingestion failed: {str(e)}')
+        finally:
+            if cleanup:
+                cleanup()
+
+        icon = '✅' if job.status == COMPLETED else '❌'
+        print(f"{icon} Ingestion job {job.job_id} {job.status}: "
+              f"{job.records_processed:,} records")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the state of a job
+
+        Args:
+            job_id: ID returned by submit
+
+        Returns:
+            Job snapshot, or None if the job is unknown or was pruned
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Snapshots of all retained jobs, newest first, without full results"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        snapshots = []
+        for job in reversed(jobs):
+            snapshot = job.snapshot()
+            snapshot.pop('result')
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (COMPLETED, FAILED)]
+        for job_id in finished[:max(len(finished) - self.max_retained_jobs, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        """Stop accepting jobs and wait for running ones to finish"""
+        self._executor.shutdown(wait=True)
+
+
+# Singleton instance
+ingestion_jobs = IngestionJobManager(
+    max_workers=int(os.getenv('INGEST_JOB_WORKERS', 2)),
+    max_retained_jobs=int(os.getenv('INGEST_JOB_RETENTION', 200))
+)
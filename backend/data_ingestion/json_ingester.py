@@ -6,8 +6,29 @@ from pymongo import MongoClient
 from datetime import datetime
 import json
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, BinaryIO, Callable
 from pathlib import Path
+from itertools import islice
+
+from .stream_reader import JSONStreamError
+from .format_readers import iter_records, detect_format
+from .bulk_writer import (
+    BulkInsertPipeline, BulkUpsertPipeline, DEFAULT_BATCH_SIZE, DEFAULT_WRITERS
+)
+from .field_stats import FIELD_STATS_COLLECTION, FIELD_STATS_ENABLED, FieldStatsProfile, FieldStatsStore
+from .summaries import SUMMARIES_ENABLED, SummaryStore, summaries_for
+from .enrichment import (
+    BatchEnricher, DATE_FIELDS, NUMERIC_FIELDS,
+    parse_date_value, coerce_numeric_value
+)
+
+
+# Identity fields for incremental loads, in priority order; records with
+# neither are identified by their content hash
+UPSERT_KEY_FIELDS = ('_id', 'id')
+
+# Positional tracking ID assigned by enrichment, not part of a record's identity
+GENERATED_ID_FIELDS = ('record_id',)
 
 
 class ReconciliationDataIngester:
@@ -16,7 +37,9 @@ class ReconciliationDataIngester:
     Supports various JSON structures and enriches data with metadata
     """
     
-    def __init__(self, mongo_uri: str, db_name: str, collection_name: str):
+    def __init__(self, mongo_uri: str, db_name: str, collection_name: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_writers: int = DEFAULT_WRITERS,
+                 batch_enrichment: bool = True, client: Optional[MongoClient] = None):
         """
         Initialize the data ingester
         
@@ -24,21 +47,35 @@ class ReconciliationDataIngester:
             mongo_uri: MongoDB connection URI
             db_name: Database name
             collection_name: Collection name
+            batch_size: Records per enrichment chunk and insert batch
+            max_writers: Concurrent insert threads
+            batch_enrichment: Enrich chunks column-wise with BatchEnricher
+                              instead of calling enrich_record per record
+            client: Shared pooled MongoClient; if omitted a private client is
+                    created on connect() and closed by close()
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
         self.collection_name = collection_name
-        self.client = None
+        self.batch_size = batch_size
+        self.max_writers = max_writers
+        self.batch_enricher = BatchEnricher() if batch_enrichment else None
+        self.client = client
+        self._owns_client = client is None
         self.db = None
         self.collection = None
+        self.stats_store = None
         
     def connect(self) -> bool:
         """Establish MongoDB connection"""
         try:
-            self.client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
-            self.client.server_info()  # Test connection
+            if self._owns_client:
+                self.client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+                self.client.server_info()  # Test connection
             self.db = self.client[self.db_name]
             self.collection = self.db[self.collection_name]
+            if FIELD_STATS_ENABLED:
+                self.stats_store = FieldStatsStore(self.db[FIELD_STATS_COLLECTION])
             return True
         except Exception as e:
             print(f"MongoDB connection failed: {e}")
@@ -90,23 +127,9 @@ class ReconciliationDataIngester:
             enriched['record_id'] = f'REC-{index+1:06d}'
         
         # Parse and standardize date fields
-        date_fields = [
-            'date', 'transaction_date', 'reconciliation_date', 
-            'created_at', 'updated_at', 'timestamp'
-        ]
-        
-        for field in date_fields:
+        for field in DATE_FIELDS:
             if field in enriched and isinstance(enriched[field], str):
-                try:
-                    # Handle ISO format with timezone
-                    date_str = enriched[field].replace('Z', '+00:00')
-                    enriched[field] = datetime.fromisoformat(date_str)
-                except:
-                    try:
-                        # Try common formats
-                        enriched[field] = datetime.strptime(enriched[field], '%Y-%m-%d')
-                    except:
-                        pass
+                enriched[field] = parse_date_value(enriched[field])
         
         # Add ingestion metadata
         enriched['_ingested_at'] = datetime.utcnow()
@@ -114,7 +137,7 @@ class ReconciliationDataIngester:
         
         # Extract temporal features if date exists
         date_obj = None
-        for field in date_fields:
+        for field in DATE_FIELDS:
             if field in enriched and isinstance(enriched[field], datetime):
                 date_obj = enriched[field]
                 break
@@ -127,20 +150,12 @@ class ReconciliationDataIngester:
             enriched['_month_name'] = date_obj.strftime('%B')
         
         # Standardize numeric fields
-        numeric_fields = [
-            'amount', 'value', 'total', 'balance', 'difference',
-            'debit', 'credit', 'net_amount', 'quantity', 'price'
-        ]
-        
-        for field in numeric_fields:
+        for field in NUMERIC_FIELDS:
             if field in enriched:
-                try:
-                    enriched[field] = float(enriched[field])
-                except:
-                    pass
+                enriched[field] = coerce_numeric_value(enriched[field])
         
         # Standardize status field
-        if 'status' in enriched and isinstance(enriched[field], str):
+        if 'status' in enriched and isinstance(enriched['status'], str):
             enriched['status'] = enriched['status'].lower().strip()
         
         return enriched
@@ -193,13 +208,15 @@ class ReconciliationDataIngester:
         
         return indexes_created
     
-    def ingest_json(self, json_data: str, drop_existing: bool = False) -> Dict[str, Any]:
+    def ingest_json(self, json_data: str, drop_existing: bool = False,
+                    incremental: bool = False) -> Dict[str, Any]:
         """
         Main ingestion method from JSON string
         
         Args:
             json_data: JSON string to ingest
             drop_existing: Whether to drop existing collection
+            incremental: Upsert by record identity instead of inserting
             
         Returns:
             Result dictionary with statistics
@@ -222,7 +239,7 @@ class ReconciliationDataIngester:
             if drop_existing:
                 existing_count = self.collection.count_documents({})
                 if existing_count > 0:
-                    self.collection.drop()
+                    self.drop_collection()
             
             # Parse JSON
             try:
@@ -235,54 +252,225 @@ class ReconciliationDataIngester:
             try:
                 records = self.validate_and_extract_records(data)
             except ValueError as e:
-                result['error'] = str(e)
+                result['error'] = f'Invalid JSON format: {str(e)}'
                 return result
             
             if not records:
                 result['error'] = 'No records found in JSON data'
                 return result
             
-            # Enrich records
-            enriched_records = []
-            for idx, record in enumerate(records):
-                try:
-                    enriched = self.enrich_record(record, idx)
-                    enriched_records.append(enriched)
-                except Exception as e:
-                    print(f"Warning: Failed to enrich record {idx}: {e}")
-                    enriched_records.append(record)
+            # Enrich and insert in batches, then index and gather statistics
+            self.finalize_result(result, self.insert_records(records, incremental=incremental))
+            
+        except Exception as e:
+            result['error'] = f'Ingestion failed: {str(e)}'
+        
+        return result
+    
+    def enrich_chunk(self, chunk: List[Dict], start_index: int) -> List[Dict]:
+        """
+        Enrich a chunk of records, column-wise when batch enrichment is enabled
+        
+        Falls back to per-record enrichment if the batch path fails, so a
+        single odd record only loses its own enrichment.
+        
+        Args:
+            chunk: Raw records
+            start_index: Index of the first record in the whole upload
+            
+        Returns:
+            Enriched records
+        """
+        if self.batch_enricher is not None:
+            try:
+                return self.batch_enricher.enrich(chunk, start_index)
+            except Exception as e:
+                print(f"Warning: Batch enrichment failed, using per-record path: {e}")
+        
+        enriched_chunk = []
+        for offset, record in enumerate(chunk):
+            try:
+                enriched_chunk.append(self.enrich_record(record, start_index + offset))
+            except Exception as e:
+                print(f"Warning: Failed to enrich record {start_index + offset}: {e}")
+                enriched_chunk.append(record)
+        return enriched_chunk
+    
+    def drop_collection(self):
+        """Drop the collection together with its field statistics"""
+        self.collection.drop()
+        if self.stats_store is not None:
+            self.stats_store.reset(self.collection_name)
+    
+    def insert_records(self, records: Iterable[Dict],
+                       progress: Optional[Callable[[int], None]] = None,
+                       incremental: bool = False,
+                       load: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Enrich records in chunks and bulk-write them with concurrent writers
+        
+        The records stored by this load are profiled batch by batch, once
+        each batch is written, and merged into the collection's field
+        statistics when the load finishes (also after a parse error, since
+        the records before it are stored).
+        
+        Args:
+            records: Iterable of raw records (list or streaming generator)
+            progress: Called with the size of each chunk once it is queued for insert
+            incremental: Upsert on UPSERT_KEY_FIELDS and skip records whose
+                         content hash is unchanged, instead of inserting
+            load: Optional dict receiving the bulk load summary, also when
+                  reading the records fails part way
+            
+        Returns:
+            Bulk load summary (inserted, failed, per-batch errors, docs_per_sec;
+            plus updated and unchanged when incremental)
+        """
+        records = iter(records)
+        index = 0
+        profile = FieldStatsProfile(self.collection_name) if self.stats_store else None
+        
+        if incremental:
+            pipeline = BulkUpsertPipeline(self.collection, UPSERT_KEY_FIELDS,
+                                          self.batch_size, self.max_writers, profile=profile,
+                                          volatile_fields=GENERATED_ID_FIELDS)
+        else:
+            pipeline = BulkInsertPipeline(self.collection, self.batch_size, self.max_writers,
+                                          profile=profile)
+        
+        try:
+            with pipeline:
+                while True:
+                    chunk = list(islice(records, self.batch_size))
+                    if not chunk:
+                        break
+                    
+                    pipeline.add_many(self.enrich_chunk(chunk, index))
+                    index += len(chunk)
+                    if progress:
+                        progress(len(chunk))
+        finally:
+            if profile is not None:
+                self.stats_store.merge(profile)
+            if load is not None:
+                load.update(pipeline.close())
+        
+        summary = pipeline.close()
+        if summary['failed']:
+            print(f"⚠️  {summary['failed']} records failed to insert "
+                  f"in {summary['failed_batches']} batches")
+        return summary
+    
+    @staticmethod
+    def record_counts(result: Dict[str, Any], bulk_load: Dict[str, Any]):
+        """Fill the inserted (and updated/unchanged) record counts of a bulk load into a result"""
+        result['records_inserted'] = bulk_load.get('inserted', 0)
+        if 'updated' in bulk_load:
+            result['records_updated'] = bulk_load['updated']
+            result['records_unchanged'] = bulk_load['unchanged']
+    
+    def finalize_result(self, result: Dict[str, Any], bulk_load: Dict[str, Any]):
+        """
+        Fill counts, indexes and statistics into an ingestion result
+        
+        Args:
+            result: Result dictionary being built
+            bulk_load: Summary returned by insert_records
+        """
+        self.record_counts(result, bulk_load)
+        
+        written = bulk_load['inserted'] + bulk_load.get('updated', 0) + bulk_load.get('unchanged', 0)
+        if written == 0:
+            result['error'] = 'No records were inserted'
+            if bulk_load['batch_errors']:
+                result['error'] += f": {bulk_load['batch_errors'][0]['errors'][0]['message']}"
+            return
+        
+        if SUMMARIES_ENABLED and summaries_for([self.collection_name]):
+            # Loaded into a summarized collection (e.g. discrepancies): re-aggregate its summaries
+            result['summaries_refreshed'] = SummaryStore(self.db).refresh({self.collection_name: None})
+        
+        result['indexes_created'] = self.create_indexes()
+        result['statistics'] = self.get_collection_stats()
+        result['statistics']['bulk_load'] = bulk_load
+        result['statistics']['docs_per_sec'] = bulk_load['docs_per_sec']
+        result['success'] = True
+    
+    def ingest_stream(self, stream: BinaryIO, drop_existing: bool = False,
+                      progress: Optional[Callable[[int], None]] = None,
+                      incremental: bool = False, file_format: str = 'json') -> Dict[str, Any]:
+        """
+        Ingest records from a binary stream in a single incremental pass
+        
+        The file is parsed once and records are enriched and inserted in
+        bounded batches, so peak memory does not depend on the file size. Records
+        parsed before a syntax error has been detected are already inserted
+        and are reported in records_inserted (and records_updated /
+        records_unchanged when incremental), also when the ingestion fails.
+        
+        Args:
+            stream: Binary file-like object (e.g. UploadFile.file)
+            drop_existing: Whether to drop existing collection
+            progress: Optional callback receiving the number of records processed per chunk
+            incremental: Upsert by record identity instead of inserting
+            file_format: 'json', 'ndjson', 'csv' or 'parquet'
+            
+        Returns:
+            Result dictionary with statistics
+        """
+        result = {
+            'success': False,
+            'records_inserted': 0,
+            'indexes_created': [],
+            'error': None,
+            'statistics': {}
+        }
+        load: Dict[str, Any] = {}
+        
+        try:
+            if not self.connect():
+                result['error'] = 'Failed to connect to MongoDB'
+                return result
+            
+            if drop_existing:
+                self.drop_collection()
             
-            # Insert data
-            insert_result = self.collection.insert_many(enriched_records)
-            result['records_inserted'] = len(insert_result.inserted_ids)
+            records = iter_records(stream, file_format)
+            try:
+                bulk_load = self.insert_records(records, progress, incremental, load)
+            except (JSONStreamError, ValueError) as e:
+                # Records read before the error are stored
+                self.record_counts(result, load)
+                result['error'] = f'Invalid {file_format.upper()} format: {str(e)}'
+                return result
             
-            # Create indexes
-            result['indexes_created'] = self.create_indexes()
+            if bulk_load['batches'] == 0:
+                result['error'] = 'No records found in the uploaded file'
+                return result
             
-            # Gather statistics
-            result['statistics'] = self.get_collection_stats()
-            result['success'] = True
+            self.finalize_result(result, bulk_load)
             
         except Exception as e:
+            self.record_counts(result, load)
             result['error'] = f'Ingestion failed: {str(e)}'
         
         return result
     
     def ingest_from_file(self, file_path: str, drop_existing: bool = False) -> Dict[str, Any]:
         """
-        Ingest data from JSON file
+        Ingest data from a JSON, NDJSON, CSV or Parquet file
         
         Args:
-            file_path: Path to JSON file
+            file_path: Path to the file (format taken from its extension)
             drop_existing: Whether to drop existing collection
             
         Returns:
             Result dictionary with statistics
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_data = f.read()
-            return self.ingest_json(json_data, drop_existing)
+            file_format = detect_format(file_path)
+            with open(file_path, 'rb') as f:
+                return self.ingest_stream(f, drop_existing, file_format=file_format)
         except FileNotFoundError:
             return {
                 'success': False,
@@ -318,8 +506,8 @@ class ReconciliationDataIngester:
         return stats
     
     def close(self):
-        """Close MongoDB connection"""
-        if self.client:
+        """Close MongoDB connection (a shared client is left open)"""
+        if self.client and self._owns_client:
             self.client.close()
 
 
@@ -328,7 +516,9 @@ def ingest_reconciliation_data(
     mongo_uri: str,
     db_name: str,
     collection_name: str,
-    drop_existing: bool = False
+    drop_existing: bool = False,
+    client: Optional[MongoClient] = None,
+    incremental: bool = False
 ) -> Dict[str, Any]:
     """
     Helper function to ingest reconciliation data
@@ -339,11 +529,47 @@ def ingest_reconciliation_data(
         db_name: Database name
         collection_name: Collection name
         drop_existing: Whether to drop existing data
+        client: Optional shared MongoClient
+        incremental: Upsert by record identity instead of inserting
+        
+    Returns:
+        Ingestion result
+    """
+    ingester = ReconciliationDataIngester(mongo_uri, db_name, collection_name, client=client)
+    result = ingester.ingest_json(json_data, drop_existing, incremental)
+    ingester.close()
+    return result
+
+
+def ingest_reconciliation_data_stream(
+    stream: BinaryIO,
+    mongo_uri: str,
+    db_name: str,
+    collection_name: str,
+    drop_existing: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+    client: Optional[MongoClient] = None,
+    incremental: bool = False,
+    file_format: str = 'json'
+) -> Dict[str, Any]:
+    """
+    Helper function to ingest reconciliation data from a binary stream
+    
+    Args:
+        stream: Binary file-like object
+        mongo_uri: MongoDB URI
+        db_name: Database name
+        collection_name: Collection name
+        drop_existing: Whether to drop existing data
+        progress: Optional callback receiving records processed per chunk
+        client: Optional shared MongoClient
+        incremental: Upsert by record identity instead of inserting
+        file_format: 'json', 'ndjson', 'csv' or 'parquet'
         
     Returns:
         Ingestion result
     """
-    ingester = ReconciliationDataIngester(mongo_uri, db_name, collection_name)
-    result = ingester.ingest_json(json_data, drop_existing)
+    ingester = ReconciliationDataIngester(mongo_uri, db_name, collection_name, client=client)
+    result = ingester.ingest_stream(stream, drop_existing, progress, incremental, file_format)
     ingester.close()
     return result
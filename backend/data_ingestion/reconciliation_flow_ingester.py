@@ -3,10 +3,107 @@ Reconciliation Flow Data Ingestion Module
 Handles ingestion of complete reconciliation flow data with all related collections
 """
 from pymongo import MongoClient
-from datetime import datetime
-from bson import ObjectId
+import hashlib
 import json
-from typing import Dict, List, Any, Optional
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional, BinaryIO, Callable
+
+from .stream_reader import iter_top_level_items, JSONStreamError
+from . import extended_json
+from .bulk_writer import BulkInsertPipeline, BulkUpsertPipeline
+from .cell_facts import CELL_FACTS_COLLECTION, ensure_cell_fact_indexes, iter_cell_facts
+from .field_stats import (
+    FIELD_STATS_COLLECTION, FIELD_STATS_ENABLED, FieldStatsProfile, FieldStatsStore
+)
+from .summaries import SUMMARIES_ENABLED, SummaryStore
+
+
+# Collections written concurrently by one flow ingestion
+FLOW_WRITE_WORKERS = int(os.getenv('INGEST_FLOW_WORKERS', 4))
+
+
+class ParallelCollectionWriter:
+    """
+    Runs independent per-collection writes on a bounded thread pool
+    
+    Each write is timed, and a failing collection is recorded in `errors`
+    without stopping the others. submit() blocks while max_workers writes
+    are pending, so a streaming caller never holds more than that many
+    parsed sections in memory. Counts, timings and the progress callback
+    are all handled on the submitting thread.
+    """
+    
+    def __init__(self, max_workers: int = FLOW_WRITE_WORKERS,
+                 progress: Optional[Callable[[int], None]] = None):
+        """
+        Initialize the writer
+        
+        Args:
+            max_workers: Collections written at the same time
+            progress: Optional callback receiving each collection's document count
+        """
+        self.max_workers = max(1, max_workers)
+        self.progress = progress
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='flow-write')
+        self._pending = {}
+    
+    @staticmethod
+    def _timed(write: Callable[[], Optional[int]]):
+        """Run one write, returning (count, error, seconds)"""
+        start = time.perf_counter()
+        try:
+            return write(), None, time.perf_counter() - start
+        except Exception as e:
+            return None, str(e), time.perf_counter() - start
+    
+    def submit(self, name: str, write: Callable[[], Optional[int]], counts: Dict[str, int]):
+        """
+        Queue a collection write
+        
+        Args:
+            name: Collection name (key for timings, errors and counts)
+            write: Callable performing the write and returning the document
+                   count, or None if there was nothing to write
+            counts: Result dict that receives the count once the write ends
+        """
+        while len(self._pending) >= self.max_workers:
+            self._collect(wait(self._pending, return_when=FIRST_COMPLETED).done)
+        future = self._executor.submit(self._timed, write)
+        self._pending[future] = (name, counts)
+    
+    def _collect(self, done):
+        """Record the outcome of finished writes"""
+        for future in done:
+            name, counts = self._pending.pop(future)
+            count, error, seconds = future.result()
+            self.timings[name] = round(seconds, 3)
+            if error is not None:
+                self.errors[name] = error
+                print(f"❌ Failed to write {name}: {error}")
+                continue
+            if count is not None:
+                counts[name] = count
+                if self.progress and count:
+                    self.progress(count)
+    
+    def close(self):
+        """Wait for all pending writes and stop the pool"""
+        try:
+            if self._pending:
+                self._collect(wait(self._pending).done)
+        finally:
+            self._executor.shutdown(wait=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 
 class ReconciliationFlowIngester:
@@ -15,18 +112,28 @@ class ReconciliationFlowIngester:
     Supports the complete data structure with multiple collections
     """
     
-    def __init__(self, mongo_uri: str, db_name: str):
+    def __init__(self, mongo_uri: str, db_name: str,
+                 client: Optional[MongoClient] = None,
+                 max_workers: int = FLOW_WRITE_WORKERS):
         """
         Initialize the reconciliation flow ingester
         
         Args:
             mongo_uri: MongoDB connection URI
             db_name: Database name
+            client: Shared pooled MongoClient; if omitted a private client is
+                    created on connect() and closed by close()
+            max_workers: Collections written concurrently
         """
         self.mongo_uri = mongo_uri
         self.db_name = db_name
-        self.client = None
+        self.client = client
+        self._owns_client = client is None
+        self.max_workers = max_workers
         self.db = None
+        self.stats_store = None
+        # Collection -> _ids inserted by the current run (None: re-aggregate its summaries)
+        self.summary_changes: Dict[str, Optional[List[Any]]] = {}
         
         # Collection mappings
         self.collections = {
@@ -42,47 +149,17 @@ class ReconciliationFlowIngester:
     def connect(self) -> bool:
         """Establish MongoDB connection"""
         try:
-            self.client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
-            self.client.server_info()
+            if self._owns_client:
+                self.client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+                self.client.server_info()
             self.db = self.client[self.db_name]
+            if FIELD_STATS_ENABLED:
+                self.stats_store = FieldStatsStore(self.db[FIELD_STATS_COLLECTION])
             return True
         except Exception as e:
             print(f"MongoDB connection failed: {e}")
             return False
     
-    def convert_oid_strings(self, data: Any) -> Any:
-        """
-        Convert ObjectId string representations to actual ObjectId
-        Recursively processes nested structures
-        """
-        if isinstance(data, dict):
-            converted = {}
-            for key, value in data.items():
-                if key in ['_id', 'profileId', 'matchingMethodId', 'extractionMethodId',
-                          'workspaceId', 'organizationId', 'matchResultsId', 'discrepancyId',
-                          'ticketId', 'resolvedBy'] and isinstance(value, dict) and '$oid' in value:
-                    converted[key] = ObjectId(value['$oid'])
-                elif key == 'datasourceIds' and isinstance(value, list):
-                    converted[key] = [
-                        ObjectId(item['$oid']) if isinstance(item, dict) and '$oid' in item else item
-                        for item in value
-                    ]
-                elif isinstance(value, dict) and '$date' in value:
-                    # Convert date strings to datetime
-                    try:
-                        converted[key] = datetime.fromisoformat(value['$date'].replace('Z', '+00:00'))
-                    except:
-                        converted[key] = value
-                elif isinstance(value, (dict, list)):
-                    converted[key] = self.convert_oid_strings(value)
-                else:
-                    converted[key] = value
-            return converted
-        elif isinstance(data, list):
-            return [self.convert_oid_strings(item) for item in data]
-        else:
-            return data
-    
     def create_dynamic_data_collection(self, collection_id: str, 
                                       records: List[Dict]) -> int:
         """
@@ -90,88 +167,363 @@ class ReconciliationFlowIngester:
         
         Args:
             collection_id: Collection identifier
-            records: List of records to insert
+            records: List of decoded records to insert
             
         Returns:
             Number of records inserted
         """
         try:
-            collection = self.db[collection_id]
-            
-            # Convert ObjectId strings in records
-            converted_records = [self.convert_oid_strings(record) for record in records]
-            
-            # Insert records
-            if converted_records:
-                result = collection.insert_many(converted_records)
-                return len(result.inserted_ids)
-            return 0
+            with self.new_pipeline(collection_id) as pipeline:
+                for record in records:
+                    pipeline.add(record)
+            summary = pipeline.close()
+            self.save_profile(pipeline.profile)
+            return summary['inserted']
         except Exception as e:
             print(f"Failed to create dynamic collection {collection_id}: {e}")
             return 0
     
-    def extract_and_create_data_tables(self, flow_data: Dict) -> Dict[str, int]:
+    @staticmethod
+    def row_key(full_row: Dict) -> str:
+        """
+        Stable identity of a source row for deduplication
+        
+        Uses the row's own _id when present, otherwise a hash over its
+        canonical (key-sorted) JSON form.
+        
+        Args:
+            full_row: Source row as found in matchingResult cell sources
+            
+        Returns:
+            Hashable key string
+        """
+        row_id = full_row.get('_id')
+        if row_id is not None:
+            return f"id:{row_id}"
+        canonical = json.dumps(full_row, sort_keys=True, separators=(',', ':'), default=str)
+        return f"sha1:{hashlib.sha1(canonical.encode('utf-8')).hexdigest()}"
+    
+    def new_profile(self, collection_name: str) -> Optional[FieldStatsProfile]:
+        """Empty profile for what this run writes to a collection (None when profiling is disabled)"""
+        return FieldStatsProfile(collection_name) if self.stats_store else None
+    
+    def save_profile(self, profile: Optional[FieldStatsProfile]):
+        """Merge a run's profile into the stored field statistics"""
+        if profile is not None:
+            self.stats_store.merge(profile)
+    
+    def new_pipeline(self, collection_name: str, incremental: bool = False) -> BulkInsertPipeline:
         """
-        Extract data from matching results and create data table collections
+        Bulk insert pipeline, or an upsert pipeline keyed on _id when incremental
+        
+        The pipeline feeds the collection's field statistics profile; save it
+        with save_profile(pipeline.profile) once the pipeline is closed.
+        """
+        profile = self.new_profile(collection_name)
+        if incremental:
+            return BulkUpsertPipeline(self.db[collection_name], ('_id',), profile=profile)
+        return BulkInsertPipeline(self.db[collection_name], profile=profile)
+    
+    def note_summary_change(self, collection_name: str, ids: Optional[List[Any]]):
+        """Record what the run changed in a collection (ids of inserts, or None for any other change)"""
+        previous = self.summary_changes.get(collection_name, [])
+        self.summary_changes[collection_name] = (None if ids is None or previous is None
+                                                 else previous + list(ids))
+    
+    def refresh_summaries(self, result: Dict[str, Any]):
+        """Bring the dashboard summaries of the changed collections up to date"""
+        if SUMMARIES_ENABLED and self.db is not None and self.summary_changes:
+            result['summaries_refreshed'] = SummaryStore(self.db).refresh(self.summary_changes)
+        self.summary_changes = {}
+    
+    @staticmethod
+    def written_count(summary: Dict[str, Any]) -> int:
+        """Documents stored or confirmed unchanged, from a pipeline summary"""
+        return summary['inserted'] + summary.get('updated', 0) + summary.get('unchanged', 0)
+    
+    def collect_data_tables(self, flow_data: Dict) -> Dict[str, List[Dict]]:
+        """
+        Extract the distinct source rows of each data table from matching results
+        
+        Source rows are deduplicated with set membership on row_key(), so
+        extraction is linear in the number of cell sources.
         
         Args:
-            flow_data: Complete reconciliation flow data
+            flow_data: Complete reconciliation flow data (or just its matchingResult)
             
         Returns:
-            Dictionary with collection IDs and record counts
+            Dictionary of table ID -> copies of the rows to write
         """
-        created_tables = {}
+        tables = {}
+        seen_rows = {}
         
-        try:
-            # Get matching results
-            matching_result = flow_data.get('matchingResult', {})
+        matching_result = flow_data.get('matchingResult', {})
+        if not matching_result:
+            return tables
+        
+        for row in matching_result.get('rows', []):
+            for cell in row.get('cells', []):
+                for source in cell.get('sources', []):
+                    table_id = source.get('tableId')
+                    full_row = source.get('fullRow')
+                    
+                    if not (table_id and full_row):
+                        continue
+                    
+                    if table_id not in tables:
+                        tables[table_id] = []
+                        seen_rows[table_id] = set()
+                    
+                    key = self.row_key(full_row)
+                    if key in seen_rows[table_id]:
+                        continue
+                    seen_rows[table_id].add(key)
+                    # Copied: the writers add _id/_content_hash while matchingResult is still being written
+                    tables[table_id].append(dict(full_row))
+        
+        return tables
+    
+    def write_data_table(self, table_id: str, rows: List[Dict], incremental: bool = False,
+                         summaries: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Write one data table collection through a bulk pipeline
+        
+        Args:
+            table_id: Target collection
+            rows: Distinct source rows
+            incremental: Upsert rows instead of inserting them
+            summaries: Optional dict receiving the pipeline summary
             
-            if not matching_result:
-                return created_tables
+        Returns:
+            Number of rows written (or found unchanged)
+        """
+        with self.new_pipeline(table_id, incremental) as pipeline:
+            pipeline.add_many(rows)
+        summary = pipeline.close()
+        self.save_profile(pipeline.profile)
+        if summaries is not None:
+            summaries[table_id] = summary
+        count = self.written_count(summary)
+        print(f"✅ Created collection {table_id} with {count} records")
+        if summary['failed']:
+            print(f"⚠️  {summary['failed']} records failed to insert into {table_id}")
+        return count
+    
+    def write_cell_facts(self, matching_result: Any, incremental: bool = False,
+                         summaries: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Write the flattened cell facts of a matchingResult section
+        
+        Args:
+            matching_result: matchingResult document or list of documents
+            incremental: Upsert facts instead of inserting them
+            summaries: Optional dict receiving the pipeline summary
+            
+        Returns:
+            Number of fact documents written (or found unchanged)
+        """
+        results = matching_result if isinstance(matching_result, list) else [matching_result]
+        with self.new_pipeline(CELL_FACTS_COLLECTION, incremental) as pipeline:
+            for result in results:
+                if isinstance(result, dict):
+                    pipeline.add_many(iter_cell_facts(result))
+        summary = pipeline.close()
+        self.save_profile(pipeline.profile)
+        if summaries is not None:
+            summaries[CELL_FACTS_COLLECTION] = summary
+        ensure_cell_fact_indexes(self.db[CELL_FACTS_COLLECTION])
+        count = self.written_count(summary)
+        print(f"✅ Wrote {count} cell facts to {CELL_FACTS_COLLECTION}")
+        return count
+    
+    def submit_data_tables(self, writer: ParallelCollectionWriter, flow_data: Dict,
+                           counts: Dict[str, int], incremental: bool = False,
+                           summaries: Optional[Dict[str, Any]] = None):
+        """
+        Extract the data tables of a flow and queue one write per table
+        
+        Args:
+            writer: Pool the table writes are submitted to
+            flow_data: Flow data containing matchingResult
+            counts: Result dict receiving rows written per table
+            incremental: Upsert rows instead of inserting them
+            summaries: Optional dict receiving each table's pipeline summary
+        """
+        for table_id, rows in self.collect_data_tables(flow_data).items():
+            writer.submit(
+                table_id,
+                lambda table_id=table_id, rows=rows: self.write_data_table(
+                    table_id, rows, incremental, summaries),
+                counts
+            )
+    
+    def insert_collection_data(self, collection_name: str, data: Any, incremental: bool = False,
+                               summaries: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """
+        Insert one top-level section of the flow
+        
+        Args:
+            collection_name: Target collection
+            data: Single document or list of documents
+            incremental: Upsert on _id, skipping unchanged documents
+            summaries: Optional dict receiving the upsert summary
             
-            # Get rows and extract source data
-            rows = matching_result.get('rows', [])
+        Returns:
+            Number of documents written (or found unchanged), or None if the
+            section was skipped
+        """
+        # Handle both single document and list
+        if isinstance(data, dict):
+            data = [data]
+        elif not isinstance(data, list) or not data:
+            return None
+        
+        if incremental:
+            with self.new_pipeline(collection_name, incremental=True) as pipeline:
+                pipeline.add_many(data)
+            summary = pipeline.close()
+            self.save_profile(pipeline.profile)
+            if summaries is not None:
+                summaries[collection_name] = summary
+            if summary['inserted'] or summary['updated']:
+                self.note_summary_change(collection_name, None)
+            print(f"✅ Upserted {collection_name}: {summary['inserted']} inserted, "
+                  f"{summary['updated']} updated, {summary['unchanged']} unchanged")
+            return self.written_count(summary)
+        
+        # insert_many adds missing _ids to the documents it is given, and the
+        # cell facts and data tables read the same sections on other threads
+        data = [dict(document) if isinstance(document, dict) else document for document in data]
+        insert_result = self.db[collection_name].insert_many(data)
+        profile = self.new_profile(collection_name)
+        if profile is not None:
+            profile.update(data)
+            self.save_profile(profile)
+        self.note_summary_change(collection_name, insert_result.inserted_ids)
+        print(f"✅ Inserted {len(insert_result.inserted_ids)} documents into {collection_name}")
+        return len(insert_result.inserted_ids)
+    
+    @staticmethod
+    def finish_result(result: Dict[str, Any], writer: ParallelCollectionWriter):
+        """Add per-collection timings and failures; any failure fails the ingestion"""
+        result['collection_timings'] = writer.timings
+        result['collection_errors'] = writer.errors
+        if writer.errors:
+            result['error'] = (f"Failed to write {len(writer.errors)} collection(s): "
+                               + '; '.join(f'{name}: {error}' for name, error in writer.errors.items()))
+        else:
+            result['success'] = True
+    
+    @staticmethod
+    def upsert_summary(summaries: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+        """Inserted/updated/unchanged/failed counts per collection"""
+        return {
+            name: {key: summary[key] for key in ('inserted', 'updated', 'unchanged', 'failed')}
+            for name, summary in summaries.items()
+        }
+    
+    def drop_collections(self):
+        """Drop all core flow collections and the derived cell facts, with their statistics"""
+        dropped = list(self.collections.values()) + [CELL_FACTS_COLLECTION]
+        for collection_name in dropped:
+            self.db[collection_name].drop()
+            self.note_summary_change(collection_name, None)
+        if self.stats_store is not None:
+            self.stats_store.reset(*dropped)
+        print("✅ Dropped existing collections")
+    
+    def ingest_flow(self, flow_data: Dict, drop_existing: bool = False,
+                    incremental: bool = False) -> Dict[str, Any]:
+        """
+        Ingest complete reconciliation flow data
+        
+        The core collections and every data table are independent, so they
+        are written concurrently (max_workers at a time). A collection that
+        fails does not stop the others; it is reported in collection_errors
+        and the ingestion is marked unsuccessful.
+        
+        Args:
+            flow_data: Complete flow data structure, already decoded with
+                       extended_json (ObjectId/datetime values, not $oid/$date)
+            drop_existing: Whether to drop existing collections
+            incremental: Upsert on _id and skip unchanged documents instead
+                         of inserting (re-uploads then do not duplicate data)
             
-            # Track collections and their records
-            collection_records = {}
+        Returns:
+            Ingestion result with statistics
+        """
+        result = {
+            'success': False,
+            'collections_processed': {},
+            'data_tables_created': {},
+            'error': None
+        }
+        summaries = {}
+        
+        try:
+            if not self.connect():
+                result['error'] = 'Failed to connect to MongoDB'
+                return result
             
-            for row in rows:
-                cells = row.get('cells', [])
-                for cell in cells:
-                    sources = cell.get('sources', [])
-                    for source in sources:
-                        table_id = source.get('tableId')
-                        full_row = source.get('fullRow')
-                        
-                        if table_id and full_row:
-                            if table_id not in collection_records:
-                                collection_records[table_id] = []
-                            # Avoid duplicates
-                            if full_row not in collection_records[table_id]:
-                                collection_records[table_id].append(full_row)
+            # Drop existing collections if requested
+            if drop_existing:
+                self.drop_collections()
             
-            # Create collections
-            for table_id, records in collection_records.items():
-                count = self.create_dynamic_data_collection(table_id, records)
-                created_tables[table_id] = count
-                print(f"✅ Created collection {table_id} with {count} records")
+            with ParallelCollectionWriter(self.max_workers) as writer:
+                # Process each collection type
+                for key, collection_name in self.collections.items():
+                    if key in flow_data:
+                        writer.submit(
+                            collection_name,
+                            lambda collection_name=collection_name, data=flow_data[key]:
+                                self.insert_collection_data(collection_name, data,
+                                                            incremental, summaries),
+                            result['collections_processed']
+                        )
+                
+                # Flattened cell facts and dynamic data tables
+                if flow_data.get('matchingResult'):
+                    writer.submit(
+                        CELL_FACTS_COLLECTION,
+                        lambda: self.write_cell_facts(flow_data['matchingResult'], incremental, summaries),
+                        result['collections_processed']
+                    )
+                self.submit_data_tables(writer, flow_data, result['data_tables_created'],
+                                        incremental, summaries)
             
-            return created_tables
+            if incremental:
+                result['upsert_summary'] = self.upsert_summary(summaries)
+            self.finish_result(result, writer)
             
         except Exception as e:
-            print(f"Failed to extract and create data tables: {e}")
-            return created_tables
+            result['error'] = f'Ingestion failed: {str(e)}'
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.refresh_summaries(result)
+        
+        return result
     
-    def ingest_flow(self, flow_data: Dict, drop_existing: bool = False) -> Dict[str, Any]:
+    def ingest_stream(self, stream: BinaryIO,
+                      drop_existing: bool = False,
+                      progress: Optional[Callable[[int], None]] = None,
+                      incremental: bool = False) -> Dict[str, Any]:
         """
-        Ingest complete reconciliation flow data
+        Ingest reconciliation flow from a binary JSON stream
+        
+        Top-level sections are parsed one at a time and handed to the
+        parallel writer as soon as they are complete, so parsing overlaps
+        the writes and at most max_workers sections are held in memory.
         
         Args:
-            flow_data: Complete flow data structure
+            stream: Binary file-like object (e.g. UploadFile.file)
             drop_existing: Whether to drop existing collections
+            progress: Optional callback receiving the number of documents
+                      written after each collection
+            incremental: Upsert on _id and skip unchanged documents
             
         Returns:
-            Ingestion result with statistics
+            Ingestion result
         """
         result = {
             'success': False,
@@ -179,66 +531,80 @@ class ReconciliationFlowIngester:
             'data_tables_created': {},
             'error': None
         }
+        summaries = {}
         
         try:
             if not self.connect():
                 result['error'] = 'Failed to connect to MongoDB'
                 return result
             
-            # Drop existing collections if requested
             if drop_existing:
-                for collection_name in self.collections.values():
-                    self.db[collection_name].drop()
-                print("✅ Dropped existing collections")
+                self.drop_collections()
             
-            # Process each collection type
-            for key, collection_name in self.collections.items():
-                if key in flow_data:
-                    data = flow_data[key]
+            with ParallelCollectionWriter(self.max_workers, progress) as writer:
+                sections = iter_top_level_items(stream, extended_json.object_hook)
+                while True:
+                    # Only parse errors are invalid input; errors queueing writes are ingestion failures
+                    try:
+                        key, data = next(sections)
+                    except StopIteration:
+                        break
+                    except (JSONStreamError, ValueError) as e:
+                        # Malformed JSON, or a top-level value or $date wrapper of the wrong shape
+                        result['error'] = f'Invalid JSON format: {str(e)}'
+                        return result
                     
-                    # Handle both single document and list
-                    if isinstance(data, dict):
-                        data = [data]
-                    elif not isinstance(data, list):
+                    collection_name = self.collections.get(key)
+                    if not collection_name:
                         continue
                     
-                    # Convert ObjectId strings
-                    converted_data = [self.convert_oid_strings(doc) for doc in data]
+                    writer.submit(
+                        collection_name,
+                        lambda collection_name=collection_name, data=data:
+                            self.insert_collection_data(collection_name, data,
+                                                        incremental, summaries),
+                        result['collections_processed']
+                    )
                     
-                    # Insert data
-                    if converted_data:
-                        collection = self.db[collection_name]
-                        insert_result = collection.insert_many(converted_data)
-                        result['collections_processed'][collection_name] = len(insert_result.inserted_ids)
-                        print(f"✅ Inserted {len(insert_result.inserted_ids)} documents into {collection_name}")
+                    if key == 'matchingResult' and data:
+                        writer.submit(
+                            CELL_FACTS_COLLECTION,
+                            lambda data=data: self.write_cell_facts(data, incremental, summaries),
+                            result['collections_processed']
+                        )
+                        self.submit_data_tables(writer, {key: data}, result['data_tables_created'],
+                                                incremental, summaries)
             
-            # Extract and create dynamic data tables
-            result['data_tables_created'] = self.extract_and_create_data_tables(flow_data)
-            
-            result['success'] = True
+            if incremental:
+                result['upsert_summary'] = self.upsert_summary(summaries)
+            self.finish_result(result, writer)
             
         except Exception as e:
             result['error'] = f'Ingestion failed: {str(e)}'
             import traceback
             traceback.print_exc()
+        finally:
+            self.refresh_summaries(result)
         
         return result
     
     def ingest_from_json_string(self, json_data: str, 
-                               drop_existing: bool = False) -> Dict[str, Any]:
+                               drop_existing: bool = False,
+                               incremental: bool = False) -> Dict[str, Any]:
         """
         Ingest reconciliation flow from JSON string
         
         Args:
             json_data: JSON string containing flow data
             drop_existing: Whether to drop existing collections
+            incremental: Upsert on _id and skip unchanged documents
             
         Returns:
             Ingestion result
         """
         try:
-            flow_data = json.loads(json_data)
-            return self.ingest_flow(flow_data, drop_existing)
+            flow_data = extended_json.loads(json_data)
+            return self.ingest_flow(flow_data, drop_existing, incremental)
         except json.JSONDecodeError as e:
             return {
                 'success': False,
@@ -259,9 +625,8 @@ class ReconciliationFlowIngester:
             Ingestion result
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_data = f.read()
-            return self.ingest_from_json_string(json_data, drop_existing)
+            with open(file_path, 'rb') as f:
+                return self.ingest_stream(f, drop_existing)
         except FileNotFoundError:
             return {
                 'success': False,
@@ -276,8 +641,8 @@ class ReconciliationFlowIngester:
             }
     
     def close(self):
-        """Close MongoDB connection"""
-        if self.client:
+        """Close MongoDB connection (a shared client is left open)"""
+        if self.client and self._owns_client:
             self.client.close()
 
 
@@ -285,7 +650,9 @@ def ingest_reconciliation_flow(
     json_data: str,
     mongo_uri: str,
     db_name: str,
-    drop_existing: bool = False
+    drop_existing: bool = False,
+    client: Optional[MongoClient] = None,
+    incremental: bool = False
 ) -> Dict[str, Any]:
     """
     Helper function to ingest reconciliation flow data
@@ -295,11 +662,43 @@ def ingest_reconciliation_flow(
         mongo_uri: MongoDB URI
         db_name: Database name
         drop_existing: Whether to drop existing data
+        client: Optional shared MongoClient
+        incremental: Upsert on _id and skip unchanged documents
+        
+    Returns:
+        Ingestion result
+    """
+    ingester = ReconciliationFlowIngester(mongo_uri, db_name, client=client)
+    result = ingester.ingest_from_json_string(json_data, drop_existing, incremental)
+    ingester.close()
+    return result
+
+
+def ingest_reconciliation_flow_stream(
+    stream: BinaryIO,
+    mongo_uri: str,
+    db_name: str,
+    drop_existing: bool = False,
+    progress: Optional[Callable[[int], None]] = None,
+    client: Optional[MongoClient] = None,
+    incremental: bool = False
+) -> Dict[str, Any]:
+    """
+    Helper function to ingest reconciliation flow data from a binary JSON stream
+    
+    Args:
+        stream: Binary file-like object
+        mongo_uri: MongoDB URI
+        db_name: Database name
+        drop_existing: Whether to drop existing data
+        progress: Optional callback receiving documents written per section
+        client: Optional shared MongoClient
+        incremental: Upsert on _id and skip unchanged documents
         
     Returns:
         Ingestion result
     """
-    ingester = ReconciliationFlowIngester(mongo_uri, db_name)
-    result = ingester.ingest_from_json_string(json_data, drop_existing)
+    ingester = ReconciliationFlowIngester(mongo_uri, db_name, client=client)
+    result = ingester.ingest_stream(stream, drop_existing, progress, incremental)
     ingester.close()
     return result
@@ -0,0 +1,199 @@
+"""
+Streaming JSON Reader
+Incrementally parses uploaded JSON so records can be ingested in bounded
+batches without holding the whole document in memory
+"""
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+import ijson
+
+
+# Keys that may hold the record list in a wrapping object
+RECORD_KEYS = ('records', 'data', 'reconciliations', 'transactions', 'items')
+
+# ijson raises subclasses of this for malformed or truncated input
+JSONStreamError = ijson.JSONError
+
+
+class ObjectBuilder:
+    """
+    Builds Python values from ijson events
+
+    Unlike ijson.ObjectBuilder, objects are only attached to their parent
+    once complete, so an object_hook can replace them (e.g. Extended JSON
+    wrappers become ObjectId/datetime during parsing).
+    """
+
+    __slots__ = ('object_hook', 'stack', 'value')
+
+    def __init__(self, object_hook: Optional[Callable[[Dict], Any]] = None):
+        self.object_hook = object_hook
+        self.stack = []
+        self.value = None
+
+    def event(self, event: str, value: Any):
+        stack = self.stack
+        if event == 'map_key':
+            stack[-1][1] = value
+            return
+        if event == 'start_map':
+            stack.append([{}, None])
+            return
+        if event == 'start_array':
+            stack.append([[], None])
+            return
+        if event == 'end_map':
+            value = stack.pop()[0]
+            if self.object_hook is not None:
+                value = self.object_hook(value)
+        elif event == 'end_array':
+            value = stack.pop()[0]
+
+        if not stack:
+            self.value = value
+        elif isinstance(stack[-1][0], list):
+            stack[-1][0].append(value)
+        else:
+            stack[-1][0][stack[-1][1]] = value
+
+
+def _feed_value(builder: ObjectBuilder, events: Iterator[Tuple[str, str, Any]],
+                event: str, value: Any):
+    """
+    Feed one complete JSON value, starting at the given event, into a builder
+
+    Args:
+        builder: Object builder receiving the events
+        events: Remaining ijson parse events
+        event: Event that starts the value
+        value: Value carried by that event
+    """
+    builder.event(event, value)
+    if event not in ('start_map', 'start_array'):
+        return
+
+    depth = 1
+    for _, event, value in events:
+        builder.event(event, value)
+        if event in ('start_map', 'start_array'):
+            depth += 1
+        elif event in ('end_map', 'end_array'):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def _build_value(events: Iterator[Tuple[str, str, Any]], event: str, value: Any,
+                 object_hook: Optional[Callable[[Dict], Any]] = None) -> Any:
+    """Build one complete JSON value starting at the given event"""
+    builder = ObjectBuilder(object_hook)
+    _feed_value(builder, events, event, value)
+    return builder.value
+
+
+def _iter_array_items(events: Iterator[Tuple[str, str, Any]],
+                      object_hook: Optional[Callable[[Dict], Any]] = None) -> Iterator[Any]:
+    """Yield the items of an array whose start_array event was just consumed"""
+    for _, event, value in events:
+        if event == 'end_array':
+            return
+        yield _build_value(events, event, value, object_hook)
+
+
+def _checked_records(items: Iterator[Any]) -> Iterator[Dict]:
+    """Pass record list items through, rejecting any that is not an object"""
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Record {position} is not a JSON object: {type(item).__name__}")
+        yield item
+
+
+def iter_json_records(stream: BinaryIO,
+                      object_hook: Optional[Callable[[Dict], Any]] = None) -> Iterator[Dict]:
+    """
+    Yield records from a JSON stream in a single incremental pass
+
+    Supports the same structures as ReconciliationDataIngester.validate_and_extract_records:
+    - List of records: [{}, {}, ...]
+    - Dict with a record list under one of RECORD_KEYS (first one in the document wins)
+    - Single record: {...}
+
+    Args:
+        stream: Binary file-like object positioned at the start of the document
+        object_hook: Optional callable applied to every completed JSON object
+
+    Yields:
+        Record dictionaries
+
+    Raises:
+        JSONStreamError: If the document is malformed
+        ValueError: If the top-level value is not an object or array, or a
+                    record list item is not an object
+    """
+    events = iter(ijson.parse(stream, use_float=True))
+    _, event, value = next(events)
+
+    if event == 'start_array':
+        yield from _checked_records(_iter_array_items(events, object_hook))
+    elif event == 'start_map':
+        # Other top-level keys are only needed if no record list is found
+        single = ObjectBuilder(object_hook)
+        single.event('start_map', None)
+        for prefix, event, value in events:
+            if prefix == '' and event == 'end_map':
+                single.event(event, value)
+                yield single.value
+                break
+            if prefix == '' and event == 'map_key' and value in RECORD_KEYS:
+                key = value
+                _, event, value = next(events)
+                if event == 'start_array':
+                    yield from _checked_records(_iter_array_items(events, object_hook))
+                    break
+                single.event('map_key', key)
+                _feed_value(single, events, event, value)
+                continue
+            single.event(event, value)
+    else:
+        raise ValueError(f"Unsupported JSON structure: {type(value).__name__}")
+
+    # Consume the rest of the document so trailing syntax errors are reported
+    for _ in events:
+        pass
+
+
+def iter_top_level_items(stream: BinaryIO,
+                         object_hook: Optional[Callable[[Dict], Any]] = None
+                         ) -> Iterator[Tuple[str, Any]]:
+    """
+    Yield (key, value) pairs of a top-level JSON object one at a time
+
+    Only one top-level value is materialized at a time, so peak memory is
+    bounded by the largest section rather than the whole document.
+
+    Args:
+        stream: Binary file-like object positioned at the start of the document
+        object_hook: Optional callable applied to every completed JSON object
+
+    Yields:
+        Tuples of top-level key and fully built value
+
+    Raises:
+        JSONStreamError: If the document is malformed
+        ValueError: If the top-level value is not an object
+    """
+    if object_hook is None:
+        # ijson's C backend builds values natively when no hook is needed
+        yield from ijson.kvitems(stream, '', use_float=True)
+        return
+
+    events = iter(ijson.parse(stream, use_float=True))
+    _, event, value = next(events)
+    if event != 'start_map':
+        raise ValueError("Top-level JSON value must be an object")
+
+    for prefix, event, value in events:
+        if prefix == '' and event == 'map_key':
+            key = value
+            _, event, value = next(events)
+            yield key, _build_value(events, event, value, object_hook)
@@ -0,0 +1,423 @@
+"""
+Dashboard Summary Collections
+Named aggregations over the flow collections (discrepancies by severity and
+type, tickets by status and risk, resolutions by status) materialized into
+summary collections with $merge. Ingestion keeps them current: documents
+inserted by a run are aggregated on their own and added to the stored
+counts, while collections that were dropped or had documents updated are
+re-aggregated in full. Documents removed by a reconciliation are subtracted
+before they are deleted. Every change to a summary holds its lease in the
+database, so API workers and reconciliation processes never interleave.
+The query path answers matching questions from the summaries instead of
+scanning the raw collections.
+"""
+import os
+import re
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from collection_names import SUMMARY_LEASE_COLLECTION, SUMMARY_STATE_COLLECTION
+
+
+SUMMARY_PREFIX = 'summary_'
+SUMMARIES_ENABLED = os.getenv('INGEST_SUMMARIES', 'true').lower() not in ('0', 'false', 'no')
+
+# Inserted _ids aggregated per incremental $merge
+SUMMARY_DELTA_BATCH = int(os.getenv('SUMMARY_DELTA_BATCH', 10000))
+
+# A lease not released within this time (its holder died) can be taken over
+SUMMARY_LEASE_SECONDS = float(os.getenv('SUMMARY_LEASE_SECONDS', 600))
+# Longest wait for a summary's lease before giving up on the change
+SUMMARY_LEASE_WAIT_SECONDS = float(os.getenv('SUMMARY_LEASE_WAIT_SECONDS', 600))
+
+# name -> source collection, grouping fields, optional summed amount field
+SUMMARY_DEFINITIONS = {
+    'discrepancies_by_severity_type': {
+        'source': 'discrepancies',
+        'group_by': ['severity', 'type'],
+        'amount_field': 'amount'
+    },
+    'tickets_by_status_risk': {
+        'source': 'ticket',
+        'group_by': ['status', 'risk']
+    },
+    'resolutions_by_status': {
+        'source': 'discrepancyResolution',
+        'group_by': ['status']
+    }
+}
+
+# Words naming each source collection and grouping field in a question
+SOURCE_WORDS = {
+    'discrepancies': {'discrepancy', 'discrepancies', 'mismatch', 'mismatches', 'exception', 'exceptions'},
+    'ticket': {'ticket', 'tickets'},
+    'discrepancyResolution': {'resolution', 'resolutions'}
+}
+FIELD_WORDS = {
+    'severity': {'severity', 'severities'},
+    'type': {'type', 'types', 'kind', 'kinds', 'category', 'categories'},
+    'status': {'status', 'statuses', 'state', 'states'},
+    'risk': {'risk', 'risks'}
+}
+
+# Words that ask for counts or a chart without filtering the data; a
+# question with any other word (a value, a date, a vendor) is not routed
+AGGREGATE_WORDS = {
+    'a', 'all', 'amount', 'amounts', 'and', 'are', 'as', 'bar', 'breakdown', 'by', 'chart', 'count', 'counts',
+    'current', 'display', 'distribution', 'do', 'does', 'each', 'for', 'get', 'give', 'graph', 'group',
+    'grouped', 'have', 'how', 'in', 'is', 'level', 'levels', 'list', 'many', 'me', 'number', 'of', 'overview',
+    'per', 'pie', 'plot', 'show', 'split', 'summarize', 'summary', 'table', 'the', 'there', 'total', 'totals',
+    'value', 'values', 'we', 'what', 'which', 'with', 'wise'
+}
+
+def summary_collection(name: str) -> str:
+    """Collection holding a named summary"""
+    return SUMMARY_PREFIX + name
+
+
+def summaries_for(sources: Optional[Iterable[str]] = None) -> List[str]:
+    """Names of the summaries computed from any of the source collections (all when None)"""
+    if sources is None:
+        return list(SUMMARY_DEFINITIONS)
+    sources = set(sources)
+    return [name for name, definition in SUMMARY_DEFINITIONS.items() if definition['source'] in sources]
+
+
+class SummaryStore:
+    """
+    Maintains the summary collections and answers questions from them
+    """
+
+    def __init__(self, db):
+        """
+        Initialize the store
+
+        Args:
+            db: pymongo database
+        """
+        self.db = db
+        self.state = db[SUMMARY_STATE_COLLECTION]
+        self.leases = db[SUMMARY_LEASE_COLLECTION]
+
+    # ---------- Leases ----------
+
+    @contextmanager
+    def lease(self, name: str) -> Iterator[Callable[[], None]]:
+        """
+        Hold the database lease of a summary while changing it
+
+        Waits (with backoff) while another process holds an unexpired lease.
+
+        Args:
+            name: Summary name
+
+        Yields:
+            Callable extending the lease, for long changes
+
+        Raises:
+            TimeoutError: If the lease stays taken for SUMMARY_LEASE_WAIT_SECONDS
+        """
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + SUMMARY_LEASE_WAIT_SECONDS
+
+        def take():
+            now = datetime.utcnow()
+            # Matches a free, expired or own lease; otherwise the upsert collides on _id
+            self.leases.update_one(
+                {'_id': name, '$or': [{'expiresAt': {'$lte': now}}, {'owner': owner}]},
+                {'$set': {'owner': owner, 'expiresAt': now + timedelta(seconds=SUMMARY_LEASE_SECONDS)}},
+                upsert=True)
+
+        delay = 0.05
+        while True:
+            try:
+                take()
+                break
+            except DuplicateKeyError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Summary '{name}' is being changed by another process")
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+        try:
+            yield take
+        finally:
+            self.leases.delete_one({'_id': name, 'owner': owner})
+
+    @contextmanager
+    def leases_of(self, names: List[str]) -> Iterator[None]:
+        """Hold the leases of several summaries (taken in name order)"""
+        with ExitStack() as stack:
+            for name in sorted(names):
+                stack.enter_context(self.lease(name))
+            yield
+
+    # ---------- Maintenance ----------
+
+    @staticmethod
+    def group_stages(definition: Dict[str, Any], now: datetime) -> List[Dict[str, Any]]:
+        """$group of a summary with its fields promoted out of _id"""
+        fields = definition['group_by']
+        group = {'_id': {field: f'${field}' for field in fields}, 'count': {'$sum': 1}}
+        if definition.get('amount_field'):
+            # $sum skips values that are not numbers
+            group['amount'] = {'$sum': f"${definition['amount_field']}"}
+        return [
+            {'$group': group},
+            {'$set': {**{field: f'$_id.{field}' for field in fields}, 'updatedAt': now}}
+        ]
+
+    def rebuild(self, names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Re-aggregate summaries from their whole source collections
+
+        Groups are merged in place; groups that no longer occur in the
+        source (not stamped by this refresh) are deleted afterwards, so
+        readers never see an empty summary while it is rebuilt.
+
+        Args:
+            names: Summaries to rebuild (default: all)
+
+        Returns:
+            Groups stored per summary
+        """
+        refreshed = {}
+        for name in names or list(SUMMARY_DEFINITIONS):
+            definition = SUMMARY_DEFINITIONS[name]
+            target = summary_collection(name)
+            with self.lease(name):
+                now = datetime.utcnow()
+                pipeline = self.group_stages(definition, now) + [
+                    {'$merge': {'into': target, 'on': '_id', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+                ]
+                list(self.db[definition['source']].aggregate(pipeline, allowDiskUse=True))
+                self.db[target].delete_many({'updatedAt': {'$lt': now}})
+                refreshed[name] = self.save_state(name, 'full', now)
+        return refreshed
+
+    def merge_delta(self, name: str, query: Dict[str, Any], sign: int = 1):
+        """
+        Add (sign 1) or subtract (sign -1) the source documents matching a query
+
+        The documents are aggregated on their own and their counts and
+        amounts merged into the stored groups; groups left without documents
+        are deleted. The caller holds the summary's lease.
+        """
+        definition = SUMMARY_DEFINITIONS[name]
+        target = summary_collection(name)
+        now = datetime.utcnow()
+        added = {'count': {'$add': ['$count', '$$new.count']}, 'updatedAt': '$$new.updatedAt'}
+        negate = {'count': {'$multiply': ['$count', -1]}}
+        if definition.get('amount_field'):
+            added['amount'] = {'$add': [{'$ifNull': ['$amount', 0]}, '$$new.amount']}
+            negate['amount'] = {'$multiply': ['$amount', -1]}
+        pipeline = ([{'$match': query}] + self.group_stages(definition, now)
+                    + ([{'$set': negate}] if sign < 0 else [])
+                    + [{'$merge': {'into': target, 'on': '_id',
+                                   'whenMatched': [{'$set': added}], 'whenNotMatched': 'insert'}}])
+        list(self.db[definition['source']].aggregate(pipeline))
+        if sign < 0:
+            self.db[target].delete_many({'count': {'$lte': 0}})
+
+    def apply_inserted(self, names: List[str], ids: List[Any]) -> Dict[str, Any]:
+        """
+        Add newly inserted source documents to summaries
+
+        Args:
+            names: Summaries of the source collection the documents went to
+            ids: _id values of the inserted documents
+
+        Returns:
+            Groups stored per summary
+        """
+        refreshed = {}
+        for name in names:
+            with self.lease(name) as extend:
+                for start in range(0, len(ids), SUMMARY_DELTA_BATCH):
+                    self.merge_delta(name, {'_id': {'$in': ids[start:start + SUMMARY_DELTA_BATCH]}})
+                    extend()
+                refreshed[name] = self.save_state(name, 'incremental', datetime.utcnow())
+        return refreshed
+
+    def built(self, names: List[str]) -> List[str]:
+        """The summaries that have been built (incremental changes apply only to them)"""
+        states = {doc['_id'] for doc in self.state.find({'_id': {'$in': names}}, {'_id': 1})}
+        return [name for name in names if name in states]
+
+    def invalidate(self, names: List[str]):
+        """Forget summaries that could not be kept current: not routed to, rebuilt on their next refresh"""
+        self.state.delete_many({'_id': {'$in': names}})
+
+    def refresh(self, changes: Dict[str, Optional[List[Any]]]) -> Dict[str, Any]:
+        """
+        Bring summaries up to date after an ingestion run
+
+        Args:
+            changes: Source collection -> _ids of documents inserted by the
+                     run, or None when its documents may have been updated,
+                     replaced or dropped (re-aggregated in full)
+
+        Returns:
+            Mode and groups stored per refreshed summary (empty when no
+            summary reads the changed collections)
+        """
+        refreshed = {}
+        errors = []
+        for source, ids in changes.items():
+            names = summaries_for([source])
+            if not names or ids == []:
+                continue
+            try:
+                built = self.built(names) if ids is not None else []
+                # Summaries never built are aggregated in full instead of from the new documents
+                full = [name for name in names if name not in built]
+                if full:
+                    refreshed.update({name: {'mode': 'full', 'groups': groups}
+                                      for name, groups in self.rebuild(full).items()})
+                if built:
+                    refreshed.update({name: {'mode': 'incremental', 'groups': groups}
+                                      for name, groups in self.apply_inserted(built, ids).items()})
+            except Exception as e:
+                print(f"⚠️  Could not refresh summaries of {source}: {e}")
+                errors.append(f'{source}: {e}')
+                self.invalidate(names)
+        if refreshed:
+            print(f"✅ Refreshed summaries: {', '.join(refreshed)}")
+        if errors:
+            refreshed['error'] = '; '.join(errors)
+        return refreshed
+
+    def remove(self, source: str, query: Dict[str, Any]) -> int:
+        """
+        Delete source documents, taking them out of the summaries first
+
+        The summaries' leases are held across the subtraction and the
+        delete, so no refresh sees the documents counted but deleted (or
+        the reverse). A summary that cannot be updated is invalidated.
+
+        Args:
+            source: Source collection
+            query: Documents to delete
+
+        Returns:
+            Documents deleted
+        """
+        names = self.built(summaries_for([source]))
+        if not names:
+            return self.db[source].delete_many(query).deleted_count
+        try:
+            with self.leases_of(names):
+                try:
+                    for name in names:
+                        self.merge_delta(name, query, sign=-1)
+                        self.save_state(name, 'incremental', datetime.utcnow())
+                except Exception as e:
+                    print(f"⚠️  Could not update summaries of {source}: {e}")
+                    self.invalidate(names)
+                return self.db[source].delete_many(query).deleted_count
+        except TimeoutError as e:
+            print(f"⚠️  Could not update summaries of {source}: {e}")
+            self.invalidate(names)
+            return self.db[source].delete_many(query).deleted_count
+
+    def refresh_sources(self, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Re-aggregate summaries in full
+
+        Args:
+            sources: Only summaries of these source collections (default: all)
+
+        Returns:
+            Mode and groups stored per refreshed summary
+        """
+        sources = sources or sorted({definition['source'] for definition in SUMMARY_DEFINITIONS.values()})
+        return self.refresh({source: None for source in sources})
+
+    def save_state(self, name: str, mode: str, now: datetime) -> int:
+        """Record when a summary was refreshed; returns its group count"""
+        groups = self.db[summary_collection(name)].count_documents({})
+        self.state.replace_one({'_id': name}, {
+            'source': SUMMARY_DEFINITIONS[name]['source'],
+            'collection': summary_collection(name),
+            'group_by': SUMMARY_DEFINITIONS[name]['group_by'],
+            'mode': mode,
+            'groups': groups,
+            'refreshed_at': now
+        }, upsert=True)
+        return groups
+
+    def list_summaries(self) -> List[Dict[str, Any]]:
+        """Every defined summary with its last refresh (None when never built)"""
+        states = {doc['_id']: doc for doc in self.state.find({})}
+        return [
+            {
+                'name': name,
+                'source': definition['source'],
+                'collection': summary_collection(name),
+                'group_by': definition['group_by'],
+                'groups': states.get(name, {}).get('groups'),
+                'mode': states.get(name, {}).get('mode'),
+                'refreshed_at': states.get(name, {}).get('refreshed_at')
+            }
+            for name, definition in SUMMARY_DEFINITIONS.items()
+        ]
+
+    # ---------- Query routing ----------
+
+    def route(self, question: str, collection: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Summary pipeline answering a question, if one can
+
+        A question is routed when it names a summarized collection (or the
+        collection argument is one) and asks only for counts or amounts
+        grouped by fields of a built summary, e.g. "discrepancies by
+        severity" or "how many tickets per status and risk". Anything more
+        specific (values, dates, other fields) goes to the raw collections.
+
+        Args:
+            question: Natural language question
+            collection: Collection the question was asked against
+
+        Returns:
+            Dict with summary (name), collection and pipeline, or None
+        """
+        words = re.findall(r'[a-z]+', question.lower())
+        if not words:
+            return None
+
+        mentioned = {source for source, names in SOURCE_WORDS.items() if names & set(words)}
+        if collection in SOURCE_WORDS:
+            mentioned.add(collection)
+        elif collection is not None:
+            return None
+        if len(mentioned) != 1:
+            return None
+        source = mentioned.pop()
+
+        fields = [field for field, names in FIELD_WORDS.items() if names & set(words)]
+        vocabulary = AGGREGATE_WORDS | SOURCE_WORDS[source] | {name for field in fields for name in FIELD_WORDS[field]}
+        if not fields or any(word not in vocabulary for word in words):
+            return None
+
+        built = {doc['_id'] for doc in self.state.find({'source': source}, {'_id': 1})}
+        candidates = [name for name in summaries_for([source])
+                      if name in built and set(fields) <= set(SUMMARY_DEFINITIONS[name]['group_by'])]
+        if not candidates:
+            return None
+        name = min(candidates, key=lambda candidate: len(SUMMARY_DEFINITIONS[candidate]['group_by']))
+        definition = SUMMARY_DEFINITIONS[name]
+
+        group = {'_id': {field: f'${field}' for field in fields}, 'count': {'$sum': '$count'}}
+        project = {'_id': 0, **{field: f'$_id.{field}' for field in fields}, 'count': 1}
+        if definition.get('amount_field'):
+            group['amount'] = {'$sum': '$amount'}
+            project['amount'] = {'$round': ['$amount', 2]}
+        return {
+            'summary': name,
+            'collection': summary_collection(name),
+            'pipeline': [{'$group': group}, {'$project': project}, {'$sort': {'count': -1}}]
+        }
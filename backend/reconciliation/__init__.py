@@ -0,0 +1,34 @@
+"""
+Reconciliation Engine Module
+Vectorized matching of two source collections into matchingResult documents,
+the compiled matching rule executor, sharded multi-process runs and the
+vectorized discrepancy detector
+"""
+from .columnar import SourceTable, load_source_table
+from .blocking import BlockingIndex
+from .matcher import MatchSpec, MatchOutcome, match_tables
+from .engine import EngineError, ReconciliationEngine, run_reconciliation
+from .rules import RuleCompileError, RulePlan, RuleExecutor, compile_rules
+from .coordinator import ShardedReconciliation, run_sharded_reconciliation
+from .detector import DetectionBatch, DiscrepancyDetector, detect_discrepancies
+
+__all__ = [
+    'SourceTable',
+    'load_source_table',
+    'BlockingIndex',
+    'MatchSpec',
+    'MatchOutcome',
+    'match_tables',
+    'EngineError',
+    'ReconciliationEngine',
+    'run_reconciliation',
+    'RuleCompileError',
+    'RulePlan',
+    'RuleExecutor',
+    'compile_rules',
+    'ShardedReconciliation',
+    'run_sharded_reconciliation',
+    'DetectionBatch',
+    'DiscrepancyDetector',
+    'detect_discrepancies'
+]
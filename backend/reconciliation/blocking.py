@@ -0,0 +1,312 @@
+"""
+Blocking Index
+Candidate generation for fuzzy transaction matching. Records are placed in
+blocks by key fields, amount bucket, date window and merchant name
+n-grams, and only records sharing a block are compared, instead of every
+left record with every right record:
+- amount and date buckets are twice the tolerance wide, so a record's
+  counterparts lie in its own bucket or the nearer neighbour bucket (two
+  probes per dimension)
+- names use prefix filtering: two n-gram sets with Jaccard similarity of
+  at least t share one of the |x| - ceil(t * |x|) + 1 rarest n-grams of
+  each set, so only those n-grams are indexed
+Blocking loses no pair within the tolerances and the name threshold.
+"""
+import itertools
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+NGRAM_SIZE = int(os.getenv('RECON_NGRAM_SIZE', 3))
+
+# Left records whose block probes are joined at once (bounds memory)
+BLOCK_CHUNK_ROWS = 200_000
+
+# Guards bucket boundaries against float rounding
+_EPSILON = 1e-9
+
+
+def name_ngrams(name: str, size: int = NGRAM_SIZE) -> List[str]:
+    """Distinct character n-grams of a normalized name (padded, so short names have some)"""
+    if not name:
+        return []
+    padded = f' {name} '
+    if len(padded) <= size:
+        return [padded]
+    return list(dict.fromkeys(padded[i:i + size] for i in range(len(padded) - size + 1)))
+
+
+class NgramSets:
+    """
+    N-gram sets of the names of both tables as flat arrays
+
+    Left row i is set i and right row j is set len(left) + j. Token ids
+    rank n-grams by ascending frequency over both tables, and each set's
+    tokens are sorted, so a set starts with its rarest n-grams.
+    """
+
+    def __init__(self, left_names: Sequence[str], right_names: Sequence[str], size: int = NGRAM_SIZE):
+        grams = [name_ngrams(name, size) for name in itertools.chain(left_names, right_names)]
+        self.left_count = len(left_names)
+        self.lengths = np.fromiter(map(len, grams), dtype=np.int64, count=len(grams))
+        self.offsets = np.concatenate([[0], np.cumsum(self.lengths)]).astype(np.int64)
+
+        flat = np.array(list(itertools.chain.from_iterable(grams)), dtype=object)
+        codes, uniques = pd.factorize(flat)
+        frequency = np.bincount(codes, minlength=len(uniques))
+        rank = np.empty(len(uniques), dtype=np.int64)
+        rank[np.argsort(frequency, kind='stable')] = np.arange(len(uniques))
+        tokens = rank[codes] if len(codes) else np.empty(0, dtype=np.int64)
+        owner = np.repeat(np.arange(len(grams)), self.lengths)
+        self.tokens = tokens[np.lexsort((tokens, owner))]
+        self.vocabulary = len(uniques)
+
+    def gather(self, sets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(position in sets, token) for every token of the given sets"""
+        counts = self.lengths[sets]
+        position = np.repeat(np.arange(len(sets)), counts)
+        starts = np.repeat(self.offsets[sets], counts)
+        within = np.arange(len(position)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return position, self.tokens[starts + within]
+
+    def prefixes(self, sets: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(position in sets, token) for the prefix-filtering tokens of the given sets"""
+        position, tokens = self.gather(sets)
+        counts = self.lengths[sets]
+        keep = counts - np.ceil(threshold * counts - _EPSILON).astype(np.int64) + 1
+        within = np.arange(len(position)) - np.repeat(np.cumsum(counts) - counts, counts)
+        mask = within < np.minimum(keep, counts)[position]
+        return position[mask], tokens[mask]
+
+    def jaccard(self, left_sets: np.ndarray, right_sets: np.ndarray) -> np.ndarray:
+        """Jaccard similarity of each (left set, right set) pair (0 when a set is empty)"""
+        left_position, left_tokens = self.gather(left_sets)
+        right_position, right_tokens = self.gather(right_sets)
+        vocabulary = max(self.vocabulary, 1)
+        shared = np.isin(left_position * vocabulary + left_tokens,
+                         right_position * vocabulary + right_tokens, assume_unique=True)
+        intersection = np.bincount(left_position[shared], minlength=len(left_sets))
+        union = self.lengths[left_sets] + self.lengths[right_sets] - intersection
+        return np.divide(intersection, union, out=np.zeros(len(left_sets)), where=union > 0)
+
+
+def _buckets(values: np.ndarray, half_width: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bucket of each value and the neighbour bucket that can hold values
+    within half_width of it
+
+    Buckets are 2 * half_width wide, so [value - half_width, value + half_width]
+    touches the own bucket and at most one neighbour.
+    """
+    if not np.isfinite(half_width):
+        zeros = np.zeros(len(values), dtype=np.int64)
+        return zeros, zeros
+    if half_width <= 0:
+        bucket = np.floor(values).astype(np.int64)
+        return bucket, bucket
+    width = 2 * half_width
+    bucket = np.floor(values / width)
+    neighbour = np.where(values - bucket * width < half_width, bucket - 1, bucket + 1)
+    return bucket.astype(np.int64), neighbour.astype(np.int64)
+
+
+class BlockingIndex:
+    """
+    Candidate pairs and their verification for fuzzy one-to-one matching
+    """
+
+    def __init__(self, amount_tolerance: float = 0.0, amount_tolerance_pct: float = 0.0,
+                 date_window_days: Optional[int] = 0, name_similarity: float = 0.0,
+                 ngram_size: int = NGRAM_SIZE):
+        """
+        Initialize the index
+
+        Args:
+            amount_tolerance: Absolute amount difference accepted
+            amount_tolerance_pct: Amount difference accepted, in percent of the left amount
+            date_window_days: Date difference accepted in days (None: dates are not compared)
+            name_similarity: Minimum Jaccard similarity of the name n-grams
+                             (0: names are not compared)
+            ngram_size: Characters per name n-gram
+        """
+        self.amount_tolerance = amount_tolerance
+        self.amount_tolerance_pct = amount_tolerance_pct
+        self.date_window_days = date_window_days
+        self.name_similarity = name_similarity
+        self.ngram_size = ngram_size
+        self.ngrams: Optional[NgramSets] = None
+        self.stats: Dict[str, Any] = {}
+
+    def tolerance_cents(self, left_cents: np.ndarray) -> np.ndarray:
+        """Accepted amount difference in cents per left amount (with half a cent of rounding)"""
+        return np.maximum(self.amount_tolerance * 100,
+                          np.abs(left_cents) * self.amount_tolerance_pct / 100) + 0.5
+
+    def amount_scale(self, cents: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Amounts on a scale where accepted differences are at most a fixed half width
+
+        Absolute tolerances use cents directly. Percentage tolerances use
+        sign(x) * log(1 + |x| / c) with c = absolute tolerance / pct: amounts
+        within max(absolute, pct * |x|) of x are then within pct / (1 - pct).
+        """
+        pct = self.amount_tolerance_pct / 100
+        absolute = self.amount_tolerance * 100 + 0.5
+        if pct <= 0:
+            return cents, absolute + _EPSILON
+        if pct >= 1:
+            return cents, math.inf
+        scale = absolute / pct
+        return np.sign(cents) * np.log1p(np.abs(cents) / scale), pct / (1 - pct) + _EPSILON
+
+    def prepare(self, left, right):
+        """Build the name n-gram sets of both tables (once per pair of tables)"""
+        if self.name_similarity > 0 and self.ngrams is None:
+            self.ngrams = NgramSets(left.names, right.names, self.ngram_size)
+
+    def candidate_pairs(self, left, right, left_rows: np.ndarray, right_rows: np.ndarray,
+                        left_block: np.ndarray, right_block: np.ndarray
+                        ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distinct (left row, right row) pairs sharing a block
+
+        Args:
+            left: Left SourceTable
+            right: Right SourceTable
+            left_rows: Left rows to match
+            right_rows: Right rows to match
+            left_block: Key field block code of every left row
+            right_block: Key field block code of every right row
+
+        Returns:
+            Candidate left rows and right rows
+        """
+        start = time.perf_counter()
+        self.prepare(left, right)
+        use_dates = self.date_window_days is not None
+        if use_dates:
+            left_rows = left_rows[~np.isnan(left.days[left_rows])]
+            right_rows = right_rows[~np.isnan(right.days[right_rows])]
+
+        amounts, amount_half = self.amount_scale(np.concatenate([left.cents[left_rows],
+                                                                 right.cents[right_rows]]))
+        amount_bucket, amount_neighbour = _buckets(amounts, amount_half)
+        if use_dates:
+            day_bucket, day_neighbour = _buckets(
+                np.concatenate([left.days[left_rows], right.days[right_rows]]),
+                self.date_window_days + _EPSILON if self.date_window_days else 0)
+        else:
+            day_bucket = day_neighbour = np.zeros(len(amounts), dtype=np.int64)
+
+        def tokens(sets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+            if self.ngrams is None:
+                return np.arange(len(sets)), np.zeros(len(sets), dtype=np.int64)
+            return self.ngrams.prefixes(sets, self.name_similarity)
+
+        n = len(left_rows)
+        keys = ['block', 'amount', 'day', 'token']
+        position, token = tokens(right_rows + len(left))
+        right_frame = pd.DataFrame({
+            'block': right_block[right_rows][position],
+            'amount': amount_bucket[n:][position],
+            'day': day_bucket[n:][position],
+            'token': token,
+            'right': right_rows[position]
+        })
+
+        pairs_left, pairs_right = [], []
+        for chunk_start in range(0, n, BLOCK_CHUNK_ROWS):
+            chunk = np.arange(chunk_start, min(chunk_start + BLOCK_CHUNK_ROWS, n))
+            # Up to 2 amount x 2 date probes per left row
+            probe_rows = np.concatenate([chunk] * 4)
+            probe_amount = np.concatenate([amount_bucket[chunk], amount_neighbour[chunk]] * 2)
+            probe_day = np.concatenate([day_bucket[chunk]] * 2 + [day_neighbour[chunk]] * 2)
+            probes = pd.DataFrame({'row': probe_rows, 'amount': probe_amount, 'day': probe_day})
+            probes = probes.drop_duplicates()
+            position, token = tokens(left_rows[chunk])
+            probes = probes.merge(pd.DataFrame({'row': chunk[position], 'token': token}), on='row')
+            probes['block'] = left_block[left_rows][probes['row'].to_numpy()]
+            joined = probes.merge(right_frame, on=keys)[['row', 'right']].drop_duplicates()
+            pairs_left.append(left_rows[joined['row'].to_numpy()])
+            pairs_right.append(joined['right'].to_numpy())
+
+        candidates_left = np.concatenate(pairs_left) if pairs_left else np.empty(0, dtype=np.int64)
+        candidates_right = np.concatenate(pairs_right) if pairs_right else np.empty(0, dtype=np.int64)
+        possible = len(left_rows) * len(right_rows)
+        self.stats = {
+            'left_rows': int(len(left_rows)),
+            'right_rows': int(len(right_rows)),
+            'possible_pairs': int(possible),
+            'candidate_pairs': int(len(candidates_left)),
+            'reduction_ratio': round(1 - len(candidates_left) / possible, 6) if possible else 0.0,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+        return candidates_left.astype(np.int64), candidates_right.astype(np.int64)
+
+    def verify(self, left, right, candidates_left: np.ndarray, candidates_right: np.ndarray
+               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Check candidate pairs against the tolerances and the name threshold
+
+        Returns:
+            Mask of accepted pairs and their scores (amount difference first,
+            then date difference, then name dissimilarity; lower is closer)
+        """
+        amount_diff = np.abs(right.cents[candidates_right] - left.cents[candidates_left])
+        valid = amount_diff <= self.tolerance_cents(left.cents[candidates_left])
+        window = self.date_window_days or 0
+        score = amount_diff * (window + 1)
+        if self.date_window_days is not None:
+            date_diff = np.abs(right.days[candidates_right] - left.days[candidates_left])
+            valid &= date_diff <= window
+            score = score + np.nan_to_num(date_diff)
+        if self.ngrams is not None:
+            similarity = np.zeros(len(valid))
+            similarity[valid] = self.ngrams.jaccard(candidates_left[valid], candidates_right[valid] + len(left))
+            valid &= similarity >= self.name_similarity - _EPSILON
+            # Below one date step, so names only break ties
+            score = score + (1 - similarity) * 0.99
+        return valid, score
+
+
+def resolve_pairs(left: np.ndarray, right: np.ndarray, score: np.ndarray
+                  ) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Greedy one-to-one assignment of scored candidate pairs
+
+    Each round every left row proposes its closest remaining candidate and
+    every right row accepts its closest proposal; rows of accepted pairs
+    leave the pool. Runs until no candidates remain.
+
+    Returns:
+        Matched (left rows, right rows) and the number of rounds
+    """
+    matched_left: List[np.ndarray] = []
+    matched_right: List[np.ndarray] = []
+    rounds = 0
+    while len(left):
+        rounds += 1
+        order = np.lexsort((right, score, left))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = left[order][1:] != left[order][:-1]
+        proposals = order[first]
+
+        order = proposals[np.lexsort((left[proposals], score[proposals], right[proposals]))]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = right[order][1:] != right[order][:-1]
+        accepted = order[first]
+
+        matched_left.append(left[accepted])
+        matched_right.append(right[accepted])
+        keep = ~np.isin(left, left[accepted]) & ~np.isin(right, right[accepted])
+        left, right, score = left[keep], right[keep], score[keep]
+
+    empty = np.empty(0, dtype=np.int64)
+    return (np.concatenate(matched_left) if matched_left else empty,
+            np.concatenate(matched_right) if matched_right else empty,
+            rounds)
@@ -0,0 +1,300 @@
+"""
+Columnar Source Tables
+Loads the fields a reconciliation needs from a dynamic source collection
+into NumPy arrays (amounts in cents, dates as epoch days, key fields as
+normalized strings), so matching runs on whole columns instead of documents
+"""
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Documents fetched per cursor batch and converted per chunk
+LOAD_CHUNK_ROWS = int(os.getenv('RECON_LOAD_CHUNK_ROWS', 100000))
+
+# Date formats tried (vectorized) before pandas' per-value 'mixed' parsing
+DATE_FORMATS = ('ISO8601', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def to_cents(values: Sequence[Any]) -> np.ndarray:
+    """
+    Convert amounts to integer cents
+
+    Strings may carry currency symbols and thousands separators. Values
+    that are not numbers become NaN.
+
+    Returns:
+        float64 array of whole cents (NaN where unknown)
+    """
+    series = pd.Series(values, dtype=object)
+    numbers = pd.to_numeric(series, errors='coerce')
+    strings = series.map(type).eq(str) & numbers.isna()
+    if strings.any():
+        cleaned = series[strings].str.replace(r'[$,\s]', '', regex=True)
+        # Accounting negatives: (12.50)
+        cleaned = cleaned.str.replace(r'^\((.*)\)$', r'-\1', regex=True)
+        numbers[strings] = pd.to_numeric(cleaned, errors='coerce')
+    return np.round(numbers.to_numpy(dtype=np.float64) * 100)
+
+
+def to_epoch_days(values: Sequence[Any]) -> np.ndarray:
+    """
+    Convert dates (datetimes or strings in common formats) to days since 1970-01-01
+
+    Returns:
+        float64 array of whole days (NaN where the value is not a date)
+    """
+    series = pd.Series(values, dtype=object)
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+
+    is_datetime = series.map(type).eq(datetime)
+    if is_datetime.any():
+        parsed[is_datetime] = pd.to_datetime(series[is_datetime].tolist(), utc=True).tz_localize(None)
+
+    pending = series.map(type).eq(str)
+    for date_format in DATE_FORMATS + ('mixed',):
+        if not pending.any():
+            break
+        attempt = pd.to_datetime(series[pending], format=date_format, errors='coerce', utc=True)
+        ok = attempt.notna()
+        parsed[ok[ok].index] = attempt[ok].dt.tz_localize(None)
+        pending[ok[ok].index] = False
+
+    days = parsed.to_numpy().astype('datetime64[D]')
+    result = (days - _EPOCH).astype(np.float64)
+    result[np.isnat(days)] = np.nan
+    return result
+
+
+def date_expression(field: str) -> Dict[str, Any]:
+    """
+    Aggregation expression parsing a date field in MongoDB like to_epoch_days
+
+    BSON dates are used as they are and strings are tried with DATE_FORMATS
+    ('mixed' has no server-side equivalent). Anything else is null.
+    """
+    value = f'${field}'
+    parsed = None
+    for date_format in reversed(DATE_FORMATS):
+        attempt = {'dateString': value, 'onError': None, 'onNull': None}
+        if date_format != 'ISO8601':
+            attempt['format'] = date_format
+        attempt = {'$dateFromString': attempt}
+        parsed = attempt if parsed is None else {'$ifNull': [attempt, parsed]}
+    return {'$switch': {'branches': [
+        {'case': {'$eq': [{'$type': value}, 'date']}, 'then': value},
+        {'case': {'$eq': [{'$type': value}, 'string']}, 'then': parsed}
+    ], 'default': None}}
+
+
+def epoch_day_expression(field: str) -> Dict[str, Any]:
+    """Aggregation expression for the epoch day of a date field (null when it is not a date)"""
+    return {'$floor': {'$divide': [{'$subtract': [date_expression(field), datetime(1970, 1, 1)]},
+                                   86400000]}}
+
+
+def normalize_names(values: Sequence[Any]) -> np.ndarray:
+    """Names (e.g. merchants) upper-cased with punctuation removed and spaces collapsed"""
+    return np.array([' '.join(re.sub(r'[^0-9A-Z]+', ' ', str(value).upper()).split())
+                     if value is not None else '' for value in values], dtype=object)
+
+
+def normalize_keys(values: Sequence[Any]) -> np.ndarray:
+    """Key values as trimmed, upper-cased strings ('' when missing)"""
+    return np.array(['' if value is None else str(value).strip().upper() for value in values],
+                    dtype=object)
+
+
+class SourceTable:
+    """
+    Columns of one reconciliation source
+
+    Rows are in _id order; a row's rowIndex in results is its position,
+    unless row_numbers assigns them (incremental runs).
+    """
+
+    def __init__(self, table_id: str, name: str, ids: np.ndarray, cents: np.ndarray,
+                 days: np.ndarray, keys: Dict[str, np.ndarray],
+                 amount_field: str, date_field: Optional[str],
+                 row_numbers: Optional[np.ndarray] = None,
+                 names: Optional[np.ndarray] = None, name_field: Optional[str] = None,
+                 values: Optional[Dict[str, np.ndarray]] = None):
+        """
+        Initialize the table
+
+        Args:
+            table_id: Source collection name
+            name: Datasource display name (documentId in results)
+            ids: Document _id values
+            cents: Amounts in cents (NaN where missing)
+            days: Dates as epoch days (NaN where missing, or all NaN without a date field)
+            keys: Normalized key columns by field name
+            amount_field: Name of the amount field
+            date_field: Name of the date field, if any
+            row_numbers: rowIndex of each row (default: its position)
+            names: Normalized names for fuzzy matching, if any
+            name_field: Name of the name field, if any
+            values: Source values of the date, key and name fields by field
+                    name, as stored in fullRow (default: the normalized ones)
+        """
+        self.table_id = table_id
+        self.name = name
+        self.ids = ids
+        self.cents = cents
+        self.days = days
+        self.keys = keys
+        self.amount_field = amount_field
+        self.date_field = date_field
+        self.row_numbers = row_numbers
+        self.names = names
+        self.name_field = name_field
+        self.values = values or {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def fields(self) -> List[str]:
+        """Loaded fields in column order (colIndex in results)"""
+        return ([self.amount_field] + ([self.date_field] if self.date_field else []) + list(self.keys)
+                + ([self.name_field] if self.name_field else []))
+
+    def row_number(self, index: int) -> int:
+        """rowIndex of a row in results"""
+        return int(self.row_numbers[index]) if self.row_numbers is not None else int(index)
+
+    def numbered(self, row_numbers: np.ndarray) -> 'SourceTable':
+        """The same rows with the given rowIndex values"""
+        return SourceTable(self.table_id, self.name, self.ids, self.cents, self.days, self.keys,
+                           self.amount_field, self.date_field, np.asarray(row_numbers, dtype=np.int64),
+                           self.names, self.name_field, self.values)
+
+    def take(self, indexes: np.ndarray) -> 'SourceTable':
+        """Subset of the rows (keeping their rowIndex values)"""
+        row_numbers = self.row_numbers if self.row_numbers is not None else np.arange(len(self))
+        return SourceTable(self.table_id, self.name, self.ids[indexes], self.cents[indexes],
+                           self.days[indexes], {field: values[indexes] for field, values in self.keys.items()},
+                           self.amount_field, self.date_field, row_numbers[indexes],
+                           self.names[indexes] if self.names is not None else None, self.name_field,
+                           {field: values[indexes] for field, values in self.values.items()})
+
+    def date(self, index: int) -> Optional[str]:
+        """Parsed date of one row as YYYY-MM-DD (None without one)"""
+        days = self.days[index]
+        return None if np.isnan(days) else str(_EPOCH + int(days))
+
+    def full_row(self, index: int) -> Dict[str, Any]:
+        """Loaded fields of one row, as the fullRow of a result source"""
+        row = {'_id': self.ids[index]}
+        cents = self.cents[index]
+        row[self.amount_field] = None if np.isnan(cents) else float(cents) / 100
+        if self.date_field:
+            row[self.date_field] = self.date(index)
+        for field, values in self.keys.items():
+            row[field] = values[index]
+        if self.name_field:
+            row[self.name_field] = self.names[index]
+        for field, values in self.values.items():
+            row[field] = values[index]
+        return row
+
+
+def concat_tables(first: SourceTable, second: SourceTable) -> SourceTable:
+    """Rows of two tables of the same source, first then second (row_numbers must be set)"""
+    return SourceTable(
+        table_id=first.table_id,
+        name=first.name,
+        ids=np.concatenate([first.ids, second.ids]),
+        cents=np.concatenate([first.cents, second.cents]),
+        days=np.concatenate([first.days, second.days]),
+        keys={field: np.concatenate([values, second.keys[field]]) for field, values in first.keys.items()},
+        amount_field=first.amount_field,
+        date_field=first.date_field,
+        row_numbers=np.concatenate([first.row_numbers, second.row_numbers]),
+        names=np.concatenate([first.names, second.names]) if first.names is not None else None,
+        name_field=first.name_field,
+        values={field: np.concatenate([values, second.values[field]]) for field, values in first.values.items()}
+    )
+
+
+def load_source_table(collection, amount_field: str, date_field: Optional[str] = None,
+                      key_fields: Sequence[str] = (), query: Optional[Dict[str, Any]] = None,
+                      name: Optional[str] = None, name_field: Optional[str] = None,
+                      chunk_rows: int = LOAD_CHUNK_ROWS) -> SourceTable:
+    """
+    Load the matching columns of a source collection
+
+    Only the needed fields are projected, and each chunk of documents is
+    converted to arrays before the next is read, so memory holds the
+    columns rather than the documents.
+
+    Args:
+        collection: pymongo collection with the source records
+        amount_field: Field with the amount
+        date_field: Optional field with the transaction date
+        key_fields: Fields that must be equal for two records to match
+        query: Optional filter on the source records
+        name: Display name of the source (defaults to the collection name)
+        name_field: Optional field with the merchant/description for fuzzy matching
+        chunk_rows: Documents converted per chunk
+
+    Returns:
+        SourceTable
+    """
+    fields = ([amount_field] + ([date_field] if date_field else []) + list(key_fields)
+              + ([name_field] if name_field else []))
+    projection = {field: 1 for field in fields}
+    cursor = collection.find(query or {}, projection, batch_size=min(chunk_rows, 10000)).sort('_id', 1)
+
+    ids, cents, days, names = [], [], [], []
+    keys = {field: [] for field in key_fields}
+    # Results keep the source values of every field but the (parsed) amount
+    values = {field: [] for field in fields[1:]}
+    chunk: List[Dict[str, Any]] = []
+
+    def convert():
+        ids.append(np.array([doc['_id'] for doc in chunk], dtype=object))
+        cents.append(to_cents([doc.get(amount_field) for doc in chunk]))
+        if date_field:
+            days.append(to_epoch_days([doc.get(date_field) for doc in chunk]))
+        for field in key_fields:
+            keys[field].append(normalize_keys([doc.get(field) for doc in chunk]))
+        if name_field:
+            names.append(normalize_names([doc.get(name_field) for doc in chunk]))
+        for field, parts in values.items():
+            column = np.empty(len(chunk), dtype=object)
+            for position, doc in enumerate(chunk):
+                column[position] = doc.get(field)
+            parts.append(column)
+        chunk.clear()
+
+    for doc in cursor:
+        chunk.append(doc)
+        if len(chunk) >= chunk_rows:
+            convert()
+    if chunk:
+        convert()
+
+    def join(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    ids = join(ids, object)
+    return SourceTable(
+        table_id=collection.name,
+        name=name or collection.name,
+        ids=ids,
+        cents=join(cents, np.float64),
+        days=join(days, np.float64) if date_field else np.full(len(ids), np.nan),
+        keys={field: join(parts, object) for field, parts in keys.items()},
+        amount_field=amount_field,
+        date_field=date_field,
+        names=join(names, object) if name_field else None,
+        name_field=name_field,
+        values={field: join(parts, object) for field, parts in values.items()}
+    )
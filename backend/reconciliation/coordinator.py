@@ -0,0 +1,904 @@
+"""
+Sharded Reconciliation Runs
+Splits a reconciliation into partitions and runs them on a process pool,
+each worker process with its own MongoDB connection:
+- by tenant (workspaceId / organizationId): the matching methods of each
+  tenant form one partition and are reconciled by the engine as usual
+- by date range: one pair of sources is split into ranges of its date
+  fields; workers match and write their range, rows left unmatched within
+  the date window of a range boundary are matched together afterwards
+  (seam pass), and the pages are merged into one result with bulk updates
+Runs are tracked with per-partition status, rows written and timings.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import MongoClient, UpdateMany
+
+from data_ingestion.jobs import COMPLETED, FAILED, QUEUED, RUNNING
+from .columnar import date_expression, epoch_day_expression
+from .engine import (SIDES, STATE_COLLECTION, WATERMARK_FIELD, EngineError, ReconciliationEngine,
+                     and_query, filter_key)
+from .matcher import MatchOutcome, MatchSpec, match_tables
+
+
+# Worker processes per sharded run
+SHARD_WORKERS = int(os.getenv('RECON_SHARD_WORKERS', os.cpu_count() or 2))
+# Date-range partitions per worker (several per worker even out uneven ranges)
+DATE_PARTITIONS_PER_WORKER = int(os.getenv('RECON_DATE_PARTITIONS_PER_WORKER', 2))
+# forkserver workers start from a clean single-threaded process (never a fork of the API)
+START_METHOD = os.getenv('RECON_SHARD_START_METHOD',
+                         'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+
+TENANT_FIELDS = ('workspaceId', 'organizationId')
+PARTITION_BY_DATE = 'date'
+SEAM_PARTITION = 'seams'
+UNDATED_PARTITION = 'undated'
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _reporter(events, partition_id: str) -> Optional[Callable[[int], None]]:
+    """Progress callback forwarding rows written to the coordinator"""
+    if events is None:
+        return None
+    return lambda rows: events.put((partition_id, 'rows', rows))
+
+
+def run_tenant_partition(mongo_uri: str, db_name: str, spec: MatchSpec, partition: Dict[str, Any],
+                         params: Dict[str, Any], events=None) -> Dict[str, Any]:
+    """
+    Worker: reconcile every matching method of one tenant
+
+    Args:
+        mongo_uri: MongoDB connection URI
+        db_name: Database name
+        spec: Match specification
+        partition: Tenant partition from plan_tenants
+        params: Arguments for ReconciliationEngine.run
+        events: Optional queue receiving progress events
+
+    Returns:
+        Partition result with the engine result of each method
+    """
+    started = time.perf_counter()
+    if events is not None:
+        events.put((partition['id'], 'started', os.getpid()))
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    methods = []
+    try:
+        for method_id in partition['methods']:
+            engine = ReconciliationEngine(mongo_uri, db_name, client=client)
+            result = engine.run(spec, matching_method_id=method_id,
+                                progress=_reporter(events, partition['id']), **params)
+            methods.append({'matching_method_id': method_id, **result})
+    finally:
+        client.close()
+
+    errors = [f"{method['matching_method_id']}: {method['error']}" for method in methods if method['error']]
+    return {
+        'partition': partition['id'],
+        'pid': os.getpid(),
+        'success': not errors,
+        'error': '; '.join(errors) or None,
+        'result_pages': sum(method['result_pages'] for method in methods),
+        'discrepancies_created': sum(method['discrepancies_created'] for method in methods),
+        'cell_facts_written': sum(method['cell_facts_written'] for method in methods),
+        'methods': methods,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def seam_rows(table, indexes: np.ndarray, partition: Dict[str, Any], window: int) -> np.ndarray:
+    """Positions (within indexes) of rows dated within window days of the partition's inner boundaries"""
+    days = table.days[indexes]
+    near = np.zeros(len(indexes), dtype=bool)
+    if window <= 0:
+        return near
+    with np.errstate(invalid='ignore'):
+        if partition.get('low') is not None:
+            near |= days - partition['low'] < window
+        if partition.get('high') is not None:
+            near |= partition['high'] - 1 - days < window
+    return near
+
+
+def run_date_partition(mongo_uri: str, db_name: str, spec: MatchSpec, partition: Dict[str, Any],
+                       job: Dict[str, Any], events=None) -> Dict[str, Any]:
+    """
+    Worker: match one date range of a pair of sources and write its pages
+
+    Pages are tagged with metadata.partition and numbered from 0; the
+    coordinator renumbers them. Unmatched rows near an inner boundary are
+    returned instead of written, for the seam pass.
+
+    Args:
+        mongo_uri: MongoDB connection URI
+        db_name: Database name
+        spec: Match specification
+        partition: Date partition from plan_dates
+        job: Run settings shared by all partitions (match_id, sources,
+             method, filters, marks, watermark_field)
+        events: Optional queue receiving progress events
+
+    Returns:
+        Partition result with counts, held-back rows and timings
+    """
+    started = time.perf_counter()
+    if events is not None:
+        events.put((partition['id'], 'started', os.getpid()))
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    engine = ReconciliationEngine(mongo_uri, db_name, client=client)
+    timings: Dict[str, float] = {}
+    try:
+        engine.connect()
+        sources = job['sources']
+        left, right = engine.load_tables(spec, [
+            (SIDES[side], side, sources[side],
+             and_query(job['filters'][side], partition['queries'][side],
+                       engine.marked_query(job['watermark_field'], high=job['marks'][side], full=True)))
+            for side in (0, 1)
+        ], timings)
+        left = left.numbered(partition['offsets'][0] + np.arange(len(left)))
+        right = right.numbered(partition['offsets'][1] + np.arange(len(right)))
+
+        start = time.perf_counter()
+        outcome = match_tables(left, right, spec)
+        timings['match'] = time.perf_counter() - start
+
+        window = spec.date_window_days if spec.date_fields else 0
+        held = [seam_rows(table, unmatched, partition, window)
+                for table, unmatched in ((left, outcome.unmatched_left), (right, outcome.unmatched_right))]
+        kept = MatchOutcome(outcome.left_index, outcome.right_index, outcome.exact,
+                            outcome.unmatched_left[~held[0]], outcome.unmatched_right[~held[1]],
+                            outcome.timings, outcome.rounds)
+        matches = len(kept.left_index)
+        discrepancies = len(kept.unmatched_left) + len(kept.unmatched_right)
+
+        start = time.perf_counter()
+        written = {'result_pages': 0, 'discrepancies_created': 0, 'cell_facts_written': 0, 'error': None}
+        if matches + discrepancies:
+            header = engine.result_header(job['match_id'], left, right, spec, sources[0], sources[1],
+                                          job['method'], 0, 0)
+            header['metadata']['partition'] = partition['id']
+            written = engine.write_pages(engine.iter_pages(engine.iter_rows(left, right, kept, spec),
+                                                           header, 0),
+                                         _reporter(events, partition['id']))
+        timings['write'] = time.perf_counter() - start
+
+        held_rows = []
+        for table, unmatched, near in ((left, outcome.unmatched_left, held[0]),
+                                       (right, outcome.unmatched_right, held[1])):
+            indexes = unmatched[near]
+            held_rows.append({'ids': table.ids[indexes].tolist(),
+                              'rows': table.row_numbers[indexes].tolist()})
+        return {
+            'partition': partition['id'],
+            'pid': os.getpid(),
+            'success': written['error'] is None,
+            **written,
+            'records': [len(left), len(right)],
+            'matches': matches,
+            'discrepancies': discrepancies,
+            'summary': kept.summary(),
+            'held': held_rows,
+            'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            'seconds': time.perf_counter() - started
+        }
+    finally:
+        client.close()
+
+
+class ShardedRun:
+    """
+    Progress of one sharded reconciliation
+    """
+
+    def __init__(self, partition_by: str, params: Dict[str, Any]):
+        """
+        Initialize the run
+
+        Args:
+            partition_by: Tenant field or 'date'
+            params: Request parameters (reported back in snapshots)
+        """
+        self.run_id = uuid.uuid4().hex
+        self.partition_by = partition_by
+        self.params = params
+        self.status = QUEUED
+        self.stage = 'queued'
+        self.partitions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started = None
+        self._elapsed = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def mark_running(self):
+        self.status = RUNNING
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+
+    def mark_finished(self, status: str, error: Optional[str] = None):
+        self._elapsed = time.perf_counter() - self._started
+        self.finished_at = datetime.utcnow()
+        self.error = error
+        self.status = status
+        self.stage = status
+
+    def planned(self, plan: List[Dict[str, Any]]):
+        """Register the partitions of the run"""
+        with self._lock:
+            for partition in plan:
+                self.partitions[partition['id']] = {
+                    'id': partition['id'],
+                    'status': QUEUED,
+                    'estimated_rows': partition['estimated_rows'],
+                    'rows_written': 0,
+                    'pid': None,
+                    'seconds': None,
+                    'error': None
+                }
+
+    def event(self, partition_id: str, kind: str, value: Any):
+        """Apply a worker progress event"""
+        with self._lock:
+            partition = self.partitions.get(partition_id)
+            if partition is None:
+                return
+            if kind == 'started' and partition['status'] == QUEUED:
+                partition['status'] = RUNNING
+                partition['pid'] = value
+            elif kind == 'rows':
+                partition['rows_written'] += value
+
+    def partition_finished(self, partition_id: str, result: Dict[str, Any]):
+        with self._lock:
+            partition = self.partitions[partition_id]
+            partition['status'] = COMPLETED if result['success'] else FAILED
+            partition['seconds'] = round(result.get('seconds') or 0.0, 3)
+            partition['error'] = result.get('error')
+            partition['pid'] = result.get('pid', partition['pid'])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Report the run state
+
+        Returns:
+            Dictionary with status, stage, partition progress and result
+        """
+        if self._elapsed is not None:
+            elapsed = self._elapsed
+        elif self._started is not None:
+            elapsed = time.perf_counter() - self._started
+        else:
+            elapsed = 0.0
+        with self._lock:
+            partitions = [dict(partition) for partition in self.partitions.values()]
+        finished = sum(1 for partition in partitions if partition['status'] in (COMPLETED, FAILED))
+        return {
+            'run_id': self.run_id,
+            'partition_by': self.partition_by,
+            'status': self.status,
+            'stage': self.stage,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'partitions_total': len(partitions),
+            'partitions_finished': finished,
+            'progress': round(finished / len(partitions), 4) if partitions else 0.0,
+            'rows_written': sum(partition['rows_written'] for partition in partitions),
+            'elapsed_seconds': round(elapsed, 3),
+            'partitions': partitions,
+            'error': self.error,
+            'result': self.result
+        }
+
+
+class ShardedReconciliation:
+    """
+    Plans partitions, fans them out to worker processes and merges the results
+    """
+
+    def __init__(self, mongo_uri: str, db_name: str, workers: int = SHARD_WORKERS,
+                 client: Optional[MongoClient] = None):
+        """
+        Initialize the coordinator
+
+        Args:
+            mongo_uri: MongoDB connection URI (workers connect with it)
+            db_name: Database name
+            workers: Worker processes
+            client: Shared MongoClient for the coordinator's own reads and writes
+        """
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.workers = max(int(workers), 1)
+        self.engine = ReconciliationEngine(mongo_uri, db_name, client=client)
+        self.db = None
+
+    # ---------- Planning ----------
+
+    def plan_tenants(self, field: str, method_filter: Optional[Dict] = None) -> List[Dict[str, Any]]:
+        """
+        One partition per tenant with all its matching methods
+
+        A method belongs to the tenant in its own field, or else in the field
+        of its first datasource that has one.
+        """
+        methods = list(self.db['matchmethod'].find(method_filter or {}, {'datasourceIds': 1, field: 1}))
+        if not methods:
+            raise EngineError('No matching methods to reconcile')
+        ids = [i for method in methods for i in method.get('datasourceIds') or []]
+        datasources = {doc['_id']: doc for doc in self.db['datasources'].find(
+            {'_id': {'$in': ids}}, {field: 1, 'collectionId': 1})}
+        sizes: Dict[str, int] = {}
+
+        def size(collection: Optional[str]) -> int:
+            if collection and collection not in sizes:
+                sizes[collection] = self.db[collection].estimated_document_count()
+            return sizes.get(collection, 0)
+
+        groups: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        for method in methods:
+            linked = [datasources[i] for i in method.get('datasourceIds') or [] if i in datasources]
+            owner = method.get(field, next((doc[field] for doc in linked if field in doc), None))
+            group = groups.setdefault(owner, {'id': f'{field}={owner}', 'kind': 'tenant', 'key': {field: owner},
+                                              'methods': [], 'estimated_rows': 0})
+            group['methods'].append(str(method['_id']))
+            group['estimated_rows'] += sum(size(doc.get('collectionId')) for doc in linked[:2])
+        return list(groups.values())
+
+    def day_counts(self, spec: MatchSpec, sources: List[Dict[str, Any]],
+                   filters: Tuple[Optional[Dict], Optional[Dict]], marks: List[Any],
+                   watermark_field: str) -> List[Dict[Optional[int], int]]:
+        """
+        Rows per parsed date of each source, one aggregation per source
+
+        Returns:
+            Per side, epoch day -> rows (None: rows whose date field is not a date)
+        """
+        def count(side: int) -> Dict[Optional[int], int]:
+            query = and_query(filters[side],
+                              self.engine.marked_query(watermark_field, high=marks[side], full=True))
+            pipeline = ([{'$match': query}] if query else []) + [
+                {'$group': {'_id': epoch_day_expression(spec.date_fields[side]), 'rows': {'$sum': 1}}}
+            ]
+            return {None if doc['_id'] is None else int(doc['_id']): doc['rows']
+                    for doc in self.db[sources[side]['collection']].aggregate(pipeline, allowDiskUse=True)}
+
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix='recon-plan') as executor:
+            return list(executor.map(count, (0, 1)))
+
+    @staticmethod
+    def date_query(field: str, start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+        """Rows whose parsed date is in [start, end), or is not a date when both are None"""
+        parsed = date_expression(field)
+        if start is None and end is None:
+            return {'$expr': {'$eq': [parsed, None]}}
+        return {'$expr': {'$and': [{'$gte': [parsed, start]}, {'$lt': [parsed, end]}]}}
+
+    def plan_dates(self, spec: MatchSpec, sources: List[Dict[str, Any]],
+                   filters: Tuple[Optional[Dict], Optional[Dict]], marks: List[Any],
+                   watermark_field: str, partitions: int) -> List[Dict[str, Any]]:
+        """
+        Date-range partitions of one pair of sources
+
+        Ranges are whole UTC days of equal length over the parsed dates,
+        BSON dates and date strings alike. Rows whose date field is not a
+        date (missing, or unparseable) form one more partition. Each
+        partition's rows are counted up front from the per-day counts, so
+        workers can number their rows (rowIndex) without overlapping.
+        """
+        if not spec.date_fields:
+            raise EngineError('Date partitioning needs a date_field')
+        fields = spec.date_fields
+        counts = self.day_counts(spec, sources, filters, marks, watermark_field)
+        days = sorted({day for side in counts for day in side if day is not None})
+        plan = []
+        if days:
+            first, last = days[0], days[-1]
+            count = max(min(partitions, last - first + 1), 1)
+            edges = np.unique(np.round(np.linspace(first, last + 1, count + 1)).astype(int)).tolist()
+            for i, (low, high) in enumerate(zip(edges[:-1], edges[1:])):
+                start, end = _EPOCH + timedelta(days=low), _EPOCH + timedelta(days=high)
+                plan.append({
+                    'id': f"{start:%Y-%m-%d}..{end - timedelta(days=1):%Y-%m-%d}",
+                    'kind': PARTITION_BY_DATE,
+                    'queries': [self.date_query(field, start, end) for field in fields],
+                    'rows': [sum(rows for day, rows in side.items() if day is not None and low <= day < high)
+                             for side in counts],
+                    'low': low if i > 0 else None,
+                    'high': high if i < len(edges) - 2 else None
+                })
+        plan.append({'id': UNDATED_PARTITION, 'kind': PARTITION_BY_DATE,
+                     'queries': [self.date_query(field, None, None) for field in fields],
+                     'rows': [side.get(None, 0) for side in counts],
+                     'low': None, 'high': None})
+
+        offsets = [0, 0]
+        planned = []
+        for partition in plan:
+            rows = partition['rows']
+            if not any(rows):
+                continue
+            partition['offsets'] = list(offsets)
+            partition['estimated_rows'] = sum(rows)
+            offsets = [offset + n for offset, n in zip(offsets, rows)]
+            planned.append(partition)
+        return planned
+
+    # ---------- Execution ----------
+
+    def execute(self, worker: Callable[..., Dict[str, Any]], plan: List[Dict[str, Any]], spec: MatchSpec,
+                job: Dict[str, Any], tracker: ShardedRun) -> List[Dict[str, Any]]:
+        """
+        Run the partitions on a process pool, largest first
+
+        Returns:
+            Partition results in plan order
+        """
+        if not plan:
+            return []
+        context = multiprocessing.get_context(START_METHOD)
+        results: Dict[str, Dict[str, Any]] = {}
+
+        with context.Manager() as manager:
+            events = manager.Queue()
+
+            def drain():
+                while True:
+                    try:
+                        tracker.event(*events.get_nowait())
+                    except queue.Empty:
+                        return
+
+            workers = min(self.workers, len(plan))
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+                futures = {pool.submit(worker, self.mongo_uri, self.db_name, spec, partition, job, events): partition
+                           for partition in sorted(plan, key=lambda p: -p['estimated_rows'])}
+                pending = set(futures)
+                while pending:
+                    done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    drain()
+                    for future in done:
+                        partition = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            result = {'partition': partition['id'], 'success': False,
+                                      'error': f'Partition failed: {str(e)}'}
+                        results[partition['id']] = result
+                        tracker.partition_finished(partition['id'], result)
+                        icon = '✅' if result['success'] else '❌'
+                        print(f"{icon} Partition {partition['id']} finished in {result.get('seconds', 0):.1f}s "
+                              f"({len(results)}/{len(plan)})")
+                drain()
+        return [results[partition['id']] for partition in plan]
+
+    def run(self, spec: MatchSpec, partition_by: str = TENANT_FIELDS[0], partitions: Optional[int] = None,
+            matching_method_id: Optional[str] = None, method_filter: Optional[Dict] = None,
+            left_collection: Optional[str] = None, right_collection: Optional[str] = None,
+            left_filter: Optional[Dict] = None, right_filter: Optional[Dict] = None,
+            replace_existing: bool = True, incremental: bool = False,
+            watermark_field: str = WATERMARK_FIELD, tracker: Optional[ShardedRun] = None) -> Dict[str, Any]:
+        """
+        Run a sharded reconciliation
+
+        Args:
+            spec: Match specification
+            partition_by: 'workspaceId' or 'organizationId' (every matching
+                          method, grouped by tenant) or 'date' (one pair of
+                          sources split into date ranges)
+            partitions: Date ranges (default: workers x RECON_DATE_PARTITIONS_PER_WORKER)
+            matching_method_id: Method whose sources are split by date
+            method_filter: Optional query selecting the methods of a tenant run
+            left_collection: Left source for date runs (overrides the method's)
+            right_collection: Right source for date runs (overrides the method's)
+            left_filter: Optional query on the left records
+            right_filter: Optional query on the right records
+            replace_existing: Delete earlier engine results for the same sources once
+                              the new run is written
+            incremental: Tenant runs: reconcile each method incrementally.
+                         Date runs: run the engine incrementally in-process
+                         when a usable earlier run exists (deltas are small)
+            watermark_field: Source field whose value increases as rows arrive
+            tracker: Optional ShardedRun receiving progress
+
+        Returns:
+            Result dictionary with merged counts, per-partition results and timings
+        """
+        tracker = tracker or ShardedRun(partition_by, {})
+        result = {
+            'success': False,
+            'partition_by': partition_by,
+            'workers': self.workers,
+            'result_pages': 0,
+            'discrepancies_created': 0,
+            'cell_facts_written': 0,
+            'partitions': [],
+            'error': None
+        }
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+
+        try:
+            if not self.engine.connect():
+                result['error'] = 'Failed to connect to MongoDB'
+                return result
+            self.db = self.engine.db
+
+            try:
+                if partition_by in TENANT_FIELDS:
+                    result.update(self.run_tenants(spec, partition_by, method_filter, {
+                        'left_filter': left_filter, 'right_filter': right_filter,
+                        'replace_existing': replace_existing, 'incremental': incremental,
+                        'watermark_field': watermark_field
+                    }, timings, tracker))
+                elif partition_by == PARTITION_BY_DATE:
+                    result.update(self.run_dates(spec, partitions, matching_method_id, left_collection,
+                                                 right_collection, (left_filter, right_filter), replace_existing,
+                                                 incremental, watermark_field, timings, tracker))
+                else:
+                    raise EngineError(f"Unknown partition_by '{partition_by}' "
+                                      f"(use {', '.join(TENANT_FIELDS)} or {PARTITION_BY_DATE})")
+            except EngineError as e:
+                result['error'] = f'Invalid reconciliation request: {str(e)}'
+                return result
+
+            failed = [partition for partition in result['partitions'] if not partition['success']]
+            if failed and result['error'] is None:
+                result['error'] = f"{len(failed)} of {len(result['partitions'])} partitions failed: " + \
+                                  '; '.join(f"{partition['partition']}: {partition['error']}" for partition in failed)
+            result['success'] = result['error'] is None
+
+        except Exception as e:
+            result['error'] = f'Sharded reconciliation failed: {str(e)}'
+        finally:
+            timings['total'] = time.perf_counter() - started
+            result['timings'] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+            busy = sum(partition.get('seconds') or 0.0 for partition in result['partitions'])
+            if timings.get('partitions'):
+                # Partition seconds per wall-clock second: close to workers when scaling linearly
+                result['parallelism'] = round(busy / timings['partitions'], 2)
+
+        return result
+
+    def run_tenants(self, spec: MatchSpec, field: str, method_filter: Optional[Dict],
+                    params: Dict[str, Any], timings: Dict[str, float], tracker: ShardedRun) -> Dict[str, Any]:
+        """Reconcile every matching method, one partition per tenant"""
+        start = time.perf_counter()
+        plan = self.plan_tenants(field, method_filter)
+        tracker.planned(plan)
+        timings['plan'] = time.perf_counter() - start
+        print(f"🧩 Reconciling {sum(len(p['methods']) for p in plan):,} matching methods "
+              f"in {len(plan):,} {field} partitions on {min(self.workers, len(plan))} workers")
+
+        start = time.perf_counter()
+        tracker.stage = 'partitions'
+        results = self.execute(run_tenant_partition, plan, spec, params, tracker)
+        timings['partitions'] = time.perf_counter() - start
+
+        summary = {'methods': 0, 'matched': 0, 'unmatched_left': 0, 'unmatched_right': 0}
+        for partition in results:
+            for method in partition.get('methods', []):
+                summary['methods'] += 1
+                for key in ('matched', 'unmatched_left', 'unmatched_right'):
+                    summary[key] += (method.get('summary') or {}).get(key, 0)
+        return {
+            'result_pages': sum(partition.get('result_pages', 0) for partition in results),
+            'discrepancies_created': sum(partition.get('discrepancies_created', 0) for partition in results),
+            'cell_facts_written': sum(partition.get('cell_facts_written', 0) for partition in results),
+            'summary': summary,
+            'partitions': results
+        }
+
+    def run_dates(self, spec: MatchSpec, partitions: Optional[int], matching_method_id: Optional[str],
+                  left_collection: Optional[str], right_collection: Optional[str],
+                  filters: Tuple[Optional[Dict], Optional[Dict]], replace_existing: bool, incremental: bool,
+                  watermark_field: str, timings: Dict[str, float], tracker: ShardedRun) -> Dict[str, Any]:
+        """Reconcile one pair of sources split into date ranges, then merge the results"""
+        engine = self.engine
+        left_source, right_source, method = engine.resolve_sources(matching_method_id, left_collection,
+                                                                   right_collection)
+        sources = [left_source, right_source]
+        state_id = engine.state_id(left_source['collection'], right_source['collection'])
+        filter_keys = [filter_key(filters[0]), filter_key(filters[1])]
+
+        if incremental and engine.usable_state(self.db[STATE_COLLECTION].find_one({'_id': state_id}),
+                                               spec, filter_keys, watermark_field):
+            tracker.stage = 'incremental'
+            result = engine.run(spec, matching_method_id=matching_method_id, left_collection=left_collection,
+                                right_collection=right_collection, left_filter=filters[0],
+                                right_filter=filters[1], incremental=True, watermark_field=watermark_field)
+            timings.update(result.pop('timings', {}))
+            return {**result, 'partitions': []}
+
+        start = time.perf_counter()
+        marks = [engine.max_mark(source['collection'], watermark_field) for source in sources]
+        plan = self.plan_dates(spec, sources, filters, marks, watermark_field,
+                               partitions or self.workers * DATE_PARTITIONS_PER_WORKER)
+        tracker.planned(plan)
+        match_id = str(uuid.uuid4())
+        timings['plan'] = time.perf_counter() - start
+        print(f"🧩 Reconciling {left_source['name']} and {right_source['name']} in {len(plan):,} date partitions "
+              f"on {min(self.workers, len(plan))} workers")
+
+        try:
+            start = time.perf_counter()
+            tracker.stage = 'partitions'
+            job = {'match_id': match_id, 'sources': sources, 'method': method, 'filters': filters,
+                   'marks': marks, 'watermark_field': watermark_field}
+            results = self.execute(run_date_partition, plan, spec, job, tracker)
+            timings['partitions'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tracker.stage = 'seams'
+            seams = self.match_seams(spec, sources, method, match_id, results,
+                                     first_page=sum(partition.get('result_pages', 0) for partition in results))
+            timings['seams'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            tracker.stage = 'merge'
+            merged = self.merge(match_id, results, seams)
+            timings['merge'] = time.perf_counter() - start
+        except Exception:
+            engine.delete_runs([match_id])
+            raise
+
+        rows_total = [sum(partition.get('records', [0, 0])[side] for partition in results) for side in (0, 1)]
+        replaced = 0
+        if seams['error'] is not None or not all(partition['success'] for partition in results):
+            # Keep the earlier results rather than a partial run
+            engine.delete_runs([match_id])
+        else:
+            if replace_existing:
+                replaced = engine.delete_previous(left_source['collection'], right_source['collection'],
+                                                  keep=match_id)
+            engine.save_state({
+                '_id': state_id,
+                'spec': spec.to_dict(),
+                'filters': filter_keys,
+                'watermarkField': watermark_field,
+                'matchId': match_id,
+                'marks': [engine.stored_mark(mark) for mark in marks],
+                'rows': rows_total,
+                'pageCount': merged['page_count'],
+                'totals': merged['totals']
+            })
+            for source in sources:
+                engine.ensure_watermark_index(source['collection'], watermark_field)
+
+        summary = {
+            'matched': merged['totals']['matches'],
+            'unmatched_left': sum(partition.get('summary', {}).get('unmatched_left', 0)
+                                  for partition in results) + seams['unmatched'][0],
+            'unmatched_right': sum(partition.get('summary', {}).get('unmatched_right', 0)
+                                   for partition in results) + seams['unmatched'][1],
+            'seam_rows': seams['held'],
+            'seam_matches': seams['matches']
+        }
+        for partition in results:
+            partition.pop('held', None)
+        return {
+            'mode': 'full',
+            'match_id': match_id,
+            'replaced_runs': replaced,
+            'result_pages': merged['result_pages'],
+            'discrepancies_created': sum(partition.get('discrepancies_created', 0) for partition in results)
+            + seams['discrepancies_created'],
+            'cell_facts_written': sum(partition.get('cell_facts_written', 0) for partition in results)
+            + seams['cell_facts_written'],
+            'left': {'collection': left_source['collection'], 'name': left_source['name'],
+                     'records': rows_total[0]},
+            'right': {'collection': right_source['collection'], 'name': right_source['name'],
+                      'records': rows_total[1]},
+            'summary': summary,
+            'page_count': merged['page_count'],
+            'totals': merged['totals'],
+            'partitions': results,
+            'error': seams['error']
+        }
+
+    def match_seams(self, spec: MatchSpec, sources: List[Dict[str, Any]], method: Optional[Dict[str, Any]],
+                    match_id: str, results: List[Dict[str, Any]], first_page: int) -> Dict[str, Any]:
+        """
+        Match the rows the partitions held back at their boundaries and write them
+
+        A pair within the date window whose rows fell on both sides of a
+        boundary has both rows within the window of that boundary, so both
+        were held back and meet here. The seam pages follow the partition
+        pages; a run without partition pages gets its (possibly empty)
+        first page here.
+        """
+        held = [{}, {}]
+        for partition in results:
+            for side, rows in enumerate(partition.get('held') or []):
+                held[side].update(zip(rows['ids'], rows['rows']))
+        left, right = self.engine.load_tables(spec, [
+            (f'seam_{SIDES[side]}', side, sources[side], {'_id': {'$in': list(held[side])}})
+            for side in (0, 1)
+        ])
+        left = left.numbered([held[0][i] for i in left.ids.tolist()])
+        right = right.numbered([held[1][i] for i in right.ids.tolist()])
+        outcome = match_tables(left, right, spec)
+
+        matches = len(outcome.left_index)
+        discrepancies = len(outcome.unmatched_left) + len(outcome.unmatched_right)
+        written = {'result_pages': 0, 'discrepancies_created': 0, 'cell_facts_written': 0, 'error': None}
+        if matches + discrepancies or first_page == 0:
+            header = self.engine.result_header(match_id, left, right, spec, sources[0], sources[1], method, 0, 0)
+            header['metadata']['partition'] = SEAM_PARTITION
+            written = self.engine.write_pages(self.engine.iter_pages(
+                self.engine.iter_rows(left, right, outcome, spec), header, 0, first_page))
+        return {
+            **written,
+            'held': [len(held[0]), len(held[1])],
+            'matches': matches,
+            'discrepancies': discrepancies,
+            'unmatched': [len(outcome.unmatched_left), len(outcome.unmatched_right)]
+        }
+
+    def merge(self, match_id: str, results: List[Dict[str, Any]], seams: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Number the partition pages consecutively and set the run totals on every page
+
+        Returns:
+            Page count, pages written and the run totals
+        """
+        requests = []
+        offset = 0
+        for partition in results:
+            if offset and partition.get('result_pages'):
+                requests.append(UpdateMany({'matchId': match_id, 'metadata.partition': partition['partition']},
+                                           {'$inc': {'metadata.page': offset}}))
+            offset += partition.get('result_pages', 0)
+        totals = {
+            'matches': sum(partition.get('matches', 0) for partition in results) + seams['matches'],
+            'discrepancies': sum(partition.get('discrepancies', 0) for partition in results) + seams['discrepancies']
+        }
+        page_count = max(offset + seams['result_pages'], 1)
+        requests.append(UpdateMany({'matchId': match_id}, {'$set': {
+            'metadata.pageCount': page_count,
+            'metadata.matchSummary.totalMatches': totals['matches'],
+            'metadata.matchSummary.totalDiscrepancies': totals['discrepancies']
+        }}))
+        self.db['matchingResult'].bulk_write(requests, ordered=True)
+        return {'page_count': page_count, 'result_pages': offset + seams['result_pages'], 'totals': totals}
+
+    def close(self):
+        self.engine.close()
+
+
+class ShardedRunManager:
+    """
+    Background runner for sharded reconciliations
+
+    Each run already uses every worker process, so runs are queued and
+    executed max_runs at a time. Finished runs are kept up to max_retained_runs.
+    """
+
+    def __init__(self, max_runs: int = 1, max_retained_runs: int = 50):
+        """
+        Initialize the manager
+
+        Args:
+            max_runs: Sharded runs allowed at the same time
+            max_retained_runs: Finished runs kept for status queries
+        """
+        self.max_retained_runs = max_retained_runs
+        self._executor = ThreadPoolExecutor(max_workers=max_runs, thread_name_prefix='recon-shard')
+        self._runs: "OrderedDict[str, ShardedRun]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, mongo_uri: str, db_name: str, spec: MatchSpec, workers: Optional[int] = None,
+               client: Optional[MongoClient] = None, **params) -> ShardedRun:
+        """
+        Queue a sharded reconciliation
+
+        Args:
+            mongo_uri: MongoDB connection URI
+            db_name: Database name
+            spec: Match specification
+            workers: Worker processes (default RECON_SHARD_WORKERS)
+            client: Shared MongoClient for the coordinator
+            **params: Arguments for ShardedReconciliation.run
+
+        Returns:
+            The queued run
+        """
+        run = ShardedRun(params.get('partition_by', TENANT_FIELDS[0]),
+                         {'spec': spec.to_dict(), 'workers': workers or SHARD_WORKERS, **params})
+        with self._lock:
+            self._runs[run.run_id] = run
+            self._prune()
+        self._executor.submit(self._run, run, mongo_uri, db_name, spec, workers, client, params)
+        print(f"🧩 Queued sharded reconciliation {run.run_id} (by {run.partition_by})")
+        return run
+
+    def _run(self, run: ShardedRun, mongo_uri: str, db_name: str, spec: MatchSpec,
+             workers: Optional[int], client: Optional[MongoClient], params: Dict[str, Any]):
+        run.mark_running()
+        coordinator = ShardedReconciliation(mongo_uri, db_name, workers or SHARD_WORKERS, client=client)
+        try:
+            run.result = coordinator.run(spec, tracker=run, **params)
+            if run.result['success']:
+                run.mark_finished(COMPLETED)
+            else:
+                run.mark_finished(FAILED, run.result['error'])
+        except Exception as e:
+            run.mark_finished(FAILED, f'Sharded reconciliation failed: {str(e)}')
+        finally:
+            coordinator.close()
+        icon = '✅' if run.status == COMPLETED else '❌'
+        print(f"{icon} Sharded reconciliation {run.run_id} {run.status}")
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a run, or None if it is unknown or was pruned"""
+        with self._lock:
+            run = self._runs.get(run_id)
+        return run.snapshot() if run else None
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """Snapshots of all retained runs, newest first, without results and partitions"""
+        with self._lock:
+            runs = list(self._runs.values())
+        snapshots = []
+        for run in reversed(runs):
+            snapshot = run.snapshot()
+            snapshot.pop('result')
+            snapshot.pop('partitions')
+            snapshots.append(snapshot)
+        return snapshots
+
+    def _prune(self):
+        """Forget the oldest finished runs beyond the retention limit"""
+        finished = [run_id for run_id, run in self._runs.items() if run.status in (COMPLETED, FAILED)]
+        for run_id in finished[:max(len(finished) - self.max_retained_runs, 0)]:
+            del self._runs[run_id]
+
+    def shutdown(self):
+        """Stop accepting runs and wait for running ones to finish"""
+        self._executor.shutdown(wait=True)
+
+
+def run_sharded_reconciliation(mongo_uri: str, db_name: str, spec: MatchSpec, workers: int = SHARD_WORKERS,
+                               client: Optional[MongoClient] = None, **params) -> Dict[str, Any]:
+    """
+    Helper function to run one sharded reconciliation in the foreground
+
+    Args:
+        mongo_uri: MongoDB URI
+        db_name: Database name
+        spec: Match specification
+        workers: Worker processes
+        client: Optional shared MongoClient for the coordinator
+        **params: Arguments for ShardedReconciliation.run
+
+    Returns:
+        Sharded reconciliation result
+    """
+    coordinator = ShardedReconciliation(mongo_uri, db_name, workers, client=client)
+    try:
+        return coordinator.run(spec, **params)
+    finally:
+        coordinator.close()
+
+
+# Singleton instance
+sharded_runs = ShardedRunManager(
+    max_runs=int(os.getenv('RECON_SHARD_RUNS', 1)),
+    max_retained_runs=int(os.getenv('RECON_SHARD_RETENTION', 50))
+)
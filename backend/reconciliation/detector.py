@@ -0,0 +1,511 @@
+"""
+Discrepancy Detector
+Classifies reconciliation rows as columns: the left/right amounts of
+matchingResult rows (or of matching engine output) are compared with
+NumPy, discrepancy type and severity come from per-rule thresholds
+applied to whole arrays, and the discrepancies - with tickets for the
+severe ones - are written through unordered bulk inserts
+"""
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo import MongoClient
+
+from data_ingestion.bulk_writer import BulkInsertPipeline
+from data_ingestion.summaries import SUMMARIES_ENABLED, SummaryStore
+from .columnar import SourceTable, to_cents
+from .engine import HIGH_SEVERITY_AMOUNT, MEDIUM_SEVERITY_AMOUNT, MISSING_COUNTERPART, as_object_id
+from .matcher import MatchOutcome
+
+
+# Marks discrepancies and tickets written by the detector (replaced on re-runs)
+DETECTOR_SOURCE = 'detector'
+
+# Result rows classified and written per batch
+DETECT_CHUNK_ROWS = int(os.getenv('DETECT_CHUNK_ROWS', 100000))
+
+# Default thresholds (a rule may override each of them)
+DEFAULT_THRESHOLDS = {
+    'tolerance': float(os.getenv('DETECT_TOLERANCE', 0.01)),
+    'medium': MEDIUM_SEVERITY_AMOUNT,
+    'high': HIGH_SEVERITY_AMOUNT,
+    'medium_pct': float(os.getenv('DETECT_MEDIUM_SEVERITY_PCT') or 'inf'),
+    'high_pct': float(os.getenv('DETECT_HIGH_SEVERITY_PCT') or 'inf'),
+    'ticket_severity': os.getenv('DETECT_TICKET_SEVERITY', 'high') or None
+}
+TICKET_DUE_DAYS = int(os.getenv('DETECT_TICKET_DUE_DAYS', 7))
+
+AMOUNT_MISMATCH = 'amount_mismatch'
+DATA_MISMATCH = 'data_mismatch'
+SEVERITIES = np.array(['low', 'medium', 'high'], dtype=object)
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2}
+
+# Status cell values meaning the row did not reconcile
+NOT_RECONCILED_VALUES = [False, 'false', 'False', 'Not Reconciled', 'Unmatched']
+
+
+class DetectionBatch:
+    """
+    Result rows to check, as columns
+
+    fields holds extra per-row arrays or constants copied into each
+    discrepancy (e.g. matchResultsId, matchedRowIndex, matchId).
+    """
+
+    def __init__(self, left_amount: np.ndarray, right_amount: np.ndarray,
+                 reconciled: Optional[np.ndarray] = None, rules: Optional[np.ndarray] = None,
+                 fields: Optional[Dict[str, Any]] = None, skip: Optional[np.ndarray] = None):
+        """
+        Initialize the batch
+
+        Args:
+            left_amount: Left amounts (NaN where the row has no left record)
+            right_amount: Right amounts (NaN where the row has no right record)
+            reconciled: Status of each row (True, False, or None when unknown)
+            rules: Matching rule name of each row (selects the thresholds)
+            fields: Extra discrepancy fields, per-row arrays or constants
+            skip: Rows that already have a discrepancy
+        """
+        count = len(left_amount)
+        self.left_amount = np.asarray(left_amount, dtype=np.float64)
+        self.right_amount = np.asarray(right_amount, dtype=np.float64)
+        self.reconciled = reconciled if reconciled is not None else np.full(count, None, dtype=object)
+        self.rules = rules if rules is not None else np.full(count, '', dtype=object)
+        self.fields = fields or {}
+        self.skip = skip if skip is not None else np.zeros(count, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.left_amount)
+
+    @classmethod
+    def from_outcome(cls, left: SourceTable, right: SourceTable, outcome: MatchOutcome,
+                     rule: str = '', fields: Optional[Dict[str, Any]] = None) -> 'DetectionBatch':
+        """
+        Rows of a match outcome, in result order (pairs, unmatched left, unmatched right)
+
+        Matched pairs are reconciled; their amounts may still differ within
+        the match tolerance. matchedRowIndex is the row's position in that order.
+        """
+        pairs, lonely_left, lonely_right = (len(outcome.left_index), len(outcome.unmatched_left),
+                                            len(outcome.unmatched_right))
+        nan_left, nan_right = np.full(lonely_left, np.nan), np.full(lonely_right, np.nan)
+        left_cents = np.concatenate([left.cents[outcome.left_index], left.cents[outcome.unmatched_left], nan_right])
+        right_cents = np.concatenate([right.cents[outcome.right_index], nan_left, right.cents[outcome.unmatched_right]])
+        reconciled = np.concatenate([np.ones(pairs, dtype=bool), np.zeros(lonely_left + lonely_right, dtype=bool)])
+        source_ids = np.concatenate([left.ids[outcome.unmatched_left], right.ids[outcome.unmatched_right]])
+        return cls(
+            left_amount=left_cents / 100,
+            right_amount=right_cents / 100,
+            reconciled=reconciled.astype(object),
+            rules=np.full(len(reconciled), rule, dtype=object),
+            fields={
+                'matchedRowIndex': np.arange(len(reconciled)),
+                'sourceRowId': np.concatenate([np.full(pairs, None, dtype=object), source_ids]),
+                **(fields or {})
+            }
+        )
+
+
+class DiscrepancyDetector:
+    """
+    Vectorized discrepancy classification and bulk discrepancy/ticket writes
+    """
+
+    def __init__(self, db, rules: Optional[Dict[str, Dict[str, Any]]] = None,
+                 create_tickets: bool = True, chunk_rows: int = DETECT_CHUNK_ROWS):
+        """
+        Initialize the detector
+
+        Args:
+            db: pymongo database
+            rules: Thresholds by matching rule name ('default' applies to
+                   every rule), each with any of tolerance, medium, high
+                   (absolute amount differences), medium_pct, high_pct
+                   (percent of the larger amount) and ticket_severity
+                   ('high', 'medium', 'low' or None for no tickets)
+            create_tickets: Create tickets for discrepancies at or above ticket_severity
+            chunk_rows: Result rows classified and written per batch
+        """
+        self.db = db
+        rules = dict(rules or {})
+        self.defaults = {**DEFAULT_THRESHOLDS, **rules.pop('default', {})}
+        self.rules = rules
+        self.create_tickets = create_tickets
+        self.chunk_rows = max(int(chunk_rows), 1)
+        self.summary_store = SummaryStore(db) if SUMMARIES_ENABLED else None
+        self._owners: Dict[Any, Dict[str, Any]] = {}
+
+    # ---------- Classification ----------
+
+    def thresholds(self, rules: np.ndarray) -> Dict[str, np.ndarray]:
+        """Threshold arrays aligned with the rows, from each row's rule"""
+        codes, names = pd.factorize(pd.Series(rules, dtype=object).fillna(''))
+        table = {key: [] for key in ('tolerance', 'medium', 'high', 'medium_pct', 'high_pct', 'ticket_rank')}
+        for name in list(names) or ['']:
+            settings = {**self.defaults, **self.rules.get(name, {})}
+            for key in ('tolerance', 'medium', 'high', 'medium_pct', 'high_pct'):
+                value = settings.get(key)
+                table[key].append(float(value) if value is not None else np.inf)
+            ticket = settings.get('ticket_severity')
+            table['ticket_rank'].append(SEVERITY_RANK.get(ticket, len(SEVERITY_RANK)) if ticket else len(SEVERITY_RANK))
+        return {key: np.asarray(values)[codes] for key, values in table.items()}
+
+    def classify(self, batch: DetectionBatch) -> Dict[str, np.ndarray]:
+        """
+        Type, severity and difference of every row
+
+        - missing_counterpart: only one side has an amount
+        - amount_mismatch: both sides differ by more than the rule's tolerance
+        - data_mismatch: amounts agree but the row is marked not reconciled
+        Severity is high or medium when the absolute difference (the amount
+        itself for missing counterparts) or its percentage of the larger
+        amount reaches the rule's threshold, otherwise low.
+
+        Returns:
+            Arrays: flagged (row is a discrepancy), type, severity, amount,
+            difference and ticket (a ticket is due)
+        """
+        left, right = batch.left_amount, batch.right_amount
+        limits = self.thresholds(batch.rules)
+        has_left, has_right = ~np.isnan(left), ~np.isnan(right)
+
+        missing = has_left ^ has_right
+        both = has_left & has_right
+        difference = np.where(both, np.round(np.nan_to_num(left) - np.nan_to_num(right), 2),
+                              np.where(has_left, np.nan_to_num(left), -np.nan_to_num(right)))
+        absolute = np.abs(difference)
+        base = np.maximum(np.abs(np.nan_to_num(left)), np.abs(np.nan_to_num(right)))
+        percent = np.divide(absolute * 100, base, out=np.zeros(len(base)), where=base > 0)
+
+        not_reconciled = pd.Series(batch.reconciled, dtype=object).isin(NOT_RECONCILED_VALUES).to_numpy()
+        mismatch = both & (absolute > limits['tolerance'] + 1e-9)
+        data_mismatch = both & ~mismatch & not_reconciled
+        flagged = (missing | mismatch | data_mismatch) & ~batch.skip
+
+        kind = np.select([missing, mismatch, data_mismatch],
+                         np.array([MISSING_COUNTERPART, AMOUNT_MISMATCH, DATA_MISMATCH], dtype=object),
+                         default=None)
+        rank = np.select([(absolute >= limits['high']) | (percent >= limits['high_pct']),
+                          (absolute >= limits['medium']) | (percent >= limits['medium_pct'])], [2, 1], default=0)
+        return {
+            'flagged': flagged,
+            'type': kind,
+            'severity': SEVERITIES[rank],
+            'amount': np.where(has_left, left, right),
+            'left': left,
+            'right': right,
+            'difference': difference,
+            'ticket': flagged & (rank >= limits['ticket_rank']) & self.create_tickets
+        }
+
+    # ---------- Documents ----------
+
+    @staticmethod
+    def _text(values: np.ndarray) -> pd.Series:
+        return pd.Series(values).round(2).astype(str)
+
+    def documents(self, batch: DetectionBatch, classified: Dict[str, np.ndarray],
+                  now: datetime) -> Dict[str, pd.DataFrame]:
+        """
+        Discrepancy and ticket documents of the flagged rows, as DataFrames
+
+        Ticket rows reference their discrepancy through pre-assigned _id values.
+        """
+        rows = np.flatnonzero(classified['flagged'])
+        kind = classified['type'][rows]
+        severity = classified['severity'][rows]
+        amount, difference = classified['amount'][rows], classified['difference'][rows]
+        left_text, right_text = self._text(classified['left'][rows]), self._text(classified['right'][rows])
+        details = np.select(
+            [kind == MISSING_COUNTERPART, kind == AMOUNT_MISMATCH],
+            [('No counterpart for amount ' + self._text(amount)).to_numpy(),
+             ('Amounts differ by ' + self._text(np.abs(difference)) + ' (' + left_text + ' vs '
+              + right_text + ')').to_numpy()],
+            default='Amounts agree but the row is not reconciled'
+        )
+
+        discrepancies = pd.DataFrame({
+            '_id': [ObjectId() for _ in range(len(rows))],
+            'type': kind,
+            'severity': severity,
+            'details': details,
+            'amount': amount,
+            'difference': difference,
+            'ruleName': batch.rules[rows]
+        })
+        for name, value in batch.fields.items():
+            discrepancies[name] = value[rows] if isinstance(value, np.ndarray) else value
+        discrepancies['source'] = DETECTOR_SOURCE
+        discrepancies['createdAt'] = now
+        discrepancies['updatedAt'] = now
+
+        ticketed = classified['ticket'][rows]
+        tickets = pd.DataFrame({
+            'name': ('Investigate ' + pd.Series(severity[ticketed]) + ' ' + pd.Series(kind[ticketed])
+                     .str.replace('_', ' ') + ' of ' + self._text(amount[ticketed])).to_numpy(),
+            'instruction': details[ticketed],
+            'status': 'Open',
+            'risk': pd.Series(severity[ticketed]).str.capitalize().to_numpy(),
+            'discrepancyId': discrepancies['_id'].to_numpy()[ticketed]
+        })
+        for name in ('profileId', 'workspaceId', 'organizationId', 'matchId'):
+            if name in discrepancies:
+                tickets[name] = discrepancies[name].to_numpy()[ticketed]
+        tickets['source'] = DETECTOR_SOURCE
+        tickets['expiresAt'] = now + timedelta(days=TICKET_DUE_DAYS)
+        tickets['createdAt'] = now
+        tickets['updatedAt'] = now
+        return {'discrepancies': discrepancies, 'tickets': tickets}
+
+    @staticmethod
+    def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """DataFrame rows as documents (NaN stored as null)"""
+        return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+    def write(self, batches: Iterator[DetectionBatch]) -> Dict[str, Any]:
+        """
+        Classify batches and insert their discrepancies and tickets
+
+        Each batch's tickets are queued right after its discrepancies, so
+        both go out in the same round of unordered bulk inserts.
+
+        Returns:
+            Counts by type and severity, documents written and timings
+        """
+        timings = {'classify': 0.0, 'documents': 0.0, 'write': 0.0}
+        counts = {'rows_scanned': 0, 'rows_skipped': 0, 'by_type': {}, 'by_severity': {}}
+        tracked = self.summary_store is not None
+        discrepancies = BulkInsertPipeline(self.db['discrepancies'], track_ids=tracked)
+        tickets = BulkInsertPipeline(self.db['ticket'], track_ids=tracked)
+        now = datetime.utcnow()
+        try:
+            for batch in batches:
+                start = time.perf_counter()
+                classified = self.classify(batch)
+                counts['rows_scanned'] += len(batch)
+                counts['rows_skipped'] += int(np.count_nonzero(batch.skip))
+                flagged = classified['flagged']
+                for key, name in (('type', 'by_type'), ('severity', 'by_severity')):
+                    values, frequency = np.unique(classified[key][flagged].astype(str), return_counts=True)
+                    for value, n in zip(values.tolist(), frequency.tolist()):
+                        counts[name][value] = counts[name].get(value, 0) + n
+                timings['classify'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                frames = self.documents(batch, classified, now)
+                records = {name: self._records(frame) for name, frame in frames.items()}
+                timings['documents'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                discrepancies.add_many(records['discrepancies'])
+                tickets.add_many(records['tickets'])
+                timings['write'] += time.perf_counter() - start
+        finally:
+            start = time.perf_counter()
+            summaries = {'discrepancies': discrepancies.close(), 'ticket': tickets.close()}
+            timings['write'] += time.perf_counter() - start
+            if tracked:
+                # Only the documents written here are added to the dashboard summaries
+                counts['summaries_refreshed'] = self.summary_store.refresh(
+                    {'discrepancies': discrepancies.inserted_ids, 'ticket': tickets.inserted_ids})
+
+        failed = {name: summary['failed'] for name, summary in summaries.items() if summary['failed']}
+        return {
+            **counts,
+            'discrepancies_created': summaries['discrepancies']['inserted'],
+            'tickets_created': summaries['ticket']['inserted'],
+            'error': (f"Failed to write {', '.join(f'{count} {name}' for name, count in failed.items())} documents"
+                      if failed else None),
+            'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}
+        }
+
+    # ---------- matchingResult input ----------
+
+    def owner(self, matching_method_id: Any) -> Dict[str, Any]:
+        """workspaceId/organizationId of a matching method (from the method or its datasources)"""
+        if matching_method_id not in self._owners:
+            owner = {}
+            method = self.db['matchmethod'].find_one({'_id': matching_method_id}) if matching_method_id else None
+            if method:
+                owner = {key: method[key] for key in ('workspaceId', 'organizationId') if key in method}
+                for datasource in self.db['datasources'].find({'_id': {'$in': method.get('datasourceIds') or []}}):
+                    for key in ('workspaceId', 'organizationId'):
+                        if key in datasource:
+                            owner.setdefault(key, datasource[key])
+            self._owners[matching_method_id] = owner
+        return self._owners[matching_method_id]
+
+    @staticmethod
+    def column_pipeline(query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Project each matchingResult page to its amount/status/rule columns
+
+        Columns are found by name (left_amount, right_amount,
+        reconciliation_status), falling back to the first, second and last
+        cell. Only values leave the server, not the cell sources.
+        """
+        def position(name: str, default: int) -> Dict[str, Any]:
+            index = {'$indexOfArray': [{'$ifNull': ['$columns.name', []]}, name]}
+            return {'$cond': [{'$gte': [index, 0]}, index, default]}
+
+        def column(name: str, default: int) -> Dict[str, Any]:
+            return {'$map': {'input': '$rows', 'as': 'row',
+                             'in': {'$arrayElemAt': ['$$row.cells.value', position(name, default)]}}}
+
+        return [
+            {'$match': query},
+            {'$project': {
+                'matchId': 1,
+                'matchingMethodId': 1,
+                'profileId': 1,
+                'left': column('left_amount', 0),
+                'right': column('right_amount', 1),
+                'status': column('reconciliation_status', -1),
+                'rule': {'$map': {'input': '$rows', 'as': 'row',
+                                  'in': {'$arrayElemAt': [{'$ifNull': ['$$row.matchingRules', []]}, 0]}}}
+            }}
+        ]
+
+    def existing_rows(self, page_ids: List[Any]) -> Dict[Any, np.ndarray]:
+        """Row positions of each page that already have a discrepancy from elsewhere (e.g. the engine)"""
+        pipeline = [
+            {'$match': {'matchResultsId': {'$in': page_ids}, 'source': {'$ne': DETECTOR_SOURCE}}},
+            {'$group': {'_id': '$matchResultsId', 'rows': {'$push': '$matchedRowIndex'}}}
+        ]
+        return {doc['_id']: np.asarray([row for row in doc['rows'] if row is not None], dtype=np.int64)
+                for doc in self.db['discrepancies'].aggregate(pipeline)}
+
+    def iter_result_batches(self, query: Dict[str, Any]) -> Iterator[DetectionBatch]:
+        """Batches of about chunk_rows result rows from the matching matchingResult pages"""
+        pages: List[Dict[str, Any]] = []
+        rows = 0
+
+        def build() -> DetectionBatch:
+            existing = self.existing_rows([page['_id'] for page in pages])
+            lengths = [len(page['left'] or []) for page in pages]
+
+            def flat(key: str) -> List[Any]:
+                return [value for page in pages for value in (page[key] or [])]
+
+            def per_page(value) -> np.ndarray:
+                return np.repeat(np.array([value(page) for page in pages] + [None], dtype=object)[:-1], lengths)
+
+            positions = np.concatenate([np.arange(n) for n in lengths]) if lengths else np.empty(0, np.int64)
+            skip = np.concatenate([np.isin(np.arange(n), existing.get(page['_id'], []))
+                                   for page, n in zip(pages, lengths)]) if lengths else np.empty(0, bool)
+            fields = {
+                'matchResultsId': per_page(lambda page: page['_id']),
+                'matchedRowIndex': positions,
+                'matchId': per_page(lambda page: page.get('matchId')),
+                'matchingMethodId': per_page(lambda page: page.get('matchingMethodId')),
+                'profileId': per_page(lambda page: page.get('profileId'))
+            }
+            for key in ('workspaceId', 'organizationId'):
+                fields[key] = per_page(lambda page: self.owner(page.get('matchingMethodId')).get(key))
+            return DetectionBatch(
+                left_amount=to_cents(flat('left')) / 100,
+                right_amount=to_cents(flat('right')) / 100,
+                reconciled=np.array(flat('status') + [None], dtype=object)[:-1],
+                rules=np.array(flat('rule') + [None], dtype=object)[:-1],
+                fields=fields,
+                skip=skip
+            )
+
+        cursor = self.db['matchingResult'].aggregate(self.column_pipeline(query), batchSize=16)
+        for page in cursor:
+            pages.append(page)
+            rows += len(page['left'] or [])
+            if rows >= self.chunk_rows:
+                yield build()
+                pages, rows = [], 0
+        if pages:
+            yield build()
+
+    def delete(self, collection: str, query: Dict[str, Any]) -> int:
+        """Delete documents, subtracting them from the dashboard summaries first"""
+        if self.summary_store is not None:
+            return self.summary_store.remove(collection, query)
+        return self.db[collection].delete_many(query).deleted_count
+
+    def detect(self, match_id: Optional[str] = None, matching_method_id: Optional[str] = None,
+               replace_existing: bool = True) -> Dict[str, Any]:
+        """
+        Detect discrepancies in stored matchingResult rows
+
+        Args:
+            match_id: Only pages of this run
+            matching_method_id: Only pages of this matching method
+            replace_existing: Remove the detector's earlier discrepancies
+                              (and their tickets) for the same pages first
+
+        Returns:
+            Result dictionary with counts by type/severity, documents written and timings
+        """
+        result = {'success': False, 'discrepancies_replaced': 0, 'error': None}
+        started = time.perf_counter()
+        try:
+            query = {}
+            if match_id:
+                query['matchId'] = match_id
+            if matching_method_id:
+                query['matchingMethodId'] = as_object_id(matching_method_id)
+            if not query:
+                result['error'] = 'Invalid detection request: pass match_id or matching_method_id'
+                return result
+
+            if replace_existing:
+                page_ids = self.db['matchingResult'].distinct('_id', query)
+                previous = {'matchResultsId': {'$in': page_ids}, 'source': DETECTOR_SOURCE}
+                previous_ids = self.db['discrepancies'].distinct('_id', previous)
+                if previous_ids:
+                    self.delete('ticket', {'discrepancyId': {'$in': previous_ids}, 'source': DETECTOR_SOURCE})
+                    result['discrepancies_replaced'] = self.delete('discrepancies', previous)
+
+            result.update(self.write(self.iter_result_batches(query)))
+            result['success'] = result['error'] is None
+            print(f"✅ Detected {result['discrepancies_created']:,} discrepancies in {result['rows_scanned']:,} rows "
+                  f"({result['tickets_created']:,} tickets)")
+        except Exception as e:
+            result['error'] = f'Discrepancy detection failed: {str(e)}'
+        finally:
+            result.setdefault('timings', {})['total'] = round(time.perf_counter() - started, 3)
+        return result
+
+
+def detect_discrepancies(
+    mongo_uri: str,
+    db_name: str,
+    client: Optional[MongoClient] = None,
+    rules: Optional[Dict[str, Dict[str, Any]]] = None,
+    create_tickets: bool = True,
+    **params
+) -> Dict[str, Any]:
+    """
+    Helper function to run the detector over stored matchingResult rows
+
+    Args:
+        mongo_uri: MongoDB URI
+        db_name: Database name
+        client: Optional shared MongoClient
+        rules: Thresholds by matching rule name (see DiscrepancyDetector)
+        create_tickets: Create tickets for severe discrepancies
+        **params: Arguments for DiscrepancyDetector.detect (match_id,
+                  matching_method_id, replace_existing)
+
+    Returns:
+        Detection result
+    """
+    owns_client = client is None
+    if owns_client:
+        client = MongoClient(mongo_uri)
+    try:
+        detector = DiscrepancyDetector(client[db_name], rules=rules, create_tickets=create_tickets)
+        return detector.detect(**params)
+    finally:
+        if owns_client:
+            client.close()
@@ -0,0 +1,929 @@
+"""
+Reconciliation Engine
+Matches the records of two dynamic source collections (e.g. POS vs bank
+statement) with the vectorized matcher and writes the outcome as
+matchingResult documents, discrepancies and matchingResultCells facts.
+Runs record a high-water mark per source, so later runs can reconcile
+only the rows that arrived since (incremental=True)
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+
+from collection_names import RECONCILIATION_STATE_COLLECTION
+from data_ingestion.bulk_writer import BulkInsertPipeline
+from data_ingestion.cell_facts import CELL_FACTS_COLLECTION, ensure_cell_fact_indexes, iter_cell_facts
+from data_ingestion.field_stats import (
+    FIELD_STATS_COLLECTION, FIELD_STATS_ENABLED, FieldStatsProfile, FieldStatsStore
+)
+from data_ingestion.summaries import SUMMARIES_ENABLED, SummaryStore
+from .columnar import SourceTable, concat_tables, load_source_table
+from .matcher import MATCH_EXACT, MATCH_TOLERANCE, MatchOutcome, MatchSpec, match_tables
+
+
+ENGINE_NAME = 'vectorized'
+
+# Rows per matchingResult document (keeps documents far below the 16MB limit)
+RESULT_PAGE_ROWS = int(os.getenv('RECON_RESULT_PAGE_ROWS', 1000))
+WRITE_CELL_FACTS = os.getenv('RECON_CELL_FACTS', 'true').lower() not in ('0', 'false', 'no')
+
+# Unmatched amounts at or above these are high / medium severity
+HIGH_SEVERITY_AMOUNT = float(os.getenv('RECON_HIGH_SEVERITY_AMOUNT', 1000))
+MEDIUM_SEVERITY_AMOUNT = float(os.getenv('RECON_MEDIUM_SEVERITY_AMOUNT', 100))
+
+# Source field that increases as rows arrive (set by the JSON ingester); '_id' also works
+WATERMARK_FIELD = os.getenv('RECON_WATERMARK_FIELD', '_ingested_at')
+# Timestamp watermarks stop this many seconds in the past: concurrent writers
+# can commit rows stamped earlier than rows already committed by another
+WATERMARK_LAG_SECONDS = float(os.getenv('RECON_WATERMARK_LAG_SECONDS', 300))
+
+# Source row _ids looked up per query in earlier results
+RESULT_LOOKUP_BATCH = 10000
+
+# Last run and high-water marks per pair of sources
+STATE_COLLECTION = RECONCILIATION_STATE_COLLECTION
+
+RESULT_COLUMNS = [
+    {'name': 'left_amount', 'type': 'number', 'sourceFields': []},
+    {'name': 'right_amount', 'type': 'number', 'sourceFields': []},
+    {'name': 'difference', 'type': 'number', 'sourceFields': []},
+    {'name': 'reconciliation_status', 'type': 'boolean', 'sourceFields': []}
+]
+
+MISSING_COUNTERPART = 'missing_counterpart'
+
+SIDES = ('left', 'right')
+
+
+class EngineError(ValueError):
+    """The reconciliation request cannot be run as given (unknown method or sources)"""
+
+
+def severity_for(amount: Optional[float]) -> str:
+    """Severity of an unmatched record by its absolute amount"""
+    amount = abs(amount or 0.0)
+    if amount >= HIGH_SEVERITY_AMOUNT:
+        return 'high'
+    if amount >= MEDIUM_SEVERITY_AMOUNT:
+        return 'medium'
+    return 'low'
+
+
+def as_object_id(value: Any) -> Any:
+    """ObjectId for a 24-hex string, otherwise the value unchanged"""
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+
+def and_query(*queries: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Conjunction of the non-empty queries"""
+    queries = [query for query in queries if query]
+    if not queries:
+        return {}
+    return queries[0] if len(queries) == 1 else {'$and': queries}
+
+
+def filter_key(query: Optional[Dict[str, Any]]) -> str:
+    """Stable text form of a source filter, stored to detect changed filters"""
+    return orjson.dumps(query or {}, default=str, option=orjson.OPT_SORT_KEYS).decode()
+
+
+class ReconciliationEngine:
+    """
+    Runs transaction-level reconciliations between two source collections
+    """
+
+    def __init__(self, mongo_uri: str, db_name: str, client: Optional[MongoClient] = None,
+                 page_rows: int = RESULT_PAGE_ROWS, write_cell_facts: bool = WRITE_CELL_FACTS):
+        """
+        Initialize the engine
+
+        Args:
+            mongo_uri: MongoDB connection URI
+            db_name: Database name
+            client: Shared pooled MongoClient; if omitted a private client is
+                    created on connect() and closed by close()
+            page_rows: Result rows per matchingResult document
+            write_cell_facts: Also write matchingResultCells for the results
+        """
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.client = client
+        self._owns_client = client is None
+        self.page_rows = max(int(page_rows), 1)
+        self.write_cell_facts = write_cell_facts
+        self.db = None
+        self.stats_store = None
+        self.summary_store = None
+        self.summaries_refreshed: Dict[str, Any] = {}
+
+    def connect(self) -> bool:
+        """Establish MongoDB connection"""
+        try:
+            if self._owns_client:
+                self.client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+                self.client.server_info()
+            self.db = self.client[self.db_name]
+            if FIELD_STATS_ENABLED:
+                self.stats_store = FieldStatsStore(self.db[FIELD_STATS_COLLECTION])
+            if SUMMARIES_ENABLED:
+                self.summary_store = SummaryStore(self.db)
+            return True
+        except Exception as e:
+            print(f"MongoDB connection failed: {e}")
+            return False
+
+    def resolve_sources(self, matching_method_id: Optional[str] = None,
+                        left_collection: Optional[str] = None,
+                        right_collection: Optional[str] = None
+                        ) -> Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Find the two source collections to reconcile
+
+        With a matching method, its first two datasourceIds are looked up in
+        datasources and their collectionId values are used (explicit
+        collections override them).
+
+        Returns:
+            Left source, right source (each with collection, name and the
+            datasource document) and the matchmethod document, if any
+
+        Raises:
+            EngineError: If the method, its datasources or a collection is missing
+        """
+        method = None
+        datasources: List[Dict[str, Any]] = []
+        if matching_method_id:
+            method = self.db['matchmethod'].find_one({'_id': as_object_id(matching_method_id)})
+            if method is None:
+                raise EngineError(f"Matching method '{matching_method_id}' not found")
+            ids = method.get('datasourceIds') or []
+            found = {doc['_id']: doc for doc in self.db['datasources'].find({'_id': {'$in': ids}})}
+            datasources = [found[i] for i in ids if i in found]
+
+        sources = []
+        for position, explicit in enumerate((left_collection, right_collection)):
+            datasource = datasources[position] if position < len(datasources) else {}
+            collection = explicit or datasource.get('collectionId')
+            if not collection:
+                side = SIDES[position]
+                raise EngineError(f'No {side} source collection: pass {side}_collection '
+                                  'or a matching method with two datasources')
+            if collection not in self.db.list_collection_names():
+                raise EngineError(f"Source collection '{collection}' does not exist")
+            sources.append({'collection': collection,
+                            'name': datasource.get('name') or collection,
+                            'datasource': datasource})
+        return sources[0], sources[1], method
+
+    def load_tables(self, spec: MatchSpec, loads: List[Tuple[str, int, Dict[str, Any], Optional[Dict]]],
+                    timings: Optional[Dict[str, float]] = None) -> List[SourceTable]:
+        """
+        Load source tables concurrently
+
+        Args:
+            spec: Match specification (fields to load per side)
+            loads: (label, side, source, query) per table
+            timings: Optional dict receiving 'load_<label>' seconds
+
+        Returns:
+            Tables in the order of loads
+        """
+        def load(label: str, side: int, source: Dict[str, Any], query: Optional[Dict]) -> SourceTable:
+            start = time.perf_counter()
+            table = load_source_table(self.db[source['collection']], query=query,
+                                      name=source['name'], **spec.side_fields(side))
+            if timings is not None:
+                timings[f'load_{label}'] = time.perf_counter() - start
+            return table
+
+        with ThreadPoolExecutor(max_workers=len(loads), thread_name_prefix='recon-load') as executor:
+            futures = [executor.submit(load, *arguments) for arguments in loads]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def source_ref(table: SourceTable, index: int) -> Dict[str, Any]:
+        """Cell source pointing at one source row"""
+        full_row = table.full_row(index)
+        return {
+            'tableId': table.table_id,
+            'rowIndex': table.row_number(index),
+            'colIndex': 0,
+            'originalValue': full_row[table.amount_field],
+            'documentId': table.name,
+            'fullRow': full_row
+        }
+
+    def matched_row(self, left: SourceTable, left_index: int, right: SourceTable, right_index: int,
+                    exact: bool, spec: MatchSpec) -> Dict[str, Any]:
+        """Result row of a matched pair"""
+        match_type = MATCH_EXACT if exact else MATCH_TOLERANCE
+        left_ref, right_ref = self.source_ref(left, left_index), self.source_ref(right, right_index)
+        left_amount, right_amount = left_ref['originalValue'], right_ref['originalValue']
+        return {
+            'cells': [
+                {'value': left_amount, 'matchType': match_type, 'sources': [left_ref]},
+                {'value': right_amount, 'matchType': match_type, 'sources': [right_ref]},
+                {'value': round(left_amount - right_amount, 2), 'matchType': 'computed', 'sources': []},
+                {'value': 'Reconciled', 'matchType': 'none', 'sources': []}
+            ],
+            'sourceRows': [{'tableId': left.table_id, 'rowIndex': left_ref['rowIndex']},
+                           {'tableId': right.table_id, 'rowIndex': right_ref['rowIndex']}],
+            'matchingRules': [spec.name]
+        }
+
+    def unmatched_row(self, table: SourceTable, other: SourceTable, index: int, position: int,
+                      spec: MatchSpec) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Result row and discrepancy fields of a record without counterpart"""
+        ref = self.source_ref(table, index)
+        amount = ref['originalValue']
+        date = table.date(index) if table.date_field else None
+        when = f' on {date}' if date else ''
+        discrepancy = {
+            'type': MISSING_COUNTERPART,
+            'severity': severity_for(amount),
+            'details': f"No matching record in {other.name} for {amount}{when} "
+                       f"({table.name} row {ref['rowIndex']})",
+            'side': SIDES[position],
+            'amount': amount,
+            'tableId': table.table_id,
+            'sourceRowIndex': ref['rowIndex'],
+            'sourceRowId': table.ids[index]
+        }
+        amount_cell = {'value': amount, 'matchType': MATCH_EXACT, 'sources': [ref]}
+        empty_cell = {'value': None, 'matchType': 'none', 'sources': []}
+        difference = amount if position == 0 or amount is None else -amount
+        row = {
+            'cells': [
+                amount_cell if position == 0 else empty_cell,
+                empty_cell if position == 0 else amount_cell,
+                {'value': difference, 'matchType': 'computed', 'sources': []},
+                {'value': 'Not Reconciled', 'matchType': 'none', 'sources': [],
+                 'metaData': {key: discrepancy[key] for key in ('severity', 'details', 'type')}}
+            ],
+            'sourceRows': [{'tableId': table.table_id, 'rowIndex': ref['rowIndex']}],
+            'matchingRules': [spec.name]
+        }
+        return row, discrepancy
+
+    def iter_rows(self, left: SourceTable, right: SourceTable, outcome: MatchOutcome,
+                  spec: MatchSpec, pairs: bool = True
+                  ) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        """
+        Yield result rows with the discrepancy of each unmatched row
+
+        Matched pairs come first (unless pairs is False), then unmatched
+        left rows, then unmatched right rows.
+
+        Yields:
+            (row, discrepancy fields or None)
+        """
+        if pairs:
+            for left_index, right_index, exact in zip(outcome.left_index.tolist(),
+                                                      outcome.right_index.tolist(),
+                                                      outcome.exact.tolist()):
+                yield self.matched_row(left, left_index, right, right_index, exact, spec), None
+
+        for table, other, indexes, position in ((left, right, outcome.unmatched_left, 0),
+                                                (right, left, outcome.unmatched_right, 1)):
+            for index in indexes.tolist():
+                yield self.unmatched_row(table, other, index, position, spec)
+
+    def result_header(self, match_id: str, left: SourceTable, right: SourceTable, spec: MatchSpec,
+                      left_source: Dict[str, Any], right_source: Dict[str, Any],
+                      method: Optional[Dict[str, Any]], matches: int, discrepancies: int) -> Dict[str, Any]:
+        """Fields shared by every matchingResult page of a run"""
+        datasource = left_source['datasource'] or right_source['datasource']
+        return {
+            'matchId': match_id,
+            'matchingMethodId': method['_id'] if method else None,
+            'profileId': method.get('profileId') if method else None,
+            'columns': RESULT_COLUMNS,
+            'sources': [left.table_id, right.table_id],
+            'metadata': {
+                'engine': ENGINE_NAME,
+                'matchSummary': {
+                    'totalMatches': matches,
+                    'totalDiscrepancies': discrepancies,
+                    'aggregationApplied': False
+                },
+                'documentIds': [left.name, right.name],
+                'fieldsUsed': [f'{table.table_id}.{field}' for table in (left, right) for field in table.fields],
+                'spec': spec.to_dict()
+            },
+            'owner': {key: datasource[key] for key in ('workspaceId', 'organizationId') if key in datasource}
+        }
+
+    def iter_pages(self, rows: Iterator[Tuple[Dict, Optional[Dict]]], header: Dict[str, Any],
+                   page_count: int, first_page: int = 0
+                   ) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        Group result rows into matchingResult documents
+
+        A run always has a first page, even without rows; pages appended
+        by incremental runs start at first_page.
+
+        Yields:
+            (matchingResult document, its discrepancy documents)
+        """
+        now = datetime.utcnow()
+        page, page_rows, page_discrepancies = first_page, [], []
+        owner = header['owner']
+        header = {key: value for key, value in header.items() if key != 'owner'}
+
+        def build():
+            result_id = ObjectId()
+            document = {
+                '_id': result_id,
+                **header,
+                'rows': page_rows,
+                'metadata': {**header['metadata'], 'page': page, 'pageCount': page_count},
+                'createdAt': now,
+                'updatedAt': now
+            }
+            discrepancies = []
+            for row_index, fields in page_discrepancies:
+                discrepancies.append({
+                    **fields,
+                    'collection': orjson.dumps(page_rows[row_index]['cells'], default=str).decode(),
+                    'matchedRowIndex': row_index,
+                    'matchResultsId': result_id,
+                    'matchId': header['matchId'],
+                    'matchingMethodId': header['matchingMethodId'],
+                    'profileId': header['profileId'],
+                    **owner,
+                    'engine': ENGINE_NAME,
+                    'createdAt': now,
+                    'updatedAt': now
+                })
+            return document, discrepancies
+
+        for row, discrepancy in rows:
+            if discrepancy is not None:
+                page_discrepancies.append((len(page_rows), discrepancy))
+            page_rows.append(row)
+            if len(page_rows) >= self.page_rows:
+                yield build()
+                page, page_rows, page_discrepancies = page + 1, [], []
+        if page_rows or page == 0:
+            yield build()
+
+    def page_count(self, rows: int) -> int:
+        return (rows + self.page_rows - 1) // self.page_rows
+
+    def delete_previous(self, left_collection: str, right_collection: str, keep: Optional[str] = None) -> int:
+        """
+        Remove earlier engine results for the same pair of sources
+
+        Called once a run's results are written, so the sources always have
+        a complete set of results.
+
+        Args:
+            left_collection: Left source collection
+            right_collection: Right source collection
+            keep: matchId of the run that replaces them
+
+        Returns:
+            Runs removed
+        """
+        previous = {'metadata.engine': ENGINE_NAME, 'sources': [left_collection, right_collection],
+                    'matchId': {'$ne': keep}}
+        match_ids = self.db['matchingResult'].distinct('matchId', previous)
+        if not match_ids:
+            return 0
+        self.delete_runs(match_ids)
+        return len(match_ids)
+
+    def delete_runs(self, match_ids: List[str]):
+        """Remove the result pages, discrepancies and cell facts of runs"""
+        self.db['matchingResult'].delete_many({'matchId': {'$in': match_ids}, 'metadata.engine': ENGINE_NAME})
+        self.delete_discrepancies({'matchId': {'$in': match_ids}, 'engine': ENGINE_NAME})
+        self.db[CELL_FACTS_COLLECTION].delete_many({'matchId': {'$in': match_ids}})
+
+    def delete_discrepancies(self, query: Dict[str, Any]) -> int:
+        """Delete discrepancies, subtracting them from the dashboard summaries first"""
+        if self.summary_store is not None:
+            return self.summary_store.remove('discrepancies', query)
+        return self.db['discrepancies'].delete_many(query).deleted_count
+
+    # ---------- High-water marks ----------
+
+    @staticmethod
+    def state_id(left_collection: str, right_collection: str) -> str:
+        return f'{left_collection}|{right_collection}'
+
+    def max_mark(self, collection: str, field: str) -> Any:
+        """High-water mark of a source collection (None if no row has the field)"""
+        doc = next(self.db[collection].find({field: {'$exists': True}}, {field: 1})
+                   .sort(field, -1).limit(1), None)
+        return doc[field] if doc is not None else None
+
+    @staticmethod
+    def stored_mark(mark: Any, lag: float = WATERMARK_LAG_SECONDS) -> Any:
+        """
+        Mark saved for the next incremental run
+
+        Runs read every row up to the current mark, but timestamp marks
+        (datetimes, or ObjectIds for _id) are stored capped at lag seconds
+        ago, so a row whose writer committed after a later-stamped row is
+        still above the stored mark when the next run reads. Rows the next
+        run reads again are skipped as already reconciled. Other values
+        are stored as they are.
+        """
+        if mark is None:
+            return None
+        cutoff = datetime.utcnow() - timedelta(seconds=lag)
+        if lag > 0 and isinstance(mark, datetime) and mark.replace(tzinfo=None) > cutoff:
+            return cutoff
+        if lag > 0 and isinstance(mark, ObjectId) and mark.generation_time.replace(tzinfo=None) > cutoff:
+            return ObjectId.from_datetime(cutoff)
+        return mark
+
+    @staticmethod
+    def marked_query(field: str, low: Any = None, high: Any = None, full: bool = False) -> Optional[Dict]:
+        """
+        Rows up to a high-water mark
+
+        Full runs take every row not above high (including rows without the
+        field); incremental runs take the rows in (low, high].
+        """
+        if full:
+            return {field: {'$not': {'$gt': high}}} if high is not None else None
+        bounds = {'$lte': high}
+        if low is not None:
+            bounds['$gt'] = low
+        return {field: bounds}
+
+    def reconciled_ids(self, match_id: str, table_id: str, ids: List[Any]) -> set:
+        """_ids among the given source rows that already have a result row in a run"""
+        self.db['matchingResult'].create_index([('matchId', 1), ('rows.cells.sources.fullRow._id', 1)])
+        found = set()
+        for start in range(0, len(ids), RESULT_LOOKUP_BATCH):
+            batch = ids[start:start + RESULT_LOOKUP_BATCH]
+            wanted = set(batch)
+            query = {'matchId': match_id, 'rows.cells.sources': {
+                '$elemMatch': {'tableId': table_id, 'fullRow._id': {'$in': batch}}}}
+            for page in self.db['matchingResult'].find(
+                    query, {'rows.cells.sources.tableId': 1, 'rows.cells.sources.fullRow._id': 1}):
+                for row in page.get('rows') or []:
+                    for cell in row.get('cells') or []:
+                        for source in cell.get('sources') or []:
+                            row_id = (source.get('fullRow') or {}).get('_id')
+                            if source.get('tableId') == table_id and row_id in wanted:
+                                found.add(row_id)
+        return found
+
+    def ensure_watermark_index(self, collection: str, field: str):
+        """Index the watermark field so incremental runs read only the delta"""
+        if field != '_id':
+            self.db[collection].create_index([(field, 1)])
+
+    def save_state(self, state: Dict[str, Any]):
+        state['updatedAt'] = datetime.utcnow()
+        self.db[STATE_COLLECTION].replace_one({'_id': state['_id']}, state, upsert=True)
+
+    def usable_state(self, state: Optional[Dict[str, Any]], spec: MatchSpec, filters: List[str],
+                     watermark_field: str) -> Optional[Dict[str, Any]]:
+        """The stored state if an incremental run can continue it, else None"""
+        if state is None:
+            return None
+        if (state.get('spec') != spec.to_dict() or state.get('filters') != filters
+                or state.get('watermarkField') != watermark_field):
+            print("⚠️  Match spec, filters or watermark changed since the last run; reconciling in full")
+            return None
+        if self.db['matchingResult'].count_documents({'matchId': state['matchId']}, limit=1) == 0:
+            print("⚠️  Results of the last run are gone; reconciling in full")
+            return None
+        return state
+
+    # ---------- Runs ----------
+
+    def run(self, spec: MatchSpec, matching_method_id: Optional[str] = None,
+            left_collection: Optional[str] = None, right_collection: Optional[str] = None,
+            left_filter: Optional[Dict] = None, right_filter: Optional[Dict] = None,
+            replace_existing: bool = True, incremental: bool = False,
+            watermark_field: str = WATERMARK_FIELD,
+            progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Reconcile two sources and store the results
+
+        Args:
+            spec: Match specification
+            matching_method_id: matchmethod whose datasources are reconciled
+            left_collection: Left source collection (overrides the method's first datasource)
+            right_collection: Right source collection (overrides the second datasource)
+            left_filter: Optional query on the left records
+            right_filter: Optional query on the right records
+            replace_existing: Delete this engine's earlier results for the same sources
+                              once the new ones are written (full runs)
+            incremental: Reconcile only rows above the last run's high-water
+                         marks against its open (unmatched) rows, updating its
+                         results in place; runs in full if there is no usable
+                         earlier run
+            watermark_field: Source field whose value increases as rows arrive
+            progress: Optional callback receiving result rows written per page
+
+        Returns:
+            Result dictionary with match summary, counts and stage timings
+        """
+        result = {
+            'success': False,
+            'mode': 'full',
+            'match_id': None,
+            'result_pages': 0,
+            'discrepancies_created': 0,
+            'cell_facts_written': 0,
+            'error': None
+        }
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        self.summaries_refreshed = {}
+
+        try:
+            if not self.connect():
+                result['error'] = 'Failed to connect to MongoDB'
+                return result
+
+            try:
+                left_source, right_source, method = self.resolve_sources(
+                    matching_method_id, left_collection, right_collection)
+            except EngineError as e:
+                result['error'] = f'Invalid reconciliation request: {str(e)}'
+                return result
+
+            state_id = self.state_id(left_source['collection'], right_source['collection'])
+            filters = [filter_key(left_filter), filter_key(right_filter)]
+            state = self.usable_state(self.db[STATE_COLLECTION].find_one({'_id': state_id}),
+                                      spec, filters, watermark_field) if incremental else None
+            marks = [self.max_mark(source['collection'], watermark_field)
+                     for source in (left_source, right_source)]
+
+            if state is not None:
+                result['mode'] = 'incremental'
+                result.update(self.run_delta(spec, state, left_source, right_source, method,
+                                             (left_filter, right_filter), marks, timings, progress))
+            else:
+                result.update(self.run_full(spec, left_source, right_source, method,
+                                            (left_filter, right_filter), marks, watermark_field,
+                                            replace_existing, timings, progress))
+                state = {'_id': state_id, 'spec': spec.to_dict(), 'filters': filters,
+                         'watermarkField': watermark_field}
+                for source in (left_source, right_source):
+                    self.ensure_watermark_index(source['collection'], watermark_field)
+
+            if result['error'] is None:
+                self.save_state({
+                    **state,
+                    'matchId': result['match_id'],
+                    'marks': [self.stored_mark(mark) if mark is not None else previous for mark, previous
+                              in zip(marks, state.get('marks') or [None, None])],
+                    'rows': [result[side]['rows_total'] for side in SIDES],
+                    'pageCount': result['page_count'],
+                    'totals': result['totals']
+                })
+            result['success'] = result['error'] is None
+            if self.summary_store is not None:
+                result['summaries_refreshed'] = self.summaries_refreshed
+
+        except Exception as e:
+            result['error'] = f'Reconciliation failed: {str(e)}'
+        finally:
+            timings['total'] = time.perf_counter() - started
+            result['timings'] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+
+        return result
+
+    def run_full(self, spec: MatchSpec, left_source: Dict[str, Any], right_source: Dict[str, Any],
+                 method: Optional[Dict[str, Any]], filters: Tuple[Optional[Dict], Optional[Dict]],
+                 marks: List[Any], watermark_field: str, replace_existing: bool,
+                 timings: Dict[str, float], progress: Optional[Callable[[int], None]]) -> Dict[str, Any]:
+        """Match every row up to the high-water marks and write fresh results"""
+        sources = (left_source, right_source)
+        left, right = self.load_tables(spec, [
+            (SIDES[side], side, sources[side],
+             and_query(filters[side], self.marked_query(watermark_field, high=marks[side], full=True)))
+            for side in (0, 1)
+        ], timings)
+        print(f"📥 Loaded {len(left):,} {left.name} and {len(right):,} {right.name} records")
+
+        start = time.perf_counter()
+        outcome = match_tables(left, right, spec)
+        timings['match'] = time.perf_counter() - start
+        summary = outcome.summary()
+        print(f"✅ Matched {summary['matched']:,} pairs ({summary['exact_matches']:,} exact); "
+              f"{summary['unmatched_left']:,} + {summary['unmatched_right']:,} unmatched")
+
+        start = time.perf_counter()
+        matches = len(outcome.left_index)
+        discrepancies = len(outcome.unmatched_left) + len(outcome.unmatched_right)
+        match_id = str(uuid.uuid4())
+        header = self.result_header(match_id, left, right, spec, left_source, right_source,
+                                    method, matches, discrepancies)
+        page_count = max(self.page_count(matches + discrepancies), 1)
+        try:
+            written = self.write_pages(self.iter_pages(self.iter_rows(left, right, outcome, spec),
+                                                       header, page_count), progress)
+        except Exception:
+            self.delete_runs([match_id])
+            raise
+        replaced = 0
+        if written['error'] is not None:
+            # Keep the earlier results rather than a partial run
+            self.delete_runs([match_id])
+        elif replace_existing:
+            replaced = self.delete_previous(left.table_id, right.table_id, keep=match_id)
+        timings['write'] = time.perf_counter() - start
+
+        return {
+            **written,
+            'match_id': match_id,
+            'replaced_runs': replaced,
+            'left': {'collection': left.table_id, 'name': left.name, 'records': len(left),
+                     'rows_total': len(left)},
+            'right': {'collection': right.table_id, 'name': right.name, 'records': len(right),
+                      'rows_total': len(right)},
+            'summary': summary,
+            'page_count': page_count,
+            'totals': {'matches': matches, 'discrepancies': discrepancies}
+        }
+
+    def run_delta(self, spec: MatchSpec, state: Dict[str, Any], left_source: Dict[str, Any],
+                  right_source: Dict[str, Any], method: Optional[Dict[str, Any]],
+                  filters: Tuple[Optional[Dict], Optional[Dict]], marks: List[Any],
+                  timings: Dict[str, float], progress: Optional[Callable[[int], None]]) -> Dict[str, Any]:
+        """
+        Reconcile the rows that arrived since the last run
+
+        New rows are matched against the new and still-open rows of the
+        other side (never open against open, which already failed to match):
+        1. open + new left rows vs new right rows
+        2. new left rows still unmatched vs open right rows
+        Open rows that find a counterpart have their result row rewritten in
+        place and their discrepancy removed; new pairs and new unmatched rows
+        are appended as new result pages. Rows above the marks that already
+        have a result row (re-stamped by an update or re-upload) are skipped.
+        """
+        sources = (left_source, right_source)
+        match_id = state['matchId']
+        field = state['watermarkField']
+        previous_marks = state.get('marks') or [None, None]
+
+        open_rows: Dict[str, Dict[Any, Dict[str, Any]]] = {side: {} for side in SIDES}
+        for doc in self.db['discrepancies'].find(
+                {'matchId': match_id, 'engine': ENGINE_NAME, 'type': MISSING_COUNTERPART},
+                {'side': 1, 'sourceRowId': 1, 'sourceRowIndex': 1, 'matchResultsId': 1, 'matchedRowIndex': 1}):
+            if doc.get('side') in open_rows and 'sourceRowId' in doc:
+                open_rows[doc['side']][doc['sourceRowId']] = doc
+
+        # Open rows only need loading when the other side has new rows
+        has_new = [marks[side] is not None and marks[side] != previous_marks[side] for side in (0, 1)]
+        loads = []
+        for side in (0, 1):
+            ids = list(open_rows[SIDES[side]]) if has_new[1 - side] else []
+            loads.append((f'open_{SIDES[side]}', side, sources[side],
+                          and_query(filters[side], {'_id': {'$in': ids}})))
+            delta = self.marked_query(field, low=previous_marks[side], high=marks[side]) \
+                if has_new[side] else {'_id': {'$in': []}}
+            loads.append((f'new_{SIDES[side]}', side, sources[side], and_query(filters[side], delta)))
+        open_left, new_left, open_right, new_right = self.load_tables(spec, loads, timings)
+
+        # Rows re-stamped by an update or re-upload that already have a result
+        # row (matched or open) are not matched again as new rows
+        skipped = [0, 0]
+        fresh_tables = []
+        for side, new in enumerate((new_left, new_right)):
+            ids = new.ids.tolist()
+            known = self.reconciled_ids(match_id, sources[side]['collection'], ids) if ids else set()
+            if known:
+                new = new.take(np.array([i for i, row_id in enumerate(ids) if row_id not in known],
+                                        dtype=np.int64))
+                skipped[side] = len(known)
+            fresh_tables.append(new)
+        new_left, new_right = fresh_tables
+
+        # rowIndex: open rows keep theirs, new rows continue the side's numbering
+        rows_total = list(state.get('rows') or [0, 0])
+        tables = {}
+        for side, (opened, new) in enumerate(((open_left, new_left), (open_right, new_right))):
+            known = open_rows[SIDES[side]]
+            opened = opened.numbered([known[i]['sourceRowIndex'] for i in opened.ids.tolist()])
+            new = new.numbered(rows_total[side] + np.arange(len(new)))
+            rows_total[side] += len(new)
+            tables[SIDES[side]] = (opened, new)
+        (open_left, new_left), (open_right, new_right) = tables['left'], tables['right']
+        print(f"📥 Loaded {len(new_left):,} new / {len(open_left):,} open {left_source['name']} and "
+              f"{len(new_right):,} new / {len(open_right):,} open {right_source['name']} records")
+
+        start = time.perf_counter()
+        first_left = concat_tables(open_left, new_left)
+        first = match_tables(first_left, new_right, spec)
+        still_new = first.unmatched_left[first.unmatched_left >= len(open_left)]
+        second_left = first_left.take(still_new)
+        second = match_tables(second_left, open_right, spec)
+        timings['match'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        # Open rows that found a counterpart: rewrite their result row
+        updates: Dict[Any, Dict[int, Dict[str, Any]]] = {}
+        resolved = []
+        old_pair = first.left_index < len(open_left)
+        for left_index, right_index, exact in zip(first.left_index[old_pair].tolist(),
+                                                  first.right_index[old_pair].tolist(),
+                                                  first.exact[old_pair].tolist()):
+            location = open_rows['left'][first_left.ids[left_index]]
+            updates.setdefault(location['matchResultsId'], {})[location['matchedRowIndex']] = \
+                self.matched_row(first_left, left_index, new_right, right_index, exact, spec)
+            resolved.append(location['_id'])
+        for left_index, right_index, exact in zip(second.left_index.tolist(), second.right_index.tolist(),
+                                                  second.exact.tolist()):
+            location = open_rows['right'][open_right.ids[right_index]]
+            updates.setdefault(location['matchResultsId'], {})[location['matchedRowIndex']] = \
+                self.matched_row(second_left, left_index, open_right, right_index, exact, spec)
+            resolved.append(location['_id'])
+
+        # New pairs and new unmatched rows: append pages
+        new_pairs = ~old_pair
+        appended_pairs = int(np.count_nonzero(new_pairs))
+        unmatched_new_right = first.unmatched_right
+        appended_discrepancies = len(second.unmatched_left) + len(unmatched_new_right)
+
+        def appended_rows():
+            for left_index, right_index, exact in zip(first.left_index[new_pairs].tolist(),
+                                                      first.right_index[new_pairs].tolist(),
+                                                      first.exact[new_pairs].tolist()):
+                yield self.matched_row(first_left, left_index, new_right, right_index, exact, spec), None
+            for index in second.unmatched_left.tolist():
+                yield self.unmatched_row(second_left, open_right, index, 0, spec)
+            for index in unmatched_new_right.tolist():
+                yield self.unmatched_row(new_right, first_left, index, 1, spec)
+
+        totals = {
+            'matches': state['totals']['matches'] + appended_pairs + len(resolved),
+            'discrepancies': state['totals']['discrepancies'] - len(resolved) + appended_discrepancies
+        }
+        first_page = state['pageCount']
+        page_count = first_page + self.page_count(appended_pairs + appended_discrepancies)
+
+        written = {'result_pages': 0, 'discrepancies_created': 0, 'cell_facts_written': 0, 'error': None}
+        if page_count > first_page:
+            header = self.result_header(match_id, first_left, new_right, spec, left_source, right_source,
+                                        method, totals['matches'], totals['discrepancies'])
+            written = self.write_pages(self.iter_pages(appended_rows(), header, page_count, first_page),
+                                       progress)
+        written['cell_facts_written'] += self.update_rows(updates)
+        if resolved:
+            self.delete_discrepancies({'_id': {'$in': resolved}})
+        self.db['matchingResult'].update_many({'matchId': match_id}, {'$set': {
+            'metadata.pageCount': page_count,
+            'metadata.matchSummary.totalMatches': totals['matches'],
+            'metadata.matchSummary.totalDiscrepancies': totals['discrepancies']
+        }})
+        timings['write'] = time.perf_counter() - start
+
+        exact = int(np.count_nonzero(first.exact)) + int(np.count_nonzero(second.exact))
+        summary = {
+            'matched': len(first.left_index) + len(second.left_index),
+            'exact_matches': exact,
+            'tolerance_matches': len(first.left_index) + len(second.left_index) - exact,
+            'resolved_open_rows': len(resolved),
+            'unmatched_left': len(second.unmatched_left),
+            'unmatched_right': len(unmatched_new_right),
+            'tolerance_rounds': max(first.rounds, second.rounds)
+        }
+        print(f"✅ Matched {summary['matched']:,} pairs ({len(resolved):,} previously open); "
+              f"{summary['unmatched_left']:,} + {summary['unmatched_right']:,} new unmatched")
+
+        return {
+            **written,
+            'match_id': match_id,
+            'result_pages_updated': len(updates),
+            'discrepancies_resolved': len(resolved),
+            'left': {'collection': left_source['collection'], 'name': left_source['name'],
+                     'new_records': len(new_left), 'open_records': len(open_left),
+                     'already_reconciled': skipped[0], 'rows_total': rows_total[0]},
+            'right': {'collection': right_source['collection'], 'name': right_source['name'],
+                      'new_records': len(new_right), 'open_records': len(open_right),
+                      'already_reconciled': skipped[1], 'rows_total': rows_total[1]},
+            'summary': summary,
+            'page_count': page_count,
+            'totals': totals
+        }
+
+    # ---------- Writes ----------
+
+    def write_pages(self, pages: Iterator[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                    progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Write matchingResult pages, their discrepancies and cell facts
+
+        Returns:
+            Counts of written documents and any write error
+        """
+        profiles = {name: FieldStatsProfile(name) if self.stats_store else None
+                    for name in ('matchingResult', 'discrepancies', CELL_FACTS_COLLECTION)}
+        results = BulkInsertPipeline(self.db['matchingResult'], batch_size=8,
+                                     profile=profiles['matchingResult'])
+        discrepancies = BulkInsertPipeline(self.db['discrepancies'], profile=profiles['discrepancies'],
+                                           track_ids=self.summary_store is not None)
+        facts = (BulkInsertPipeline(self.db[CELL_FACTS_COLLECTION], profile=profiles[CELL_FACTS_COLLECTION])
+                 if self.write_cell_facts else None)
+
+        try:
+            for document, page_discrepancies in pages:
+                results.add(document)
+                discrepancies.add_many(page_discrepancies)
+                if facts is not None:
+                    facts.add_many(iter_cell_facts(document))
+                if progress:
+                    progress(len(document['rows']))
+        finally:
+            summaries = {'matchingResult': results.close(), 'discrepancies': discrepancies.close()}
+            if facts is not None:
+                summaries[CELL_FACTS_COLLECTION] = facts.close()
+                ensure_cell_fact_indexes(self.db[CELL_FACTS_COLLECTION])
+            for profile in profiles.values():
+                if profile is not None:
+                    self.stats_store.merge(profile)
+            if discrepancies.inserted_ids:
+                self.summaries_refreshed.update(
+                    self.summary_store.refresh({'discrepancies': discrepancies.inserted_ids}))
+
+        failed = {name: summary['failed'] for name, summary in summaries.items() if summary['failed']}
+        return {
+            'result_pages': summaries['matchingResult']['inserted'],
+            'discrepancies_created': summaries['discrepancies']['inserted'],
+            'cell_facts_written': summaries[CELL_FACTS_COLLECTION]['inserted'] if facts is not None else 0,
+            'error': (f"Failed to write {', '.join(f'{count} {name}' for name, count in failed.items())} documents"
+                      if failed else None)
+        }
+
+    def update_rows(self, updates: Dict[Any, Dict[int, Dict[str, Any]]]) -> int:
+        """
+        Rewrite result rows in place and refresh the cell facts of their pages
+
+        Args:
+            updates: matchingResult _id -> {row position: new row}
+
+        Returns:
+            Cell facts written
+        """
+        if not updates:
+            return 0
+        now = datetime.utcnow()
+        self.db['matchingResult'].bulk_write([
+            UpdateOne({'_id': page_id}, {'$set': {
+                **{f'rows.{index}': row for index, row in rows.items()},
+                'updatedAt': now
+            }})
+            for page_id, rows in updates.items()
+        ], ordered=False)
+        if not self.write_cell_facts:
+            return 0
+
+        facts = self.db[CELL_FACTS_COLLECTION]
+        facts.delete_many({'matchingResultId': {'$in': list(updates)}})
+        with BulkInsertPipeline(facts) as pipeline:
+            for page in self.db['matchingResult'].find({'_id': {'$in': list(updates)}}):
+                pipeline.add_many(iter_cell_facts(page))
+        return pipeline.close()['inserted']
+
+    def close(self):
+        """Close MongoDB connection (a shared client is left open)"""
+        if self.client and self._owns_client:
+            self.client.close()
+
+
+def run_reconciliation(
+    mongo_uri: str,
+    db_name: str,
+    spec: MatchSpec,
+    client: Optional[MongoClient] = None,
+    **params
+) -> Dict[str, Any]:
+    """
+    Helper function to run one reconciliation
+
+    Args:
+        mongo_uri: MongoDB URI
+        db_name: Database name
+        spec: Match specification
+        client: Optional shared MongoClient
+        **params: Arguments for ReconciliationEngine.run (sources, filters,
+                  replace_existing, incremental, watermark_field)
+
+    Returns:
+        Reconciliation result
+    """
+    engine = ReconciliationEngine(mongo_uri, db_name, client=client)
+    result = engine.run(spec, **params)
+    engine.close()
+    return result
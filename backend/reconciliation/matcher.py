@@ -0,0 +1,375 @@
+"""
+Vectorized Transaction Matcher
+One-to-one matching of two columnar source tables:
+1. Exact pass - hash join on (key fields, amount, date)
+2. Tolerance pass - sort-merge windows over (key fields, amount, date)
+   that pair the remaining records within the amount and date tolerances
+With a name field (e.g. merchant), exact pairs must also have similar
+names and the tolerance pass compares records within blocking-index blocks
+(see blocking.py) instead of sorted windows.
+"""
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .blocking import BlockingIndex, resolve_pairs
+from .columnar import SourceTable
+
+
+MATCH_EXACT = 'exact'
+MATCH_TOLERANCE = 'tolerance'
+
+# Right-side neighbours examined on each side of a left record per round
+WINDOW_CANDIDATES = int(os.getenv('RECON_WINDOW_CANDIDATES', 4))
+# Tolerance rounds; each round re-pairs records whose best candidate was taken
+MAX_TOLERANCE_ROUNDS = int(os.getenv('RECON_MAX_ROUNDS', 8))
+# Minimum Jaccard similarity of name n-grams when a name field is matched
+NAME_SIMILARITY = float(os.getenv('RECON_NAME_SIMILARITY', 0.3))
+# Left records whose candidate windows are evaluated at once (bounds memory)
+CANDIDATE_CHUNK_ROWS = 1_000_000
+
+# Stand-in for a missing date in the exact join (missing only equals missing)
+_NO_DATE = np.int64(-2**62)
+
+FieldPair = Union[str, Sequence[str], Dict[str, str]]
+
+
+def field_pair(value: FieldPair) -> Tuple[str, str]:
+    """(left, right) field names from 'field', ['left', 'right'] or {'left': ..., 'right': ...}"""
+    if isinstance(value, str):
+        return value, value
+    if isinstance(value, dict):
+        return value['left'], value.get('right', value['left'])
+    left, right = value
+    return left, right
+
+
+class MatchSpec:
+    """
+    How records of the left and right sources are matched
+    """
+
+    def __init__(self, name: str = 'Transaction match',
+                 amount_field: FieldPair = 'amount',
+                 date_field: Optional[FieldPair] = 'date',
+                 key_fields: Sequence[FieldPair] = (),
+                 amount_tolerance: float = 0.0,
+                 amount_tolerance_pct: float = 0.0,
+                 date_window_days: int = 0,
+                 name_field: Optional[FieldPair] = None,
+                 name_similarity: float = NAME_SIMILARITY,
+                 candidates: int = WINDOW_CANDIDATES,
+                 max_rounds: int = MAX_TOLERANCE_ROUNDS):
+        """
+        Initialize the specification
+
+        Args:
+            name: Rule name written to result rows
+            amount_field: Amount field, the same on both sides or a (left, right) pair
+            date_field: Date field (or pair), or None to match on amount only
+            key_fields: Fields (or pairs) that must be equal, compared trimmed
+                        and case-insensitively (e.g. vendor type)
+            amount_tolerance: Absolute amount difference accepted
+            amount_tolerance_pct: Amount difference accepted, in percent of the left amount
+            date_window_days: Date difference accepted, in days
+            name_field: Name field (or pair), e.g. merchant, matched fuzzily
+            name_similarity: Minimum Jaccard similarity of the name n-grams (0-1)
+            candidates: Right-side neighbours examined on each side per round
+            max_rounds: Maximum tolerance rounds
+        """
+        self.name = name
+        self.amount_fields = field_pair(amount_field)
+        self.date_fields = field_pair(date_field) if date_field else None
+        self.key_fields = [field_pair(field) for field in key_fields]
+        self.amount_tolerance = float(amount_tolerance)
+        self.amount_tolerance_pct = float(amount_tolerance_pct)
+        self.date_window_days = int(date_window_days)
+        self.name_fields = field_pair(name_field) if name_field else None
+        self.name_similarity = min(max(float(name_similarity), 0.0), 1.0)
+        self.candidates = max(int(candidates), 1)
+        self.max_rounds = max(int(max_rounds), 0)
+
+    @property
+    def uses_tolerance(self) -> bool:
+        return bool(self.amount_tolerance or self.amount_tolerance_pct or self.date_window_days
+                    or self.name_fields)
+
+    def blocking_index(self) -> BlockingIndex:
+        """Blocking index for the fuzzy (name) tolerance pass"""
+        return BlockingIndex(
+            amount_tolerance=self.amount_tolerance,
+            amount_tolerance_pct=self.amount_tolerance_pct,
+            date_window_days=self.date_window_days if self.date_fields else None,
+            name_similarity=self.name_similarity if self.name_fields else 0.0
+        )
+
+    def side_fields(self, side: int) -> Dict[str, Any]:
+        """Field names of one side (0 = left, 1 = right) for load_source_table"""
+        return {
+            'amount_field': self.amount_fields[side],
+            'date_field': self.date_fields[side] if self.date_fields else None,
+            'key_fields': [pair[side] for pair in self.key_fields],
+            'name_field': self.name_fields[side] if self.name_fields else None
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'amount_field': list(self.amount_fields),
+            'date_field': list(self.date_fields) if self.date_fields else None,
+            'key_fields': [list(pair) for pair in self.key_fields],
+            'amount_tolerance': self.amount_tolerance,
+            'amount_tolerance_pct': self.amount_tolerance_pct,
+            'date_window_days': self.date_window_days,
+            'name_field': list(self.name_fields) if self.name_fields else None,
+            'name_similarity': self.name_similarity if self.name_fields else None
+        }
+
+
+class MatchOutcome:
+    """
+    Result of matching two tables
+
+    left_index/right_index hold the matched row pairs (positions in the
+    tables) and exact whether each pair matched exactly or within tolerance.
+    """
+
+    def __init__(self, left_index: np.ndarray, right_index: np.ndarray, exact: np.ndarray,
+                 unmatched_left: np.ndarray, unmatched_right: np.ndarray,
+                 timings: Dict[str, float], rounds: int,
+                 blocking: Optional[Dict[str, Any]] = None):
+        self.left_index = left_index
+        self.right_index = right_index
+        self.exact = exact
+        self.unmatched_left = unmatched_left
+        self.unmatched_right = unmatched_right
+        self.timings = timings
+        self.rounds = rounds
+        self.blocking = blocking
+
+    def summary(self) -> Dict[str, Any]:
+        exact = int(np.count_nonzero(self.exact))
+        summary = {
+            'matched': len(self.left_index),
+            'exact_matches': exact,
+            'tolerance_matches': len(self.left_index) - exact,
+            'unmatched_left': len(self.unmatched_left),
+            'unmatched_right': len(self.unmatched_right),
+            'tolerance_rounds': self.rounds,
+            'timings': {stage: round(seconds, 3) for stage, seconds in self.timings.items()}
+        }
+        if self.blocking:
+            summary['blocking'] = self.blocking
+        return summary
+
+
+def block_codes(left: SourceTable, right: SourceTable,
+                key_fields: List[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Integer code per row for the combination of its key field values
+
+    Codes are shared by both tables, so equal codes mean equal keys.
+    """
+    n = len(left)
+    codes = np.zeros(n + len(right), dtype=np.int64)
+    for left_field, right_field in key_fields:
+        values = np.concatenate([left.keys[left_field], right.keys[right_field]])
+        field_codes, uniques = pd.factorize(values)
+        codes, _ = pd.factorize(codes * len(uniques) + field_codes)
+        codes = codes.astype(np.int64)
+    return codes[:n], codes[n:]
+
+
+def exact_pairs(left_rows: np.ndarray, right_rows: np.ndarray,
+                left_cols: Tuple[np.ndarray, ...], right_cols: Tuple[np.ndarray, ...]
+                ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash join on equal (block, cents, day), one-to-one
+
+    Records with the same key on one side are numbered, and the n-th
+    record on the left pairs with the n-th on the right.
+
+    Returns:
+        Matched (left rows, right rows)
+    """
+    columns = ['block', 'cents', 'day']
+
+    def frame(rows, cols):
+        df = pd.DataFrame({name: col[rows] for name, col in zip(columns, cols)})
+        df['occurrence'] = df.groupby(columns, sort=False).cumcount()
+        df['row'] = rows
+        return df
+
+    merged = frame(left_rows, left_cols).merge(frame(right_rows, right_cols),
+                                               on=columns + ['occurrence'], suffixes=('_l', '_r'))
+    return merged['row_l'].to_numpy(), merged['row_r'].to_numpy()
+
+
+def window_pairs(left_rows: np.ndarray, right_rows: np.ndarray,
+                 left_cols: Tuple[np.ndarray, ...], right_cols: Tuple[np.ndarray, ...],
+                 spec: MatchSpec) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Greedy one-to-one matching within tolerances over sorted windows
+
+    Each round both sides are ordered by (block, cents, day) and every left
+    record looks at its `candidates` right neighbours on each side of its
+    position. It proposes the closest one within tolerance (amount first,
+    then date); when several left records propose the same right record,
+    the closest wins and the others try again next round.
+
+    Returns:
+        Matched (left rows, right rows) and the number of rounds run
+    """
+    left_block, left_cents, left_day = left_cols
+    right_block, right_cents, right_day = right_cols
+    use_dates = spec.date_fields is not None
+    window = spec.date_window_days
+    offsets = np.concatenate([-np.arange(1, spec.candidates + 1), np.arange(spec.candidates)])
+
+    matched_left: List[np.ndarray] = []
+    matched_right: List[np.ndarray] = []
+    rounds = 0
+
+    while rounds < spec.max_rounds and len(left_rows) and len(right_rows):
+        rounds += 1
+        # Merge both sides in (block, cents, day) order; on ties left sorts first
+        rows = np.concatenate([left_rows, right_rows])
+        is_right = np.concatenate([np.zeros(len(left_rows), bool), np.ones(len(right_rows), bool)])
+        block = np.concatenate([left_block[left_rows], right_block[right_rows]])
+        cents = np.concatenate([left_cents[left_rows], right_cents[right_rows]])
+        day = np.concatenate([left_day[left_rows], right_day[right_rows]])
+        order = np.lexsort((is_right, day, cents, block))
+
+        sorted_right = rows[order][is_right[order]]
+        # Right records before each left record in the merged order
+        right_before = np.cumsum(is_right[order]) - is_right[order]
+        left_sorted = rows[order][~is_right[order]]
+        left_position = right_before[~is_right[order]]
+
+        proposals_left, proposals_right, proposals_score = [], [], []
+        for start in range(0, len(left_sorted), CANDIDATE_CHUNK_ROWS):
+            lefts = left_sorted[start:start + CANDIDATE_CHUNK_ROWS]
+            positions = left_position[start:start + CANDIDATE_CHUNK_ROWS, None] + offsets
+            valid = (positions >= 0) & (positions < len(sorted_right))
+            candidates = sorted_right[np.clip(positions, 0, len(sorted_right) - 1)]
+
+            amount_diff = np.abs(right_cents[candidates] - left_cents[lefts, None])
+            tolerance = np.maximum(spec.amount_tolerance * 100,
+                                   np.abs(left_cents[lefts]) * spec.amount_tolerance_pct / 100)
+            valid &= right_block[candidates] == left_block[lefts, None]
+            valid &= amount_diff <= tolerance[:, None] + 0.5
+            score = amount_diff * (window + 1)
+            if use_dates:
+                date_diff = np.abs(right_day[candidates] - left_day[lefts, None])
+                valid &= date_diff <= window  # NaN (missing date) compares False
+                score = score + np.nan_to_num(date_diff)
+
+            score = np.where(valid, score, np.inf)
+            best = np.argmin(score, axis=1)
+            best_score = score[np.arange(len(lefts)), best]
+            found = np.isfinite(best_score)
+            proposals_left.append(lefts[found])
+            proposals_right.append(candidates[np.arange(len(lefts)), best][found])
+            proposals_score.append(best_score[found])
+
+        proposed_left = np.concatenate(proposals_left)
+        if not len(proposed_left):
+            break
+        proposed_right = np.concatenate(proposals_right)
+        # Closest proposal wins each right record
+        ranking = np.lexsort((proposed_left, np.concatenate(proposals_score)))
+        _, first = np.unique(proposed_right[ranking], return_index=True)
+        accepted = ranking[first]
+
+        matched_left.append(proposed_left[accepted])
+        matched_right.append(proposed_right[accepted])
+        left_rows = np.setdiff1d(left_rows, proposed_left[accepted], assume_unique=True)
+        right_rows = np.setdiff1d(right_rows, proposed_right[accepted], assume_unique=True)
+
+    empty = np.empty(0, dtype=np.int64)
+    return (np.concatenate(matched_left) if matched_left else empty,
+            np.concatenate(matched_right) if matched_right else empty,
+            rounds)
+
+
+def match_tables(left: SourceTable, right: SourceTable, spec: MatchSpec) -> MatchOutcome:
+    """
+    Match two source tables one-to-one
+
+    Records without a parsable amount are never matched.
+
+    Args:
+        left: Left source (e.g. POS)
+        right: Right source (e.g. bank statement)
+        spec: Match specification
+
+    Returns:
+        MatchOutcome with matched pairs and unmatched rows of each side
+    """
+    timings = {}
+    start = time.perf_counter()
+    left_block, right_block = block_codes(left, right, spec.key_fields)
+    left_cols = (left_block, left.cents, left.days)
+    right_cols = (right_block, right.cents, right.days)
+    left_rows = np.flatnonzero(~np.isnan(left.cents))
+    right_rows = np.flatnonzero(~np.isnan(right.cents))
+    timings['prepare'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+
+    def join_columns(cols):
+        block, cents, days = cols
+        return (block, np.nan_to_num(cents).astype(np.int64),
+                np.where(np.isnan(days), _NO_DATE, np.nan_to_num(days)).astype(np.int64))
+
+    exact_left, exact_right = exact_pairs(left_rows, right_rows,
+                                          join_columns(left_cols), join_columns(right_cols))
+    index = None
+    if spec.name_fields:
+        # Equal amounts and dates are still two different merchants if the names differ
+        index = spec.blocking_index()
+        index.prepare(left, right)
+        if index.ngrams is not None:
+            # Without n-grams (name_similarity 0) every name passes
+            similar = index.ngrams.jaccard(exact_left, exact_right + len(left)) >= spec.name_similarity
+            exact_left, exact_right = exact_left[similar], exact_right[similar]
+    timings['exact_join'] = time.perf_counter() - start
+
+    tolerance_left = tolerance_right = np.empty(0, dtype=np.int64)
+    rounds = 0
+    if spec.uses_tolerance:
+        start = time.perf_counter()
+        remaining_left = np.setdiff1d(left_rows, exact_left, assume_unique=True)
+        remaining_right = np.setdiff1d(right_rows, exact_right, assume_unique=True)
+        if index is not None:
+            candidates_left, candidates_right = index.candidate_pairs(
+                left, right, remaining_left, remaining_right, left_block, right_block)
+            timings['blocking'] = time.perf_counter() - start
+            start = time.perf_counter()
+            valid, score = index.verify(left, right, candidates_left, candidates_right)
+            tolerance_left, tolerance_right, rounds = resolve_pairs(
+                candidates_left[valid], candidates_right[valid], score[valid])
+            timings['fuzzy_match'] = time.perf_counter() - start
+        else:
+            tolerance_left, tolerance_right, rounds = window_pairs(
+                remaining_left, remaining_right, left_cols, right_cols, spec)
+            timings['tolerance_windows'] = time.perf_counter() - start
+
+    left_index = np.concatenate([exact_left, tolerance_left]).astype(np.int64)
+    right_index = np.concatenate([exact_right, tolerance_right]).astype(np.int64)
+    exact = np.zeros(len(left_index), dtype=bool)
+    exact[:len(exact_left)] = True
+
+    return MatchOutcome(
+        left_index=left_index,
+        right_index=right_index,
+        exact=exact,
+        unmatched_left=np.setdiff1d(np.arange(len(left)), left_index, assume_unique=True),
+        unmatched_right=np.setdiff1d(np.arange(len(right)), right_index, assume_unique=True),
+        timings=timings,
+        rounds=rounds,
+        blocking=index.stats if index is not None else None
+    )
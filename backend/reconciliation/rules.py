@@ -0,0 +1,499 @@
+"""
+Matching Rule Compiler
+Compiles the matchingrules of a matching method (or of a whole profile)
+into a dependency DAG of rule steps and executes it:
+- aggregate steps ($sum, $avg, ... with filters) over the same source
+  collection are fused into one $facet pipeline, so each source
+  collection is read once
+- arithmetic steps ($subtract, $equals, ...) are evaluated in dependency
+  order from the memoized outputs of the steps they reference
+Identical steps compile to one node, so an output shared by several rules
+(or referenced by a later, cascading rule) is computed once
+"""
+import json
+import math
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+
+# Source collections aggregated concurrently
+RULE_WORKERS = int(os.getenv('RULE_EXECUTOR_WORKERS', 4))
+
+# $equals treats numbers this close as equal (half a cent absorbs float summation error)
+EQUALS_TOLERANCE = float(os.getenv('RULE_EQUALS_TOLERANCE', 0.005))
+
+OUTPUT_PREFIX = 'outputs.'
+
+AGGREGATE_OPERATIONS = ('$sum', '$avg', '$min', '$max', '$count')
+
+# Value of an aggregate over no matching documents
+_EMPTY_AGGREGATE = {'$sum': 0.0, '$count': 0}
+
+
+def _numbers_equal(left: Any, right: Any) -> bool:
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)) \
+            and not isinstance(left, bool) and not isinstance(right, bool):
+        return math.isclose(left, right, rel_tol=0.0, abs_tol=EQUALS_TOLERANCE)
+    return left == right
+
+
+def _numeric(operation: Callable[[float, float], Any]) -> Callable[[Any, Any], Any]:
+    """Arithmetic on two numbers; None when either operand is missing"""
+    def apply(left: Any, right: Any) -> Any:
+        if left is None or right is None:
+            return None
+        return operation(left, right)
+    return apply
+
+
+ARITHMETIC_OPERATIONS: Dict[str, Callable[[Any, Any], Any]] = {
+    '$add': _numeric(lambda a, b: a + b),
+    '$subtract': _numeric(lambda a, b: a - b),
+    '$multiply': _numeric(lambda a, b: a * b),
+    '$divide': _numeric(lambda a, b: a / b if b else None),
+    '$equals': _numbers_equal,
+    '$notEquals': lambda a, b: not _numbers_equal(a, b),
+    '$gt': _numeric(lambda a, b: a > b),
+    '$gte': _numeric(lambda a, b: a >= b),
+    '$lt': _numeric(lambda a, b: a < b),
+    '$lte': _numeric(lambda a, b: a <= b)
+}
+
+
+class RuleCompileError(ValueError):
+    """A matching rule cannot be compiled (unknown operation or reference, cycle, ...)"""
+
+
+def numeric_expression(field: str) -> Dict[str, Any]:
+    """
+    Aggregation expression reading a field as a double
+
+    Strings such as '1,234.56' or '$85.37' are cleaned before conversion;
+    values that are not numbers become null (ignored by $sum/$avg).
+    """
+    path = f'${field}'
+    cleaned = {'$trim': {'input': path}}
+    for symbol in (',', '$'):
+        cleaned = {'$replaceAll': {'input': cleaned, 'find': {'$literal': symbol}, 'replacement': ''}}
+    return {'$convert': {
+        'input': {'$cond': [{'$eq': [{'$type': path}, 'string']}, cleaned, path]},
+        'to': 'double',
+        'onError': None,
+        'onNull': None
+    }}
+
+
+def filter_query(filters: Any) -> Dict[str, Any]:
+    """
+    $match query for a rule step filter
+
+    A filter is {'field', 'value', 'mode'} (or a list of them, all of which
+    must hold). String values match trimmed and case-insensitively; mode is
+    'equals' (default), 'contains', 'startsWith' or 'notEquals'.
+    """
+    if not filters:
+        return {}
+    conditions = []
+    for item in (filters if isinstance(filters, list) else [filters]):
+        field, value = item.get('field'), item.get('value')
+        if not field:
+            raise RuleCompileError(f'Filter without a field: {item}')
+        mode = item.get('mode') or 'equals'
+        if not isinstance(value, str):
+            if mode not in ('equals', 'notEquals'):
+                raise RuleCompileError(f"Filter mode '{mode}' needs a string value")
+            conditions.append({field: value if mode == 'equals' else {'$ne': value}})
+            continue
+        text = re.escape(value.strip())
+        patterns = {
+            'equals': rf'^\s*{text}\s*$',
+            'notEquals': rf'^\s*{text}\s*$',
+            'contains': text,
+            'startsWith': rf'^\s*{text}'
+        }
+        if mode not in patterns:
+            raise RuleCompileError(f"Unsupported filter mode '{mode}'")
+        regex = {'$regex': patterns[mode], '$options': 'i'}
+        conditions.append({field: {'$not': regex} if mode == 'notEquals' else regex})
+    return conditions[0] if len(conditions) == 1 else {'$and': conditions}
+
+
+class RuleNode:
+    """
+    One distinct computation in the rule DAG
+
+    Aggregate nodes read a source collection; arithmetic nodes combine
+    operands, each either ('ref', node id) or ('static', value).
+    """
+
+    def __init__(self, node_id: str, kind: str, operation: str,
+                 collection: Optional[str] = None, field: Optional[str] = None,
+                 query: Optional[Dict[str, Any]] = None,
+                 operands: Tuple[Tuple[str, Any], ...] = ()):
+        self.node_id = node_id
+        self.kind = kind
+        self.operation = operation
+        self.collection = collection
+        self.field = field
+        self.query = query or {}
+        self.operands = operands
+
+    def facet(self) -> List[Dict[str, Any]]:
+        """$facet sub-pipeline computing this aggregate"""
+        stages = [{'$match': self.query}] if self.query else []
+        if self.operation == '$count':
+            value = {'$sum': 1}
+        else:
+            value = {self.operation: numeric_expression(self.field)}
+        stages.append({'$group': {'_id': None, 'value': value, 'count': {'$sum': 1}}})
+        return stages
+
+    def to_dict(self) -> Dict[str, Any]:
+        node = {'id': self.node_id, 'kind': self.kind, 'operation': self.operation}
+        if self.kind == 'aggregate':
+            node.update({'collection': self.collection, 'field': self.field, 'filter': self.query})
+        else:
+            node['operands'] = [{'type': kind, 'value': value} for kind, value in self.operands]
+        return node
+
+
+class CompiledRule:
+    """A matchingrules document with its outputs bound to DAG nodes"""
+
+    def __init__(self, document: Dict[str, Any]):
+        self.rule_id = document.get('_id')
+        self.name = (document.get('ruleName') or '').strip() or str(self.rule_id)
+        self.matching_method_id = document.get('matchingMethodId')
+        self.order = document.get('order') or 0
+        self.display = (document.get('display') or {}).get('fields') or []
+        self.steps = [step for group in (document.get('rules') or [])
+                      for step in (group if isinstance(group, list) else [group])]
+        self.outputs: Dict[str, str] = {}
+
+    def display_values(self, outputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Display fields (e.g. reconciliation_status) from the rule outputs"""
+        values = {}
+        for field in self.display:
+            ref = field.get('value') or ''
+            value = outputs.get(ref[len(OUTPUT_PREFIX):] if ref.startswith(OUTPUT_PREFIX) else ref)
+            datatype = field.get('datatype') or {}
+            if isinstance(value, bool) and datatype.get('type') == 'boolean':
+                value = datatype.get('trueValue', True) if value else datatype.get('falseValue', False)
+            values[field.get('key')] = value
+        return values
+
+
+class RulePlan:
+    """
+    Compiled rules: DAG nodes in dependency order plus one fused $facet
+    pipeline per source collection
+    """
+
+    def __init__(self, rules: List[CompiledRule], nodes: Dict[str, RuleNode], steps: int):
+        self.rules = rules
+        self.nodes = nodes
+        self.steps = steps
+
+    @property
+    def collections(self) -> List[str]:
+        return sorted({node.collection for node in self.nodes.values() if node.kind == 'aggregate'})
+
+    def pipelines(self) -> Dict[str, List[Dict[str, Any]]]:
+        """One aggregation pipeline per source collection, projecting only the fields the facets read"""
+        pipelines = {}
+        for collection in self.collections:
+            aggregates = [node for node in self.nodes.values()
+                          if node.kind == 'aggregate' and node.collection == collection]
+            fields = set()
+            for node in aggregates:
+                if node.field:
+                    fields.add(node.field)
+                fields.update(_query_fields(node.query))
+            stages = [{'$project': {field: 1 for field in sorted(fields)}}] if fields else []
+            stages.append({'$facet': {node.node_id: node.facet() for node in aggregates}})
+            pipelines[collection] = stages
+        return pipelines
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'rules': len(self.rules),
+            'steps': self.steps,
+            'nodes': len(self.nodes),
+            'shared_steps': self.steps - len(self.nodes),
+            'collection_passes': len(self.collections)
+        }
+
+    def explain(self) -> Dict[str, Any]:
+        return {
+            **self.stats(),
+            'nodes': [node.to_dict() for node in self.nodes.values()],
+            'outputs': {rule.name: rule.outputs for rule in self.rules},
+            'pipelines': self.pipelines()
+        }
+
+
+def _query_fields(query: Dict[str, Any]) -> List[str]:
+    fields = []
+    for key, value in query.items():
+        if key == '$and':
+            for condition in value:
+                fields.extend(_query_fields(condition))
+        else:
+            fields.append(key)
+    return fields
+
+
+class RuleCompiler:
+    """
+    Builds a RulePlan from matchingrules documents
+
+    A step's output is visible to the steps of its own rule and, cascading,
+    to every later rule (by order). A reference resolves to the rule's own
+    output of that name first, then to the latest earlier rule defining it.
+    """
+
+    def __init__(self):
+        self.nodes: Dict[str, RuleNode] = {}
+        self._signatures: Dict[str, str] = {}
+        self._steps = 0
+
+    def _node(self, signature: Dict[str, Any], build: Callable[[str], RuleNode]) -> str:
+        """Id of the node with this signature, creating it on first use"""
+        key = json.dumps(signature, sort_keys=True, default=str)
+        if key not in self._signatures:
+            node_id = f'n{len(self.nodes)}'
+            self.nodes[node_id] = build(node_id)
+            self._signatures[key] = node_id
+        return self._signatures[key]
+
+    def compile(self, documents: List[Dict[str, Any]]) -> RulePlan:
+        """
+        Compile rules in order
+
+        Raises:
+            RuleCompileError: On unsupported operations, unknown references or cycles
+        """
+        rules = [CompiledRule(document) for document in
+                 sorted(documents, key=lambda d: d.get('order') or 0)]
+        visible: Dict[str, str] = {}  # outputs of earlier rules, latest definition wins
+
+        for rule in rules:
+            definitions = {}
+            for step in rule.steps:
+                name = (step.get('output') or {}).get('name')
+                if not name:
+                    raise RuleCompileError(f"Rule '{rule.name}': step without an output name")
+                if name in definitions:
+                    raise RuleCompileError(f"Rule '{rule.name}': output '{name}' is defined twice")
+                definitions[name] = step
+
+            resolving: List[str] = []
+
+            def resolve(name: str) -> str:
+                if name in rule.outputs:
+                    return rule.outputs[name]
+                if name not in definitions:
+                    if name in visible:
+                        return visible[name]
+                    raise RuleCompileError(f"Rule '{rule.name}': unknown output '{OUTPUT_PREFIX}{name}'")
+                if name in resolving:
+                    cycle = ' -> '.join(resolving[resolving.index(name):] + [name])
+                    raise RuleCompileError(f"Rule '{rule.name}': circular outputs {cycle}")
+                resolving.append(name)
+                rule.outputs[name] = self.compile_step(rule, definitions[name], resolve)
+                resolving.pop()
+                return rule.outputs[name]
+
+            for name in definitions:
+                resolve(name)
+            self._steps += len(definitions)
+            visible.update(rule.outputs)
+
+        return RulePlan(rules, self.nodes, self._steps)
+
+    def compile_step(self, rule: CompiledRule, step: Dict[str, Any],
+                     resolve: Callable[[str], str]) -> str:
+        """Node id for one rule step (dependencies are resolved, and so created, first)"""
+        operation = step.get('operation')
+        if step.get('type') == 'aggregate':
+            if operation not in AGGREGATE_OPERATIONS:
+                raise RuleCompileError(f"Rule '{rule.name}': unsupported aggregate '{operation}'")
+            sources = list(dict.fromkeys(step.get('dataSourceIds') or []))
+            if len(sources) != 1:
+                raise RuleCompileError(f"Rule '{rule.name}': aggregate steps need exactly one data source")
+            field = step.get('fieldId')
+            if not field and operation != '$count':
+                raise RuleCompileError(f"Rule '{rule.name}': {operation} needs a fieldId")
+            query = filter_query(step.get('filter'))
+            signature = {'collection': sources[0], 'field': field if operation != '$count' else None,
+                         'operation': operation, 'query': query}
+            return self._node(signature, lambda node_id: RuleNode(
+                node_id, 'aggregate', operation, collection=sources[0], field=field, query=query))
+
+        if step.get('type') == 'arithmetic':
+            if operation not in ARITHMETIC_OPERATIONS:
+                raise RuleCompileError(f"Rule '{rule.name}': unsupported arithmetic '{operation}'")
+            operands = tuple(self.operand(rule, step.get(side), resolve)
+                             for side in ('leftField', 'rightField'))
+            signature = {'operation': operation, 'operands': operands}
+            return self._node(signature, lambda node_id: RuleNode(
+                node_id, 'arithmetic', operation, operands=operands))
+
+        raise RuleCompileError(f"Rule '{rule.name}': unsupported step type '{step.get('type')}'")
+
+    @staticmethod
+    def operand(rule: CompiledRule, spec: Optional[Dict[str, Any]],
+                resolve: Callable[[str], str]) -> Tuple[str, Any]:
+        if not spec:
+            raise RuleCompileError(f"Rule '{rule.name}': arithmetic step is missing an operand")
+        if spec.get('type') == 'static':
+            return ('static', spec.get('value'))
+        if spec.get('type') == 'ref':
+            ref = spec.get('value') or ''
+            if not ref.startswith(OUTPUT_PREFIX):
+                raise RuleCompileError(f"Rule '{rule.name}': references must start with '{OUTPUT_PREFIX}'")
+            return ('ref', resolve(ref[len(OUTPUT_PREFIX):]))
+        raise RuleCompileError(f"Rule '{rule.name}': unsupported operand type '{spec.get('type')}'")
+
+
+def compile_rules(documents: List[Dict[str, Any]]) -> RulePlan:
+    """Compile matchingrules documents into a RulePlan"""
+    return RuleCompiler().compile(documents)
+
+
+class RuleExecutor:
+    """
+    Executes compiled rules: one fused aggregation per source collection
+    (collections in parallel), then the arithmetic nodes in order
+    """
+
+    def __init__(self, db, max_workers: int = RULE_WORKERS):
+        """
+        Initialize the executor
+
+        Args:
+            db: pymongo database
+            max_workers: Source collections aggregated concurrently
+        """
+        self.db = db
+        self.max_workers = max_workers
+
+    def load_rules(self, matching_method_id: Optional[str] = None,
+                   profile_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Active matchingrules of a matching method or of every method in a profile"""
+        query: Dict[str, Any] = {'active': {'$ne': False}}
+        if matching_method_id:
+            query['matchingMethodId'] = ObjectId(matching_method_id)
+        if profile_id:
+            query['profileId'] = ObjectId(profile_id)
+        return list(self.db['matchingrules'].find(query).sort('order', 1))
+
+    def aggregate(self, plan: RulePlan) -> Tuple[Dict[str, Any], Dict[str, int]]:
+        """
+        Run every fused pipeline
+
+        Returns:
+            (value by aggregate node id, matched document count by node id)
+        """
+        pipelines = plan.pipelines()
+
+        def run(collection: str) -> Dict[str, List[Dict[str, Any]]]:
+            return next(self.db[collection].aggregate(pipelines[collection], allowDiskUse=True), {})
+
+        values, counts = {}, {}
+        workers = max(1, min(self.max_workers, len(pipelines) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rules') as executor:
+            for facets in executor.map(run, pipelines):
+                for node_id, groups in facets.items():
+                    operation = plan.nodes[node_id].operation
+                    group = groups[0] if groups else {}
+                    value = group.get('value')
+                    values[node_id] = _EMPTY_AGGREGATE.get(operation) if value is None else value
+                    counts[node_id] = group.get('count', 0)
+        return values, counts
+
+    @staticmethod
+    def evaluate(plan: RulePlan, memo: Dict[str, Any]) -> Dict[str, Any]:
+        """Evaluate the arithmetic nodes (creation order is dependency order) into memo"""
+        for node in plan.nodes.values():
+            if node.kind != 'arithmetic':
+                continue
+            left, right = (memo[value] if kind == 'ref' else value for kind, value in node.operands)
+            memo[node.node_id] = ARITHMETIC_OPERATIONS[node.operation](left, right)
+        return memo
+
+    def execute(self, matching_method_id: Optional[str] = None, profile_id: Optional[str] = None,
+                documents: Optional[List[Dict[str, Any]]] = None,
+                explain: bool = False) -> Dict[str, Any]:
+        """
+        Compile and execute the rules of a matching method or profile
+
+        Args:
+            matching_method_id: Execute this method's rules
+            profile_id: Execute the rules of every method in the profile
+            documents: matchingrules documents to execute instead of loading them
+            explain: Include the compiled nodes and pipelines
+
+        Returns:
+            Result dictionary with per-rule outputs and display values,
+            plan statistics and stage timings
+        """
+        result = {'success': False, 'rules': [], 'error': None}
+        timings = {}
+        started = time.perf_counter()
+
+        try:
+            if documents is None:
+                if not (matching_method_id or profile_id):
+                    result['error'] = 'Invalid request: pass a matching method or profile ID'
+                    return result
+                if not all(ObjectId.is_valid(i) for i in (matching_method_id, profile_id) if i):
+                    result['error'] = 'Invalid request: IDs must be 24-character hex ObjectIds'
+                    return result
+                documents = self.load_rules(matching_method_id, profile_id)
+            if not documents:
+                result['error'] = 'Invalid request: no active matching rules found'
+                return result
+
+            start = time.perf_counter()
+            try:
+                plan = compile_rules(documents)
+            except RuleCompileError as e:
+                result['error'] = f'Invalid rules: {str(e)}'
+                return result
+            timings['compile'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            memo, counts = self.aggregate(plan)
+            timings['aggregate'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.evaluate(plan, memo)
+            timings['evaluate'] = time.perf_counter() - start
+
+            for rule in plan.rules:
+                outputs = {name: memo[node_id] for name, node_id in rule.outputs.items()}
+                result['rules'].append({
+                    'rule_id': rule.rule_id,
+                    'rule_name': rule.name,
+                    'matching_method_id': rule.matching_method_id,
+                    'outputs': outputs,
+                    'record_counts': {name: counts[node_id] for name, node_id in rule.outputs.items()
+                                      if node_id in counts},
+                    'display': rule.display_values(outputs)
+                })
+            result['plan'] = plan.explain() if explain else plan.stats()
+            result['success'] = True
+
+        except Exception as e:
+            result['error'] = f'Rule execution failed: {str(e)}'
+        finally:
+            timings['total'] = time.perf_counter() - started
+            result['timings'] = {stage: round(seconds, 4) for stage, seconds in timings.items()}
+
+        return result
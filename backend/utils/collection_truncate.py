@@ -0,0 +1,129 @@
+"""
+Collection Truncation
+Empties collections by dropping and recreating them with the same options
+(validator, collation, capped size) and secondary indexes, instead of
+deleting every document with delete_many({})
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List
+
+from pymongo import IndexModel
+from pymongo.errors import CollectionInvalid
+
+
+TRUNCATE_WORKERS = int(os.getenv('CLEAR_DATA_WORKERS', 4))
+
+# Index spec keys that describe the index rather than configure it
+_INDEX_META_KEYS = ('key', 'v', 'ns')
+
+
+def index_models(collection) -> List[IndexModel]:
+    """
+    Capture the secondary indexes of a collection
+
+    Args:
+        collection: pymongo collection
+
+    Returns:
+        IndexModels recreating every index except _id_ with its options
+        (name, unique, sparse, partialFilterExpression, TTL, collation, ...)
+    """
+    models = []
+    for spec in collection.list_indexes():
+        if spec['name'] == '_id_':
+            continue
+        options = {key: value for key, value in spec.items() if key not in _INDEX_META_KEYS}
+        models.append(IndexModel(list(spec['key'].items()), **options))
+    return models
+
+
+class CollectionTruncator:
+    """
+    Drop-and-recreate truncation of several collections in parallel
+
+    Dropping a collection is a single metadata operation, whereas
+    delete_many({}) removes (and writes an oplog entry for) each document.
+    Views and system collections are skipped.
+    """
+
+    def __init__(self, db, max_workers: int = TRUNCATE_WORKERS):
+        """
+        Initialize the truncator
+
+        Args:
+            db: pymongo database
+            max_workers: Collections truncated concurrently
+        """
+        self.db = db
+        self.max_workers = max_workers
+
+    def truncate_collection(self, name: str, exists: bool = True) -> Dict[str, Any]:
+        """
+        Empty one collection, keeping its options and indexes
+
+        Args:
+            name: Collection name
+            exists: Whether the collection exists (missing ones are skipped)
+
+        Returns:
+            Dictionary with documents removed, indexes recreated and
+            elapsed seconds, or 'skipped' / 'error' with the reason
+        """
+        start = time.perf_counter()
+        result = {'collection': name, 'deleted_count': 0, 'indexes_recreated': 0}
+        try:
+            if not exists:
+                result['skipped'] = 'collection does not exist'
+                return result
+            collection = self.db[name]
+            options = collection.options()
+            if 'viewOn' in options or name.startswith('system.'):
+                result['skipped'] = 'views and system collections are not truncated'
+                return result
+
+            indexes = index_models(collection)
+            result['deleted_count'] = collection.estimated_document_count()
+
+            collection.drop()
+            try:
+                self.db.create_collection(name, **options)
+            except CollectionInvalid:
+                pass  # Recreated by a concurrent write; still restore the indexes
+            if indexes:
+                self.db[name].create_indexes(indexes)
+            result['indexes_recreated'] = len(indexes)
+        except Exception as e:
+            result['error'] = str(e)
+            print(f"❌ Failed to truncate {name}: {e}")
+        finally:
+            result['elapsed_seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+    def truncate(self, names: Iterable[str]) -> Dict[str, Any]:
+        """
+        Truncate collections concurrently
+
+        Args:
+            names: Collection names
+
+        Returns:
+            Dictionary with per-collection results, total documents removed,
+            failed collections and total elapsed seconds
+        """
+        start = time.perf_counter()
+        names = list(names)
+        existing = set(self.db.list_collection_names())
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(names) or 1)),
+                                thread_name_prefix='truncate') as executor:
+            results = list(executor.map(
+                lambda name: self.truncate_collection(name, name in existing), names))
+
+        return {
+            'collections': results,
+            'deleted_count': sum(r['deleted_count'] for r in results if 'error' not in r),
+            'collections_cleared': sum(1 for r in results if 'error' not in r and 'skipped' not in r),
+            'failed': [r['collection'] for r in results if 'error' in r],
+            'elapsed_seconds': round(time.perf_counter() - start, 3)
+        }
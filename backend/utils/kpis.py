@@ -0,0 +1,199 @@
+"""
+Dashboard KPIs
+Computes the reconciliation overview in one $facet aggregation per
+collection (discrepancies, tickets, resolutions, matching result cell
+facts), run concurrently, so the dashboard gets every headline number in
+a single small response instead of downloading and counting full lists
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from collection_names import CELL_FACTS_COLLECTION
+
+
+KPI_WORKERS = int(os.getenv('KPI_WORKERS', 4))
+
+# Ticket statuses that no longer need work, and resolution statuses that settle a discrepancy
+CLOSED_TICKET_STATUSES = ['Closed', 'Resolved', 'Done', 'Cancelled', 'closed', 'resolved', 'done', 'cancelled']
+RESOLVED_STATUSES = ['Approved', 'Resolved', 'Closed', 'approved', 'resolved', 'closed']
+
+# Matching result columns holding the two sides' amounts; a matched pair
+# counts once, with the amount of the first
+AMOUNT_COLUMNS = ['left_amount', 'right_amount']
+
+
+def _counts(buckets: List[Dict[str, Any]]) -> Dict[str, int]:
+    """{value: count} from $group buckets (missing values reported as 'unknown')"""
+    return {str(bucket['_id']) if bucket['_id'] is not None else 'unknown': bucket['count']
+            for bucket in buckets}
+
+
+def _total(facet: List[Dict[str, Any]], key: str = 'count') -> Any:
+    """Single value of a $count/$group facet (0 when the facet is empty)"""
+    return facet[0][key] if facet else 0
+
+
+class KpiAggregator:
+    """
+    One-round-trip-per-collection dashboard metrics
+    """
+
+    def __init__(self, db, max_workers: int = KPI_WORKERS):
+        """
+        Initialize the aggregator
+
+        Args:
+            db: pymongo database
+            max_workers: Collections aggregated concurrently
+        """
+        self.db = db
+        self.max_workers = max_workers
+
+    @staticmethod
+    def pipelines(match: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """$facet pipeline of each collection, restricted by match"""
+        def by(field: str) -> List[Dict[str, Any]]:
+            return [{'$group': {'_id': f'${field}', 'count': {'$sum': 1}}}]
+
+        # Resolutions carry no profile: scope them through their discrepancy
+        resolution_scope = [
+            {'$lookup': {'from': 'discrepancies', 'localField': 'discrepancyId',
+                         'foreignField': '_id', 'as': 'discrepancy'}},
+            {'$match': {f'discrepancy.{field}': condition for field, condition in match.items()}}
+        ] if match else []
+
+        return {
+            'discrepancies': [
+                {'$match': match},
+                {'$facet': {
+                    'total': [{'$count': 'count'}],
+                    'amount': [{'$group': {'_id': None, 'amount': {'$sum': '$amount'}}}],
+                    'by_severity': by('severity'),
+                    'by_type': by('type'),
+                    # No resolution in a resolved status (discrepancyResolution.discrepancyId is indexed)
+                    'unresolved': [
+                        {'$project': {'_id': 1}},
+                        {'$lookup': {'from': 'discrepancyResolution', 'localField': '_id',
+                                     'foreignField': 'discrepancyId', 'as': 'resolutions'}},
+                        {'$match': {'resolutions.status': {'$nin': RESOLVED_STATUSES}}},
+                        {'$count': 'count'}
+                    ]
+                }}
+            ],
+            'ticket': [
+                {'$match': match},
+                {'$facet': {
+                    'total': [{'$count': 'count'}],
+                    'by_status': by('status'),
+                    'open_by_risk': [{'$match': {'status': {'$nin': CLOSED_TICKET_STATUSES}}}] + by('risk')
+                }}
+            ],
+            'discrepancyResolution': [
+                {'$project': {'status': 1, 'discrepancyId': 1}}
+            ] + resolution_scope + [
+                {'$facet': {
+                    'by_status': by('status')
+                }}
+            ],
+            CELL_FACTS_COLLECTION: [
+                {'$match': {**match, 'sourceIndex': 0, '$or': [{'columnType': 'boolean'},
+                                                               {'column': {'$in': AMOUNT_COLUMNS}}]}},
+                {'$facet': {
+                    # One boolean status cell per result row
+                    'rows': [{'$match': {'columnType': 'boolean'}},
+                             {'$group': {'_id': '$reconciled', 'count': {'$sum': 1}}}],
+                    'amounts': [{'$match': {'column': {'$in': AMOUNT_COLUMNS},
+                                            '$or': [{'reconciled': {'$ne': True}},
+                                                    {'column': AMOUNT_COLUMNS[0]}]}},
+                                {'$group': {'_id': '$reconciled', 'amount': {'$sum': '$value'}}}]
+                }}
+            ]
+        }
+
+    def aggregate(self, match: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Run the collection pipelines concurrently; returns each $facet document and its seconds"""
+        def run(collection: str, pipeline: List[Dict[str, Any]]):
+            start = time.perf_counter()
+            facets = next(iter(self.db[collection].aggregate(pipeline)), {})
+            return facets, time.perf_counter() - start
+
+        pipelines = self.pipelines(match)
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(pipelines))),
+                                thread_name_prefix='kpis') as executor:
+            futures = {name: executor.submit(run, name, pipeline) for name, pipeline in pipelines.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def compute(self, profile_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Dashboard overview metrics
+
+        Unresolved discrepancies have no resolution in a resolved status
+        (e.g. Approved). Matched/unmatched come from the
+        status cell of each matching result row; the matched amount sums
+        the left amount of each pair, the unmatched amount the amount of
+        each unmatched row. Resolutions of a profile are those of its
+        discrepancies.
+
+        Args:
+            profile_id: Only data of this profile
+
+        Returns:
+            Result dictionary with discrepancies, tickets, resolutions and
+            matching sections, plus per-collection timings
+        """
+        result = {'success': False, 'error': None}
+        started = time.perf_counter()
+        try:
+            match = {}
+            if profile_id:
+                # Flow documents store profileId as an ObjectId, result rows sometimes as its string
+                ids = [profile_id] + ([ObjectId(profile_id)] if ObjectId.is_valid(profile_id) else [])
+                match['profileId'] = {'$in': ids}
+            results = self.aggregate(match)
+            facets = {name: facet for name, (facet, _) in results.items()}
+            discrepancies, tickets = facets['discrepancies'], facets['ticket']
+            resolutions, cells = facets['discrepancyResolution'], facets[CELL_FACTS_COLLECTION]
+
+            open_by_risk = _counts(tickets.get('open_by_risk', []))
+            rows = {bucket['_id']: bucket['count'] for bucket in cells.get('rows', [])}
+            amounts = {bucket['_id']: bucket['amount'] for bucket in cells.get('amounts', [])}
+            matched, unmatched = rows.get(True, 0), rows.get(False, 0)
+
+            result.update({
+                'discrepancies': {
+                    'total': _total(discrepancies.get('total', [])),
+                    'unresolved': _total(discrepancies.get('unresolved', [])),
+                    'amount': round(_total(discrepancies.get('amount', []), 'amount'), 2),
+                    'by_severity': _counts(discrepancies.get('by_severity', [])),
+                    'by_type': _counts(discrepancies.get('by_type', []))
+                },
+                'tickets': {
+                    'total': _total(tickets.get('total', [])),
+                    'open': sum(open_by_risk.values()),
+                    'open_by_risk': open_by_risk,
+                    'by_status': _counts(tickets.get('by_status', []))
+                },
+                'resolutions': {
+                    'by_status': _counts(resolutions.get('by_status', []))
+                },
+                'matching': {
+                    'matched': matched,
+                    'unmatched': unmatched,
+                    'match_rate': round(matched / (matched + unmatched), 4) if matched + unmatched else None,
+                    'matched_amount': round(amounts.get(True, 0), 2),
+                    'unmatched_amount': round(amounts.get(False, 0), 2)
+                },
+                'generated_at': datetime.utcnow(),
+                'timings': {name: round(seconds, 3) for name, (_, seconds) in results.items()}
+            })
+            result['success'] = True
+        except Exception as e:
+            result['error'] = f'KPI aggregation failed: {str(e)}'
+        finally:
+            result.setdefault('timings', {})['total'] = round(time.perf_counter() - started, 3)
+        return result
@@ -3,16 +3,115 @@ MongoDB Connection Utility for Reconciliation System
 Handles multi-collection database connections and provides helper methods
 
 """
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.write_concern import WriteConcern
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from bson import ObjectId
 import os
+import threading
 from dotenv import load_dotenv
 
+from collection_names import (
+    CELL_FACTS_COLLECTION, FIELD_STATS_COLLECTION, RECONCILIATION_STATE_COLLECTION, SUMMARY_STATE_COLLECTION
+)
+from utils.collection_truncate import CollectionTruncator
+from utils.kpis import KpiAggregator
+
 load_dotenv()
 
 
+def pool_options() -> Dict[str, Any]:
+    """
+    MongoClient connection pool and write concern settings from the environment
+    
+    Returns:
+        Keyword arguments for MongoClient
+    """
+    options = {
+        'maxPoolSize': int(os.getenv('MONGODB_MAX_POOL_SIZE', 100)),
+        'minPoolSize': int(os.getenv('MONGODB_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 300000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 30000)),
+    }
+    
+    write_concern = os.getenv('MONGODB_WRITE_CONCERN')
+    if write_concern:
+        options['w'] = int(write_concern) if write_concern.isdigit() else write_concern
+    journal = os.getenv('MONGODB_WRITE_JOURNAL')
+    if journal:
+        options['journal'] = journal.lower() == 'true'
+    
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Counts connection pool events for the shared client
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'checkins': 0,
+            'checkout_failures': 0,
+            'pool_clears': 0
+        }
+        self._checked_out = 0
+        self._peak_checked_out = 0
+    
+    def _count(self, key: str, delta: int = 0):
+        with self._lock:
+            self._counters[key] += 1
+            self._checked_out += delta
+            self._peak_checked_out = max(self._peak_checked_out, self._checked_out)
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._count('pool_clears')
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        self._count('connections_created')
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        self._count('connections_closed')
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def connection_check_out_failed(self, event):
+        self._count('checkout_failures')
+    
+    def connection_checked_out(self, event):
+        self._count('checkouts', 1)
+    
+    def connection_checked_in(self, event):
+        self._count('checkins', -1)
+    
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of the counters"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['open_connections'] = stats['connections_created'] - stats['connections_closed']
+            stats['checked_out'] = self._checked_out
+            stats['peak_checked_out'] = self._peak_checked_out
+        return stats
+
+
 def serialize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
     """
     Convert MongoDB document to JSON-serializable format
@@ -60,7 +159,11 @@ class ReconciliationMongoConnector:
         'MATCHING_RESULTS': 'matchingResult',
         'DISCREPANCIES': 'discrepancies',
         'RESOLUTIONS': 'discrepancyResolution',
-        'TICKETS': 'ticket'
+        'TICKETS': 'ticket',
+        'MATCHING_RESULT_CELLS': CELL_FACTS_COLLECTION,
+        'FIELD_STATS': FIELD_STATS_COLLECTION,
+        'SUMMARY_STATE': SUMMARY_STATE_COLLECTION,
+        'RECONCILIATION_STATE': RECONCILIATION_STATE_COLLECTION
     }
     
     @staticmethod
@@ -79,9 +182,17 @@ class ReconciliationMongoConnector:
         self.uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
         self.database_name = os.getenv('MONGODB_DATABASE', 'reconciliation_system')
         self._connected = False
+        self.pool_options = pool_options()
+        self.pool_listener = PoolStatsListener()
         
         try:
-            self._client = MongoClient(self.uri, serverSelectionTimeoutMS=5000)
+            # One pooled client shared by queries and the ingesters
+            self._client = MongoClient(
+                self.uri,
+                serverSelectionTimeoutMS=5000,
+                event_listeners=[self.pool_listener],
+                **self.pool_options
+            )
             self._client.server_info()
             self._db = self._client[self.database_name]
             self._connected = True
@@ -119,6 +230,7 @@ class ReconciliationMongoConnector:
             results_col = self._db[self.COLLECTIONS['MATCHING_RESULTS']]
             results_col.create_index([('matchingMethodId', 1)])
             results_col.create_index([('profileId', 1)])
+            results_col.create_index([('matchId', 1)])
             
             # Discrepancies indexes
             disc_col = self._db[self.COLLECTIONS['DISCREPANCIES']]
@@ -126,6 +238,7 @@ class ReconciliationMongoConnector:
             disc_col.create_index([('severity', 1)])
             disc_col.create_index([('type', 1)])
             disc_col.create_index([('workspaceId', 1)])
+            disc_col.create_index([('matchId', 1), ('type', 1)])
             
             # Resolutions indexes
             res_col = self._db[self.COLLECTIONS['RESOLUTIONS']]
@@ -150,6 +263,48 @@ class ReconciliationMongoConnector:
             raise Exception("MongoDB is not connected. Please start MongoDB service.")
         return self._db[collection_name]
     
+    def get_database(self):
+        """Get the MongoDB database (for stores and executors built on top of the connector)"""
+        if not self._connected or self._db is None:
+            raise Exception("MongoDB is not connected. Please start MongoDB service.")
+        return self._db
+    
+    def get_client(self, uri: Optional[str] = None) -> Optional[MongoClient]:
+        """
+        Get the shared pooled client
+        
+        Args:
+            uri: Connection URI the caller wants; the shared client is only
+                 returned if it matches the configured URI
+            
+        Returns:
+            The shared MongoClient, or None if offline or the URI differs
+        """
+        if not self._connected or (uri and uri != self.uri):
+            return None
+        return self._client
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Connection pool configuration and usage counters
+        
+        Returns:
+            Dictionary with settings, write concern and pool event counts
+        """
+        stats = {
+            'connected': self._connected,
+            'settings': {
+                key: value for key, value in self.pool_options.items()
+                if key not in ('w', 'journal')
+            },
+            'write_concern': (
+                self._client.write_concern.document if self._client is not None
+                else WriteConcern().document
+            )
+        }
+        stats.update(self.pool_listener.stats())
+        return stats
+    
     def get_reconciliation_flow(self, profile_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Get complete reconciliation flow with all related data
@@ -377,6 +532,36 @@ class ReconciliationMongoConnector:
             return []
         return self._db.list_collection_names()
     
+    def truncate_collections(self, collection_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Empty collections by drop-and-recreate, preserving options and indexes
+        
+        Args:
+            collection_names: Collections to truncate (default: all)
+            
+        Returns:
+            Truncation summary (see CollectionTruncator.truncate)
+        """
+        if not self._connected or self._db is None:
+            raise Exception("MongoDB is not connected. Please start MongoDB service.")
+        if collection_names is None:
+            collection_names = self.list_collections()
+        return CollectionTruncator(self._db).truncate(collection_names)
+    
+    def get_kpis(self, profile_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Dashboard overview metrics, one $facet aggregation per collection run concurrently
+        
+        Args:
+            profile_id: Only data of this profile
+            
+        Returns:
+            KPI result (see KpiAggregator.compute)
+        """
+        if not self._connected or self._db is None:
+            raise Exception("MongoDB is not connected. Please start MongoDB service.")
+        return KpiAggregator(self._db).compute(profile_id)
+    
     def close(self):
         """Close MongoDB connection"""
         if self._client:
@@ -0,0 +1,125 @@
+"""
+Query Result Cache
+Keeps recent query results in memory so charts can be re-rendered
+without re-running the LLM or MongoDB
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.json_response import dumps
+
+
+class QueryResultCache:
+    """
+    Thread-safe LRU cache of query results with TTL and memory-bounded eviction
+    """
+
+    def __init__(self, ttl_seconds: int = 900, max_bytes: int = 256 * 1024 * 1024,
+                 max_entries: int = 1000):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: Lifetime of an entry after it was stored
+            max_bytes: Approximate memory budget (encoded JSON size of all entries)
+            max_entries: Hard limit on the number of cached results
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def put(self, result: Dict[str, Any]) -> Optional[str]:
+        """
+        Store a query result
+
+        Args:
+            result: Result payload (query, pipeline, data, chart_config, ...)
+
+        Returns:
+            Result ID, or None if the result alone exceeds the memory budget
+        """
+        size = len(dumps(result))
+        if size > self.max_bytes:
+            return None
+
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[result_id] = {
+                'result': result,
+                'size': size,
+                'expires_at': time.monotonic() + self.ttl_seconds
+            }
+            self._total_bytes += size
+            self._evict()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached result by ID
+
+        Args:
+            result_id: ID returned by put()
+
+        Returns:
+            Cached result, or None if unknown or expired
+        """
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry['expires_at'] <= time.monotonic():
+                self._remove(result_id)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(result_id)
+            self._hits += 1
+            return entry['result']
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions
+            }
+
+    def _remove(self, result_id: str):
+        entry = self._entries.pop(result_id)
+        self._total_bytes -= entry['size']
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until within budget"""
+        now = time.monotonic()
+        for result_id in [rid for rid, e in self._entries.items() if e['expires_at'] <= now]:
+            self._remove(result_id)
+            self._evictions += 1
+
+        while self._entries and (
+            self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries
+        ):
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+
+# Singleton instance
+query_result_cache = QueryResultCache(
+    ttl_seconds=int(os.getenv('QUERY_RESULT_TTL_SECONDS', 900)),
+    max_bytes=int(os.getenv('QUERY_RESULT_CACHE_MB', 256)) * 1024 * 1024,
+    max_entries=int(os.getenv('QUERY_RESULT_CACHE_ENTRIES', 1000))
+)